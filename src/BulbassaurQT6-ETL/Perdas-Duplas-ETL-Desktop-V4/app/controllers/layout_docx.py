@@ -0,0 +1,188 @@
+# ===============================================================
+# Índice de quebras de página/seção de um DOCX
+# ===============================================================
+# Antes, cada análise (e cada inserção de tabela) serializava o XML de todos os
+# parágrafos com python-docx para procurar quebras. Aqui o word/document.xml é
+# lido uma única vez em fluxo (iterparse), as quebras dos parágrafos do corpo
+# viram um índice e "em que parágrafo começa a página N" é uma consulta O(1).
+# O índice fica em cache num arquivo .layout.json ao lado do template e é
+# refeito só quando o template muda.
+import os
+import sys
+import json
+import time
+import zipfile
+
+from lxml import etree
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Quais marcas contam como início de página em cada modo
+MODOS = {
+    'todas': ('manual', 'renderizada'),            # Ctrl+Enter e quebras gravadas pelo Word
+    'manuais': ('manual',),                        # só Ctrl+Enter
+    'com_secoes': ('manual', 'renderizada', 'secao'),
+}
+
+
+class LayoutDocx:
+    """
+    Índice das quebras de um documento Word.
+
+    Os parágrafos são numerados na ordem de `Document.paragraphs` (só os do
+    corpo; os de dentro de tabelas não contam), então o índice devolvido por
+    `paragrafo_da_pagina` pode ser usado direto em `doc.paragraphs[i]`.
+
+    Exemplo:
+        layout = LayoutDocx.carregar("template.docx")
+        layout.n_paginas()                 # mesmo critério do contador antigo
+        layout.paragrafo_da_pagina(3)      # parágrafo cuja quebra abre a página 3
+    """
+    VERSAO = 1
+
+    def __init__(self, n_paragrafos=0, quebras=None, secoes=None):
+        self.n_paragrafos = n_paragrafos
+        # {índice do parágrafo: [marcas]} — só os parágrafos com alguma quebra
+        self.quebras = quebras or {}
+        # [(índice do parágrafo, tipo da seção seguinte)]
+        self.secoes = secoes or []
+        self._por_modo = {
+            modo: [i for i in sorted(self.quebras) if any(m in self.quebras[i] for m in marcas)]
+            for modo, marcas in MODOS.items()
+        }
+
+    # -----------------------
+    # Leitura
+    # -----------------------
+    @classmethod
+    def _indexar(cls, eventos, liberar_memoria):
+        """Máquina de estados sobre eventos (start/end) do XML; serve para iterparse e iterwalk."""
+        profundidade = 0
+        nivel_corpo = None
+        paragrafo = 0
+        marcas = None
+        quebras, secoes = {}, []
+
+        for evento, el in eventos:
+            if evento == 'start':
+                profundidade += 1
+                if el.tag == W + 'body':
+                    nivel_corpo = profundidade
+                elif nivel_corpo and profundidade == nivel_corpo + 1 and el.tag == W + 'p':
+                    marcas = set()
+                elif marcas is not None:
+                    if el.tag == W + 'br' and el.get(W + 'type') == 'page':
+                        marcas.add('manual')
+                    elif el.tag == W + 'lastRenderedPageBreak':
+                        marcas.add('renderizada')
+                continue
+
+            # evento 'end': os filhos já foram lidos
+            if marcas is not None and el.tag == W + 'sectPr':
+                tipo = el.find(W + 'type')
+                tipo = tipo.get(W + 'val') if tipo is not None else 'nextPage'
+                secoes.append((paragrafo, tipo))
+                if tipo != 'continuous':
+                    marcas.add('secao')
+            if nivel_corpo and profundidade == nivel_corpo + 1:
+                if el.tag == W + 'p':
+                    if marcas:
+                        quebras[paragrafo] = sorted(marcas)
+                    paragrafo += 1
+                    marcas = None
+                if liberar_memoria:
+                    # Descarta o elemento já indexado (e os irmãos anteriores)
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
+            profundidade -= 1
+
+        return cls(paragrafo, quebras, secoes)
+
+    @classmethod
+    def do_arquivo(cls, docx_path):
+        """Indexa o DOCX lendo word/document.xml em fluxo, sem montar a árvore inteira."""
+        with zipfile.ZipFile(docx_path) as z, z.open('word/document.xml') as f:
+            return cls._indexar(etree.iterparse(f, events=('start', 'end')), liberar_memoria=True)
+
+    @classmethod
+    def do_documento(cls, doc):
+        """Indexa um Document do python-docx já aberto (ex: alterado em memória)."""
+        return cls._indexar(etree.iterwalk(doc.element.body, events=('start', 'end')), liberar_memoria=False)
+
+    # -----------------------
+    # Cache ao lado do template
+    # -----------------------
+    @staticmethod
+    def caminho_cache(docx_path):
+        return os.path.splitext(docx_path)[0] + ".layout.json"
+
+    @classmethod
+    def carregar(cls, docx_path, usar_cache=True):
+        """Índice do arquivo, reaproveitando o .layout.json se o template não mudou desde a indexação."""
+        info = os.stat(docx_path)
+        assinatura = {"versao": cls.VERSAO, "tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+        cache = cls.caminho_cache(docx_path)
+
+        if usar_cache and os.path.exists(cache):
+            try:
+                with open(cache, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                if all(dados.get(k) == v for k, v in assinatura.items()):
+                    return cls(dados["n_paragrafos"], {int(k): v for k, v in dados["quebras"].items()},
+                               [tuple(s) for s in dados["secoes"]])
+            except (OSError, ValueError, KeyError):
+                pass  # cache ilegível: reindexa
+
+        layout = cls.do_arquivo(docx_path)
+        if usar_cache:
+            try:
+                with open(cache, "w", encoding="utf-8") as f:
+                    json.dump({**assinatura, "n_paragrafos": layout.n_paragrafos,
+                               "quebras": layout.quebras, "secoes": layout.secoes}, f, ensure_ascii=False)
+            except OSError:
+                pass  # pasta sem permissão de escrita: segue sem cache
+        return layout
+
+    # -----------------------
+    # Consultas
+    # -----------------------
+    def n_paginas(self, modo='todas'):
+        """Páginas estimadas: 1 + parágrafos que contêm alguma quebra do modo (uma por parágrafo)."""
+        return 1 + len(self._por_modo[modo])
+
+    def paragrafo_da_pagina(self, pagina, modo='todas'):
+        """
+        Índice (em `doc.paragraphs`) do parágrafo cuja quebra abre a página `pagina`,
+        ou None se a página for 1 ou estiver além do fim do documento.
+        """
+        quebras = self._por_modo[modo]
+        if pagina < 2 or pagina - 2 >= len(quebras):
+            return None
+        return quebras[pagina - 2]
+
+
+if __name__ == '__main__':
+    # Compara com a contagem antiga (XML de cada parágrafo) num DOCX
+    from docx import Document
+
+    caminho = sys.argv[1]
+    inicio = time.perf_counter()
+    doc = Document(caminho)
+    paginas = 1
+    for p in doc.paragraphs:
+        xml = p._element.xml
+        if "<w:br w:type=\"page\"" in xml or "lastRenderedPageBreak" in xml:
+            paginas += 1
+    tempo_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    layout = LayoutDocx.carregar(caminho, usar_cache=False)
+    tempo_fluxo = time.perf_counter() - inicio
+    LayoutDocx.carregar(caminho)  # grava o .layout.json
+    inicio = time.perf_counter()
+    LayoutDocx.carregar(caminho)
+    tempo_cache = time.perf_counter() - inicio
+
+    print(f"Páginas: antigo={paginas} | índice={layout.n_paginas()} | seções={len(layout.secoes)}")
+    print(f"Tempo: XML por parágrafo {tempo_antigo:.3f}s | iterparse {tempo_fluxo:.3f}s | com cache {tempo_cache * 1000:.1f} ms")
@@ -0,0 +1,130 @@
+# ===============================================================
+# Preview HTML paginado da tabela de contingências
+# ===============================================================
+# Só a página visível é montada. As linhas de cada página são geradas em bloco
+# (concatenação de colunas inteiras com o pandas, sem iterrows) e ficam em cache
+# até os dados mudarem; larguras e cores só afetam o cabeçalho, que é barato.
+import sys
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _escapar(serie: pd.Series) -> pd.Series:
+    return serie.str.replace('&', '&amp;', regex=False).str.replace('<', '&lt;', regex=False).str.replace('>', '&gt;', regex=False)
+
+
+def linhas_html(bloco: pd.DataFrame) -> str:
+    """Linhas <tr> de um bloco do DataFrame (nulos viram célula vazia)."""
+    if bloco.empty:
+        return ''
+    html = pd.Series('<tr>', index=bloco.index)
+    for col in bloco.columns:
+        valores = bloco[col].astype(object)
+        texto = valores.where(valores.notna(), '').astype(str)
+        html = html + '<td>' + _escapar(texto) + '</td>'
+    return ''.join(html + '</tr>')
+
+
+class PreviewHTML:
+    """
+    Renderizador do preview com paginação e cache das páginas já montadas.
+
+    Exemplo:
+        preview = PreviewHTML(df, linhas_por_pagina=200)
+        html = preview.pagina(1, widths={'Perda Dupla': 320})
+    """
+
+    def __init__(self, df=None, linhas_por_pagina=200, tamanho_cache=16):
+        self.linhas_por_pagina = max(1, int(linhas_por_pagina))
+        self.tamanho_cache = tamanho_cache
+        self._cache = OrderedDict()
+        self.df = None
+        if df is not None:
+            self.set_dados(df)
+
+    def set_dados(self, df):
+        """Troca os dados do preview; as páginas em cache são descartadas."""
+        self.df = df
+        self._cache.clear()
+
+    @property
+    def n_paginas(self):
+        if self.df is None or self.df.empty:
+            return 1
+        return (len(self.df) - 1) // self.linhas_por_pagina + 1
+
+    def fatia(self, pagina):
+        """Linhas do DataFrame que aparecem na página (base 1)."""
+        pagina = min(max(1, pagina), self.n_paginas)
+        inicio = (pagina - 1) * self.linhas_por_pagina
+        return self.df.iloc[inicio:inicio + self.linhas_por_pagina]
+
+    def _corpo(self, pagina):
+        if pagina in self._cache:
+            self._cache.move_to_end(pagina)
+            return self._cache[pagina]
+        corpo = linhas_html(self.fatia(pagina))
+        self._cache[pagina] = corpo
+        if len(self._cache) > self.tamanho_cache:
+            self._cache.popitem(last=False)
+        return corpo
+
+    def pagina(self, pagina=1, widths=None, header_fill="4472C4", header_text="FFFFFF"):
+        """HTML completo de uma página do preview (base 1)."""
+        if self.df is None:
+            return '<html><head><meta charset="utf-8"></head><body></body></html>'
+        pagina = min(max(1, pagina), self.n_paginas)
+        bg = f"#{header_fill}"
+        color = f"#{header_text}"
+        cabecalho = ''.join(
+            f'<th style="background:{bg};color:{color};width:{widths.get(col, 140) if widths else 140}px;">{col}</th>'
+            for col in self.df.columns
+        )
+        inicio = (pagina - 1) * self.linhas_por_pagina
+        fim = min(inicio + self.linhas_por_pagina, len(self.df))
+        rodape = f'<p style="font-family:Arial;color:#555;">Linhas {inicio + 1 if fim else 0}–{fim} de {len(self.df)} | página {pagina} de {self.n_paginas}</p>'
+        return (
+            '<html><head><meta charset="utf-8"></head><body>'
+            '<table border="1" cellspacing="0" cellpadding="6" style="border-collapse:collapse;font-family:Arial;width:100%;">'
+            f'<tr>{cabecalho}</tr>{self._corpo(pagina)}</table>{rodape}</body></html>'
+        )
+
+
+def benchmark_preview(n_linhas=50000, linhas_por_pagina=200):
+    """Compara o preview antigo (iterrows sobre tudo) com a primeira página e a página em cache."""
+    df = pd.DataFrame({
+        'Volume': [f"Volume {i % 7 + 1}" for i in range(n_linhas)],
+        'Perda Dupla': [f"LT 500 kV Assis {i} – Ponta Grossa C1" for i in range(n_linhas)],
+        'Futura': ["SIM" if i % 2 else None for i in range(n_linhas)],
+        'Página': range(n_linhas),
+    })
+
+    inicio = time.perf_counter()
+    html = ''
+    for _, row in df.iterrows():
+        html += '<tr>'
+        for val in row:
+            html += f'<td>{"" if pd.isna(val) else val}</td>'
+        html += '</tr>'
+    tempo_antigo = time.perf_counter() - inicio
+
+    preview = PreviewHTML(df, linhas_por_pagina)
+    inicio = time.perf_counter()
+    preview.pagina(1)
+    tempo_pagina = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    preview.pagina(1, widths={'Perda Dupla': 320})
+    tempo_cache = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    linhas_html(df)
+    tempo_tudo = time.perf_counter() - inicio
+
+    print(f"{n_linhas} linhas | iterrows (tudo): {tempo_antigo:.2f}s | vetorizado (tudo): {tempo_tudo:.2f}s | "
+          f"página de {linhas_por_pagina}: {tempo_pagina * 1000:.1f} ms | página em cache: {tempo_cache * 1000:.2f} ms")
+    return {"iterrows_s": tempo_antigo, "vetorizado_s": tempo_tudo, "pagina_s": tempo_pagina, "cache_s": tempo_cache}
+
+
+if __name__ == '__main__':
+    benchmark_preview(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
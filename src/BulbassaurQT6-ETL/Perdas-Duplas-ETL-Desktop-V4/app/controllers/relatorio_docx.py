@@ -0,0 +1,244 @@
+# ===============================================================
+# Motor de tabelas DOCX do relatório de Perdas Duplas
+# ===============================================================
+# Preencher a tabela do python-docx célula a célula (table.cell(i, j).text)
+# custa caro: cada acesso percorre a grade da tabela. Aqui só o cabeçalho e uma
+# linha-modelo passam pelo python-docx; as demais linhas são montadas como
+# WordprocessingML (texto) a partir da linha-modelo e entram na tabela de uma vez.
+import re
+import sys
+import time
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from lxml import etree
+from docx import Document
+from docx.shared import RGBColor, Cm
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import qn, nsdecls
+
+# -----------------------
+# Utilitários docx
+# -----------------------
+def set_cell_shading(cell, fill_hex: str):
+    tc = cell._tc
+    tcPr = tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:fill'), fill_hex)
+    tcPr.append(shd)
+
+def set_run_color(run, hex_color: str):
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    run.font.color.rgb = RGBColor(r, g, b)
+
+def px_to_cm(px: int):
+    return px / 37.8
+
+# -----------------------
+# Montagem das linhas em XML
+# -----------------------
+_XMLNS_RE = re.compile(r'\sxmlns:\w+="[^"]*"')
+
+def _t_xml(texto):
+    # Mesmo critério do python-docx para preservar espaços nas pontas
+    if len(texto.strip()) < len(texto):
+        return f'<w:t xml:space="preserve">{escape(texto)}</w:t>'
+    return f'<w:t>{escape(texto)}</w:t>'
+
+def run_xml(texto: str) -> str:
+    """
+    Conteúdo de um <w:r> igual ao que `cell.text = texto` gera no python-docx:
+    tab vira <w:tab/>, quebra de linha vira <w:br/> e o resto vai em <w:t>.
+    """
+    if not texto:
+        return '<w:r/>'
+    if '\t' not in texto and '\n' not in texto and '\r' not in texto:
+        return f'<w:r>{_t_xml(texto)}</w:r>'
+    partes, buffer = [], []
+    for char in texto:
+        if char == '\t' or char in '\r\n':
+            if buffer:
+                partes.append(_t_xml(''.join(buffer)))
+                buffer = []
+            partes.append('<w:tab/>' if char == '\t' else '<w:br/>')
+        else:
+            buffer.append(char)
+    if buffer:
+        partes.append(_t_xml(''.join(buffer)))
+    return f'<w:r>{"".join(partes)}</w:r>'
+
+def _celula_modelo(tc):
+    """Divide o XML de uma célula da linha-modelo em (abertura com <w:tcPr>, fechamento)."""
+    tcPr = tc.tcPr
+    propriedades = etree.tostring(tcPr, encoding='unicode') if tcPr is not None else ''
+    # O fragmento serializado repete as declarações de namespace do documento; o <w:tbl> do corpo já declara w:
+    propriedades = _XMLNS_RE.sub('', propriedades)
+    return f'<w:tc>{propriedades}<w:p>', '</w:p></w:tc>'
+
+def gerar_tabela_docx(doc, df, header_fill="4472C4", header_text="FFFFFF", widths=None, style='Table Grid', log=print):
+    """
+    Cria no final do documento a tabela do DataFrame com a mesma formatação do
+    preenchimento célula a célula: estilo, cabeçalho em negrito com fundo
+    `header_fill` e texto `header_text`, larguras (px) por coluna e valores
+    nulos como texto vazio.
+
+    Args:
+        doc (Document): Documento python-docx de destino.
+        df (pd.DataFrame): Dados da tabela (uma linha do Word por linha do DataFrame).
+        header_fill (str): Cor de fundo do cabeçalho (hex, sem '#').
+        header_text (str): Cor do texto do cabeçalho (hex, sem '#').
+        widths (dict, optional): Largura em px por nome de coluna (padrão 140).
+        style (str): Estilo de tabela do template.
+        log (callable): Recebe os avisos (ex.: largura inválida), que não interrompem a geração.
+
+    Returns:
+        Table: A tabela criada (o chamador decide onde inseri-la).
+    """
+    n_linhas, n_colunas = df.shape
+    # Só cabeçalho + linha-modelo passam pelo python-docx
+    table = doc.add_table(rows=2, cols=n_colunas)
+    table.style = style
+
+    for j, col in enumerate(df.columns):
+        cell = table.cell(0, j)
+        run = cell.paragraphs[0].add_run(str(col))
+        run.bold = True
+        set_cell_shading(cell, header_fill)
+        set_run_color(run, header_text)
+
+    # Larguras na linha-modelo (copiadas para todas as linhas); uma largura inválida só gera aviso
+    widths = widths or {}
+    try:
+        for j, col in enumerate(df.columns):
+            cm_val = Cm(px_to_cm(int(widths.get(str(col), 140))))
+            for i in (0, 1):
+                try:
+                    table.cell(i, j).width = cm_val
+                except Exception:
+                    pass
+            try:
+                table.columns[j].width = cm_val
+            except Exception:
+                pass
+    except Exception as e:
+        log(f"Aviso largura: {e}")
+
+    linha_modelo = table._tbl.tr_lst[1]
+    celulas = [_celula_modelo(tc) for tc in linha_modelo.tc_lst]
+    table._tbl.remove(linha_modelo)
+    if n_linhas == 0:
+        return table
+
+    # Corpo inteiro como WordprocessingML, montado a partir da linha-modelo
+    partes = []
+    for row in df.values:
+        partes.append('<w:tr>')
+        for (abertura, fechamento), val in zip(celulas, row):
+            partes.append(abertura)
+            partes.append(run_xml("" if pd.isna(val) else str(val)))
+            partes.append(fechamento)
+        partes.append('</w:tr>')
+    corpo = parse_xml(f'<w:tbl {nsdecls("w")}>{"".join(partes)}</w:tbl>')
+    # Inserção em um único passo
+    table._tbl.extend(list(corpo))
+    return table
+
+def inserir_tabela_na_pagina(doc, table, pagina_alvo, layout=None):
+    """
+    Insere a tabela na página alvo procurando por quebras de página manuais.
+
+    Args:
+        layout (LayoutDocx, optional): Índice do template de onde `doc` foi aberto.
+            Sem ele, o índice é montado a partir do documento em memória.
+    """
+    if pagina_alvo <= 1:
+        # Insere no início do documento
+        doc.paragraphs[0].insert_paragraph_before("")._p.addnext(table._tbl)
+        print("   📍 Inserido no INÍCIO do documento.")
+        return
+
+    if layout is None:
+        from app.controllers.layout_docx import LayoutDocx
+        layout = LayoutDocx.do_documento(doc)
+    idx = layout.paragrafo_da_pagina(pagina_alvo, 'manuais')
+
+    if idx is not None:
+        # Insere junto ao parágrafo que contém a quebra que abre a página desejada
+        p = doc.paragraphs[idx]
+        p.insert_paragraph_before("") # Cria um espaço
+        p.insert_paragraph_before("")._p.addnext(table._tbl)
+        print(f"   📍 Inserido logo após a quebra da página {pagina_alvo - 1}.")
+    else:
+        print("   ⚠️ Página alvo não encontrada (documento menor que o esperado). Adicionando ao final.")
+        doc.add_page_break()
+        doc.add_paragraph("Tabela inserida aqui (Fim do Arquivo).")
+        doc.element.body.append(table._tbl)
+
+# -----------------------
+# Benchmark
+# -----------------------
+def _gerar_tabela_celula_a_celula(doc, df, header_fill, header_text, widths):
+    """Implementação anterior (célula a célula), mantida só para comparação no benchmark."""
+    table = doc.add_table(rows=df.shape[0]+1, cols=df.shape[1])
+    table.style = 'Table Grid'
+    for j, col in enumerate(df.columns):
+        cell = table.cell(0, j)
+        run = cell.paragraphs[0].add_run(str(col))
+        run.bold = True
+        set_cell_shading(cell, header_fill)
+        set_run_color(run, header_text)
+    for i, row in enumerate(df.values):
+        for j, val in enumerate(row):
+            table.cell(i+1, j).text = "" if pd.isna(val) else str(val)
+    for j, col in enumerate(df.columns):
+        cm_val = px_to_cm(int(widths.get(str(col), 140)))
+        for r in range(df.shape[0] + 1):
+            table.cell(r, j).width = Cm(cm_val)
+        table.columns[j].width = Cm(cm_val)
+    return table
+
+def _df_exemplo(n_linhas):
+    return pd.DataFrame({
+        'Volume': [f"Volume {i % 7 + 1}" for i in range(n_linhas)],
+        'Área Geoelétrica': ["Interligação Sul e Sudeste/Centro-Oeste"] * n_linhas,
+        'Perda Dupla': [f"LT 500 kV Assis {i} – Ponta Grossa C1 & C2" for i in range(n_linhas)],
+        'Prazo': ["Curto Prazo" if i % 2 else "Médio Prazo" for i in range(n_linhas)],
+        'Futura': ["SIM" if i % 2 else None for i in range(n_linhas)],
+        'Página': list(range(n_linhas)),
+    })
+
+def benchmark_tabela_docx(tamanhos=(1000, 5000, 20000), amostra_comparacao=200):
+    """
+    Mede a geração da tabela para cada tamanho. A implementação célula a célula
+    cresce de forma quadrática (~60s para 200 linhas), então ela roda só numa
+    amostra de `amostra_comparacao` linhas, que também confere se o XML é idêntico.
+    """
+    widths = {'Perda Dupla': 320, 'Área Geoelétrica': 220}
+    resultados = {}
+
+    if amostra_comparacao:
+        df = _df_exemplo(amostra_comparacao)
+        inicio = time.perf_counter()
+        antiga = _gerar_tabela_celula_a_celula(Document(), df, "4472C4", "FFFFFF", widths)
+        tempo_antigo = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        nova = gerar_tabela_docx(Document(), df, widths=widths)
+        tempo_novo = time.perf_counter() - inicio
+        identico = antiga._tbl.xml == nova._tbl.xml
+        resultados['comparacao'] = {"linhas": amostra_comparacao, "celula_a_celula_s": tempo_antigo,
+                                    "template_s": tempo_novo, "xml_identico": identico}
+        print(f"{amostra_comparacao:>6} linhas: célula a célula {tempo_antigo:.2f}s | template {tempo_novo:.2f}s | XML idêntico: {identico}")
+
+    for n in tamanhos:
+        df = _df_exemplo(n)
+        inicio = time.perf_counter()
+        gerar_tabela_docx(Document(), df, widths=widths)
+        resultados[n] = time.perf_counter() - inicio
+        print(f"{n:>6} linhas: template {resultados[n]:.2f}s")
+    return resultados
+
+
+if __name__ == '__main__':
+    benchmark_tabela_docx(tuple(int(n) for n in sys.argv[1:]) or (1000, 5000, 20000))
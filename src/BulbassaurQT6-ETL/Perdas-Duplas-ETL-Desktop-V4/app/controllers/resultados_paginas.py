@@ -0,0 +1,175 @@
+# ===============================================================
+# Resultados do ETL guardados por página do PDF
+# ===============================================================
+# O processamento gera as contingências página a página; aqui cada página fica
+# guardada enquanto o PDF e as opções não mudam. Reduzir o intervalo de páginas
+# vira só um filtro sobre o que já foi extraído, e o DataFrame normalizado de
+# cada seleção (o que a tabela e todos os exportadores leem) é montado uma vez.
+# Volume, Área e Prazo passam de uma página para a seguinte, então só valem para
+# filtrar as páginas de uma execução que as leu em sequência desde a página 1;
+# as de uma execução que começou no meio do documento ficam sem esse contexto.
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class ResultadosPorPagina:
+    """
+    Contingências já processadas de um PDF, por página (base 1).
+
+    Exemplo:
+        resultados = ResultadosPorPagina(ETLController._COLUMN_NAMES)
+        resultados.preparar("Rev5.pdf", opcoes, total_paginas=120)
+        por_pagina = dict(controller.iter_contingencias_duplas(paginas))
+        resultados.guardar_execucao(por_pagina, page_range)   # page_range base 0 ou None
+        if resultados.cobre([0, 1, 2]):          # índices base 0, como na UI
+            df = resultados.frame([0, 1, 2])
+    """
+
+    def __init__(self, colunas, tamanho_cache=8):
+        self.colunas = list(colunas)
+        self.tamanho_cache = tamanho_cache
+        self.chave = None
+        self.total_paginas = 0
+        self.paginas = {}  # {página base 1: DataFrame da página}
+        self.confiaveis = set()  # páginas lidas em sequência desde a página 1 (com o contexto completo)
+        self._frames = OrderedDict()
+
+    def limpar(self):
+        self.chave = None
+        self.total_paginas = 0
+        self.paginas.clear()
+        self.confiaveis.clear()
+        self._frames.clear()
+
+    def preparar(self, pdf_path, opcoes, total_paginas):
+        """
+        Associa os resultados ao PDF e às opções de processamento. Se algum dos
+        dois mudou, o que estava guardado é descartado. Devolve True se houve troca.
+        """
+        chave = (os.path.abspath(pdf_path), tuple(sorted(opcoes.items())))
+        if chave == self.chave:
+            return False
+        self.limpar()
+        self.chave = chave
+        self.total_paginas = total_paginas
+        return True
+
+    def _selecao(self, paginas):
+        """Índices base 0 (ou None para todas) -> páginas base 1 dentro do documento."""
+        if paginas is None:
+            return tuple(range(1, self.total_paginas + 1))
+        return tuple(p + 1 for p in sorted(set(paginas)) if 0 <= p < self.total_paginas)
+
+    def guardar(self, pagina, df, confiavel=True):
+        """
+        Guarda (ou substitui) o resultado de uma página, inclusive páginas sem contingências.
+        `confiavel=False` marca uma página lida sem o contexto das anteriores: ela entra
+        no frame da execução que a gerou, mas não conta como já processada.
+        """
+        self.paginas[pagina] = df
+        if confiavel:
+            self.confiaveis.add(pagina)
+        else:
+            self.confiaveis.discard(pagina)
+        self._frames.clear()
+
+    def guardar_execucao(self, por_pagina, paginas):
+        """
+        Guarda as páginas de uma execução do ETL. `paginas` é o intervalo pedido
+        (índices base 0, ou None para o documento todo); só as páginas lidas em
+        sequência a partir da página 1 ficam como confiáveis.
+        """
+        if paginas is None:
+            contiguas = self.total_paginas
+        else:
+            contiguas = 0
+            for p in sorted(set(paginas)):
+                if p != contiguas:
+                    break
+                contiguas += 1
+        for pagina, df in por_pagina.items():
+            self.guardar(pagina, df, confiavel=pagina <= contiguas)
+
+    def faltantes(self, paginas):
+        """Páginas (base 0) da seleção que ainda não foram processadas com o contexto completo."""
+        return [p - 1 for p in self._selecao(paginas) if p not in self.confiaveis]
+
+    def cobre(self, paginas):
+        return self.chave is not None and not self.faltantes(paginas)
+
+    def frame(self, paginas=None):
+        """
+        DataFrame normalizado das páginas selecionadas: colunas na ordem do ETL,
+        linhas na ordem do documento e índice contínuo. Fica em cache por seleção
+        até alguma página ser guardada de novo.
+        """
+        selecao = self._selecao(paginas)
+        if selecao in self._frames:
+            self._frames.move_to_end(selecao)
+            return self._frames[selecao]
+
+        partes = [self.paginas[p] for p in selecao if p in self.paginas and not self.paginas[p].empty]
+        if partes:
+            df = pd.concat(partes, ignore_index=True).reindex(columns=self.colunas)
+            # Páginas sem Volume/Prazo trazem None; o frame final usa NaN e os tipos de uma execução única
+            df = df.where(df.notna()).infer_objects()
+        else:
+            df = pd.DataFrame(columns=self.colunas)
+        self._frames[selecao] = df
+        if len(self._frames) > self.tamanho_cache:
+            self._frames.popitem(last=False)
+        return df
+
+
+def benchmark_resultados(pdf_path=None, n_paginas=400, por_pagina=25, selecao=(0, 10)):
+    """
+    Compara reprocessar um intervalo menor com filtrar as páginas já guardadas.
+    Com `pdf_path` a leitura do PDF entra no tempo de reprocessar; sem ele usa páginas sintéticas.
+    """
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from app.controllers.etl_repository import ETLController
+
+    controller = ETLController()
+    if pdf_path:
+        n_paginas = controller.count_pdf_pages(pdf_path)
+        paginas = list(controller.iter_pdf_pages(pdf_path))
+    else:
+        paginas = []
+        for pagina in range(1, n_paginas + 1):
+            linhas = [f"Volume {pagina % 7 + 1} - Área Sul", "Prazo: Curto Prazo"]
+            linhas += [f"• LT 500 kV Assis {pagina}-{i} – Ponta Grossa C1 + LT 230 kV Xavantes – Ibiúna C2" for i in range(por_pagina)]
+            paginas.append((pagina, "\n".join(linhas)))
+
+    resultados = ResultadosPorPagina(controller._COLUMN_NAMES)
+    resultados.preparar(pdf_path or "sintetico.pdf", controller.process_options, n_paginas)
+    for pagina, df in controller.iter_contingencias_duplas(paginas):
+        resultados.guardar(pagina, df)
+
+    inicio, fim = selecao
+    inicio_t = time.perf_counter()
+    if pdf_path:
+        reprocessado = controller.process_contingencias_duplas(controller.iter_pdf_pages(pdf_path, list(range(inicio, fim))))
+    else:
+        reprocessado = controller.process_contingencias_duplas(paginas[inicio:fim])
+    tempo_reprocessar = time.perf_counter() - inicio_t
+
+    inicio_t = time.perf_counter()
+    filtrado = resultados.frame(range(inicio, fim))
+    tempo_filtrar = time.perf_counter() - inicio_t
+    inicio_t = time.perf_counter()
+    resultados.frame(range(inicio, fim))
+    tempo_cache = time.perf_counter() - inicio_t
+
+    print(f"{n_paginas} páginas | intervalo {inicio + 1}-{fim}: reprocessar {tempo_reprocessar * 1000:.1f} ms "
+          f"({len(reprocessado)} linhas) | filtrar {tempo_filtrar * 1000:.1f} ms ({len(filtrado)} linhas) | "
+          f"em cache {tempo_cache * 1000:.3f} ms")
+    return {"reprocessar_s": tempo_reprocessar, "filtrar_s": tempo_filtrar, "cache_s": tempo_cache}
+
+
+if __name__ == '__main__':
+    # python resultados_paginas.py [relatorio.pdf]
+    benchmark_resultados(sys.argv[1] if len(sys.argv) > 1 else None)
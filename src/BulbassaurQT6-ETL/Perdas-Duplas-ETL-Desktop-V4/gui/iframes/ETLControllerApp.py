@@ -1,12 +1,10 @@
 # RelatorioWidgetFrame.py
 import sys
 import os
+import time
+import pathlib
 import pandas as pd
 from docx import Document
-from docx.shared import RGBColor, Cm
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx2pdf import convert
 
 from PySide6.QtWidgets import (
     QApplication, QFrame, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
@@ -25,41 +23,22 @@ except Exception:
     HAS_WEBENGINE = False
 
 # -----------------------
-# Utilitários docx
+# Utilitários docx (app/controllers/relatorio_docx.py)
 # -----------------------
-def set_cell_shading(cell, fill_hex: str):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:fill'), fill_hex)
-    tcPr.append(shd)
-
-def set_run_color(run, hex_color: str):
-    r = int(hex_color[0:2], 16)
-    g = int(hex_color[2:4], 16)
-    b = int(hex_color[4:6], 16)
-    run.font.color.rgb = RGBColor(r, g, b)
-
-def px_to_cm(px: int):
-    return px / 37.8
+# Adiciona duas pastas acima ao sys.path para importar o controller
+sys.path.insert(0, str((pathlib.Path(__file__).parent / ".." / "..").resolve()))
+
+from app.controllers.relatorio_docx import gerar_tabela_docx
+from app.controllers.preview_html import PreviewHTML
+from app.controllers.layout_docx import LayoutDocx
+
+# Conversão DOCX -> PDF pelo serviço compartilhado (LibreOffice mantido aberto; docx2pdf como fallback)
+sys.path.insert(0, str((pathlib.Path(__file__).parent / ".." / ".." / "modules" / "Relatorio-Generator-Py").resolve()))
+from conversor_pdf import converter_docx_para_pdf
 
 def gerar_preview_html(df, widths=None, header_fill="4472C4", header_text="FFFFFF"):
-    bg = f"#{header_fill}"
-    color = f"#{header_text}"
-    html = '<html><head><meta charset="utf-8"></head><body>'
-    html += '<table border="1" cellspacing="0" cellpadding="6" style="border-collapse:collapse;font-family:Arial;width:100%;">'
-    html += '<tr>'
-    for col in df.columns:
-        w = widths.get(col, 140) if widths else 140
-        html += f'<th style="background:{bg};color:{color};width:{w}px;">{col}</th>'
-    html += '</tr>'
-    for _, row in df.iterrows():
-        html += '<tr>'
-        for val in row:
-            html += f'<td>{"" if pd.isna(val) else val}</td>'
-        html += '</tr>'
-    html += '</table></body></html>'
-    return html
+    """Preview da tabela inteira numa única página (ver PreviewHTML para o preview paginado)."""
+    return PreviewHTML(df, linhas_por_pagina=max(len(df), 1)).pagina(1, widths, header_fill, header_text)
 
 # -----------------------
 # Workers
@@ -86,19 +65,8 @@ class AnaliseWorker(QThread):
                 res['df'] = df
                 res['rows'], res['cols'] = df.shape
             if os.path.exists(self.template):
-                # contar páginas por quebras simples
-                doc = Document(self.template)
-                paginas = 1
-                for p in doc.paragraphs:
-                    xml = p._element.xml
-                    if "<w:br w:type=\"page\"" in xml or "lastRenderedPageBreak" in xml:
-                        paginas += 1
-                        continue
-                    for run in p.runs:
-                        if "w:br" in run._element.xml and "type=\"page\"" in run._element.xml:
-                            paginas += 1
-                            break
-                res['pages'] = paginas
+                # contar páginas por quebras simples (índice em cache ao lado do template)
+                res['pages'] = LayoutDocx.carregar(self.template).n_paginas()
             self.finished.emit(res)
         except Exception as e:
             self.error.emit(str(e))
@@ -118,46 +86,16 @@ class GeracaoWorker(QThread):
             df = pd.read_excel(self.cfg['excel'], sheet_name=self.cfg.get('sheet', None))
             doc = Document(self.cfg['template'])
 
-            self.log.emit("🔧 Criando tabela...")
-            table = doc.add_table(rows=df.shape[0]+1, cols=df.shape[1])
-            table.style = 'Table Grid'
-
             # cabeçalho com estilo selecionado
             sel_style = self.cfg.get('style', 'ONS')
             fill = "4472C4" if sel_style == "ONS Azul" else "A9B3BD"  # cinza
             textc = "FFFFFF"
 
-            for j, col in enumerate(df.columns):
-                cell = table.cell(0, j)
-                run = cell.paragraphs[0].add_run(str(col))
-                run.bold = True
-                set_cell_shading(cell, fill)
-                set_run_color(run, textc)
-
-            self.log.emit("📝 Preenchendo dados...")
-            for i, row in enumerate(df.values):
-                for j, val in enumerate(row):
-                    table.cell(i+1, j).text = "" if pd.isna(val) else str(val)
-
-            # aplicar larguras
-            self.log.emit("📐 Aplicando larguras por coluna...")
-            widths_map = self.cfg.get('widths', {})
-            try:
-                for j, col in enumerate(df.columns):
-                    px = int(widths_map.get(str(col), 140))
-                    cm_val = px_to_cm(px)
-                    # aplicar em cada célula da coluna
-                    for r in range(df.shape[0] + 1):
-                        try:
-                            table.cell(r, j).width = Cm(cm_val)
-                        except Exception:
-                            pass
-                    try:
-                        table.columns[j].width = Cm(cm_val)
-                    except Exception:
-                        pass
-            except Exception as e:
-                self.log.emit(f"Aviso largura: {e}")
+            # Corpo gerado como WordprocessingML a partir de uma linha-modelo e inserido de uma vez
+            self.log.emit(f"🔧 Criando tabela ({df.shape[0]} linhas)...")
+            inicio = time.perf_counter()
+            table = gerar_tabela_docx(doc, df, header_fill=fill, header_text=textc, widths=self.cfg.get('widths', {}), log=self.log.emit)
+            self.log.emit(f"📝 Tabela montada em {time.perf_counter() - inicio:.2f}s")
 
             # inserir na página alvo (fallback: final)
             self.log.emit("📄 Inserindo tabela no documento...")
@@ -166,17 +104,11 @@ class GeracaoWorker(QThread):
                 if target_page <= 1:
                     doc.paragraphs[0].insert_paragraph_before("")._p.addnext(table._tbl)
                 else:
-                    paginas = 1
-                    inserted = False
-                    for p in doc.paragraphs:
-                        xml = p._element.xml
-                        if "<w:br w:type=\"page\"" in xml or "lastRenderedPageBreak" in xml:
-                            paginas += 1
-                        if paginas == target_page:
-                            p._p.addnext(table._tbl)
-                            inserted = True
-                            break
-                    if not inserted:
+                    # parágrafo cuja quebra abre a página alvo (a tabela nova não altera os índices dos parágrafos)
+                    idx = LayoutDocx.carregar(self.cfg['template']).paragrafo_da_pagina(target_page)
+                    if idx is not None:
+                        doc.paragraphs[idx]._p.addnext(table._tbl)
+                    else:
                         doc.add_page_break()
                         doc.paragraphs[-1]._p.addnext(table._tbl)
             except Exception as e:
@@ -192,7 +124,8 @@ class GeracaoWorker(QThread):
                 out_pdf = self.cfg.get('out_pdf') or os.path.splitext(out_word)[0] + ".pdf"
                 try:
                     self.log.emit("🔄 Convertendo para PDF...")
-                    convert(out_word, out_pdf)
+                    registro = converter_docx_para_pdf(out_word, out_pdf)
+                    self.log.emit(f"📄 PDF gerado em {registro['conversao_s']:.2f}s ({registro['modo']})")
                     self.finished.emit(out_pdf)
                 except Exception as e:
                     self.log.emit(f"Aviso conversão: {e}")
@@ -270,6 +203,7 @@ class RelatorioWidgetFrame(QFrame):
         self.out_pdf = ""
         self.df = None
         self.col_widths = {}
+        self.preview = PreviewHTML(linhas_por_pagina=200) # páginas do preview ficam em cache até os dados mudarem
 
     def _init_ui(self):
         main = QVBoxLayout(self)
@@ -347,6 +281,16 @@ class RelatorioWidgetFrame(QFrame):
         btn_analyze.clicked.connect(self.analisar)
         left.addWidget(btn_analyze)
 
+        prev_h = QHBoxLayout()
+        prev_h.addWidget(QLabel("Página do preview:"))
+        self.spin_preview_page = QSpinBox()
+        self.spin_preview_page.setRange(1, 1)
+        self.spin_preview_page.valueChanged.connect(self.atualizar_preview)
+        prev_h.addWidget(self.spin_preview_page)
+        self.lbl_preview_pages = QLabel("de 1")
+        prev_h.addWidget(self.lbl_preview_pages)
+        left.addLayout(prev_h)
+
         btn_preview = QPushButton("🔄 Atualizar Preview")
         btn_preview.clicked.connect(self.atualizar_preview)
         left.addWidget(btn_preview)
@@ -416,7 +360,13 @@ class RelatorioWidgetFrame(QFrame):
         self.console.append(">> Análise finalizada.")
         if 'df' in res:
             self.df = res['df']
-            self.tab_excel.load_dataframe(self.df)
+            self.preview.set_dados(self.df)
+            self.spin_preview_page.blockSignals(True)
+            self.spin_preview_page.setRange(1, self.preview.n_paginas)
+            self.spin_preview_page.setValue(1)
+            self.spin_preview_page.blockSignals(False)
+            self.lbl_preview_pages.setText(f"de {self.preview.n_paginas}")
+            self.tab_excel.load_dataframe(self.df) # a aba de dados mostra a planilha inteira; só o preview HTML é paginado
             self._build_width_controls()
             self.console.append(f">> Dados: {res.get('rows',0)} linhas, {res.get('cols',0)} colunas.")
         if 'pages' in res:
@@ -451,21 +401,17 @@ class RelatorioWidgetFrame(QFrame):
             field_widget = self.form_layout.itemAt(i, QFormLayout.FieldRole).widget()
             if label_widget and field_widget:
                 self.col_widths[str(label_widget.text())] = field_widget.value()
-        # gerar html e mostrar na aba Excel (se WebEngine disponível, abrir HTML simples no PDF tab)
-        html = gerar_preview_html(self.df, widths=self.col_widths,
-                                 header_fill="4472C4" if self.combo_style.currentText()=="ONS Azul" else "A9B3BD")
-        if HAS_WEBENGINE:
-            # mostra o preview HTML convertendo para um file:// temporário
-            tmp = os.path.join(os.path.abspath(os.path.dirname(__file__)), "preview_temp.html")
-            with open(tmp, "w", encoding="utf-8") as f:
-                f.write(html)
-            # usa webengine no tab_pdf se disponível
-            if self.tab_pdf.web_view:
-                self.tab_pdf.web_view.setUrl(QUrl.fromLocalFile(tmp))
-                self.tabs.setCurrentWidget(self.tab_pdf)
+        # gera só a página visível do preview HTML (no PDF tab se WebEngine disponível)
+        pagina = self.spin_preview_page.value()
+        if HAS_WEBENGINE and self.tab_pdf.web_view:
+            html = self.preview.pagina(pagina, widths=self.col_widths,
+                                       header_fill="4472C4" if self.combo_style.currentText()=="ONS Azul" else "A9B3BD")
+            # uma página do preview é pequena: vai direto para o WebEngine, sem arquivo temporário
+            self.tab_pdf.web_view.setHtml(html)
+            self.tabs.setCurrentWidget(self.tab_pdf)
         else:
-            # carrega tabela no QTableWidget (aba excel)
-            self.tab_excel.load_dataframe(self.df)
+            # sem WebEngine: a aba Excel já tem a planilha inteira desde a análise
+            self.tabs.setCurrentWidget(self.tab_excel)
 
     def gerar(self):
         tpl = self.le_template.text()
@@ -3,6 +3,7 @@ from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QPushButton, QWidget, Q
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QColor
 import fitz # Importa fitz para lidar com PDFs
+import time
 
 # ===============================================================
 # CLASSE: Controller (app/controllers/etl_repository.py)
@@ -16,6 +17,7 @@ parent_path = (current_path / ".." / "..").resolve()
 sys.path.insert(0, str(parent_path))
 
 from app.controllers.etl_repository import ETLController
+from app.controllers.resultados_paginas import ResultadosPorPagina
 
 # ===============================================================
 # CLASSE: ProcessingThread (Thread de processamento em segundo plano)
@@ -23,6 +25,8 @@ from app.controllers.etl_repository import ETLController
 
 class ProcessingThread(QThread):
     progress_signal = Signal(int)
+    partial_result_signal = Signal(pd.DataFrame) # Contingências de cada página, assim que ficam prontas
+    pages_result_signal = Signal(object) # {página base 1: DataFrame} de todas as páginas lidas (inclusive as vazias)
     result_signal = Signal(pd.DataFrame)
     error_signal = Signal(str)
     
@@ -42,15 +46,13 @@ class ProcessingThread(QThread):
     
     def run(self):
         try:
-            # A extração de texto é agora responsabilidade do ETLController/ETLRepository
-            full_text = self.etl_controller.extract_pdf_text(self.pdf_path, self.page_range)
-            self.progress_signal.emit(50) # Metade do progresso após extração
-            
             # Executa o script específico através do controller
             if self.script_type == "contingencias_duplas":
-                result_df = self.etl_controller.process_contingencias_duplas(full_text)
+                result_df = self.run_contingencias_duplas()
 
             elif self.script_type == "outro_script":
+                full_text = self.etl_controller.extract_pdf_text(self.pdf_path, self.page_range)
+                self.progress_signal.emit(50) # Metade do progresso após extração
                 result_df = self.etl_controller.process_outro_script(full_text)
             else:
                 result_df = pd.DataFrame({"Status": ["Script não reconhecido"]})
@@ -61,6 +63,25 @@ class ProcessingThread(QThread):
         except Exception as e:
             self.error_signal.emit(str(e))
 
+    def run_contingencias_duplas(self):
+        """Lê o PDF página a página e envia as contingências de cada página para a UI conforme são processadas."""
+        total = max(self.etl_controller.count_pdf_pages(self.pdf_path, self.page_range), 1)
+        paginas = self.etl_controller.iter_pdf_pages(self.pdf_path, self.page_range, parallel=total > 16)
+
+        partes = []
+        por_pagina = {}
+        for i, (pagina, parcial) in enumerate(self.etl_controller.iter_contingencias_duplas(paginas), start=1):
+            por_pagina[pagina] = parcial
+            if not parcial.empty:
+                partes.append(parcial)
+                self.partial_result_signal.emit(parcial)
+            self.progress_signal.emit(int(100 * i / total))
+
+        self.pages_result_signal.emit(por_pagina)
+        if not partes:
+            return pd.DataFrame(columns=self.etl_controller._COLUMN_NAMES)
+        return pd.concat(partes, ignore_index=True)
+
 # ===============================================================
 # CLASSE: PerdasDuplasUIController (Controlador da UI)
 # ===============================================================
@@ -71,6 +92,9 @@ class PerdasDuplasUIController:
     def __init__(self, widget, etl_controller):
         self.widget = widget
         self.etl_controller = etl_controller
+        # Contingências já processadas por página: reduzir o intervalo só filtra o que já foi lido
+        self.resultados = ResultadosPorPagina(etl_controller._COLUMN_NAMES)
+        self.tempos_exportacao = {} # Duração (s) da última exportação de cada formato
 
     def apply_page_range(self):
         """Processa o input do usuário para definir o intervalo de páginas a serem processadas."""
@@ -80,6 +104,8 @@ class PerdasDuplasUIController:
         if not input_text:
             # Se o input estiver vazio, processa todas as páginas
             self.widget.pages_status_label.setText("Intervalo: Todas as páginas")
+            if self._mostrar_resultados_guardados():
+                return
             QMessageBox.information(self.widget, "Intervalo Definido", "Processando TODAS as páginas do PDF.")
             return
         
@@ -104,6 +130,8 @@ class PerdasDuplasUIController:
             pages_str = ", ".join([str(p+1) for p in self.widget.selected_pages]) # Converte para base 1 para exibição
             self.widget.pages_status_label.setText(f"Intervalo: Páginas {pages_str}")
             
+            if self._mostrar_resultados_guardados():
+                return
             QMessageBox.information(self.widget, "Intervalo Definido", 
                                   f"Processando {len(self.widget.selected_pages)} páginas específicas: {pages_str}")
             
@@ -111,6 +139,45 @@ class PerdasDuplasUIController:
             QMessageBox.warning(self.widget, "Erro", f"Formato inválido. Use: 1,3,5-10\nErro: {str(e)}")
             self.widget.pages_status_label.setText("Intervalo: Erro no formato")
 
+    def _process_options(self):
+        """Opções de processamento marcadas nos checkboxes."""
+        return {
+            'enable_volume_area_extraction': self.widget.cb_enable_volume_area_extraction.isChecked(),
+            'enable_prazo_extraction': self.widget.cb_enable_prazo_extraction.isChecked(),
+            'enable_contingency_identification': self.widget.cb_enable_contingency_identification.isChecked(),
+            'enable_regex_processing': self.widget.cb_regex_processing.isChecked(),
+            'standardize_columns': self.widget.cb_standardize_columns.isChecked(),
+            'separar_duplas': self.widget.cb_separar_duplas.isChecked(),
+            'adicionar_lt': self.widget.cb_adicionar_lt.isChecked()
+        }
+
+    def _preparar_resultados(self):
+        """Associa os resultados guardados ao PDF e às opções atuais (descarta tudo se algum dos dois mudou)."""
+        self.etl_controller.process_options.update(self._process_options())
+        total_pages = self.etl_controller.count_pdf_pages(self.widget.current_pdf_path)
+        self.resultados.preparar(self.widget.current_pdf_path, self.etl_controller.process_options, total_pages)
+
+    def _mostrar_resultados_guardados(self):
+        """
+        Se todas as páginas do intervalo atual já foram processadas (com o mesmo PDF
+        e as mesmas opções), mostra o resultado filtrado sem rodar o ETL de novo.
+        Devolve False quando é preciso processar.
+        """
+        if not self.widget.current_pdf_path:
+            return False
+        self._preparar_resultados()
+        page_range = self.widget.selected_pages or None
+        if not self.resultados.cobre(page_range):
+            return False
+
+        inicio = time.perf_counter()
+        df = self.resultados.frame(page_range)
+        self._exibir(df)
+        print(f"⏱️ Intervalo filtrado dos resultados já processados: {len(df)} registros em {time.perf_counter() - inicio:.3f}s")
+        QMessageBox.information(self.widget, "Resultados já processados",
+                                f"Páginas já processadas: {len(df)} registros filtrados, sem reprocessar o PDF.")
+        return True
+
     def load_pdf(self):
         """Abre uma caixa de diálogo para selecionar e carregar um arquivo PDF."""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -133,7 +200,8 @@ class PerdasDuplasUIController:
                 self.widget.pdf_text.setPlainText(full_text_preview)
                 self.widget.tab_widget.setCurrentIndex(0) # Volta para a aba do PDF
                 
-                # Limpa e reseta o controle de páginas
+                # Limpa e reseta o controle de páginas (e os resultados do PDF anterior)
+                self.resultados.limpar()
                 self.widget.selected_pages = []
                 self.widget.page_input.clear()
                 self.widget.pages_status_label.setText("Intervalo: Todas as páginas")
@@ -160,26 +228,28 @@ class PerdasDuplasUIController:
             QMessageBox.warning(self.widget, "Aviso", "Por favor, carregue um PDF primeiro.")
             return
         
+        # Intervalo já processado com as mesmas opções: só filtra os resultados guardados
+        if script_type == "contingencias_duplas" and self._mostrar_resultados_guardados():
+            return
+        
         self.widget.progress_bar.setVisible(True) # Mostra a barra de progresso
         self.widget.progress_bar.setValue(0)
         
         # Coleta as opções de processamento dos checkboxes
-        process_options = {
-            'enable_volume_area_extraction': self.widget.cb_enable_volume_area_extraction.isChecked(),
-            'enable_prazo_extraction': self.widget.cb_enable_prazo_extraction.isChecked(),
-            'enable_contingency_identification': self.widget.cb_enable_contingency_identification.isChecked(),
-            'enable_regex_processing': self.widget.cb_regex_processing.isChecked(),
-            'standardize_columns': self.widget.cb_standardize_columns.isChecked(),
-            'separar_duplas': self.widget.cb_separar_duplas.isChecked(),
-            'adicionar_lt': self.widget.cb_adicionar_lt.isChecked()
-        }
+        process_options = self._process_options()
         
         # Usa as páginas selecionadas ou None para todas
         page_range = self.widget.selected_pages if self.widget.selected_pages else None
         
+        if script_type == "contingencias_duplas":
+            self._preparar_resultados() # Os resultados desta execução valem para o PDF e as opções atuais
+        
         # Cria e inicia a thread de processamento, passando a instância do etl_controller
         self.thread = ProcessingThread(self.widget.current_pdf_path, script_type, process_options, page_range, self.etl_controller, parent=self.widget)
+        self.widget.results_table.setRowCount(0)
         self.thread.progress_signal.connect(self.update_progress)
+        self.thread.partial_result_signal.connect(self.append_results)
+        self.thread.pages_result_signal.connect(self.store_page_results)
         self.thread.result_signal.connect(self.show_results)
         self.thread.error_signal.connect(self.show_error)
         self.thread.start()
@@ -195,11 +265,38 @@ class PerdasDuplasUIController:
         Args:
             df (pd.DataFrame): O DataFrame com os resultados a serem exibidos.
         """
-        self.widget.current_df = df # Armazena o DataFrame atual
+        if self.thread.script_type == "contingencias_duplas" and self.resultados.paginas:
+            # Mesmo DataFrame normalizado que os exportadores vão ler
+            df = self.resultados.frame(self.thread.page_range)
         self.widget.progress_bar.setVisible(False) # Esconde a barra de progresso
+        self._exibir(df)
+        QMessageBox.information(self.widget, "Sucesso", f"Processamento concluído! {len(df)} registros encontrados.")
+
+    def _exibir(self, df):
+        """Guarda o DataFrame atual e o mostra na aba de resultados."""
+        self.widget.current_df = df # Armazena o DataFrame atual
+        
+        # Configura a tabela com os dados do DataFrame (os parciais já exibidos não são redesenhados)
+        if self.widget.results_table.rowCount() != len(df):
+            self.widget.results_table.setRowCount(0)
+            self._fill_rows(df)
         
-        # Configura a tabela com os dados do DataFrame
-        self.widget.results_table.setRowCount(df.shape[0])
+        self.widget.tab_widget.setCurrentIndex(1) # Muda para a aba de resultados
+
+    def store_page_results(self, por_pagina):
+        """Guarda as contingências de cada página lida pela thread (inclusive as páginas sem nenhuma)."""
+        self.resultados.guardar_execucao(por_pagina, self.thread.page_range)
+
+    def append_results(self, df):
+        """Acrescenta à tabela as contingências de uma página já processada (resultado parcial)."""
+        if self.widget.results_table.rowCount() == 0:
+            self.widget.tab_widget.setCurrentIndex(1)
+        self._fill_rows(df)
+
+    def _fill_rows(self, df):
+        """Acrescenta as linhas do DataFrame ao final da tabela de resultados."""
+        start = self.widget.results_table.rowCount()
+        self.widget.results_table.setRowCount(start + df.shape[0])
         self.widget.results_table.setColumnCount(df.shape[1])
         self.widget.results_table.setHorizontalHeaderLabels(df.columns.tolist())
         
@@ -223,46 +320,57 @@ class PerdasDuplasUIController:
                     if df.iat[row, col] == "SIM":
                         item.setBackground(QColor(173, 216, 230, 100))  # Azul claro
                 
-                self.widget.results_table.setItem(row, col, item)
-        
-        self.widget.tab_widget.setCurrentIndex(1) # Muda para a aba de resultados
-        QMessageBox.information(self.widget, "Sucesso", f"Processamento concluído! {len(df)} registros encontrados.")
+                self.widget.results_table.setItem(start + row, col, item)
 
     def show_error(self, error_msg):
         """Exibe uma mensagem de erro em caso de falha no processamento."""
         self.widget.progress_bar.setVisible(False) # Esconde a barra de progresso
         QMessageBox.critical(self.widget, "Erro", f"Erro no processamento:\n{error_msg}")
 
+    def _exportar(self, formato, titulo, nome_padrao, filtro, salvar):
+        """
+        Pede o caminho e grava o DataFrame atual (o mesmo normalizado exibido na tabela)
+        com `salvar(df, caminho)`, informando quanto tempo a exportação levou.
+        """
+        df = self.widget.current_df
+        if df is None or df.empty:
+            QMessageBox.warning(self.widget, "Aviso", "Nenhum dado para exportar.")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(self.widget, titulo, nome_padrao, filtro)
+        if not file_path:
+            return
+        try:
+            inicio = time.perf_counter()
+            salvar(df, file_path)
+            duracao = time.perf_counter() - inicio
+            self.tempos_exportacao[formato] = duracao
+            print(f"⏱️ Exportação {formato}: {len(df)} registros em {duracao:.2f}s -> {file_path}")
+            QMessageBox.information(self.widget, "Sucesso", f"Arquivo salvo em:\n{file_path}\n\n{len(df)} registros em {duracao:.2f}s")
+        except Exception as e:
+            QMessageBox.critical(self.widget, "Erro", f"Erro ao salvar:\n{str(e)}")
+
     def export_to_excel(self):
         """Exporta o DataFrame atual de resultados para um arquivo Excel."""
-        if self.widget.current_df is not None and not self.widget.current_df.empty:
-            file_path, _ = QFileDialog.getSaveFileName(
-                self.widget, "Salvar Excel", "perdas_duplas_ETL.xlsx", "Excel Files (*.xlsx)")
-            
-            if file_path:
-                try:
-                    self.widget.current_df.to_excel(file_path, index=False)
-                    QMessageBox.information(self.widget, "Sucesso", f"Arquivo salvo em:\n{file_path}")
-                except Exception as e:
-                    QMessageBox.critical(self.widget, "Erro", f"Erro ao salvar:\n{str(e)}")
-        else:
-            QMessageBox.warning(self.widget, "Aviso", "Nenhum dado para exportar.")
+        self._exportar("Excel", "Salvar Excel", "perdas_duplas_ETL.xlsx", "Excel Files (*.xlsx)",
+                       lambda df, caminho: df.to_excel(caminho, index=False))
 
     def export_to_word(self):
-        """Exibe uma mensagem informando que a funcionalidade de exportação para Word está em desenvolvimento."""
-        QMessageBox.information(self.widget, "Info", "Funcionalidade em desenvolvimento.")
+        """Exporta o DataFrame atual de resultados como tabela num documento Word."""
+        def salvar(df, caminho):
+            from docx import Document
+            from app.controllers.relatorio_docx import gerar_tabela_docx
+
+            doc = Document()
+            doc.add_heading('Relatório de Perdas Duplas', level=1)
+            gerar_tabela_docx(doc, df)
+            doc.save(caminho)
+
+        self._exportar("Word", "Salvar Word", "perdas_duplas_ETL.docx", "Word Files (*.docx)", salvar)
 
     def _update_and_log_process_options(self):
         """Coleta o estado atual dos checkboxes, atualiza o controller e imprime no terminal."""
-        current_options = {
-            'enable_volume_area_extraction': self.widget.cb_enable_volume_area_extraction.isChecked(),
-            'enable_prazo_extraction': self.widget.cb_enable_prazo_extraction.isChecked(),
-            'enable_contingency_identification': self.widget.cb_enable_contingency_identification.isChecked(),
-            'enable_regex_processing': self.widget.cb_regex_processing.isChecked(),
-            'standardize_columns': self.widget.cb_standardize_columns.isChecked(),
-            'separar_duplas': self.widget.cb_separar_duplas.isChecked(),
-            'adicionar_lt': self.widget.cb_adicionar_lt.isChecked()
-        }
+        current_options = self._process_options()
         self.etl_controller.process_options.update(current_options)
         print("Process Options Atualizadas:", self.etl_controller.process_options)
 
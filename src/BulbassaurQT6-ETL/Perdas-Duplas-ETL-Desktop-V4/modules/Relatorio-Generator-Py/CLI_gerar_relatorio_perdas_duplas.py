@@ -4,9 +4,9 @@ from docx.enum.section import WD_SECTION
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import os
-from docx2pdf import convert
+import conversor_pdf
 from tqdm import tqdm
-import time
+from pathlib import Path
 
 def adicionar_tabela_teste(doc: Document, num_linhas: int = 5, num_colunas: int = 5):
     """
@@ -96,20 +96,33 @@ def adicionar_pagina_e_tabela(doc_path: str, excel_path: str, output_docx_path:
     return output_docx_path
 
 def converter_docx_para_pdf(docx_path: str, pdf_path: str):
-    print(f"Iniciando conversão de DOCX para PDF. Isso pode demorar MUITO...")
-    start_time = time.time()
+    print(f"Iniciando conversão de DOCX para PDF...")
     
     try:
-        # A conversão é uma operação bloqueadora. Não há progresso iterativo aqui.
-        convert(docx_path, pdf_path)
-        end_time = time.time()
-        print(f"Conversão concluída em {end_time - start_time:.2f} segundos.")
+        # LibreOffice headless mantido aberto (ou docx2pdf/Word, se não houver LibreOffice)
+        registro = conversor_pdf.converter_docx_para_pdf(docx_path, pdf_path)
+        print(f"Conversão concluída em {registro['conversao_s']:.2f} segundos ({registro['modo']}).")
         print(f"Arquivo PDF salvo em '{pdf_path}'.")
     except Exception as e:
-        print(f"ERRO na conversão para PDF. Certifique-se que o Microsoft Office está instalado.")
+        print(f"ERRO na conversão para PDF. Certifique-se que o LibreOffice (ou o Microsoft Office) está instalado.")
         print(f"Detalhes do erro: {e}")
         raise
 
+def converter_pasta_para_pdf(pasta: str, max_paralelo: int = 2):
+    """
+    Converte todos os .docx de uma pasta para PDF em lote, com até `max_paralelo`
+    conversões simultâneas, e imprime o tempo de cada documento.
+    """
+    documentos = sorted(str(p) for p in Path(pasta).glob("*.docx") if not p.name.startswith("~$"))
+    if not documentos:
+        print(f"❌ Nenhum .docx encontrado em '{pasta}'")
+        return []
+    print(f"Convertendo {len(documentos)} documentos ({max_paralelo} em paralelo)...")
+    with conversor_pdf.ConversorPDF(max_paralelo=max_paralelo) as conversor:
+        registros = conversor.converter_lote(documentos)
+    conversor_pdf.imprimir_relatorio(registros)
+    return registros
+
 def gerar_relatorio_teste_tabela(template_path: str, output_docx_path: str = "relatorio_teste_tabela.docx"):
     """
     Gera um relatório de teste contendo apenas a tabela de formatação.
@@ -154,10 +167,11 @@ if __name__ == "__main__":
     print("\nOpções:")
     print("1️⃣  - Gerar relatório COMPLETO (tabela teste + dados Excel + PDF)")
     print("2️⃣  - Gerar apenas TESTE DE TABELA (validar formatação)")
-    print("3️⃣  - Sair")
+    print("3️⃣  - Converter todos os DOCX de uma pasta para PDF (lote)")
+    print("4️⃣  - Sair")
     print("-"*60)
     
-    opcao = input("\nEscolha uma opção (1, 2 ou 3): ").strip()
+    opcao = input("\nEscolha uma opção (1, 2, 3 ou 4): ").strip()
     
     if opcao == "1":
         print("\n📋 Você escolheu: Gerar Relatório Completo")
@@ -196,8 +210,14 @@ if __name__ == "__main__":
             print(f"   📌 Arquivo: {resultado}")
     
     elif opcao == "3":
+        print("\n📚 Você escolheu: Conversão em lote")
+        pasta = input("Pasta com os .docx: ").strip().strip('"')
+        paralelo = input("Conversões simultâneas [2]: ").strip()
+        converter_pasta_para_pdf(pasta, int(paralelo) if paralelo else 2)
+    
+    elif opcao == "4":
         print("\n👋 Saindo...")
     
     else:
-        print("\n❌ Opção inválida! Por favor escolha 1, 2 ou 3.")
+        print("\n❌ Opção inválida! Por favor escolha 1, 2, 3 ou 4.")
 
@@ -4,41 +4,98 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import re
+import time
+import functools
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, List
 import numpy as np
 
+COLUNAS_CATEGORICAS = ['Volume', 'Área Geoelétrica', 'Horizonte']
+PADRAO_TENSAO = re.compile(r'(\d+\.?\d*)\s*kV', re.IGNORECASE)
+# Acima disso a dispersão usa WebGL e uma amostra dos pontos (o navegador não acompanha SVG)
+LIMITE_PONTOS_SVG = 1000
+LIMITE_PONTOS_DISPERSAO = 20000
+
+
+def _plano(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte colunas categóricas de um agregado em texto (os gráficos não herdam categorias vazias)."""
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str)
+    return df
+
+
+def _figura_em_cache(metodo):
+    """
+    Guarda a figura por combinação de argumentos: num rerun do Streamlit o custo
+    é montar a figura do Plotly, não agregar. A figura devolvida é compartilhada
+    entre chamadas; para alterá-la, trabalhe numa cópia (go.Figure(fig)).
+    """
+    @functools.wraps(metodo)
+    def envoltorio(self, *args, **kwargs):
+        chave = ('figura', metodo.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(chave)
+        except TypeError:
+            return metodo(self, *args, **kwargs)
+        return self._memo(chave, lambda: metodo(self, *args, **kwargs))
+    return envoltorio
+
 
 class AnalisadorContingenciasPlotly:
     """
     Classe especializada para geração de gráficos Plotly Express.
     Foco em gráficos offline para uso no Streamlit.
+
+    As colunas derivadas (tensão e tipo) são extraídas uma única vez, de forma
+    vetorizada, e as colunas de filtro ficam como `category`. Cada agregação
+    (contagens, tabelas cruzadas, métricas) é calculada uma vez por instância, e
+    `filtrar` devolve uma instância por conjunto de filtros, guardada em cache:
+    um rerun do dashboard com os mesmos filtros não recalcula nada (as figuras
+    dos métodos plot_* também ficam em cache). Os caches são protegidos por um
+    lock: a mesma instância é compartilhada pelas sessões do Streamlit.
     """
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, tamanho_cache: int = 32, _preprocessado: bool = False):
         """
         Inicializa o analisador com um DataFrame.
         
         Args:
             df: DataFrame com colunas ['Volume', 'Área Geoelétrica', 
                                       'Contingência Dupla', 'Horizonte']
+            tamanho_cache: Quantos conjuntos de filtros ficam em cache em `filtrar`.
         """
-        self.df = df.copy()
-        self._preprocessar_dados()
+        # Cópia rasa: as colunas tratadas são substituídas, o DataFrame original não é alterado
+        self.df = df if _preprocessado else df.copy(deep=False)
+        self.tamanho_cache = tamanho_cache
+        self._agregados = {}
+        self._filtros = OrderedDict()
+        self._lock = threading.Lock()
+        if not _preprocessado:
+            self._preprocessar_dados()
         
     def _preprocessar_dados(self) -> None:
         """Preprocessa os dados extraindo informações adicionais."""
-        # Garantir que colunas críticas sejam strings
-        self.df['Volume'] = self.df['Volume'].astype(str).fillna('Desconhecido')
-        self.df['Área Geoelétrica'] = self.df['Área Geoelétrica'].astype(str).fillna('Desconhecido')
-        self.df['Horizonte'] = self.df['Horizonte'].astype(str).fillna('Desconhecido')
-        self.df['Contingência Dupla'] = self.df['Contingência Dupla'].astype(str).fillna('Desconhecido')
+        # Garantir que colunas críticas sejam strings (as de filtro como categorias)
+        for col in COLUNAS_CATEGORICAS:
+            self.df[col] = self.df[col].fillna('Desconhecido').astype(str).astype('category')
+        contingencia = self.df['Contingência Dupla'].fillna('Desconhecido').astype(str)
+        self.df['Contingência Dupla'] = contingencia
         
         # Extrair tensão (kV) da coluna de contingência
-        self.df['Tensão_kV'] = self.df['Contingência Dupla'].apply(self._extrair_tensao)
+        self.df['Tensão_kV'] = pd.to_numeric(
+            contingencia.str.extract(PADRAO_TENSAO, expand=False), errors='coerce'
+        )
         
         # Extrair tipo de contingência
-        self.df['Tipo_Contingência'] = self.df['Contingência Dupla'].apply(
-            lambda x: 'CC' if 'CC' in x else ('CA' if 'CA' in x else 'Desconhecido')
+        self.df['Tipo_Contingência'] = pd.Categorical(
+            np.select(
+                [contingencia.str.contains('CC', regex=False), contingencia.str.contains('CA', regex=False)],
+                ['CC', 'CA'],
+                default='Desconhecido'
+            ),
+            categories=['CC', 'CA', 'Desconhecido']
         )
         
         # Contar ocorrências
@@ -50,60 +107,165 @@ class AnalisadorContingenciasPlotly:
         if not isinstance(texto, str):
             return None
             
-        padrao = r'(\d+\.?\d*)\s*kV'
-        match = re.search(padrao, texto, re.IGNORECASE)
+        match = PADRAO_TENSAO.search(texto)
         if match:
             try:
                 return float(match.group(1))
             except ValueError:
                 return None
         return None
+
+    # -----------------------
+    # Filtros e cache de agregados
+    # -----------------------
+    def filtrar(self, volumes: Optional[List[str]] = None, areas: Optional[List[str]] = None,
+                horizontes: Optional[List[str]] = None, tensao_min: Optional[float] = None,
+                tensao_max: Optional[float] = None) -> 'AnalisadorContingenciasPlotly':
+        """
+        Analisador restrito aos filtros (listas vazias ou None não filtram).
+
+        Com limite de tensão, linhas sem tensão extraída ficam de fora. A mesma
+        combinação de filtros devolve a mesma instância, com os agregados já calculados.
+        """
+        chave = (
+            frozenset(volumes or ()), frozenset(areas or ()), frozenset(horizontes or ()),
+            None if tensao_min is None else float(tensao_min),
+            None if tensao_max is None else float(tensao_max),
+        )
+        if not any(chave[:3]) and tensao_min is None and tensao_max is None:
+            return self
+        with self._lock:
+            if chave in self._filtros:
+                self._filtros.move_to_end(chave)
+                return self._filtros[chave]
+
+        mascara = np.ones(len(self.df), dtype=bool)
+        for col, valores in zip(COLUNAS_CATEGORICAS, chave[:3]):
+            if valores:
+                mascara &= self.df[col].isin(valores).to_numpy()
+        if tensao_min is not None:
+            mascara &= (self.df['Tensão_kV'] >= tensao_min).to_numpy()
+        if tensao_max is not None:
+            mascara &= (self.df['Tensão_kV'] <= tensao_max).to_numpy()
+
+        filtrado = AnalisadorContingenciasPlotly(self.df[mascara], self.tamanho_cache, _preprocessado=True)
+        with self._lock:
+            # Outra sessão pode ter montado a mesma fatia enquanto esta calculava
+            filtrado = self._filtros.setdefault(chave, filtrado)
+            self._filtros.move_to_end(chave)
+            if len(self._filtros) > self.tamanho_cache:
+                self._filtros.popitem(last=False)
+        return filtrado
+
+    def _memo(self, chave, calcular):
+        """Resultado de `calcular()` guardado por instância (os dados de uma instância não mudam)."""
+        with self._lock:
+            if chave in self._agregados:
+                return self._agregados[chave]
+        # Calculado fora do lock (pode chamar outros _memo); o primeiro resultado guardado vale
+        valor = calcular()
+        with self._lock:
+            return self._agregados.setdefault(chave, valor)
+
+    def _contagem(self, col: str) -> pd.Series:
+        """Contagem por valor da coluna, da maior para a menor (sem categorias ausentes)."""
+        def calcular():
+            contagem = self.df[col].value_counts()
+            contagem = contagem[contagem > 0]
+            if isinstance(contagem.index, pd.CategoricalIndex):
+                contagem.index = contagem.index.astype(str)
+            return contagem
+        return self._memo(('contagem', col), calcular)
+
+    def _contagem_grupos(self, cols: tuple) -> pd.DataFrame:
+        """Contagem por combinação das colunas, como DataFrame com a coluna 'Contagem'."""
+        return self._memo(
+            ('grupos', cols),
+            lambda: _plano(self.df.groupby(list(cols), observed=True).size().reset_index(name='Contagem'))
+        )
+
+    def _tabela_cruzada(self, x_col: str, y_col: str) -> pd.DataFrame:
+        """Equivalente a pd.crosstab(df[x_col], df[y_col]) só com as combinações presentes."""
+        def calcular():
+            tabela = self.df.groupby([x_col, y_col], observed=True).size().unstack(fill_value=0)
+            if isinstance(tabela.index, pd.CategoricalIndex):
+                tabela.index = tabela.index.astype(str)
+            if isinstance(tabela.columns, pd.CategoricalIndex):
+                tabela.columns = tabela.columns.astype(str)
+            tabela = tabela.sort_index().sort_index(axis=1)
+            tabela.index.name, tabela.columns.name = x_col, y_col
+            return tabela
+        return self._memo(('cruzada', x_col, y_col), calcular)
+
+    def _subconjunto(self, cols: tuple, converter: tuple, erros: str = 'coerce') -> pd.DataFrame:
+        """Só as colunas usadas no gráfico, com as de `converter` passadas para número."""
+        def calcular():
+            df_temp = self.df[[c for c in dict.fromkeys(cols) if c]].copy()
+            for c in converter:
+                if pd.api.types.is_numeric_dtype(df_temp[c]):
+                    continue
+                if erros == 'coerce':
+                    df_temp[c] = pd.to_numeric(df_temp[c], errors='coerce')
+                else:
+                    # Equivalente ao antigo errors='ignore': mantém a coluna se não for toda numérica
+                    try:
+                        df_temp[c] = pd.to_numeric(df_temp[c])
+                    except (ValueError, TypeError):
+                        pass
+            return df_temp
+        return self._memo(('subconjunto', cols, converter, erros), calcular)
     
     def get_metricas_principais(self) -> Dict:
         """Retorna métricas principais dos dados."""
         try:
-            # Converter tensão para float, ignorando valores não numéricos
-            tensao_series = pd.to_numeric(self.df['Tensão_kV'], errors='coerce')
-            
-            return {
-                'total_registros': len(self.df),
-                'total_volumes': self.df['Volume'].nunique(),
-                'total_areas': self.df['Área Geoelétrica'].nunique(),
-                'tensao_media': float(tensao_series.mean()) if not tensao_series.isnull().all() else 0,
-                'tensao_maxima': float(tensao_series.max()) if not tensao_series.isnull().all() else 0,
-                'tensao_minima': float(tensao_series.min()) if not tensao_series.isnull().all() else 0,
-                'distribuicao_volume': self.df['Volume'].value_counts().to_dict(),
-                'distribuicao_area': self.df['Área Geoelétrica'].value_counts().to_dict(),
-                'distribuicao_horizonte': self.df['Horizonte'].value_counts().to_dict()
-            }
+            return self._memo('metricas', self._calcular_metricas)
         except Exception as e:
             print(f"Erro ao calcular métricas: {e}")
             return {}
+
+    def _calcular_metricas(self) -> Dict:
+        # Tensão já é numérica (NaN onde não foi possível extrair)
+        tensao_series = pd.to_numeric(self.df['Tensão_kV'], errors='coerce')
+        sem_tensao = tensao_series.isnull().all()
+        
+        return {
+            'total_registros': len(self.df),
+            'total_volumes': self.df['Volume'].nunique(),
+            'total_areas': self.df['Área Geoelétrica'].nunique(),
+            'tensao_media': float(tensao_series.mean()) if not sem_tensao else 0,
+            'tensao_maxima': float(tensao_series.max()) if not sem_tensao else 0,
+            'tensao_minima': float(tensao_series.min()) if not sem_tensao else 0,
+            'distribuicao_volume': self._contagem('Volume').to_dict(),
+            'distribuicao_area': self._contagem('Área Geoelétrica').to_dict(),
+            'distribuicao_horizonte': self._contagem('Horizonte').to_dict()
+        }
     
     def get_opcoes_filtro(self) -> Dict:
         """Retorna opções disponíveis para filtros com tipos consistentes."""
         try:
-            # Garantir que todos os valores sejam strings para ordenação
-            volumes = sorted(self.df['Volume'].astype(str).unique().tolist())
-            areas = sorted(self.df['Área Geoelétrica'].astype(str).unique().tolist())
-            horizontes = sorted(self.df['Horizonte'].astype(str).unique().tolist())
-            
-            # Filtrar tensões válidas
-            tensoes_validas = pd.to_numeric(self.df['Tensão_kV'], errors='coerce').dropna()
-            
-            return {
-                'volumes': volumes,
-                'areas': areas,
-                'horizontes': horizontes,
-                'tensoes': {
-                    'min': float(tensoes_validas.min()) if len(tensoes_validas) > 0 else 0.0,
-                    'max': float(tensoes_validas.max()) if len(tensoes_validas) > 0 else 1000.0
-                }
-            }
+            return self._memo('opcoes_filtro', self._calcular_opcoes_filtro)
         except Exception as e:
             print(f"Erro ao obter opções de filtro: {e}")
             return {}
+
+    def _calcular_opcoes_filtro(self) -> Dict:
+        # Valores presentes (strings) de cada coluna de filtro, já ordenados
+        volumes, areas, horizontes = (sorted(self._contagem(col).index) for col in COLUNAS_CATEGORICAS)
+        
+        # Filtrar tensões válidas
+        tensoes_validas = pd.to_numeric(self.df['Tensão_kV'], errors='coerce').dropna()
+        
+        return {
+            'volumes': volumes,
+            'areas': areas,
+            'horizontes': horizontes,
+            'tensoes': {
+                'min': float(tensoes_validas.min()) if len(tensoes_validas) > 0 else 0.0,
+                'max': float(tensoes_validas.max()) if len(tensoes_validas) > 0 else 1000.0
+            }
+        }
     
+    @_figura_em_cache
     def plot_barras(self, x_col: str, y_col: Optional[str] = None, 
                    color_col: Optional[str] = None, 
                    titulo: str = "", barmode: str = 'relative') -> go.Figure:
@@ -112,8 +274,9 @@ class AnalisadorContingenciasPlotly:
         """
         try:
             if y_col is None:
-                # Contar ocorrências
-                df_agg = self.df.groupby(x_col).size().reset_index(name='Contagem')
+                # Contar ocorrências (por x e, se houver, pela cor)
+                grupos = (x_col,) if not color_col or color_col == x_col else (x_col, color_col)
+                df_agg = self._contagem_grupos(grupos)
                 fig = px.bar(df_agg, x=x_col, y='Contagem', 
                             color=color_col if color_col else None,
                             title=titulo or f'Distribuição por {x_col}',
@@ -135,6 +298,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar gráfico de barras: {e}")
             return self._criar_figura_erro(f"Erro ao gerar gráfico de barras: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_pizza(self, values_col: Optional[str] = None, 
                   names_col: Optional[str] = None,
                   titulo: str = "") -> go.Figure:
@@ -146,7 +310,7 @@ class AnalisadorContingenciasPlotly:
                 if names_col is None:
                     raise ValueError("names_col é obrigatório quando values_col é None")
                 
-                df_agg = self.df[names_col].value_counts().reset_index()
+                df_agg = self._contagem(names_col).reset_index()
                 df_agg.columns = [names_col, 'Contagem']
                 fig = px.pie(df_agg, values='Contagem', names=names_col,
                             title=titulo or f'Distribuição por {names_col}')
@@ -160,6 +324,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar gráfico de pizza: {e}")
             return self._criar_figura_erro(f"Erro ao gerar gráfico de pizza: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_histograma(self, x_col: str, nbins: int = 20, 
                        color_col: Optional[str] = None,
                        titulo: str = "") -> go.Figure:
@@ -180,6 +345,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar histograma: {e}")
             return self._criar_figura_erro(f"Erro ao gerar histograma: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_box(self, x_col: str, y_col: str,
                 color_col: Optional[str] = None,
                 titulo: str = "") -> go.Figure:
@@ -187,11 +353,8 @@ class AnalisadorContingenciasPlotly:
         Gera box plot com tratamento de erro.
         """
         try:
-            # Converter coluna y para numérica
-            df_temp = self.df.copy()
-            df_temp[y_col] = pd.to_numeric(df_temp[y_col], errors='coerce')
-            
-            # Remover NaN
+            # Só as colunas do gráfico, com y numérica e sem NaN
+            df_temp = self._subconjunto((x_col, y_col, color_col), (y_col,))
             df_temp = df_temp.dropna(subset=[x_col, y_col])
             
             if df_temp.empty:
@@ -205,6 +368,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar box plot: {e}")
             return self._criar_figura_erro(f"Erro ao gerar box plot: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_heatmap(self, x_col: str, y_col: str,
                     titulo: str = "", colorscale: str = 'Viridis') -> go.Figure:
         """
@@ -212,7 +376,7 @@ class AnalisadorContingenciasPlotly:
         """
         try:
             # Criar tabela cruzada
-            df_cross = pd.crosstab(self.df[x_col], self.df[y_col])
+            df_cross = self._tabela_cruzada(x_col, y_col)
             
             if df_cross.empty:
                 return self._criar_figura_erro("Dados insuficientes para heatmap")
@@ -227,6 +391,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar heatmap: {e}")
             return self._criar_figura_erro(f"Erro ao gerar heatmap: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_scatter(self, x_col: str, y_col: str,
                     color_col: Optional[str] = None,
                     size_col: Optional[str] = None,
@@ -236,14 +401,17 @@ class AnalisadorContingenciasPlotly:
         """
         try:
             # Converter colunas para numéricas se possível
-            df_temp = self.df.copy()
-            df_temp[x_col] = pd.to_numeric(df_temp[x_col], errors='ignore')
-            df_temp[y_col] = pd.to_numeric(df_temp[y_col], errors='ignore')
+            df_temp = self._subconjunto((x_col, y_col, color_col, size_col), (x_col, y_col), erros='manter')
+            titulo = titulo or f'Dispersão: {y_col} vs {x_col}'
+            if len(df_temp) > LIMITE_PONTOS_DISPERSAO:
+                titulo += f' (amostra de {LIMITE_PONTOS_DISPERSAO} de {len(df_temp)} pontos)'
+                df_temp = df_temp.sample(LIMITE_PONTOS_DISPERSAO, random_state=0).sort_index()
             
             fig = px.scatter(df_temp, x=x_col, y=y_col,
                             color=color_col,
                             size=size_col,
-                            title=titulo or f'Dispersão: {y_col} vs {x_col}')
+                            title=titulo,
+                            render_mode='webgl' if len(df_temp) > LIMITE_PONTOS_SVG else 'svg')
             
             fig.update_layout(
                 xaxis_title=x_col,
@@ -253,7 +421,22 @@ class AnalisadorContingenciasPlotly:
         except Exception as e:
             print(f"Erro ao gerar gráfico de dispersão: {e}")
             return self._criar_figura_erro(f"Erro ao gerar gráfico de dispersão: {str(e)[:50]}")
+
+    def _faixas_tensao(self) -> pd.DataFrame:
+        """Linhas com tensão extraída e a faixa de tensão de cada uma (calculado uma vez)."""
+        def calcular():
+            df_tensao = self._subconjunto(('Área Geoelétrica', 'Tensão_kV'), ('Tensão_kV',))
+            df_tensao = df_tensao.dropna(subset=['Tensão_kV', 'Área Geoelétrica'])
+            df_tensao['Área Geoelétrica'] = df_tensao['Área Geoelétrica'].astype(str)
+            df_tensao['Faixa_Tensão'] = pd.cut(
+                df_tensao['Tensão_kV'],
+                bins=[0, 500, 700, 900, float('inf')],
+                labels=['< 500 kV', '500-700 kV', '700-900 kV', '> 900 kV']
+            )
+            return df_tensao
+        return self._memo('faixas_tensao', calcular)
     
+    @_figura_em_cache
     def plot_tensao_por_regiao(self, tipo: str = 'barras', 
                               titulo: str = "Distribuição de Tensão por Região") -> go.Figure:
         """
@@ -261,28 +444,20 @@ class AnalisadorContingenciasPlotly:
         """
         try:
             # Filtrar apenas linhas com tensão extraída
-            df_tensao = self.df.copy()
-            df_tensao['Tensão_kV'] = pd.to_numeric(df_tensao['Tensão_kV'], errors='coerce')
-            df_tensao = df_tensao.dropna(subset=['Tensão_kV', 'Área Geoelétrica'])
+            df_tensao = self._faixas_tensao()
             
             if df_tensao.empty:
                 return self._criar_figura_erro("Não foi possível extrair tensões dos dados")
             
-            # Criar categorias de tensão
-            df_tensao['Faixa_Tensão'] = pd.cut(
-                df_tensao['Tensão_kV'],
-                bins=[0, 500, 700, 900, float('inf')],
-                labels=['< 500 kV', '500-700 kV', '700-900 kV', '> 900 kV']
-            )
-            
             if tipo == 'pizza':
                 # Distribuição geral de faixas de tensão
-                faixa_counts = df_tensao['Faixa_Tensão'].value_counts().reset_index()
+                faixa_counts = self._memo('faixas_contagem', lambda: df_tensao['Faixa_Tensão'].value_counts().reset_index())
                 fig = px.pie(faixa_counts, values='count', names='Faixa_Tensão',
                             title=titulo)
             else:  # barras
                 # Agrupar por região e faixa de tensão
-                df_agrupado = df_tensao.groupby(['Área Geoelétrica', 'Faixa_Tensão']).size().reset_index(name='Contagem')
+                df_agrupado = self._memo('faixas_por_area', lambda: df_tensao.groupby(
+                    ['Área Geoelétrica', 'Faixa_Tensão'], observed=True).size().reset_index(name='Contagem'))
                 fig = px.bar(df_agrupado, x='Área Geoelétrica', y='Contagem', 
                             color='Faixa_Tensão',
                             title=titulo,
@@ -293,6 +468,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar gráfico de tensão: {e}")
             return self._criar_figura_erro(f"Erro ao gerar gráfico de tensão: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_horizonte_por_volume(self, tipo: str = 'barras',
                                  titulo: str = "Distribuição de Horizonte por Volume") -> go.Figure:
         """
@@ -300,7 +476,7 @@ class AnalisadorContingenciasPlotly:
         """
         try:
             # Agrupar por Volume e Horizonte
-            df_agrupado = self.df.groupby(['Volume', 'Horizonte']).size().reset_index(name='Contagem')
+            df_agrupado = self._contagem_grupos(('Volume', 'Horizonte'))
             
             if tipo == 'pizza':
                 # Subplots para cada volume
@@ -343,6 +519,7 @@ class AnalisadorContingenciasPlotly:
             print(f"Erro ao gerar gráfico de horizonte: {e}")
             return self._criar_figura_erro(f"Erro ao gerar gráfico de horizonte: {str(e)[:50]}")
     
+    @_figura_em_cache
     def plot_volume_por_area(self, tipo: str = 'heatmap',
                             titulo: str = "Volume por Área Geoelétrica") -> go.Figure:
         """
@@ -351,7 +528,7 @@ class AnalisadorContingenciasPlotly:
         try:
             if tipo == 'heatmap':
                 # Heatmap
-                heatmap_data = pd.crosstab(self.df['Volume'], self.df['Área Geoelétrica'])
+                heatmap_data = self._tabela_cruzada('Volume', 'Área Geoelétrica')
                 if heatmap_data.empty:
                     return self._criar_figura_erro("Dados insuficientes para heatmap")
                     
@@ -361,7 +538,7 @@ class AnalisadorContingenciasPlotly:
                                color_continuous_scale='Viridis')
             else:
                 # Barras agrupadas
-                df_agrupado = self.df.groupby(['Volume', 'Área Geoelétrica']).size().reset_index(name='Contagem')
+                df_agrupado = self._contagem_grupos(('Volume', 'Área Geoelétrica'))
                 fig = px.bar(df_agrupado, x='Volume', y='Contagem',
                             color='Área Geoelétrica',
                             title=titulo,
@@ -377,46 +554,50 @@ class AnalisadorContingenciasPlotly:
         Retorna insights principais dos dados.
         """
         try:
-            metricas = self.get_metricas_principais()
-            
-            if not metricas:
-                return {
-                    'metricas': {},
-                    'insights': {
-                        'volume_mais_comum': "Nenhum dado disponível",
-                        'area_mais_comum': "Nenhum dado disponível",
-                        'horizonte_mais_comum': "Nenhum dado disponível",
-                        'tensao_dominante': "Nenhum dado disponível",
-                        'proporcao_cc_ca': "Nenhum dado disponível"
-                    }
-                }
-            
-            # Insights adicionais
-            distribuicao_volume = metricas.get('distribuicao_volume', {})
-            distribuicao_area = metricas.get('distribuicao_area', {})
-            distribuicao_horizonte = metricas.get('distribuicao_horizonte', {})
-            
-            volume_mais_comum = max(distribuicao_volume.items(), key=lambda x: x[1]) if distribuicao_volume else ("Nenhum", 0)
-            area_mais_comum = max(distribuicao_area.items(), key=lambda x: x[1]) if distribuicao_area else ("Nenhum", 0)
-            horizonte_mais_comum = max(distribuicao_horizonte.items(), key=lambda x: x[1]) if distribuicao_horizonte else ("Nenhum", 0)
-            
-            return {
-                'metricas': metricas,
-                'insights': {
-                    'volume_mais_comum': f"{volume_mais_comum[0]} ({volume_mais_comum[1]} contingências)",
-                    'area_mais_comum': f"{area_mais_comum[0]} ({area_mais_comum[1]} contingências)",
-                    'horizonte_mais_comum': f"{horizonte_mais_comum[0]} ({horizonte_mais_comum[1]} contingências)",
-                    'tensao_dominante': f"{metricas.get('tensao_media', 0):.1f} kV (média)",
-                    'proporcao_cc_ca': f"CC: {self.df[self.df['Tipo_Contingência'] == 'CC'].shape[0]}, "
-                                     f"CA: {self.df[self.df['Tipo_Contingência'] == 'CA'].shape[0]}"
-                }
-            }
+            return self._memo('insights', self._calcular_insights)
         except Exception as e:
             print(f"Erro ao gerar insights: {e}")
             return {
                 'metricas': {},
                 'insights': {}
             }
+
+    def _calcular_insights(self) -> Dict:
+        metricas = self.get_metricas_principais()
+        
+        if not metricas:
+            return {
+                'metricas': {},
+                'insights': {
+                    'volume_mais_comum': "Nenhum dado disponível",
+                    'area_mais_comum': "Nenhum dado disponível",
+                    'horizonte_mais_comum': "Nenhum dado disponível",
+                    'tensao_dominante': "Nenhum dado disponível",
+                    'proporcao_cc_ca': "Nenhum dado disponível"
+                }
+            }
+        
+        # Insights adicionais
+        distribuicao_volume = metricas.get('distribuicao_volume', {})
+        distribuicao_area = metricas.get('distribuicao_area', {})
+        distribuicao_horizonte = metricas.get('distribuicao_horizonte', {})
+        
+        volume_mais_comum = max(distribuicao_volume.items(), key=lambda x: x[1]) if distribuicao_volume else ("Nenhum", 0)
+        area_mais_comum = max(distribuicao_area.items(), key=lambda x: x[1]) if distribuicao_area else ("Nenhum", 0)
+        horizonte_mais_comum = max(distribuicao_horizonte.items(), key=lambda x: x[1]) if distribuicao_horizonte else ("Nenhum", 0)
+        tipos = self._contagem('Tipo_Contingência')
+        
+        return {
+            'metricas': metricas,
+            'insights': {
+                'volume_mais_comum': f"{volume_mais_comum[0]} ({volume_mais_comum[1]} contingências)",
+                'area_mais_comum': f"{area_mais_comum[0]} ({area_mais_comum[1]} contingências)",
+                'horizonte_mais_comum': f"{horizonte_mais_comum[0]} ({horizonte_mais_comum[1]} contingências)",
+                'tensao_dominante': f"{metricas.get('tensao_media', 0):.1f} kV (média)",
+                'proporcao_cc_ca': f"CC: {tipos.get('CC', 0)}, "
+                                 f"CA: {tipos.get('CA', 0)}"
+            }
+        }
     
     def _criar_figura_erro(self, mensagem: str) -> go.Figure:
         """Cria uma figura de erro quando não é possível gerar o gráfico."""
@@ -434,4 +615,63 @@ class AnalisadorContingenciasPlotly:
             yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
             plot_bgcolor='white'
         )
-        return fig
\ No newline at end of file
+        return fig
+
+
+def _rodada_dashboard(analisador: AnalisadorContingenciasPlotly) -> None:
+    """Mesmas chamadas que o PerdasDuplas_app.py faz a cada rerun."""
+    analisador.get_opcoes_filtro()
+    analisador.get_metricas_principais()
+    analisador.plot_barras(x_col='Volume', color_col='Volume', barmode='group')
+    analisador.plot_pizza(names_col='Área Geoelétrica')
+    analisador.plot_tensao_por_regiao(tipo='barras')
+    analisador.plot_horizonte_por_volume(tipo='barras')
+    analisador.plot_heatmap(x_col='Área Geoelétrica', y_col='Volume')
+    analisador.plot_histograma(x_col='Tensão_kV', nbins=10, color_col='Volume')
+    analisador.get_insights()
+
+
+def benchmark_analisador(n_linhas: int = 100000) -> Dict:
+    """Mede a construção (apply linha a linha x vetorizado) e um rerun do dashboard sem e com cache."""
+    areas = ["Interligação Sul e Sudeste/Centro-Oeste", "Elos de Corrente Contínua", "Interligação Norte/Nordeste"]
+    df = pd.DataFrame({
+        'Volume': [f"Volume {i % 7 + 1}" for i in range(n_linhas)],
+        'Área Geoelétrica': [areas[i % 3] for i in range(n_linhas)],
+        'Contingência Dupla': [f"LT {'CC 600' if i % 5 == 0 else (500, 765, 230)[i % 3]} kV Assis {i} – Ponta Grossa C1 e C2"
+                               for i in range(n_linhas)],
+        'Horizonte': ["Curto Prazo" if i % 2 else "Médio Prazo" for i in range(n_linhas)],
+    })
+
+    inicio = time.perf_counter()
+    df['Contingência Dupla'].apply(AnalisadorContingenciasPlotly._extrair_tensao)
+    tempo_apply = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    analisador = AnalisadorContingenciasPlotly(df)
+    tempo_construcao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    _rodada_dashboard(analisador)
+    tempo_primeira = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    _rodada_dashboard(analisador)
+    tempo_rerun = time.perf_counter() - inicio
+
+    filtros = dict(volumes=['Volume 1', 'Volume 2'], tensao_min=0.0, tensao_max=800.0)
+    inicio = time.perf_counter()
+    _rodada_dashboard(analisador.filtrar(**filtros))
+    tempo_filtro = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    _rodada_dashboard(analisador.filtrar(**filtros))
+    tempo_filtro_cache = time.perf_counter() - inicio
+
+    print(f"{n_linhas} linhas | tensão por apply: {tempo_apply:.2f}s | construção vetorizada: {tempo_construcao:.2f}s")
+    print(f"dashboard: 1ª rodada {tempo_primeira:.2f}s | rerun {tempo_rerun:.2f}s | "
+          f"novo filtro {tempo_filtro:.2f}s | mesmo filtro {tempo_filtro_cache:.2f}s")
+    return {"apply_s": tempo_apply, "construcao_s": tempo_construcao, "primeira_s": tempo_primeira,
+            "rerun_s": tempo_rerun, "filtro_s": tempo_filtro, "filtro_cache_s": tempo_filtro_cache}
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_analisador(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
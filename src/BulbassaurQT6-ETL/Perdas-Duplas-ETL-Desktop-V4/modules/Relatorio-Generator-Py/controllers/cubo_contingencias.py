@@ -0,0 +1,394 @@
+# cubo_contingencias.py
+# ===============================================================
+# Cubo pré-agregado para o dashboard de Perdas Duplas
+# ===============================================================
+# As contingências são contadas uma única vez por combinação de
+# Área × Tensão × Horizonte × Volume (× Tipo, para a proporção CC/CA). Um
+# relatório com dezenas de milhares de linhas vira algumas centenas de células,
+# e filtros, métricas e gráficos do dashboard leem fatias desse cubo em vez do
+# DataFrame completo. O que depende das linhas individuais (dados brutos, box,
+# dispersão e gráficos personalizados) continua no AnalisadorContingenciasPlotly.
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from AnaliseContigenciasPyPlot import AnalisadorContingenciasPlotly, _figura_em_cache
+
+DIMENSOES = ['Área Geoelétrica', 'Tensão_kV', 'Horizonte', 'Volume', 'Tipo_Contingência']
+FAIXAS_TENSAO = dict(
+    bins=[0, 500, 700, 900, float('inf')],
+    labels=['< 500 kV', '500-700 kV', '700-900 kV', '> 900 kV']
+)
+
+
+class CuboContingencias:
+    """
+    Contagem de contingências por combinação das `DIMENSOES`.
+
+    Oferece a mesma interface do AnalisadorContingenciasPlotly usada pelo
+    dashboard (métricas, opções de filtro, insights e gráficos); os gráficos que
+    precisam das linhas individuais são repassados ao analisador com os mesmos filtros.
+    O cubo é compartilhado entre as sessões do Streamlit (st.cache_resource), por
+    isso as fatias e os agregados em cache são alterados sob um lock.
+
+    Exemplo:
+        cubo = CuboContingencias.do_dataframe(df)
+        visao = cubo.fatia(volumes=['Volume 1'], tensao_min=500)
+        visao.get_metricas_principais()
+        visao.plot_barras(x_col='Volume', color_col='Horizonte')
+    """
+
+    def __init__(self, dados: pd.DataFrame, analisador: AnalisadorContingenciasPlotly,
+                 filtros: Optional[Dict] = None, tamanho_cache: int = 32):
+        # dados: uma linha por combinação das dimensões, com a coluna 'Contagem'
+        self.dados = dados
+        self._analisador_base = analisador
+        self.filtros = filtros or {}
+        self.tamanho_cache = tamanho_cache
+        self._agregados = {}
+        self._fatias = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def do_dataframe(cls, df: pd.DataFrame, tamanho_cache: int = 32) -> 'CuboContingencias':
+        """Monta o cubo a partir do DataFrame bruto (colunas do relatório de Perdas Duplas)."""
+        analisador = AnalisadorContingenciasPlotly(df, tamanho_cache)
+        dados = (
+            analisador.df.groupby(DIMENSOES, observed=True, dropna=False).size()
+            .reset_index(name='Contagem')
+        )
+        for col in DIMENSOES:
+            if isinstance(dados[col].dtype, pd.CategoricalDtype):
+                dados[col] = dados[col].astype(str)
+        return cls(dados, analisador, tamanho_cache=tamanho_cache)
+
+    # -----------------------
+    # Fatias e cache
+    # -----------------------
+    def fatia(self, volumes: Optional[List[str]] = None, areas: Optional[List[str]] = None,
+              horizontes: Optional[List[str]] = None, tensao_min: Optional[float] = None,
+              tensao_max: Optional[float] = None) -> 'CuboContingencias':
+        """
+        Sub-cubo com os mesmos critérios de AnalisadorContingenciasPlotly.filtrar
+        (listas vazias não filtram; com limite de tensão, linhas sem tensão ficam de fora).
+        """
+        filtros = dict(volumes=volumes, areas=areas, horizontes=horizontes,
+                       tensao_min=tensao_min, tensao_max=tensao_max)
+        chave = (
+            frozenset(volumes or ()), frozenset(areas or ()), frozenset(horizontes or ()),
+            None if tensao_min is None else float(tensao_min),
+            None if tensao_max is None else float(tensao_max),
+        )
+        if not any(chave[:3]) and tensao_min is None and tensao_max is None:
+            return self
+        with self._lock:
+            if chave in self._fatias:
+                self._fatias.move_to_end(chave)
+                return self._fatias[chave]
+
+        dados = self.dados
+        mascara = pd.Series(True, index=dados.index)
+        for col, valores in (('Volume', chave[0]), ('Área Geoelétrica', chave[1]), ('Horizonte', chave[2])):
+            if valores:
+                mascara &= dados[col].isin(valores)
+        if tensao_min is not None:
+            mascara &= dados['Tensão_kV'] >= tensao_min
+        if tensao_max is not None:
+            mascara &= dados['Tensão_kV'] <= tensao_max
+
+        sub = CuboContingencias(dados[mascara], self._analisador_base, filtros, self.tamanho_cache)
+        with self._lock:
+            sub = self._fatias.setdefault(chave, sub)
+            self._fatias.move_to_end(chave)
+            if len(self._fatias) > self.tamanho_cache:
+                self._fatias.popitem(last=False)
+        return sub
+
+    @property
+    def analisador(self) -> AnalisadorContingenciasPlotly:
+        """Analisador das linhas individuais com os mesmos filtros (para dados brutos e gráficos livres)."""
+        return self._analisador_base.filtrar(**self.filtros)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.analisador.df
+
+    def _memo(self, chave, calcular):
+        with self._lock:
+            if chave in self._agregados:
+                return self._agregados[chave]
+        valor = calcular()
+        with self._lock:
+            return self._agregados.setdefault(chave, valor)
+
+    def _soma(self, dims: tuple) -> pd.DataFrame:
+        """Contagem por combinação de `dims` (sem as combinações com valor ausente)."""
+        return self._memo(
+            ('soma', dims),
+            lambda: self.dados.groupby(list(dims), dropna=True)['Contagem'].sum().reset_index()
+        )
+
+    def _distribuicao(self, col: str) -> pd.Series:
+        """Contagem por valor da coluna, da maior para a menor."""
+        return self._memo(
+            ('distribuicao', col),
+            lambda: self.dados.groupby(col)['Contagem'].sum().sort_values(ascending=False, kind='stable')
+        )
+
+    def _tabela_cruzada(self, x_col: str, y_col: str) -> pd.DataFrame:
+        def calcular():
+            tabela = self._soma((x_col, y_col)).pivot(index=x_col, columns=y_col, values='Contagem')
+            return tabela.fillna(0).astype(int).sort_index().sort_index(axis=1)
+        return self._memo(('cruzada', x_col, y_col), calcular)
+
+    def _com_tensao(self) -> pd.DataFrame:
+        def calcular():
+            com_tensao = self.dados[self.dados['Tensão_kV'].notna()].copy()
+            com_tensao['Faixa_Tensão'] = pd.cut(com_tensao['Tensão_kV'], **FAIXAS_TENSAO)
+            return com_tensao
+        return self._memo('com_tensao', calcular)
+
+    # -----------------------
+    # Métricas
+    # -----------------------
+    def get_metricas_principais(self) -> Dict:
+        """Retorna métricas principais dos dados."""
+        try:
+            return self._memo('metricas', self._calcular_metricas)
+        except Exception as e:
+            print(f"Erro ao calcular métricas: {e}")
+            return {}
+
+    def _calcular_metricas(self) -> Dict:
+        com_tensao = self._com_tensao()
+        n_com_tensao = com_tensao['Contagem'].sum()
+        return {
+            'total_registros': int(self.dados['Contagem'].sum()),
+            'total_volumes': self.dados['Volume'].nunique(),
+            'total_areas': self.dados['Área Geoelétrica'].nunique(),
+            # Média ponderada pela contagem = média sobre as linhas originais
+            'tensao_media': float((com_tensao['Tensão_kV'] * com_tensao['Contagem']).sum() / n_com_tensao) if n_com_tensao else 0,
+            'tensao_maxima': float(com_tensao['Tensão_kV'].max()) if n_com_tensao else 0,
+            'tensao_minima': float(com_tensao['Tensão_kV'].min()) if n_com_tensao else 0,
+            'distribuicao_volume': self._distribuicao('Volume').to_dict(),
+            'distribuicao_area': self._distribuicao('Área Geoelétrica').to_dict(),
+            'distribuicao_horizonte': self._distribuicao('Horizonte').to_dict()
+        }
+
+    def get_opcoes_filtro(self) -> Dict:
+        """Retorna opções disponíveis para filtros com tipos consistentes."""
+        try:
+            return self._memo('opcoes_filtro', self._calcular_opcoes_filtro)
+        except Exception as e:
+            print(f"Erro ao obter opções de filtro: {e}")
+            return {}
+
+    def _calcular_opcoes_filtro(self) -> Dict:
+        tensoes = self.dados['Tensão_kV'].dropna()
+        return {
+            'volumes': sorted(self.dados['Volume'].unique().tolist()),
+            'areas': sorted(self.dados['Área Geoelétrica'].unique().tolist()),
+            'horizontes': sorted(self.dados['Horizonte'].unique().tolist()),
+            'tensoes': {
+                'min': float(tensoes.min()) if len(tensoes) > 0 else 0.0,
+                'max': float(tensoes.max()) if len(tensoes) > 0 else 1000.0
+            }
+        }
+
+    def get_insights(self) -> Dict:
+        """Retorna insights principais dos dados."""
+        try:
+            return self._memo('insights', self._calcular_insights)
+        except Exception as e:
+            print(f"Erro ao gerar insights: {e}")
+            return {'metricas': {}, 'insights': {}}
+
+    def _calcular_insights(self) -> Dict:
+        metricas = self.get_metricas_principais()
+        if not metricas or not metricas['total_registros']:
+            return {
+                'metricas': metricas,
+                'insights': {chave: "Nenhum dado disponível" for chave in (
+                    'volume_mais_comum', 'area_mais_comum', 'horizonte_mais_comum',
+                    'tensao_dominante', 'proporcao_cc_ca')}
+            }
+
+        def mais_comum(distribuicao):
+            valor, contagem = max(distribuicao.items(), key=lambda x: x[1])
+            return f"{valor} ({contagem} contingências)"
+
+        tipos = self._distribuicao('Tipo_Contingência')
+        return {
+            'metricas': metricas,
+            'insights': {
+                'volume_mais_comum': mais_comum(metricas['distribuicao_volume']),
+                'area_mais_comum': mais_comum(metricas['distribuicao_area']),
+                'horizonte_mais_comum': mais_comum(metricas['distribuicao_horizonte']),
+                'tensao_dominante': f"{metricas.get('tensao_media', 0):.1f} kV (média)",
+                'proporcao_cc_ca': f"CC: {tipos.get('CC', 0)}, CA: {tipos.get('CA', 0)}"
+            }
+        }
+
+    # -----------------------
+    # Gráficos a partir do cubo
+    # -----------------------
+    @_figura_em_cache
+    def plot_barras(self, x_col: str, y_col: Optional[str] = None,
+                    color_col: Optional[str] = None,
+                    titulo: str = "", barmode: str = 'relative') -> go.Figure:
+        """Barras de contagem lidas do cubo; com `y_col` ou colunas fora do cubo, usa as linhas."""
+        if y_col is not None or x_col not in DIMENSOES or (color_col and color_col not in DIMENSOES):
+            return self.analisador.plot_barras(x_col, y_col, color_col, titulo, barmode)
+        try:
+            grupos = (x_col,) if not color_col or color_col == x_col else (x_col, color_col)
+            fig = px.bar(self._soma(grupos), x=x_col, y='Contagem',
+                         color=color_col if color_col else None,
+                         title=titulo or f'Distribuição por {x_col}',
+                         barmode=barmode)
+            fig.update_layout(xaxis_title=x_col, yaxis_title='Contagem', showlegend=color_col is not None)
+            return fig
+        except Exception as e:
+            print(f"Erro ao gerar gráfico de barras: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar gráfico de barras: {str(e)[:50]}")
+
+    @_figura_em_cache
+    def plot_pizza(self, values_col: Optional[str] = None,
+                   names_col: Optional[str] = None,
+                   titulo: str = "") -> go.Figure:
+        """Pizza de contagem lida do cubo; com `values_col` ou coluna fora do cubo, usa as linhas."""
+        if values_col is not None or names_col not in DIMENSOES:
+            return self.analisador.plot_pizza(values_col, names_col, titulo)
+        try:
+            df_agg = self._distribuicao(names_col).reset_index()
+            fig = px.pie(df_agg, values='Contagem', names=names_col,
+                         title=titulo or f'Distribuição por {names_col}')
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+            return fig
+        except Exception as e:
+            print(f"Erro ao gerar gráfico de pizza: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar gráfico de pizza: {str(e)[:50]}")
+
+    @_figura_em_cache
+    def plot_histograma(self, x_col: str, nbins: int = 20,
+                        color_col: Optional[str] = None,
+                        titulo: str = "") -> go.Figure:
+        """Histograma ponderado pela contagem do cubo (mesmas barras do histograma das linhas)."""
+        if x_col not in DIMENSOES or (color_col and color_col not in DIMENSOES):
+            return self.analisador.plot_histograma(x_col, nbins, color_col, titulo)
+        try:
+            fig = px.histogram(self.dados, x=x_col, y='Contagem', histfunc='sum', nbins=nbins,
+                               color=color_col,
+                               title=titulo or f'Histograma de {x_col}')
+            fig.update_layout(xaxis_title=x_col, yaxis_title='Frequência')
+            return fig
+        except Exception as e:
+            print(f"Erro ao gerar histograma: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar histograma: {str(e)[:50]}")
+
+    @_figura_em_cache
+    def plot_heatmap(self, x_col: str, y_col: str,
+                     titulo: str = "", colorscale: str = 'Viridis') -> go.Figure:
+        """Mapa de calor da tabela cruzada lida do cubo."""
+        if x_col not in DIMENSOES or y_col not in DIMENSOES:
+            return self.analisador.plot_heatmap(x_col, y_col, titulo, colorscale)
+        try:
+            df_cross = self._tabela_cruzada(x_col, y_col)
+            if df_cross.empty:
+                return self.analisador._criar_figura_erro("Dados insuficientes para heatmap")
+            return px.imshow(df_cross,
+                             title=titulo or f'Heatmap: {x_col} vs {y_col}',
+                             labels=dict(x=x_col, y=y_col, color='Contagem'),
+                             color_continuous_scale=colorscale)
+        except Exception as e:
+            print(f"Erro ao gerar heatmap: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar heatmap: {str(e)[:50]}")
+
+    @_figura_em_cache
+    def plot_tensao_por_regiao(self, tipo: str = 'barras',
+                               titulo: str = "Distribuição de Tensão por Região") -> go.Figure:
+        """Faixas de tensão por região, lidas do cubo."""
+        try:
+            com_tensao = self._com_tensao()
+            if com_tensao.empty:
+                return self.analisador._criar_figura_erro("Não foi possível extrair tensões dos dados")
+            if tipo == 'pizza':
+                faixas = com_tensao.groupby('Faixa_Tensão', observed=True)['Contagem'].sum().reset_index()
+                return px.pie(faixas, values='Contagem', names='Faixa_Tensão', title=titulo)
+            df_agrupado = (com_tensao.groupby(['Área Geoelétrica', 'Faixa_Tensão'], observed=True)['Contagem']
+                           .sum().reset_index())
+            return px.bar(df_agrupado, x='Área Geoelétrica', y='Contagem',
+                          color='Faixa_Tensão', title=titulo, barmode='stack')
+        except Exception as e:
+            print(f"Erro ao gerar gráfico de tensão: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar gráfico de tensão: {str(e)[:50]}")
+
+    @_figura_em_cache
+    def plot_horizonte_por_volume(self, tipo: str = 'barras',
+                                  titulo: str = "Distribuição de Horizonte por Volume") -> go.Figure:
+        """Horizonte por volume; a versão em pizza (subplots) continua no analisador."""
+        if tipo == 'pizza':
+            return self.analisador.plot_horizonte_por_volume(tipo, titulo)
+        try:
+            return px.bar(self._soma(('Volume', 'Horizonte')), x='Volume', y='Contagem',
+                          color='Horizonte', title=titulo, barmode='group')
+        except Exception as e:
+            print(f"Erro ao gerar gráfico de horizonte: {e}")
+            return self.analisador._criar_figura_erro(f"Erro ao gerar gráfico de horizonte: {str(e)[:50]}")
+
+    # Gráficos que dependem das linhas individuais
+    def plot_box(self, *args, **kwargs) -> go.Figure:
+        return self.analisador.plot_box(*args, **kwargs)
+
+    def plot_scatter(self, *args, **kwargs) -> go.Figure:
+        return self.analisador.plot_scatter(*args, **kwargs)
+
+    def plot_volume_por_area(self, *args, **kwargs) -> go.Figure:
+        return self.analisador.plot_volume_por_area(*args, **kwargs)
+
+
+def benchmark_cubo(n_linhas: int = 200000) -> Dict:
+    """Compara um rerun com filtro novo no analisador (linhas) e no cubo."""
+    areas = ["Interligação Sul e Sudeste/Centro-Oeste", "Elos de Corrente Contínua", "Interligação Norte/Nordeste"]
+    df = pd.DataFrame({
+        'Volume': [f"Volume {i % 7 + 1}" for i in range(n_linhas)],
+        'Área Geoelétrica': [areas[i % 3] for i in range(n_linhas)],
+        'Contingência Dupla': [f"LT {'CC 600' if i % 5 == 0 else (230, 345, 440, 500, 765)[i % 5]} kV Assis {i} – Ponta Grossa C1 e C2"
+                               for i in range(n_linhas)],
+        'Horizonte': ["Curto Prazo" if i % 2 else "Médio Prazo" for i in range(n_linhas)],
+    })
+
+    def rodada(visao):
+        visao.get_metricas_principais()
+        visao.plot_barras(x_col='Volume', color_col='Horizonte', barmode='group')
+        visao.plot_pizza(names_col='Área Geoelétrica')
+        visao.plot_tensao_por_regiao(tipo='barras')
+        visao.plot_horizonte_por_volume(tipo='barras')
+        visao.plot_heatmap(x_col='Área Geoelétrica', y_col='Volume')
+        visao.plot_histograma(x_col='Tensão_kV', nbins=10, color_col='Volume')
+        visao.get_insights()
+
+    inicio = time.perf_counter()
+    cubo = CuboContingencias.do_dataframe(df)
+    tempo_cubo = time.perf_counter() - inicio
+
+    resultados = {"linhas": n_linhas, "celulas_cubo": len(cubo.dados), "construcao_s": tempo_cubo}
+    filtros = [dict(volumes=[f"Volume {v}" for v in range(1, k + 2)], tensao_min=0.0, tensao_max=800.0) for k in range(4)]
+    for nome, base in (("analisador", cubo._analisador_base), ("cubo", cubo)):
+        inicio = time.perf_counter()
+        for f in filtros:
+            rodada(base.filtrar(**f) if nome == "analisador" else base.fatia(**f))
+        resultados[nome + "_s"] = (time.perf_counter() - inicio) / len(filtros)
+
+    print(f"{n_linhas} linhas -> cubo com {len(cubo.dados)} células em {tempo_cubo:.2f}s")
+    print(f"rerun com filtro novo: linhas {resultados['analisador_s']:.2f}s | cubo {resultados['cubo_s']:.2f}s")
+    return resultados
+
+
+if __name__ == '__main__':
+    benchmark_cubo(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
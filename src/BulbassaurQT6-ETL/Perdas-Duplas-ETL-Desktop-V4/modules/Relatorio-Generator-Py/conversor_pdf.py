@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+# ============================================================================
+# Serviço local de conversão DOCX -> PDF (LibreOffice headless)
+# ============================================================================
+# O docx2pdf abre e fecha uma sessão do Word a cada documento, e esse custo
+# domina os lotes de relatórios. Aqui cada "slot" é um perfil do LibreOffice
+# headless reaproveitado entre as conversões:
+#   - com o módulo `uno` (python3-uno no Linux), o slot mantém o soffice
+#     escutando num socket e os documentos são convertidos pela mesma sessão.
+#     Só neste modo a instância fica aberta ("quente") entre documentos;
+#   - sem `uno`, o slot chama `soffice --convert-to pdf` com um perfil de
+#     usuário próprio e persistente: a criação do perfil acontece uma única
+#     vez, mas cada documento ainda inicia um processo soffice novo.
+# Os documentos entram numa fila e são convertidos em paralelo, um por slot.
+# Sem LibreOffice instalado, cai para o docx2pdf (Windows com Word): o Word é
+# automatizado via COM, então as conversões rodam uma por vez, na thread que
+# chamou, com o COM inicializado nela.
+#
+# Uso:
+#   python conversor_pdf.py relatorio1.docx relatorio2.docx --paralelo 2 --saida pdfs/
+import os
+import sys
+import glob
+import time
+import queue
+import atexit
+import shutil
+import socket
+import tempfile
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except Exception:
+    HAS_UNO = False
+
+CAMINHOS_SOFFICE_WINDOWS = [
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+]
+
+
+def localizar_soffice():
+    """Executável do LibreOffice (PATH, variável SOFFICE_PATH ou pastas padrão do Windows)."""
+    candidatos = [os.environ.get("SOFFICE_PATH"), shutil.which("soffice"), shutil.which("libreoffice")]
+    candidatos += CAMINHOS_SOFFICE_WINDOWS
+    return next((c for c in candidatos if c and os.path.exists(c)), None)
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _propriedades(**valores):
+    props = []
+    for nome, valor in valores.items():
+        prop = PropertyValue()
+        prop.Name, prop.Value = nome, valor
+        props.append(prop)
+    return tuple(props)
+
+
+class InstanciaLibreOffice:
+    """Um slot de conversão: um perfil do LibreOffice e, com `uno`, um soffice aberto escutando num socket."""
+
+    def __init__(self, soffice, perfil_dir, timeout_s=180, usar_uno=HAS_UNO):
+        self.soffice = soffice
+        self.perfil_dir = Path(perfil_dir)
+        self.timeout_s = timeout_s
+        self.usar_uno = usar_uno
+        self.processo = None
+        self.desktop = None
+        self.iniciada = False
+        self.conversoes = 0
+
+    @property
+    def _perfil_url(self):
+        return self.perfil_dir.resolve().as_uri()
+
+    def iniciar(self):
+        self.perfil_dir.mkdir(parents=True, exist_ok=True)
+        self.iniciada = True
+        if not self.usar_uno:
+            return
+        porta = _porta_livre()
+        self.processo = subprocess.Popen(
+            [self.soffice, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+             f"-env:UserInstallation={self._perfil_url}",
+             f"--accept=socket,host=127.0.0.1,port={porta};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        contexto_local = uno.getComponentContext()
+        resolver = contexto_local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", contexto_local)
+        prazo = time.perf_counter() + self.timeout_s
+        while True:
+            try:
+                contexto = resolver.resolve(f"uno:socket,host=127.0.0.1,port={porta};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.processo.poll() is not None or time.perf_counter() > prazo:
+                    self.encerrar()
+                    raise RuntimeError("LibreOffice não respondeu ao iniciar a instância de conversão")
+                time.sleep(0.25)
+        self.desktop = contexto.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", contexto)
+
+    def converter(self, docx_path, pdf_path):
+        if not self.iniciada:
+            self.iniciar()
+        if self.usar_uno:
+            self._converter_uno(docx_path, pdf_path)
+        else:
+            self._converter_cli(docx_path, pdf_path)
+        self.conversoes += 1
+
+    def _converter_uno(self, docx_path, pdf_path):
+        documento = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(docx_path)), "_blank", 0, _propriedades(Hidden=True, ReadOnly=True))
+        try:
+            documento.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)), _propriedades(FilterName="writer_pdf_Export"))
+        finally:
+            documento.close(True)
+
+    def _converter_cli(self, docx_path, pdf_path):
+        # O --convert-to grava <saida>/<nome>.pdf; cada slot usa a sua pasta e o arquivo é movido para o destino
+        saida = self.perfil_dir / "saida"
+        saida.mkdir(exist_ok=True)
+        resultado = subprocess.run(
+            [self.soffice, "--headless", "--norestore", f"-env:UserInstallation={self._perfil_url}",
+             "--convert-to", "pdf", "--outdir", str(saida), os.path.abspath(docx_path)],
+            capture_output=True, text=True, timeout=self.timeout_s,
+        )
+        gerado = saida / (Path(docx_path).stem + ".pdf")
+        if resultado.returncode != 0 or not gerado.exists():
+            raise RuntimeError(f"soffice falhou ({resultado.returncode}): {resultado.stderr.strip() or resultado.stdout.strip()}")
+        shutil.move(str(gerado), os.path.abspath(pdf_path))
+
+    def encerrar(self):
+        self.iniciada = False
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.processo is not None:
+            try:
+                self.processo.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.processo.kill()
+            self.processo = None
+
+
+class ConversorPDF:
+    """
+    Converte DOCX em PDF com slots do LibreOffice reaproveitados (instância
+    aberta entre conversões no modo uno; um soffice por documento no modo cli).
+
+    Exemplo:
+        with ConversorPDF(max_paralelo=2) as conversor:
+            resultados = conversor.converter_lote([("a.docx", "a.pdf"), ("b.docx", "b.pdf")])
+    """
+
+    def __init__(self, max_paralelo=2, soffice=None, timeout_s=180, perfil_dir=None):
+        self.max_paralelo = max(1, int(max_paralelo))
+        self.soffice = soffice or localizar_soffice()
+        self.timeout_s = timeout_s
+        # Perfis por processo: dois processos não podem abrir o mesmo perfil do LibreOffice ao mesmo tempo
+        self._perfil_temporario = perfil_dir is None
+        self.perfil_dir = Path(perfil_dir) if perfil_dir else Path(tempfile.gettempdir()) / "palkia_conversor_pdf" / str(os.getpid())
+        self._slots = None
+        self._lock = threading.Lock()
+        # O docx2pdf compartilha uma única aplicação do Word: uma conversão por vez
+        self._lock_word = threading.Lock()
+
+    @property
+    def modo(self):
+        if self.soffice is None:
+            return "docx2pdf"
+        return "libreoffice-uno" if HAS_UNO else "libreoffice-cli"
+
+    def _obter_slots(self):
+        # As instâncias sobem sob demanda, na primeira conversão
+        with self._lock:
+            if self._slots is None:
+                self._slots = queue.Queue()
+                for i in range(self.max_paralelo):
+                    self._slots.put(InstanciaLibreOffice(self.soffice, self.perfil_dir / f"slot_{i}", self.timeout_s))
+            return self._slots
+
+    def converter(self, docx_path, pdf_path=None):
+        """Converte um documento; devolve o registro de tempos (ver `converter_lote`)."""
+        return self.converter_lote([(docx_path, pdf_path)])[0]
+
+    def _converter_um(self, docx_path, pdf_path, enfileirado_em):
+        registro = {"docx": docx_path, "pdf": pdf_path, "modo": self.modo, "erro": None}
+        inicio = time.perf_counter()
+        registro["espera_s"] = inicio - enfileirado_em
+
+        if self.soffice is None:
+            try:
+                self._converter_docx2pdf(docx_path, pdf_path)
+            except Exception as e:
+                registro["erro"] = f"{type(e).__name__}: {e}"
+            registro["conversao_s"] = time.perf_counter() - inicio
+            return registro
+
+        slots = self._obter_slots()
+        instancia = slots.get()
+        try:
+            try:
+                instancia.converter(docx_path, pdf_path)
+            except Exception:
+                # A instância pode ter caído: reinicia o slot e tenta mais uma vez
+                instancia.encerrar()
+                instancia.converter(docx_path, pdf_path)
+        except Exception as e:
+            registro["erro"] = f"{type(e).__name__}: {e}"
+        finally:
+            slots.put(instancia)
+        registro["conversao_s"] = time.perf_counter() - inicio
+        return registro
+
+    def _converter_docx2pdf(self, docx_path, pdf_path):
+        """
+        Conversão pelo Word (docx2pdf). O docx2pdf não inicializa o COM e um
+        `word.Quit()` fecha o Word de todas as threads, então a conversão roda
+        na thread atual, com CoInitialize/CoUninitialize, e uma de cada vez.
+        """
+        from docx2pdf import convert
+        try:
+            import pythoncom
+        except ImportError:
+            pythoncom = None  # fora do Windows (macOS usa AppleScript)
+
+        with self._lock_word:
+            if pythoncom is not None:
+                pythoncom.CoInitialize()
+            try:
+                convert(os.path.abspath(docx_path), os.path.abspath(pdf_path))
+            finally:
+                if pythoncom is not None:
+                    pythoncom.CoUninitialize()
+
+    def converter_lote(self, documentos, callback=None):
+        """
+        Enfileira os documentos e converte até `max_paralelo` ao mesmo tempo
+        (no modo docx2pdf, um por vez na thread que chamou).
+
+        Args:
+            documentos (list): Caminhos .docx ou pares (docx, pdf). Sem pdf, usa o mesmo nome com .pdf.
+            callback (callable, optional): Chamado com cada registro assim que o documento termina.
+
+        Returns:
+            list: Um registro por documento, na ordem de entrada:
+                {"docx", "pdf", "modo", "erro", "espera_s", "conversao_s"}.
+        """
+        pares = []
+        for item in documentos:
+            docx_path, pdf_path = (item, None) if isinstance(item, (str, os.PathLike)) else item
+            pares.append((str(docx_path), str(pdf_path or Path(docx_path).with_suffix(".pdf"))))
+
+        enfileirado_em = time.perf_counter()
+        if self.modo == "docx2pdf":
+            # Word via COM: em sequência, na thread que chamou
+            registros = []
+            for docx, pdf in pares:
+                registros.append(self._converter_um(docx, pdf, enfileirado_em))
+                if callback:
+                    callback(registros[-1])
+            return registros
+
+        with ThreadPoolExecutor(max_workers=self.max_paralelo) as executor:
+            futuros = [executor.submit(self._converter_um, docx, pdf, enfileirado_em) for docx, pdf in pares]
+            if callback:
+                for futuro in futuros:
+                    futuro.add_done_callback(lambda f: callback(f.result()))
+            return [f.result() for f in futuros]
+
+    def encerrar(self):
+        with self._lock:
+            if self._slots is None:
+                return
+            while not self._slots.empty():
+                self._slots.get().encerrar()
+            self._slots = None
+            if self._perfil_temporario:
+                shutil.rmtree(self.perfil_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar()
+
+
+_servico_padrao = None
+
+
+def servico_padrao(max_paralelo=2):
+    """Serviço compartilhado pelo processo: as instâncias ficam abertas entre chamadas e fecham na saída."""
+    global _servico_padrao
+    if _servico_padrao is None:
+        _servico_padrao = ConversorPDF(max_paralelo=max_paralelo)
+        atexit.register(_servico_padrao.encerrar)
+    return _servico_padrao
+
+
+def converter_docx_para_pdf(docx_path, pdf_path):
+    """Substituto do `docx2pdf.convert` para um documento; levanta RuntimeError em caso de falha."""
+    registro = servico_padrao().converter(docx_path, pdf_path)
+    if registro["erro"]:
+        raise RuntimeError(f"Falha na conversão de {os.path.basename(docx_path)}: {registro['erro']}")
+    return registro
+
+
+def imprimir_relatorio(registros):
+    total = sum(r["conversao_s"] for r in registros)
+    print(f"\n--- Conversão: {len(registros)} documentos ({registros[0]['modo'] if registros else '-'}) ---")
+    for r in registros:
+        status = "ERRO" if r["erro"] else "ok"
+        print(f"  [{status}] {os.path.basename(r['docx'])}: {r['conversao_s']:.2f}s (fila {r['espera_s']:.2f}s)")
+        if r["erro"]:
+            print(f"      {r['erro']}")
+    print(f"  Tempo somado de conversão: {total:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte DOCX em PDF com LibreOffice headless mantido aberto")
+    parser.add_argument("arquivos", nargs="+", help="arquivos .docx ou padrões (ex: relatorios/*.docx)")
+    parser.add_argument("--paralelo", type=int, default=2, help="conversões simultâneas (instâncias do LibreOffice)")
+    parser.add_argument("--saida", default=None, help="pasta dos PDFs (padrão: ao lado de cada DOCX)")
+    args = parser.parse_args()
+
+    arquivos = [a for padrao in args.arquivos for a in (sorted(glob.glob(padrao)) or [padrao])]
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+        documentos = [(a, os.path.join(args.saida, Path(a).stem + ".pdf")) for a in arquivos]
+    else:
+        documentos = arquivos
+
+    inicio = time.perf_counter()
+    with ConversorPDF(max_paralelo=args.paralelo) as conversor:
+        registros = conversor.converter_lote(documentos)
+    imprimir_relatorio(registros)
+    print(f"  Tempo total (com paralelismo): {time.perf_counter() - inicio:.2f}s")
+    sys.exit(1 if any(r["erro"] for r in registros) else 0)
@@ -22,15 +22,31 @@ xhtml2pdf
 requests
 
 """# -*- coding: utf-8 -*-
-# Servidor Flask para conversão de HTML para PDF (v1.1 - CORRIGIDO)
+# Servidor Flask para conversão de HTML para PDF (v1.2 - fila de jobs)
 # Requer: pip install weasyprint
 # NOTA: O Flask rodará na porta 8888.
+#
+# Além do /generate-cv (síncrono), os relatórios podem ser enviados como job:
+#   POST /jobs                 {"relatorios": [{"nome": "a.pdf", "html": "..."}, ...]}
+#                              (ou só {"html": "..."}) -> 202 {"job_id": ...}
+#   GET  /jobs/<id>            status e progresso (relatórios concluídos / total)
+#   GET  /jobs/<id>/download   o PDF (um relatório) ou um ZIP com todos
+# Os PDFs são gerados num pool local de processos, sem broker externo. O id do
+# job é o hash da entrada: um pedido idêntico a um já concluído volta pronto na
+# hora, e cada relatório fica em cache (por hash do HTML) para os jobs seguintes.
 
 import os
 import io
+import json
+import shutil
+import hashlib
+import tempfile
 import threading
 import time
+import zipfile
 import requests
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
 
 from flask import Flask, Response, request, send_file, render_template_string
 
@@ -72,10 +88,250 @@ class RelatorioGeneratorPDF:
         pdf_buffer.seek(0)
         return pdf_buffer
 
+# Gerador de cada processo do pool (WeasyPrint é carregado uma vez por processo)
+_gerador_worker = None
+
+def _iniciar_worker():
+    global _gerador_worker
+    _gerador_worker = RelatorioGeneratorPDF()
+
+def _gerar_pdf_worker(html_content: str) -> bytes:
+    if _gerador_worker is None:
+        _iniciar_worker()
+    return _gerador_worker.generate(html_content).getvalue()
+
+
+class FilaRelatorios:
+    """
+    Fila de jobs de geração de PDF com pool local de workers e cache em disco.
+
+    Cada job tem um ou mais relatórios HTML; cada relatório vira uma tarefa no
+    pool, então um job grande não bloqueia a requisição nem os outros jobs.
+    Os PDFs ficam em `cache_dir/<hash do HTML>.pdf` (no máximo `max_cache`,
+    descartando os usados há mais tempo). Dos jobs, ficam guardados no máximo
+    `max_jobs`; os finalizados mais antigos são esquecidos primeiro.
+    """
+    STATUS_PENDENTE = "pendente"
+    STATUS_EXECUTANDO = "executando"
+    STATUS_CONCLUIDO = "concluido"
+    STATUS_ERRO = "erro"
+
+    def __init__(self, max_workers: int = 2, cache_dir: str = None, max_cache: int = 200, usar_processos: bool = True,
+                 max_jobs: int = 500):
+        self.max_workers = max_workers
+        self.usar_processos = usar_processos
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "palkia_relatorios_pdf")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_cache = max_cache
+        self.max_jobs = max_jobs
+        self._cache = OrderedDict()        # hash do HTML -> caminho do PDF
+        self._jobs = OrderedDict()         # id do job -> dict de estado (mais antigo primeiro)
+        self._em_andamento = {}            # hash do HTML -> Future (mesmo relatório em dois jobs)
+        # RLock: um Future já concluído chama o callback na hora, ainda dentro de submeter()
+        self._lock = threading.RLock()
+        self._pool = None
+        # PDFs de execuções anteriores continuam valendo
+        for nome in sorted(os.listdir(self.cache_dir), key=lambda n: os.path.getmtime(os.path.join(self.cache_dir, n))):
+            if nome.endswith(".pdf"):
+                self._cache[nome[:-4]] = os.path.join(self.cache_dir, nome)
+
+    def _obter_pool(self):
+        if self._pool is None:
+            if self.usar_processos:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_iniciar_worker)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, initializer=_iniciar_worker)
+        return self._pool
+
+    def _descartar_pool(self, pool):
+        """Um worker morreu (BrokenProcessPool): o pool não aceita mais tarefas e o próximo pedido cria outro."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _agendar(self, html_content: str):
+        pool = self._obter_pool()
+        try:
+            return pool.submit(_gerar_pdf_worker, html_content), pool
+        except BrokenExecutor:
+            self._descartar_pool(pool)
+            pool = self._obter_pool()
+            return pool.submit(_gerar_pdf_worker, html_content), pool
+
+    def _no_cache(self, hash_html: str) -> bool:
+        caminho = self._cache.get(hash_html)
+        return caminho is not None and os.path.exists(caminho)
+
+    @staticmethod
+    def _hash(texto: str) -> str:
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def normalizar_pedido(dados: dict) -> list:
+        """Lista de {"nome", "html"} a partir do corpo do POST /jobs (ValueError se inválido)."""
+        if not isinstance(dados, dict):
+            raise ValueError("Corpo JSON inválido.")
+        relatorios = dados.get("relatorios")
+        if relatorios is None and "html" in dados:
+            relatorios = [{"nome": dados.get("nome"), "html": dados["html"]}]
+        if not isinstance(relatorios, list) or not relatorios:
+            raise ValueError("Informe 'html' ou uma lista não vazia em 'relatorios'.")
+        normalizados = []
+        for i, rel in enumerate(relatorios, start=1):
+            if not isinstance(rel, dict) or not isinstance(rel.get("html"), str):
+                raise ValueError(f"Relatório {i} sem o campo 'html'.")
+            nome = rel.get("nome") or f"relatorio_{i}.pdf"
+            if not nome.lower().endswith(".pdf"):
+                nome += ".pdf"
+            normalizados.append({"nome": os.path.basename(nome), "html": rel["html"]})
+        return normalizados
+
+    # -----------------------
+    # Jobs
+    # -----------------------
+    def submeter(self, relatorios: list) -> dict:
+        """Registra o job (ou devolve o existente com a mesma entrada) e agenda os relatórios."""
+        job_id = self._hash(json.dumps(relatorios, sort_keys=True, ensure_ascii=False))[:24]
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] != self.STATUS_ERRO:
+                # Concluído mas com algum PDF fora do cache: o job é refeito
+                if job["status"] != self.STATUS_CONCLUIDO or all(self._no_cache(r["hash"]) for r in job["relatorios"]):
+                    self._jobs.move_to_end(job_id)
+                    return job
+            job = {
+                "id": job_id,
+                "status": self.STATUS_PENDENTE,
+                "criado_em": time.time(),
+                "inicio": None,
+                "fim": None,
+                "relatorios": [{"nome": r["nome"], "hash": self._hash(r["html"]), "status": self.STATUS_PENDENTE,
+                                "do_cache": False, "erro": None} for r in relatorios],
+            }
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._limitar_jobs()
+
+            for rel, entrada in zip(job["relatorios"], relatorios):
+                if self._no_cache(rel["hash"]):
+                    self._cache.move_to_end(rel["hash"])
+                    rel.update(status=self.STATUS_CONCLUIDO, do_cache=True)
+                    continue
+                futuro = self._em_andamento.get(rel["hash"])
+                if futuro is None:
+                    futuro, pool = self._agendar(entrada["html"])
+                    self._em_andamento[rel["hash"]] = futuro
+                    futuro.add_done_callback(lambda f, h=rel["hash"], p=pool: self._guardar(h, f, p))
+                rel["status"] = self.STATUS_EXECUTANDO
+                futuro.add_done_callback(lambda f, j=job, r=rel: self._relatorio_pronto(j, r, f))
+            self._atualizar_status(job)
+        return job
+
+    def _limitar_jobs(self):
+        """Esquece os jobs finalizados mais antigos além de `max_jobs` (os em andamento ficam)."""
+        excesso = len(self._jobs) - self.max_jobs
+        if excesso <= 0:
+            return
+        finalizados = [job_id for job_id, job in self._jobs.items()
+                       if job["status"] in (self.STATUS_CONCLUIDO, self.STATUS_ERRO)]
+        for job_id in finalizados[:excesso]:
+            del self._jobs[job_id]
+
+    def _guardar(self, hash_html: str, futuro, pool=None):
+        """Grava o PDF gerado no cache (uma vez por hash, mesmo se vários jobs pediram)."""
+        if pool is not None and isinstance(futuro.exception(), BrokenExecutor):
+            self._descartar_pool(pool)
+        with self._lock:
+            self._em_andamento.pop(hash_html, None)
+            if futuro.exception() is not None:
+                return
+            caminho = os.path.join(self.cache_dir, f"{hash_html}.pdf")
+            with open(caminho, "wb") as f:
+                f.write(futuro.result())
+            self._cache[hash_html] = caminho
+            while len(self._cache) > self.max_cache:
+                _, antigo = self._cache.popitem(last=False)
+                try:
+                    os.remove(antigo)
+                except OSError:
+                    pass
+
+    def _relatorio_pronto(self, job: dict, rel: dict, futuro):
+        erro = futuro.exception()
+        with self._lock:
+            if erro is not None:
+                rel.update(status=self.STATUS_ERRO, erro=str(erro))
+            else:
+                rel["status"] = self.STATUS_CONCLUIDO
+            self._atualizar_status(job)
+
+    def _atualizar_status(self, job: dict):
+        status = [r["status"] for r in job["relatorios"]]
+        if job["inicio"] is None and any(s != self.STATUS_PENDENTE for s in status):
+            job["inicio"] = time.time()
+        if all(s in (self.STATUS_CONCLUIDO, self.STATUS_ERRO) for s in status):
+            job["status"] = self.STATUS_ERRO if self.STATUS_ERRO in status else self.STATUS_CONCLUIDO
+            job["fim"] = job["fim"] or time.time()
+        elif any(s == self.STATUS_EXECUTANDO for s in status):
+            job["status"] = self.STATUS_EXECUTANDO
+
+    def status(self, job_id: str):
+        """Resumo do job para o GET /jobs/<id> (None se não existir)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            concluidos = sum(r["status"] == self.STATUS_CONCLUIDO for r in job["relatorios"])
+            total = len(job["relatorios"])
+            return {
+                "job_id": job["id"],
+                "status": job["status"],
+                "concluidos": concluidos,
+                "total": total,
+                "progresso": round(concluidos / total, 3),
+                "tempo_s": round((job["fim"] or time.time()) - job["criado_em"], 3),
+                "relatorios": [{"nome": r["nome"], "status": r["status"], "do_cache": r["do_cache"], "erro": r["erro"]}
+                               for r in job["relatorios"]],
+            }
+
+    def resultado(self, job_id: str):
+        """(nome do arquivo, bytes, mimetype) do job concluído; None se não estiver pronto."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != self.STATUS_CONCLUIDO:
+                return None
+            arquivos = [(r["nome"], self._cache.get(r["hash"])) for r in job["relatorios"]]
+        if any(caminho is None or not os.path.exists(caminho) for _, caminho in arquivos):
+            return None  # saiu do cache: o cliente reenvia o pedido
+        if len(arquivos) == 1:
+            nome, caminho = arquivos[0]
+            with open(caminho, "rb") as f:
+                return nome, f.read(), "application/pdf"
+        buffer = io.BytesIO()
+        usados = set()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for i, (nome, caminho) in enumerate(arquivos, start=1):
+                if nome in usados:
+                    nome = f"{os.path.splitext(nome)[0]}_{i}.pdf"
+                usados.add(nome)
+                zf.write(caminho, nome)
+        return f"relatorios_{job_id}.zip", buffer.getvalue(), "application/zip"
+
+    def encerrar(self, limpar_cache: bool = False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if limpar_cache:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
 class FlaskServer:
-    def __init__(self, pdf_generator: RelatorioGeneratorPDF, host: str = '0.0.0.0', port: int = 8888, debug: bool = True):
+    def __init__(self, pdf_generator: RelatorioGeneratorPDF, host: str = '0.0.0.0', port: int = 8888, debug: bool = True,
+                 fila: FilaRelatorios = None):
         self.app = Flask(__name__)
         self.pdf_generator = pdf_generator
+        self.fila = fila or FilaRelatorios()
         self.host = host
         self.port = port
         self.debug = debug
@@ -106,6 +362,39 @@ class FlaskServer:
             except Exception as e:
                 return { "error": f"Geração de PDF falhou: {e}" }, 500
 
+        @self.app.route("/jobs", methods=["POST"])
+        def submit_job_endpoint():
+            try:
+                relatorios = FilaRelatorios.normalizar_pedido(request.get_json(silent=True))
+            except ValueError as ve:
+                return {"error": str(ve)}, 400
+            job = self.fila.submeter(relatorios)
+            status = self.fila.status(job["id"])
+            status["status_url"] = f"/jobs/{job['id']}"
+            status["download_url"] = f"/jobs/{job['id']}/download"
+            # 200 quando já está pronto (cache), 202 quando ficou na fila
+            return status, 200 if status["status"] == FilaRelatorios.STATUS_CONCLUIDO else 202
+
+        @self.app.route("/jobs/<job_id>", methods=["GET"])
+        def job_status_endpoint(job_id):
+            status = self.fila.status(job_id)
+            if status is None:
+                return {"error": "Job não encontrado."}, 404
+            return status
+
+        @self.app.route("/jobs/<job_id>/download", methods=["GET"])
+        def job_download_endpoint(job_id):
+            status = self.fila.status(job_id)
+            if status is None:
+                return {"error": "Job não encontrado."}, 404
+            if status["status"] != FilaRelatorios.STATUS_CONCLUIDO:
+                return {"error": f"Job não concluído (status: {status['status']}).", "status": status}, 409
+            resultado = self.fila.resultado(job_id)
+            if resultado is None:
+                return {"error": "Resultado expirou do cache; envie o pedido novamente."}, 410
+            nome, conteudo, mimetype = resultado
+            return send_file(io.BytesIO(conteudo), mimetype=mimetype, as_attachment=True, download_name=nome)
+
     def run(self):
         server_thread = threading.Thread(target=lambda: self.app.run(host=self.host, port=self.port, debug=self.debug, use_reloader=False))
         server_thread.daemon = True
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+# ============================================================================
+# Geração em lote (sem interface) dos relatórios de Perdas Duplas
+# ============================================================================
+# Lê um manifesto JSON com vários PDFs/intervalos de páginas e, para cada um,
+# roda extração -> Excel -> Word (e opcionalmente PDF) em paralelo, num pool de
+# processos. A extração acontece uma única vez por (PDF, páginas, opções): o
+# DataFrame resultante alimenta todas as exportações e fica em cache em
+# <saida>/.cache, então rodar o lote de novo só refaz o que mudou.
+# Ao final grava <saida>/resumo_lote.json com o tempo de cada etapa.
+#
+# Manifesto (caminhos relativos à pasta do manifesto):
+#   {
+#     "saida": "saida_lote",
+#     "formatos": ["excel", "word"],          # "pdf" converte o Word com o conversor_pdf
+#     "opcoes": {"enable_regex_processing": true},
+#     "template_word": "template.docx",       # opcional; sem ele o Word é um documento novo
+#     "pagina_word": 3,
+#     "relatorios": [
+#       {"pdf": "Rev5.pdf"},
+#       {"pdf": "Rev5.pdf", "paginas": "1-20", "nome": "rev5_vol1", "template_word": "outro.docx"}
+#     ]
+#   }
+#
+# Uso:
+#   python lote_perdas_duplas.py manifesto.json --paralelo 4
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from docx import Document
+
+# Controllers do app (app/controllers/...)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from app.controllers.etl_repository import ETLController
+from app.controllers.relatorio_docx import gerar_tabela_docx, inserir_tabela_na_pagina
+from app.controllers.layout_docx import LayoutDocx
+
+# Conversor Word -> PDF (modules/Relatorio-Generator-Py/conversor_pdf.py)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import conversor_pdf
+
+FORMATOS = ("excel", "word", "pdf")
+VERSAO_CACHE = 1
+
+
+# -----------------------
+# Manifesto
+# -----------------------
+def carregar_manifesto(caminho, saida=None, formatos=None):
+    """
+    Lê o manifesto e devolve (pasta de saída, formatos, lista de relatórios normalizados).
+
+    Cada relatório herda `opcoes`, `template_word` e `pagina_word` do nível de cima
+    quando não define os seus. Levanta ValueError para manifestos inválidos.
+    """
+    caminho = Path(caminho).resolve()
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    base = caminho.parent
+
+    def resolver(p):
+        return str((base / p).resolve()) if p else None
+
+    formatos = list(formatos or dados.get("formatos") or ["excel", "word"])
+    invalidos = [fmt for fmt in formatos if fmt not in FORMATOS]
+    if invalidos:
+        raise ValueError(f"Formatos desconhecidos: {invalidos} (use {', '.join(FORMATOS)})")
+    saida = Path(saida) if saida else base / dados.get("saida", "saida_lote")
+
+    relatorios, nomes = [], set()
+    for i, item in enumerate(dados.get("relatorios") or [], start=1):
+        if isinstance(item, str):
+            item = {"pdf": item}
+        if not item.get("pdf"):
+            raise ValueError(f"Relatório {i} do manifesto sem o campo 'pdf'.")
+        paginas = item.get("paginas")
+        nome = item.get("nome") or Path(item["pdf"]).stem + (f"_p{paginas.replace(',', '_')}" if isinstance(paginas, str) else "")
+        if nome in nomes:
+            raise ValueError(f"Nome de relatório repetido no manifesto: '{nome}'")
+        nomes.add(nome)
+        relatorios.append({
+            "nome": nome,
+            "pdf": resolver(item["pdf"]),
+            "paginas": paginas,
+            "opcoes": {**dados.get("opcoes", {}), **item.get("opcoes", {})},
+            "template_word": resolver(item.get("template_word", dados.get("template_word"))),
+            "pagina_word": int(item.get("pagina_word", dados.get("pagina_word", 1))),
+        })
+    if not relatorios:
+        raise ValueError("O manifesto não tem relatórios.")
+    return saida, formatos, relatorios
+
+
+def chave_extracao(relatorio):
+    """Identifica o resultado da extração: o mesmo PDF (tamanho/data), páginas e opções dão o mesmo DataFrame."""
+    info = os.stat(relatorio["pdf"])
+    assinatura = json.dumps([VERSAO_CACHE, os.path.abspath(relatorio["pdf"]), info.st_size, info.st_mtime_ns,
+                             relatorio["paginas"], sorted(relatorio["opcoes"].items())], default=str)
+    return hashlib.sha1(assinatura.encode("utf-8")).hexdigest()
+
+
+# -----------------------
+# Etapas (rodam nos processos do pool)
+# -----------------------
+def extrair(pdf, paginas, opcoes, cache_dir=None, chave=None):
+    """Extrai e processa as contingências do PDF; devolve (DataFrame, tempos, veio do cache)."""
+    cache = Path(cache_dir) / f"{chave}.pkl" if cache_dir and chave else None
+    if cache and cache.exists():
+        inicio = time.perf_counter()
+        try:
+            with open(cache, "rb") as f:
+                df = pickle.load(f)
+            return df, {"cache_s": time.perf_counter() - inicio}, True
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass  # cache corrompido: extrai de novo
+
+    etl_controller = ETLController()
+    etl_controller.process_options.update(opcoes)
+    inicio = time.perf_counter()
+    texto_paginas = list(etl_controller.iter_pdf_pages(pdf, paginas))
+    tempo_extracao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    df = etl_controller.process_contingencias_duplas(texto_paginas)
+    tempos = {"extracao_s": tempo_extracao, "processamento_s": time.perf_counter() - inicio, "paginas": len(texto_paginas)}
+    if "Erro" in df.columns:
+        raise RuntimeError(df["Erro"].iloc[0])
+
+    if cache:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return df, tempos, False
+
+
+def exportar_word(df, docx_path, template=None, pagina=1):
+    """Tabela das contingências num documento novo ou inserida na página `pagina` do template."""
+    if template:
+        doc = Document(template)
+        table = gerar_tabela_docx(doc, df)
+        inserir_tabela_na_pagina(doc, table, pagina, LayoutDocx.carregar(template))
+    else:
+        doc = Document()
+        doc.add_heading('Relatório de Perdas Duplas', level=1)
+        gerar_tabela_docx(doc, df)
+    doc.save(docx_path)
+
+
+def processar_grupo(relatorios, formatos, saida, chave, usar_cache=True):
+    """
+    Extrai uma vez e exporta para cada relatório do grupo (mesma chave de extração).
+    Devolve um registro por relatório com arquivos, tempos por etapa e erro.
+    """
+    saida = Path(saida)
+    registros = [{"nome": r["nome"], "pdf": r["pdf"], "paginas": r["paginas"], "erro": None,
+                  "arquivos": {}, "tempos": {}} for r in relatorios]
+    try:
+        df, tempos, do_cache = extrair(relatorios[0]["pdf"], relatorios[0]["paginas"], relatorios[0]["opcoes"],
+                                       saida / ".cache" if usar_cache else None, chave)
+    except Exception as e:
+        for registro in registros:
+            registro["erro"] = f"extração: {type(e).__name__}: {e}"
+        return registros
+
+    for i, (relatorio, registro) in enumerate(zip(relatorios, registros)):
+        registro["contingencias"] = len(df)
+        registro["extracao_do_cache"] = do_cache
+        registro["extracao_compartilhada"] = i > 0
+        registro["tempos"].update(tempos if i == 0 else {})
+        etapa = None
+        try:
+            if "excel" in formatos:
+                etapa = "excel"
+                inicio = time.perf_counter()
+                caminho = saida / f"{relatorio['nome']}.xlsx"
+                df.to_excel(caminho, index=False)
+                registro["arquivos"]["excel"] = str(caminho)
+                registro["tempos"]["excel_s"] = time.perf_counter() - inicio
+            if "word" in formatos or "pdf" in formatos:
+                etapa = "word"
+                inicio = time.perf_counter()
+                caminho = saida / f"{relatorio['nome']}.docx"
+                exportar_word(df, caminho, relatorio["template_word"], relatorio["pagina_word"])
+                registro["arquivos"]["word"] = str(caminho)
+                registro["tempos"]["word_s"] = time.perf_counter() - inicio
+        except Exception as e:
+            registro["erro"] = f"{etapa}: {type(e).__name__}: {e}"
+    return registros
+
+
+# -----------------------
+# Orquestração
+# -----------------------
+def executar_lote(manifesto, saida=None, formatos=None, paralelo=None, usar_cache=True, callback=None):
+    """
+    Roda o lote descrito no manifesto e grava o resumo em <saida>/resumo_lote.json.
+
+    Args:
+        manifesto (str): Caminho do manifesto JSON.
+        saida (str, optional): Sobrescreve a pasta de saída do manifesto.
+        formatos (list, optional): Sobrescreve os formatos do manifesto.
+        paralelo (int, optional): Processos do pool (padrão: número de CPUs, limitado ao número de extrações).
+        usar_cache (bool): Reaproveita extrações de execuções anteriores.
+        callback (callable, optional): Chamado com cada registro assim que o relatório termina.
+
+    Returns:
+        dict: O resumo gravado (relatórios na ordem do manifesto).
+    """
+    inicio_lote = time.perf_counter()
+    saida, formatos, relatorios = carregar_manifesto(manifesto, saida, formatos)
+    saida.mkdir(parents=True, exist_ok=True)
+
+    # Relatórios com a mesma extração viram um único trabalho
+    grupos, registros = {}, {}
+    for relatorio in relatorios:
+        try:
+            chave = chave_extracao(relatorio)
+        except OSError as e:
+            registros[relatorio["nome"]] = {"nome": relatorio["nome"], "pdf": relatorio["pdf"], "paginas": relatorio["paginas"],
+                                            "erro": f"extração: {e}", "arquivos": {}, "tempos": {}}
+            if callback:
+                callback(registros[relatorio["nome"]])
+            continue
+        grupos.setdefault(chave, []).append(relatorio)
+
+    paralelo = max(1, min(paralelo or os.cpu_count() or 1, len(grupos) or 1))
+    with ProcessPoolExecutor(max_workers=paralelo) as executor:
+        futuros = [executor.submit(processar_grupo, grupo, formatos, str(saida), chave, usar_cache)
+                   for chave, grupo in grupos.items()]
+        for futuro in as_completed(futuros):
+            for registro in futuro.result():
+                registros[registro["nome"]] = registro
+                if callback and "pdf" not in formatos:
+                    callback(registro)
+
+    # PDF: os Word de todos os relatórios entram juntos na fila do conversor
+    if "pdf" in formatos:
+        pendentes = [registros[r["nome"]] for r in relatorios
+                     if not registros[r["nome"]]["erro"] and "word" in registros[r["nome"]]["arquivos"]]
+        if pendentes:
+            with conversor_pdf.ConversorPDF(max_paralelo=min(paralelo, len(pendentes))) as conversor:
+                conversoes = conversor.converter_lote([r["arquivos"]["word"] for r in pendentes])
+            for registro, conversao in zip(pendentes, conversoes):
+                registro["tempos"]["pdf_s"] = conversao["conversao_s"]
+                registro["tempos"]["pdf_fila_s"] = conversao["espera_s"]
+                if conversao["erro"]:
+                    registro["erro"] = f"pdf: {conversao['erro']}"
+                else:
+                    registro["arquivos"]["pdf"] = conversao["pdf"]
+                if "word" not in formatos:
+                    os.remove(registro["arquivos"].pop("word"))
+        if callback:
+            for r in relatorios:
+                callback(registros[r["nome"]])
+
+    ordenados = [registros[r["nome"]] for r in relatorios]
+    totais = {}
+    for registro in ordenados:
+        for etapa, valor in registro["tempos"].items():
+            if etapa.endswith("_s"):
+                totais[etapa] = totais.get(etapa, 0.0) + valor
+    resumo = {
+        "manifesto": str(Path(manifesto).resolve()),
+        "saida": str(saida),
+        "formatos": formatos,
+        "paralelo": paralelo,
+        "extracoes": len(grupos),
+        "relatorios_ok": sum(1 for r in ordenados if not r["erro"]),
+        "relatorios_com_erro": sum(1 for r in ordenados if r["erro"]),
+        "total_s": time.perf_counter() - inicio_lote,
+        "tempo_somado_por_etapa_s": totais,
+        "relatorios": ordenados,
+    }
+    with open(saida / "resumo_lote.json", "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+    return resumo
+
+
+def imprimir_registro(registro):
+    status = "ERRO" if registro["erro"] else "ok"
+    tempos = " | ".join(f"{etapa[:-2]} {valor:.2f}s" for etapa, valor in registro["tempos"].items() if etapa.endswith("_s"))
+    origem = " (extração em cache)" if registro.get("extracao_do_cache") else ""
+    origem = " (extração compartilhada)" if registro.get("extracao_compartilhada") else origem
+    print(f"  [{status}] {registro['nome']}: {registro.get('contingencias', 0)} contingências | {tempos}{origem}")
+    if registro["erro"]:
+        print(f"      {registro['erro']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os relatórios de Perdas Duplas de um manifesto, sem interface")
+    parser.add_argument("manifesto", help="arquivo JSON com os PDFs e intervalos de páginas")
+    parser.add_argument("--saida", help="pasta de saída (padrão: 'saida' do manifesto)")
+    parser.add_argument("--formatos", help="lista separada por vírgulas: excel,word,pdf")
+    parser.add_argument("--paralelo", type=int, help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora extrações de execuções anteriores")
+    args = parser.parse_args()
+
+    print("🏭 Lote de relatórios de Perdas Duplas")
+    try:
+        resumo = executar_lote(args.manifesto, args.saida, args.formatos.split(",") if args.formatos else None,
+                               args.paralelo, not args.sem_cache, callback=imprimir_registro)
+    except (OSError, ValueError) as e:
+        print(f"❌ Manifesto inválido: {e}")
+        return 2
+    print(f"\n{resumo['relatorios_ok']} ok, {resumo['relatorios_com_erro']} com erro em {resumo['total_s']:.2f}s "
+          f"({resumo['extracoes']} extrações, {resumo['paralelo']} processos)")
+    print(f"Resumo: {Path(resumo['saida']) / 'resumo_lote.json'}")
+    return 1 if resumo["relatorios_com_erro"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
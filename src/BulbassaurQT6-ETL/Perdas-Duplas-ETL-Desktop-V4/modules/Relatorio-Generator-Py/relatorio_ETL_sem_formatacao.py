@@ -6,6 +6,11 @@ from docx.shared import RGBColor
 from docx2pdf import convert
 from docx.oxml.ns import qn
 
+# Índice de layout do DOCX (app/controllers/layout_docx.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from app.controllers.layout_docx import LayoutDocx
+from app.controllers.relatorio_docx import inserir_tabela_na_pagina
+
 # --- IMPORTS PYSIDE6 ---
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
                                QPushButton, QTextEdit, QFileDialog, QMessageBox, 
@@ -18,68 +23,11 @@ from PySide6.QtCore import Qt, QThread, Signal, QObject
 
 def contar_paginas_quebras(doc_path):
     """
-    Conta páginas baseando-se em Quebras de Página (Hard Breaks) explícitas.
-    Retorna (num_paginas, lista_de_indices_paragrafos)
+    Conta páginas baseando-se em Quebras de Página (Hard Breaks) explícitas
+    e nas quebras gravadas pelo Word (lastRenderedPageBreak).
+    Usa o índice de layout do template (lido em fluxo e mantido em cache ao lado do arquivo).
     """
-    doc = Document(doc_path)
-    paginas = 1 # Começa na página 1
-    
-    # Percorre todos os parágrafos procurando quebras
-    for i, p in enumerate(doc.paragraphs):
-        # Verifica quebras manuais (Ctrl+Enter)
-        if 'lastRenderedPageBreak' in p._element.xml or '<w:br w:type="page"/>' in p._element.xml:
-            paginas += 1
-        
-        # Verifica também nas Runs (às vezes a quebra fica dentro de um Run)
-        for run in p.runs:
-            if 'w:br' in run._element.xml and 'type="page"' in run._element.xml:
-                paginas += 1
-                break # Conta apenas uma quebra por parágrafo para não duplicar
-                
-    return paginas
-
-def inserir_tabela_na_pagina(doc, table, pagina_alvo):
-    """
-    Tenta inserir a tabela na página alvo procurando por quebras de página.
-    """
-    if pagina_alvo <= 1:
-        # Insere no início do documento
-        doc.paragraphs[0].insert_paragraph_before("")._p.addnext(table._tbl)
-        print("   📍 Inserido no INÍCIO do documento.")
-        return
-
-    paginas_contadas = 1
-    inserido = False
-
-    # Itera sobre o corpo do documento (parágrafos e tabelas)
-    # Nota: Iterar sobre doc.paragraphs pula tabelas existentes, mas serve para achar as quebras
-    for i, p in enumerate(doc.paragraphs):
-        # Detecta quebra de página
-        tem_quebra = False
-        if '<w:br w:type="page"/>' in p._element.xml:
-            tem_quebra = True
-        else:
-            for run in p.runs:
-                if 'w:br' in run._element.xml and 'type="page"' in run._element.xml:
-                    tem_quebra = True
-                    break
-        
-        if tem_quebra:
-            paginas_contadas += 1
-            # Se acabamos de passar para a página desejada
-            if paginas_contadas == pagina_alvo:
-                # Insere logo após este parágrafo que contem a quebra
-                p.insert_paragraph_before("") # Cria um espaço
-                p.insert_paragraph_before("")._p.addnext(table._tbl)
-                inserido = True
-                print(f"   📍 Inserido logo após a quebra da página {paginas_contadas - 1}.")
-                break
-    
-    if not inserido:
-        print("   ⚠️ Página alvo não encontrada (documento menor que o esperado). Adicionando ao final.")
-        doc.add_page_break()
-        doc.add_paragraph("Tabela inserida aqui (Fim do Arquivo).")
-        doc.element.body.append(table._tbl)
+    return LayoutDocx.carregar(doc_path).n_paginas('todas')
 
 # ============================================================================
 # 2. THREADS (WORKERS)
@@ -164,7 +112,7 @@ class GeracaoWorker(QThread):
             # 4. Inserir na Página Escolhida
             target = self.cfg['target_page']
             self.log.emit(f"📍 Tentando inserir na página {target}...")
-            inserir_tabela_na_pagina(doc, table, target)
+            inserir_tabela_na_pagina(doc, table, target, LayoutDocx.carregar(self.cfg['template']))
 
             # 5. Salvar
             doc.save(self.cfg['out_word'])
@@ -1,11 +1,10 @@
 import sys
 import os
-import time
 import pandas as pd
 from docx import Document
 from docx.enum.section import WD_SECTION
 from docx.shared import Inches, RGBColor
-from docx2pdf import convert
+from conversor_pdf import converter_docx_para_pdf
 from tqdm import tqdm
 
 # --- IMPORTS DO PYSIDE6 ---
@@ -122,12 +121,10 @@ def processar_relatorio(template_path, excel_path, output_docx, output_pdf, apen
     doc.save(output_docx)
     print(f"💾 [SAVE] Word salvo: {os.path.basename(output_docx)}")
 
-    # 4. Conversão PDF
-    print(f"🔄 [PDF] Iniciando conversão (Aguarde o Word)...")
-    start_time = time.time()
-    convert(output_docx, output_pdf)
-    end_time = time.time()
-    print(f"✅ [DONE] Conversão concluída em {end_time - start_time:.2f}s")
+    # 4. Conversão PDF (LibreOffice mantido aberto entre relatórios; docx2pdf se não houver LibreOffice)
+    print(f"🔄 [PDF] Iniciando conversão...")
+    registro = converter_docx_para_pdf(output_docx, output_pdf)
+    print(f"✅ [DONE] Conversão concluída em {registro['conversao_s']:.2f}s ({registro['modo']})")
     print(f"📄 [FILE] Arquivo PDF: {os.path.basename(output_pdf)}")
 
 # ============================================================================
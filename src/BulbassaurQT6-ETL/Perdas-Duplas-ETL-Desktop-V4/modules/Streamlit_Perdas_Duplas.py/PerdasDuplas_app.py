@@ -59,6 +59,10 @@ def carregar_dados(file_path):
 # Inicializar session state
 if 'analisador' not in st.session_state:
     st.session_state.analisador = None
+if 'analisador_base' not in st.session_state:
+    st.session_state.analisador_base = None
+if 'arquivo_carregado' not in st.session_state:
+    st.session_state.arquivo_carregado = None
 if 'filtros_aplicados' not in st.session_state:
     st.session_state.filtros_aplicados = False
 
@@ -69,22 +73,29 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Escolha um arquivo Excel", type=['xlsx', 'xls'])
     
     if uploaded_file is not None:
-        try:
-            df = pd.read_excel(uploaded_file)
-            st.session_state.analisador = AnalisadorContingenciasPlotly(df)
-            st.session_state.filtros_aplicados = False
-            st.success(f"✅ Dados carregados: {len(df)} registros")
-        except Exception as e:
-            st.error(f"❌ Erro ao carregar arquivo: {e}")
+        # Só relê a planilha quando o arquivo muda; nos demais reruns o analisador
+        # (e os agregados/figuras em cache dele) é reaproveitado
+        arquivo = (uploaded_file.name, uploaded_file.size)
+        if st.session_state.arquivo_carregado != arquivo:
+            try:
+                df = pd.read_excel(uploaded_file)
+                st.session_state.analisador_base = AnalisadorContingenciasPlotly(df)
+                st.session_state.analisador = st.session_state.analisador_base
+                st.session_state.arquivo_carregado = arquivo
+                st.session_state.filtros_aplicados = False
+            except Exception as e:
+                st.error(f"❌ Erro ao carregar arquivo: {e}")
+        if st.session_state.analisador_base is not None:
+            st.success(f"✅ Dados carregados: {len(st.session_state.analisador_base.df)} registros")
     
     st.markdown("---")
     
     # Filtros
-    if st.session_state.analisador is not None:
+    if st.session_state.analisador_base is not None:
         st.header("🔧 Filtros")
         
         try:
-            opcoes_filtro = st.session_state.analisador.get_opcoes_filtro()
+            opcoes_filtro = st.session_state.analisador_base.get_opcoes_filtro()
             
             # Filtro de Volume
             volumes_selecionados = st.multiselect(
@@ -127,24 +138,14 @@ with st.sidebar:
             with col_btn1:
                 if st.button("✅ Aplicar Filtros", type="primary", use_container_width=True):
                     try:
-                        df_filtrado = st.session_state.analisador.df.copy()
-                        
-                        # Aplicar filtros
-                        if volumes_selecionados:
-                            df_filtrado = df_filtrado[df_filtrado['Volume'].isin(volumes_selecionados)]
-                        if areas_selecionadas:
-                            df_filtrado = df_filtrado[df_filtrado['Área Geoelétrica'].isin(areas_selecionadas)]
-                        if horizontes_selecionados:
-                            df_filtrado = df_filtrado[df_filtrado['Horizonte'].isin(horizontes_selecionados)]
-                        
-                        # Filtrar por tensão
-                        df_filtrado['Tensão_kV'] = pd.to_numeric(df_filtrado['Tensão_kV'], errors='coerce')
-                        df_filtrado = df_filtrado[
-                            (df_filtrado['Tensão_kV'] >= tensao_min) & 
-                            (df_filtrado['Tensão_kV'] <= tensao_max)
-                        ]
-                        
-                        st.session_state.analisador = AnalisadorContingenciasPlotly(df_filtrado)
+                        # Mesma combinação de filtros reaproveita o analisador já calculado
+                        st.session_state.analisador = st.session_state.analisador_base.filtrar(
+                            volumes=volumes_selecionados,
+                            areas=areas_selecionadas,
+                            horizontes=horizontes_selecionados,
+                            tensao_min=tensao_min,
+                            tensao_max=tensao_max
+                        )
                         st.session_state.filtros_aplicados = True
                         st.rerun()
                     except Exception as e:
@@ -152,11 +153,9 @@ with st.sidebar:
             
             with col_btn2:
                 if st.button("🔄 Resetar", use_container_width=True):
-                    if uploaded_file is not None:
-                        df = pd.read_excel(uploaded_file)
-                        st.session_state.analisador = AnalisadorContingenciasPlotly(df)
-                        st.session_state.filtros_aplicados = False
-                        st.rerun()
+                    st.session_state.analisador = st.session_state.analisador_base
+                    st.session_state.filtros_aplicados = False
+                    st.rerun()
                         
         except Exception as e:
             st.warning(f"⚠️ Erro ao carregar filtros: {e}")
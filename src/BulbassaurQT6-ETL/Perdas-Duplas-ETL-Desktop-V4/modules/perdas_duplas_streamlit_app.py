@@ -1,10 +1,15 @@
 # streamlit_app.py
+import io
+import sys
+import hashlib
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from Relatorio-Generator-Py.controllers.AnaliseContigenciasPyplot import AnalisadorContingenciasPlotly
 
-from 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "Relatorio-Generator-Py" / "controllers"))
+from cubo_contingencias import CuboContingencias
 
 # Configuração da página
 st.set_page_config(
@@ -50,20 +55,33 @@ st.markdown("**Sistema de análise de contingências em linhas de transmissão**
 # Função para carregar dados
 @st.cache_data
 def carregar_dados(file_path):
-    """Carrega dados do arquivo Excel."""
+    """Carrega dados do arquivo Excel (caminho ou conteúdo em bytes)."""
     try:
-        df = pd.read_excel(file_path)
+        df = pd.read_excel(io.BytesIO(file_path) if isinstance(file_path, bytes) else file_path)
         return df
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return None
 
+@st.cache_resource(max_entries=4)
+def obter_cubo(hash_dados, _conteudo):
+    """
+    Cubo pré-agregado do arquivo, montado uma vez por hash do conteúdo e
+    compartilhado entre reruns e sessões (os filtros só fatiam o cubo).
+    """
+    df = carregar_dados(_conteudo)
+    return CuboContingencias.do_dataframe(df) if df is not None else None
+
 # Inicializar session state
-if 'analisador' not in st.session_state:
-    st.session_state.analisador = None
+if 'hash_dados' not in st.session_state:
+    st.session_state.hash_dados = None
+if 'filtros' not in st.session_state:
+    st.session_state.filtros = {}
 if 'filtros_aplicados' not in st.session_state:
     st.session_state.filtros_aplicados = False
 
+cubo = None
+
 # Sidebar
 with st.sidebar:
     st.header("📁 Carregar Dados")
@@ -72,21 +90,27 @@ with st.sidebar:
     
     if uploaded_file is not None:
         try:
-            df = pd.read_excel(uploaded_file)
-            st.session_state.analisador = AnalisadorContingenciasPlotly(df)
-            st.session_state.filtros_aplicados = False
-            st.success(f"✅ Dados carregados: {len(df)} registros")
+            conteudo = uploaded_file.getvalue()
+            hash_dados = hashlib.sha1(conteudo).hexdigest()
+            cubo = obter_cubo(hash_dados, conteudo)
+            if st.session_state.hash_dados != hash_dados:
+                # Arquivo novo: os filtros do anterior não valem mais
+                st.session_state.hash_dados = hash_dados
+                st.session_state.filtros = {}
+                st.session_state.filtros_aplicados = False
+            if cubo is not None:
+                st.success(f"✅ Dados carregados: {cubo.get_metricas_principais().get('total_registros', 0)} registros")
         except Exception as e:
             st.error(f"❌ Erro ao carregar arquivo: {e}")
     
     st.markdown("---")
     
     # Filtros
-    if st.session_state.analisador is not None:
+    if cubo is not None:
         st.header("🔧 Filtros")
         
         try:
-            opcoes_filtro = st.session_state.analisador.get_opcoes_filtro()
+            opcoes_filtro = cubo.get_opcoes_filtro()
             
             # Filtro de Volume
             volumes_selecionados = st.multiselect(
@@ -129,24 +153,14 @@ with st.sidebar:
             with col_btn1:
                 if st.button("✅ Aplicar Filtros", type="primary", use_container_width=True):
                     try:
-                        df_filtrado = st.session_state.analisador.df.copy()
-                        
-                        # Aplicar filtros
-                        if volumes_selecionados:
-                            df_filtrado = df_filtrado[df_filtrado['Volume'].isin(volumes_selecionados)]
-                        if areas_selecionadas:
-                            df_filtrado = df_filtrado[df_filtrado['Área Geoelétrica'].isin(areas_selecionadas)]
-                        if horizontes_selecionados:
-                            df_filtrado = df_filtrado[df_filtrado['Horizonte'].isin(horizontes_selecionados)]
-                        
-                        # Filtrar por tensão
-                        df_filtrado['Tensão_kV'] = pd.to_numeric(df_filtrado['Tensão_kV'], errors='coerce')
-                        df_filtrado = df_filtrado[
-                            (df_filtrado['Tensão_kV'] >= tensao_min) & 
-                            (df_filtrado['Tensão_kV'] <= tensao_max)
-                        ]
-                        
-                        st.session_state.analisador = AnalisadorContingenciasPlotly(df_filtrado)
+                        # Só os critérios ficam na sessão; a fatia do cubo sai do cache dele
+                        st.session_state.filtros = dict(
+                            volumes=volumes_selecionados,
+                            areas=areas_selecionadas,
+                            horizontes=horizontes_selecionados,
+                            tensao_min=tensao_min,
+                            tensao_max=tensao_max
+                        )
                         st.session_state.filtros_aplicados = True
                         st.rerun()
                     except Exception as e:
@@ -154,17 +168,15 @@ with st.sidebar:
             
             with col_btn2:
                 if st.button("🔄 Resetar", use_container_width=True):
-                    if uploaded_file is not None:
-                        df = pd.read_excel(uploaded_file)
-                        st.session_state.analisador = AnalisadorContingenciasPlotly(df)
-                        st.session_state.filtros_aplicados = False
-                        st.rerun()
+                    st.session_state.filtros = {}
+                    st.session_state.filtros_aplicados = False
+                    st.rerun()
                         
         except Exception as e:
             st.warning(f"⚠️ Erro ao carregar filtros: {e}")
 
 # Conteúdo principal
-if st.session_state.analisador is None:
+if cubo is None:
     # Tela inicial
     st.info("👈 **Carregue um arquivo Excel na barra lateral para começar**")
     
@@ -182,7 +194,8 @@ if st.session_state.analisador is None:
 
 else:
     # Dashboard com dados carregados
-    analisador = st.session_state.analisador
+    # Fatia do cubo com a mesma interface do AnalisadorContingenciasPlotly
+    analisador = cubo.fatia(**st.session_state.filtros)
     
     # Seção 1: Métricas
     st.header("📈 Métricas Principais")
@@ -31,9 +31,9 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
-from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+from planilhas_sisbar import abrir_planilha, salvar_planilha_stream
 
 # GUI
 try:
@@ -69,6 +69,9 @@ DEFAULT_ABAS = [
 
 AREAS_SECO_DEFAULT = [10, 11, 12, 20, 21, 22, 30, 31, 32]
 
+CABECALHO_MENSAL = ["No.", "Nome", "Agente", "Área", "Questionamento SISBAR", "Parecer da Área"]
+LARGURAS_MENSAL = [12, 40, 28, 8, 50, 50]
+
 
 # ================================ DATACLASSES =============================== #
 
@@ -215,152 +218,33 @@ class ProcessadorSISBAR:
         self.progress(10)
         
         try:
-            # Primeiro, tenta ler com openpyxl diretamente para ver o que tem
-            wb = load_workbook(caminho, data_only=False)  # data_only=False para pegar fórmulas também
-            ws = wb.active
-            self.log(f"  Aba ativa: {ws.title}")
-            self.log(f"  Dimensões da planilha: {ws.max_row} linhas x {ws.max_column} colunas")
+            # Uma única leitura do arquivo: valores gravados e fórmulas de cada célula numa passada
+            aba = abrir_planilha(caminho).ler_aba()
+            self.log(f"  Aba ativa: {aba.titulo}")
+            self.log(f"  Dimensões da planilha: {aba.max_linha} linhas x {aba.max_coluna} colunas")
             
-            # Lê valores brutos das primeiras linhas para debug
-            if ws.max_row > 0:
-                primeira_linha_valores = []
-                for col in range(1, min(ws.max_column + 1, 7)):
-                    cell = ws.cell(row=1, column=col)
-                    primeira_linha_valores.append(f"{cell.coordinate}={cell.value}")
+            # Valores brutos das primeiras linhas para debug (fórmulas aparecem como fórmula)
+            if aba.max_linha > 0:
+                primeira_linha_valores = self._resumo_linha(aba, 1)
                 self.log(f"  Primeira linha (cabeçalho): {primeira_linha_valores}")
                 
-                if ws.max_row > 1:
-                    segunda_linha_valores = []
-                    for col in range(1, min(ws.max_column + 1, 7)):
-                        cell = ws.cell(row=2, column=col)
-                        segunda_linha_valores.append(f"{cell.coordinate}={cell.value}")
+                if aba.max_linha > 1:
+                    segunda_linha_valores = self._resumo_linha(aba, 2)
                     self.log(f"  Segunda linha (dados?): {segunda_linha_valores}")
             
-            wb.close()
-            
-            # Agora tenta ler com pandas - primeiro com data_only=True (valores calculados)
+            # Valores calculados com a linha 1 como cabeçalho (mesmas regras do pd.read_excel)
             try:
-                df_raw = pd.read_excel(caminho, sheet_name=0, engine='openpyxl')
+                df_raw = aba.dataframe()
                 self.log(f"  Colunas encontradas (pandas): {list(df_raw.columns)}")
                 self.log(f"  Total de linhas brutas (pandas): {len(df_raw)}")
             except Exception as e:
                 self.log(f"  ⚠ Erro ao ler com pandas (data_only=True): {e}")
                 df_raw = pd.DataFrame()
             
-            # Se não encontrou dados, tenta ler diretamente do openpyxl
+            # Se não encontrou dados, usa as fórmulas já lidas na mesma passada
             if len(df_raw) == 0:
-                self.log("  Tentando ler diretamente do openpyxl...")
-                wb = load_workbook(caminho, data_only=False)  # Primeiro tenta sem calcular fórmulas
-                ws = wb.active
-                
-                # Encontra cabeçalho (pode estar na linha 1 ou 2)
-                headers = []
-                header_row = 1
-                
-                # Verifica se linha 1 tem cabeçalhos válidos
-                primeira_linha = []
-                for col in range(1, min(ws.max_column + 1, 10)):
-                    cell = ws.cell(row=1, column=col)
-                    primeira_linha.append(str(cell.value) if cell.value else "")
-                
-                # Se primeira linha parece ter cabeçalhos, usa ela
-                if any("barra" in str(v).lower() or "nome" in str(v).lower() for v in primeira_linha):
-                    header_row = 1
-                else:
-                    # Tenta linha 2
-                    segunda_linha = []
-                    for col in range(1, min(ws.max_column + 1, 10)):
-                        cell = ws.cell(row=2, column=col)
-                        segunda_linha.append(str(cell.value) if cell.value else "")
-                    if any("barra" in str(v).lower() or "nome" in str(v).lower() for v in segunda_linha):
-                        header_row = 2
-                
-                # Lê cabeçalhos
-                for col in range(1, ws.max_column + 1):
-                    cell = ws.cell(row=header_row, column=col)
-                    if cell.value:
-                        headers.append(str(cell.value).strip())
-                    else:
-                        headers.append(f"Col{col}")
-                
-                self.log(f"  Cabeçalhos encontrados na linha {header_row}: {headers[:6]}")
-                
-                # Lê dados linha por linha (começa após o cabeçalho)
-                dados = []
-                for row_idx in range(header_row + 1, ws.max_row + 1):
-                    linha = []
-                    tem_dados = False
-                    valor_barra = None
-                    
-                    for col_idx in range(1, len(headers) + 1):
-                        cell = ws.cell(row=row_idx, column=col_idx)
-                        valor = cell.value
-                        
-                        # Se é fórmula, pega a fórmula como string
-                        if cell.data_type == 'f':
-                            valor = cell.value  # Mantém a fórmula
-                            if valor:
-                                tem_dados = True
-                        elif valor is not None:
-                            valor_str = str(valor).strip()
-                            if valor_str != "" and valor_str.lower() != "nan":
-                                tem_dados = True
-                                # Se é a primeira coluna (No.), guarda o valor
-                                if col_idx == 1:
-                                    valor_barra = valor_str
-                        
-                        linha.append(valor)
-                    
-                    # Só adiciona se tiver dados E se a primeira coluna não estiver vazia
-                    if tem_dados and valor_barra and valor_barra.lower() not in ["", "nan", "none"]:
-                        dados.append(linha)
-                
-                wb.close()
-                
-                if dados:
-                    self.log(f"  ✓ Linhas de dados encontradas (openpyxl): {len(dados)}")
-                    # Garante que todas as linhas tenham o mesmo número de colunas
-                    max_cols = max(len(linha) for linha in dados) if dados else len(headers)
-                    dados_padronizados = []
-                    for linha in dados:
-                        linha_padronizada = linha + [None] * (max_cols - len(linha))
-                        dados_padronizados.append(linha_padronizada[:len(headers)])
-                    
-                    df_raw = pd.DataFrame(dados_padronizados, columns=headers[:len(dados_padronizados[0])])
-                else:
-                    self.log("  ⚠ Nenhuma linha de dados encontrada após o cabeçalho")
-                    # Tenta ler com data_only=True (valores calculados)
-                    self.log("  Tentando ler com valores calculados (data_only=True)...")
-                    try:
-                        wb2 = load_workbook(caminho, data_only=True)
-                        ws2 = wb2.active
-                        dados_calc = []
-                        for row_idx in range(header_row + 1, ws2.max_row + 1):
-                            linha = []
-                            tem_dados = False
-                            for col_idx in range(1, len(headers) + 1):
-                                cell = ws2.cell(row=row_idx, column=col_idx)
-                                valor = cell.value
-                                if valor is not None and str(valor).strip() != "":
-                                    tem_dados = True
-                                linha.append(valor)
-                            if tem_dados:
-                                dados_calc.append(linha)
-                        wb2.close()
-                        
-                        if dados_calc:
-                            self.log(f"  ✓ Linhas encontradas com valores calculados: {len(dados_calc)}")
-                            max_cols = max(len(linha) for linha in dados_calc) if dados_calc else len(headers)
-                            dados_padronizados = []
-                            for linha in dados_calc:
-                                linha_padronizada = linha + [None] * (max_cols - len(linha))
-                                dados_padronizados.append(linha_padronizada[:len(headers)])
-                            df_raw = pd.DataFrame(dados_padronizados, columns=headers[:len(dados_padronizados[0])])
-                        else:
-                            df_raw = pd.DataFrame(columns=headers)
-                    except Exception as e2:
-                        self.log(f"  ⚠ Erro ao ler com data_only=True: {e2}")
-                        df_raw = pd.DataFrame(columns=headers)
+                self.log("  Tentando ler as fórmulas da planilha...")
+                df_raw = self._ler_linhas_com_cabecalho(aba)
             
             mapeamento = self._detectar_colunas(df_raw.columns)
             self.log(f"  Mapeamento detectado: {mapeamento}")
@@ -423,6 +307,83 @@ class ProcessadorSISBAR:
             self.log(traceback.format_exc())
             raise
     
+    @staticmethod
+    def _resumo_linha(aba, numero: int) -> List[str]:
+        """Primeiras células da linha no formato 'A1=valor' (para o log)"""
+        valores = aba.linha(numero, com_formulas=True)
+        return [
+            f"{get_column_letter(col)}{numero}={valores[col - 1] if col <= len(valores) else None}"
+            for col in range(1, min(aba.max_coluna + 1, 7))
+        ]
+    
+    def _ler_linhas_com_cabecalho(self, aba) -> pd.DataFrame:
+        """
+        Leitura alternativa quando a linha 1 não rende dados: procura o cabeçalho
+        na linha 1 ou 2 e monta as linhas com as fórmulas como texto; se nenhuma
+        linha tiver Nº de barra, tenta os valores calculados.
+        """
+        # Encontra cabeçalho (pode estar na linha 1 ou 2)
+        header_row = 1
+        for numero in (1, 2):
+            inicio = [str(v) if v else "" for v in aba.linha(numero, com_formulas=True)[:9]]
+            if any("barra" in v.lower() or "nome" in v.lower() for v in inicio):
+                header_row = numero
+                break
+        
+        # Lê cabeçalhos
+        valores_cabecalho = aba.linha(header_row, com_formulas=True)
+        headers = []
+        for col in range(1, aba.max_coluna + 1):
+            valor = valores_cabecalho[col - 1] if col <= len(valores_cabecalho) else None
+            headers.append(str(valor).strip() if valor else f"Col{col}")
+        
+        self.log(f"  Cabeçalhos encontrados na linha {header_row}: {headers[:6]}")
+        
+        # Lê dados linha por linha (começa após o cabeçalho)
+        dados = []
+        for row_idx in range(header_row + 1, aba.max_linha + 1):
+            valores = aba.linha(row_idx, com_formulas=True)
+            linha = []
+            tem_dados = False
+            valor_barra = None
+            
+            for col_idx in range(1, len(headers) + 1):
+                valor = valores[col_idx - 1] if col_idx <= len(valores) else None
+                
+                if (row_idx, col_idx) in aba.formulas:
+                    tem_dados = True  # Mantém a fórmula
+                elif valor is not None:
+                    valor_str = str(valor).strip()
+                    if valor_str != "" and valor_str.lower() != "nan":
+                        tem_dados = True
+                        # Se é a primeira coluna (No.), guarda o valor
+                        if col_idx == 1:
+                            valor_barra = valor_str
+                
+                linha.append(valor)
+            
+            # Só adiciona se tiver dados E se a primeira coluna não estiver vazia
+            if tem_dados and valor_barra and valor_barra.lower() not in ["", "nan", "none"]:
+                dados.append(linha)
+        
+        if dados:
+            self.log(f"  ✓ Linhas de dados encontradas (fórmulas): {len(dados)}")
+            return pd.DataFrame(dados, columns=headers)
+        
+        self.log("  ⚠ Nenhuma linha de dados encontrada após o cabeçalho")
+        self.log("  Tentando com valores calculados...")
+        dados_calc = []
+        for row_idx in range(header_row + 1, aba.max_linha + 1):
+            valores = aba.linha(row_idx)
+            linha = [valores[c] if c < len(valores) else None for c in range(len(headers))]
+            if any(v is not None and str(v).strip() != "" for v in linha):
+                dados_calc.append(linha)
+        
+        if dados_calc:
+            self.log(f"  ✓ Linhas encontradas com valores calculados: {len(dados_calc)}")
+            return pd.DataFrame(dados_calc, columns=headers)
+        return pd.DataFrame(columns=headers)
+    
     def _detectar_colunas(self, colunas: List[str]) -> Dict[str, List[str]]:
         """Detecta colunas do Excel"""
         # Normaliza colunas removendo espaços extras e caracteres especiais
@@ -471,16 +432,16 @@ class ProcessadorSISBAR:
         resultado = {}
         
         try:
-            wb = load_workbook(arquivo, data_only=True)
+            # Só a primeira linha de cada aba é lida; o arquivo fica em cache para o mapeamento de Área
+            planilha = abrir_planilha(arquivo)
             for aba in abas:
-                if aba in wb.sheetnames:
-                    valor = wb[aba]['A1'].value
+                if aba in planilha.abas:
+                    valor = planilha.valor_celula(aba, 'A1')
                     resultado[aba] = str(valor) if valor else ""
                     self.log(f"  • {aba}: '{resultado[aba][:50]}...'")
                 else:
                     resultado[aba] = ""
                     self.log(f"  ⚠ {aba}: não encontrada")
-            wb.close()
             self.progress(40)
         except Exception as e:
             self.log(f"❌ Erro ao ler A1: {e}")
@@ -491,7 +452,7 @@ class ProcessadorSISBAR:
     def carregar_mapeamento_area(self, arquivo: str, aba: str) -> Optional[pd.DataFrame]:
         """Carrega mapeamento No. -> Área"""
         try:
-            df = pd.read_excel(arquivo, sheet_name=aba, engine='openpyxl')
+            df = abrir_planilha(arquivo).ler_aba(aba).dataframe()
             
             col_barra = None
             col_area = None
@@ -574,20 +535,13 @@ class ProcessadorSISBAR:
             df = self._aplicar_filtro_seco(df, config, areas_seco)
             self.progress(60)
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Mensal"
-        
-        self._aplicar_cabecalho(ws)
-        self._escrever_dados_base(ws, df)
         self.progress(70)
         
-        self._aplicar_formulas(ws, config, len(df))
-        self._ajustar_larguras(ws)
-        self.progress(80)
-        
-        os.makedirs(os.path.dirname(caminho_saida) or ".", exist_ok=True)
-        wb.save(caminho_saida)
+        # Linhas com dados e fórmulas vão direto para o arquivo (modo streaming)
+        self.log("📝 Aplicando fórmulas...")
+        salvar_planilha_stream(caminho_saida, "Mensal", CABECALHO_MENSAL,
+                               self._linhas_mensal(df, config), LARGURAS_MENSAL)
+        self.log(f"✓ Fórmulas aplicadas em {len(df)} linhas")
         self.progress(90)
         
         self.log("=" * 60)
@@ -614,36 +568,8 @@ class ProcessadorSISBAR:
         self.log(f"✓ Filtro SECO: {len(df)} -> {len(df_filtrado)} linhas")
         return df_filtrado
     
-    def _aplicar_cabecalho(self, ws):
-        """Aplica formatação ao cabeçalho"""
-        headers = ["No.", "Nome", "Agente", "Área", "Questionamento SISBAR", "Parecer da Área"]
-        fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        font = Font(color="FFFFFF", bold=True, size=11)
-        alignment = Alignment(horizontal="center", vertical="center")
-        
-        for idx, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=idx)
-            cell.value = header
-            cell.fill = fill
-            cell.font = font
-            cell.alignment = alignment
-    
-    def _escrever_dados_base(self, ws, df: pd.DataFrame):
-        """Escreve os dados base (No., Nome, Agente)"""
-        for _, row in df.iterrows():
-            ws.append([
-                row.get('No.', ""),
-                row.get('Nome', ""),
-                row.get('Agente', ""),
-                "",  # Área será preenchida por fórmula
-                "",  # Questionamento SISBAR será preenchido por fórmula
-                ""   # Parecer da Área será preenchido por fórmula
-            ])
-    
-    def _aplicar_formulas(self, ws, config: ConfigFormulas, n_linhas: int):
-        """Aplica as fórmulas Excel nas colunas apropriadas"""
-        self.log("📝 Aplicando fórmulas...")
-        
+    def _linhas_mensal(self, df: pd.DataFrame, config: ConfigFormulas):
+        """Gera as linhas do mensal: dados base (No., Nome, Agente) e as fórmulas das colunas D:F"""
         # Cria referências externas para as fórmulas
         ref_parecer = Utils.excel_quote_external_ref(config.parecer_file, config.parecer_sheet_nome)
         ref_mapping = Utils.excel_quote_external_ref(config.parecer_file, config.mapping_sheet)
@@ -651,8 +577,8 @@ class ProcessadorSISBAR:
         sep = config.sep
         fallback_escaped = config.fallback_text.replace('"', '""')
         
-        # Aplica fórmulas linha por linha
-        for row_idx in range(2, n_linhas + 2):  # Começa na linha 2 (linha 1 é cabeçalho)
+        dados = df.reindex(columns=['No.', 'Nome', 'Agente'], fill_value="")
+        for row_idx, (barra, nome, agente) in enumerate(dados.itertuples(index=False, name=None), start=2):
             cell_barra = f"$A${row_idx}"
             cell_nome = f"$B${row_idx}"
             
@@ -661,27 +587,18 @@ class ProcessadorSISBAR:
             formula_area_procv = f"PROCV({cell_barra}{sep}{ref_mapping}${config.mapping_range}{sep}4{sep}FALSO)"
             formula_area_fallback = f"ESQUERDA(DIREITA({cell_nome}{sep}5){sep}2)"
             formula_area = f"=SEERRO({formula_area_procv}{sep}{formula_area_fallback})"
-            ws.cell(row=row_idx, column=4).value = formula_area
             
             # Fórmula 2: Questionamento SISBAR
             # =SEERRO(PROCV([@[No.]];'Parecer da Área Janeiro 2026'!$A$3:$F$70;5;FALSO); "<texto da cell A1 da aba selecionada>")
             formula_quest_procv = f"PROCV({cell_barra}{sep}{ref_parecer}${config.parecer_range}{sep}5{sep}FALSO)"
             formula_quest = f"=SEERRO({formula_quest_procv}{sep}\"{fallback_escaped}\")"
-            ws.cell(row=row_idx, column=5).value = formula_quest
             
             # Fórmula 3: Parecer da Área
             # =SEERRO(PROCV([@[No.]];'Parecer da Área Janeiro 2026'!$A$3:$F$70;6;FALSO); " ")
             formula_parecer_procv = f"PROCV({cell_barra}{sep}{ref_parecer}${config.parecer_range}{sep}6{sep}FALSO)"
             formula_parecer = f"=SEERRO({formula_parecer_procv}{sep}\" \")"
-            ws.cell(row=row_idx, column=6).value = formula_parecer
-        
-        self.log(f"✓ Fórmulas aplicadas em {n_linhas} linhas")
-    
-    def _ajustar_larguras(self, ws):
-        """Ajusta largura das colunas"""
-        larguras = [12, 40, 28, 8, 50, 50]
-        for idx, largura in enumerate(larguras, start=1):
-            ws.column_dimensions[get_column_letter(idx)].width = largura
+            
+            yield [barra, nome, agente, formula_area, formula_quest, formula_parecer]
 
 
 # ================================== GUI ===================================== #
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura e escrita das planilhas do Mensal SISBAR
+
+Antes o mensal anterior era aberto até quatro vezes (openpyxl completo para o
+log, pandas, openpyxl de novo para as fórmulas e mais uma vez com
+data_only=True), o arquivo de parecer era aberto uma vez para os textos de A1 e
+outra pelo pandas a cada preview/geração para o mapeamento de Área, e o novo
+mensal era montado célula a célula num Workbook completo.
+
+Aqui:
+- Cada arquivo é aberto uma única vez (strings compartilhadas, estilos e nomes
+  das abas) e fica em cache enquanto não muda no disco.
+- Cada aba é lida em fluxo, sem montar a árvore inteira, e numa única passada
+  guarda o valor gravado (resultado das fórmulas) e a fórmula de cada célula.
+- O novo mensal é gravado em modo streaming (write_only), linha a linha.
+
+Uso:
+    planilha = abrir_planilha("Mensal - Jan26.xlsx")
+    aba = planilha.ler_aba()              # aba ativa
+    df = aba.dataframe()                  # mesmo resultado de pd.read_excel(..., sheet_name=0)
+    formula = aba.formulas.get((2, 4))    # '=SEERRO(...)' da célula D2
+    planilha.valor_celula("Desativadas", "A1")
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import zipfile
+import posixpath
+import tracemalloc
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formula.translate import Translator
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+
+# ================================ CONSTANTES ================================ #
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TAMANHO_CACHE = 4  # Arquivos abertos mantidos em memória
+
+# Textos que o pd.read_excel lê como NaN (na_values padrão do pandas)
+TEXTOS_NA = frozenset({"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                       "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"})
+
+
+# ================================ DATACLASSES =============================== #
+
+@dataclass
+class AbaLida:
+    """Conteúdo de uma aba lido numa única passada"""
+    titulo: str
+    valores: List[list]  # Linha a linha a partir de A1 (valor gravado; fórmulas trazem o último resultado salvo)
+    formulas: Dict[Tuple[int, int], str] = field(default_factory=dict)  # (linha, coluna) base 1 -> "=..."
+    max_linha: int = 0
+    max_coluna: int = 0
+
+    def linha(self, numero: int, com_formulas: bool = False) -> list:
+        """Valores da linha (base 1); com `com_formulas` as células com fórmula trazem a fórmula"""
+        if numero < 1 or numero > len(self.valores):
+            return []
+        valores = list(self.valores[numero - 1])
+        if com_formulas:
+            for col in range(1, len(valores) + 1):
+                formula = self.formulas.get((numero, col))
+                if formula is not None:
+                    valores[col - 1] = formula
+        return valores
+
+    def dataframe(self) -> pd.DataFrame:
+        """DataFrame com a linha 1 como cabeçalho, com as mesmas regras do pd.read_excel"""
+        dados = []
+        ultima_com_dados = -1
+        for numero, valores in enumerate(self.valores):
+            convertida = ["" if v is None else v for v in valores]
+            while convertida and convertida[-1] == "":
+                convertida.pop()
+            if convertida:
+                ultima_com_dados = numero
+            dados.append(convertida)
+        dados = dados[:ultima_com_dados + 1]
+        if not dados:
+            return pd.DataFrame()
+
+        largura = max(len(d) for d in dados)
+        dados = [d + [""] * (largura - len(d)) for d in dados]
+        df = pd.DataFrame({i: _coluna(d[i] for d in dados[1:]) for i in range(largura)}, columns=range(largura))
+        df.columns = _nomes_colunas(dados[0])
+        return df
+
+
+def _nomes_colunas(cabecalho: list) -> list:
+    """
+    Cabeçalho como o pandas nomeia: vazias viram 'Unnamed: i' e repetidas ganham
+    '.1', '.2'... pulando nomes que já existem no cabeçalho (as sem nome por último)
+    """
+    nomes = [f"Unnamed: {i}" if v == "" else v for i, v in enumerate(cabecalho)]
+    originais = set(nomes)
+    ordem = [i for i, v in enumerate(cabecalho) if v != ""] + [i for i, v in enumerate(cabecalho) if v == ""]
+    contagem: Dict[object, int] = {}
+    for i in ordem:
+        nome = base = nomes[i]
+        vezes = contagem.get(nome, 0)
+        while vezes > 0:
+            contagem[base] = vezes + 1
+            nome = f"{base}.{vezes}"
+            vezes = vezes + 1 if nome in originais else contagem.get(nome, 0)
+        nomes[i] = nome
+        contagem[nome] = vezes + 1
+    return nomes
+
+
+def _coluna(valores: Iterable) -> pd.Series:
+    """Valores de uma coluna com as regras do pd.read_excel: textos NA viram NaN e o tipo é inferido"""
+    serie = pd.Series([float("nan") if isinstance(v, str) and v in TEXTOS_NA else v for v in valores], dtype=object)
+    if serie.empty:
+        return serie
+    try:
+        return pd.to_numeric(serie)
+    except (ValueError, TypeError):
+        return serie.infer_objects()
+
+
+# ============================== LEITURA ===================================== #
+
+def _texto_rico(elemento) -> str:
+    """Texto de um <si>/<is>: <t> simples ou os <t> de cada trecho <r> (ignora a fonética <rPh>)"""
+    partes = []
+    for filho in elemento:
+        if filho.tag == NS_MAIN + "t":
+            partes.append(filho.text or "")
+        elif filho.tag == NS_MAIN + "r":
+            t = filho.find(NS_MAIN + "t")
+            if t is not None:
+                partes.append(t.text or "")
+    return "".join(partes)
+
+
+class PlanilhaXlsx:
+    """
+    Um arquivo .xlsx lido direto do pacote (zip), sem o openpyxl montar o Workbook.
+
+    Na abertura são lidos só os nomes das abas, as strings compartilhadas e os
+    formatos de data; cada aba é lida em fluxo na primeira vez que é pedida e
+    fica guardada. Os valores seguem as mesmas conversões do openpyxl
+    (inteiros, datas pelo formato da célula, booleanos e erros como texto).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._abas: Dict[str, AbaLida] = {}
+        with zipfile.ZipFile(caminho) as z:
+            self._ler_workbook(z)
+            self._strings = self._ler_strings(z)
+            self._estilos_data = self._ler_estilos(z)
+
+    # ------------------------------ Estrutura ------------------------------ #
+
+    def _ler_workbook(self, z: zipfile.ZipFile):
+        rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+        alvos = {}
+        for rel in rels.iter(NS_PKG_REL + "Relationship"):
+            alvo = rel.get("Target")
+            alvo = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join("xl", alvo))
+            alvos[rel.get("Id")] = alvo
+
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
+        self._partes = OrderedDict()  # nome da aba -> caminho do XML no pacote
+        for aba in wb.iter(NS_MAIN + "sheet"):
+            self._partes[aba.get("name")] = alvos.get(aba.get(NS_REL + "id"))
+        self.abas = list(self._partes)
+
+        visao = wb.find(f"{NS_MAIN}bookViews/{NS_MAIN}workbookView")
+        ativa = int(visao.get("activeTab", 0)) if visao is not None else 0
+        self.aba_ativa = self.abas[ativa] if 0 <= ativa < len(self.abas) else self.abas[0]
+
+        propriedades = wb.find(NS_MAIN + "workbookPr")
+        data_1904 = propriedades is not None and propriedades.get("date1904") in ("1", "true")
+        self._epoca = CALENDAR_MAC_1904 if data_1904 else CALENDAR_WINDOWS_1900
+
+    @staticmethod
+    def _ler_strings(z: zipfile.ZipFile) -> List[str]:
+        if "xl/sharedStrings.xml" not in z.namelist():
+            return []
+        strings = []
+        with z.open("xl/sharedStrings.xml") as f:
+            for _, el in ET.iterparse(f):
+                if el.tag == NS_MAIN + "si":
+                    strings.append(_texto_rico(el))
+                    el.clear()
+        return strings
+
+    @staticmethod
+    def _ler_estilos(z: zipfile.ZipFile) -> Dict[int, bool]:
+        """Índice do estilo (atributo s da célula) -> True para datas, False para durações; só estilos de data"""
+        if "xl/styles.xml" not in z.namelist():
+            return {}
+        estilos = ET.fromstring(z.read("xl/styles.xml"))
+        formatos = dict(BUILTIN_FORMATS)
+        for fmt in estilos.iter(NS_MAIN + "numFmt"):
+            formatos[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+
+        datas = {}
+        xfs = estilos.find(NS_MAIN + "cellXfs")
+        for i, xf in enumerate(xfs if xfs is not None else []):
+            codigo = formatos.get(int(xf.get("numFmtId", 0)))
+            if codigo and is_date_format(codigo):
+                datas[i] = not is_timedelta_format(codigo)
+        return datas
+
+    # ------------------------------- Células -------------------------------- #
+
+    def _converter(self, tipo: str, texto: Optional[str], estilo: int, el):
+        """Valor de uma célula com as regras do openpyxl (modo somente leitura)"""
+        if tipo == "inlineStr":
+            inline = el.find(NS_MAIN + "is")
+            return _texto_rico(inline) if inline is not None else None
+        if texto is None:
+            return None
+        if tipo == "s":
+            return self._strings[int(texto)]
+        if tipo == "b":
+            return bool(int(texto))
+        if tipo in ("str", "e"):
+            return texto
+        if tipo == "d":
+            return from_ISO8601(texto)
+
+        valor = float(texto) if any(c in texto for c in ".Ee") else int(texto)
+        if estilo in self._estilos_data:
+            return from_excel(valor, self._epoca, timedelta=not self._estilos_data[estilo])
+        return valor
+
+    def _celulas(self, aba: str) -> Iterator[Tuple[int, int, object, Optional[str], bool]]:
+        """Gera (linha, coluna, valor, fórmula, é erro) de cada célula da aba, em fluxo"""
+        if aba not in self._partes:
+            raise KeyError(f"Aba não encontrada: {aba}")
+        compartilhadas = {}  # si -> (fórmula mestre, coordenada)
+        with zipfile.ZipFile(self.caminho) as z, z.open(self._partes[aba]) as f:
+            linha = coluna = 0
+            for evento, el in ET.iterparse(f, events=("start", "end")):
+                if evento == "start":
+                    if el.tag == NS_MAIN + "row":
+                        linha = int(el.get("r", linha + 1))
+                        coluna = 0
+                    continue
+                if el.tag == NS_MAIN + "c":
+                    ref = el.get("r")
+                    if ref:
+                        letras, linha = coordinate_from_string(ref)
+                        coluna = column_index_from_string(letras)
+                    else:
+                        coluna += 1
+                    tipo = el.get("t", "n")
+                    v = el.find(NS_MAIN + "v")
+                    valor = self._converter(tipo, v.text if v is not None else None, int(el.get("s", 0)), el)
+
+                    formula = None
+                    f_el = el.find(NS_MAIN + "f")
+                    if f_el is not None:
+                        texto = f_el.text
+                        if f_el.get("t") == "shared":
+                            origem = ref or f"{get_column_letter(coluna)}{linha}"
+                            si = f_el.get("si")
+                            if texto:
+                                compartilhadas[si] = ("=" + texto, origem)
+                            elif si in compartilhadas:
+                                mestre, coord = compartilhadas[si]
+                                texto = Translator(mestre, coord).translate_formula(origem)[1:]
+                        if texto:
+                            formula = "=" + texto
+                    yield linha, coluna, valor, formula, tipo == "e"
+                    el.clear()
+                elif el.tag == NS_MAIN + "row":
+                    el.clear()
+
+    def ler_aba(self, aba: Optional[str] = None) -> AbaLida:
+        """Lê a aba (padrão: a ativa) numa única passada; leituras seguintes vêm da memória"""
+        aba = aba or self.aba_ativa
+        if aba in self._abas:
+            return self._abas[aba]
+
+        linhas: Dict[int, Dict[int, object]] = {}
+        formulas = {}
+        max_linha = max_coluna = 0
+        for linha, coluna, valor, formula, erro in self._celulas(aba):
+            max_linha, max_coluna = max(max_linha, linha), max(max_coluna, coluna)
+            if valor is not None or formula is not None:
+                # Erros (#N/A, #REF!...) viram NaN, como no pandas
+                linhas.setdefault(linha, {})[coluna] = float("nan") if erro else valor
+            if formula is not None:
+                formulas[(linha, coluna)] = formula
+
+        valores = []
+        for numero in range(1, max(linhas, default=0) + 1):
+            celulas = linhas.get(numero, {})
+            largura = max(celulas, default=0)
+            valores.append([celulas.get(c) for c in range(1, largura + 1)])
+
+        lida = AbaLida(aba, valores, formulas, max_linha, max_coluna)
+        self._abas[aba] = lida
+        return lida
+
+    def valor_celula(self, aba: str, coordenada: str):
+        """Valor gravado de uma célula; se a aba ainda não foi lida, para de ler ao passar da linha"""
+        letras, linha_alvo = coordinate_from_string(coordenada)
+        coluna_alvo = column_index_from_string(letras)
+        if aba in self._abas:
+            valores = self._abas[aba].linha(linha_alvo)
+            return valores[coluna_alvo - 1] if coluna_alvo <= len(valores) else None
+
+        celulas = self._celulas(aba)
+        try:
+            for linha, coluna, valor, _, _ in celulas:
+                if linha > linha_alvo:
+                    break
+                if linha == linha_alvo and coluna == coluna_alvo:
+                    return valor
+        finally:
+            celulas.close()
+        return None
+
+
+_cache_planilhas: "OrderedDict[Tuple, PlanilhaXlsx]" = OrderedDict()
+
+
+def abrir_planilha(caminho: str) -> PlanilhaXlsx:
+    """Planilha do cache; reaberta só se o arquivo mudou no disco (tamanho/data)"""
+    info = os.stat(caminho)
+    chave = (os.path.abspath(caminho), info.st_size, info.st_mtime_ns)
+    if chave in _cache_planilhas:
+        _cache_planilhas.move_to_end(chave)
+        return _cache_planilhas[chave]
+
+    planilha = PlanilhaXlsx(caminho)
+    _cache_planilhas[chave] = planilha
+    if len(_cache_planilhas) > TAMANHO_CACHE:
+        _cache_planilhas.popitem(last=False)
+    return planilha
+
+
+# ============================== ESCRITA ===================================== #
+
+def salvar_planilha_stream(caminho: str,
+                           titulo: str,
+                           cabecalho: List[str],
+                           linhas: Iterable[list],
+                           larguras: Optional[List[float]] = None,
+                           cor_cabecalho: str = "4472C4") -> int:
+    """
+    Grava uma aba em modo streaming (write_only): cada linha vai para o disco
+    assim que é gerada, sem montar as células em memória. Devolve quantas
+    linhas de dados foram gravadas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+
+    # Larguras precisam ser definidas antes da primeira linha
+    for idx, largura in enumerate(larguras or [], start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = largura
+
+    fill = PatternFill(start_color=cor_cabecalho, end_color=cor_cabecalho, fill_type="solid")
+    font = Font(color="FFFFFF", bold=True, size=11)
+    alignment = Alignment(horizontal="center", vertical="center")
+    celulas_cabecalho = []
+    for texto in cabecalho:
+        cell = WriteOnlyCell(ws, value=texto)
+        cell.fill = fill
+        cell.font = font
+        cell.alignment = alignment
+        celulas_cabecalho.append(cell)
+    ws.append(celulas_cabecalho)
+
+    n = 0
+    for linha in linhas:
+        ws.append(linha)
+        n += 1
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    wb.save(caminho)
+    return n
+
+
+# ============================= BENCHMARK ==================================== #
+
+def _mensal_sintetico(caminho: str, n_barras: int):
+    """Mensal no formato gerado pelo próprio app: dados em A:C e fórmulas (sem resultado salvo) em D:F"""
+    ref = "'C:\\SISBAR\\[Casos.xlsx]Parecer da Área Janeiro 2026'!$A$3:$F$70"
+
+    def linhas():
+        for i in range(2, n_barras + 2):
+            yield [40000 + i, f"BARRA{i:05d}-SP{i % 1000:03d}", f"AGENTE {i % 37}",
+                   f"=SEERRO(PROCV($A${i};'C:\\SISBAR\\[Casos.xlsx]Parecer'!$A$2:$D$70;4;FALSO);ESQUERDA(DIREITA($B${i};5);2))",
+                   f"=SEERRO(PROCV($A${i};{ref};5;FALSO);\"Barramento presente nos casos\")",
+                   f"=SEERRO(PROCV($A${i};{ref};6;FALSO);\" \")"]
+
+    salvar_planilha_stream(caminho, "Mensal", ["No.", "Nome", "Agente", "Área", "Questionamento SISBAR", "Parecer da Área"],
+                           linhas(), [12, 40, 28, 8, 50, 50])
+
+
+def _medir(funcao):
+    """(resultado, tempo em s, pico de memória em MB); o tempo é medido numa execução sem o tracemalloc"""
+    inicio = time.perf_counter()
+    resultado = funcao()
+    tempo = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, tempo, pico / 1024 / 1024
+
+
+def benchmark_io(n_barras: int = 5000, pasta: Optional[str] = None) -> Dict[str, float]:
+    """
+    Compara a leitura do mensal anterior e a escrita do novo mensal:
+    antes (Workbook completo + pandas, escrita célula a célula) x agora (uma
+    passada em fluxo, escrita em streaming). Mede tempo e pico de memória.
+    """
+    import tempfile
+    from openpyxl import load_workbook
+
+    pasta = pasta or tempfile.mkdtemp(prefix="sisbar_")
+    origem = os.path.join(pasta, "Mensal - Jan26.xlsx")
+    _mensal_sintetico(origem, n_barras)
+
+    def ler_antes():
+        wb = load_workbook(origem, data_only=False)  # log do cabeçalho
+        wb.active.cell(row=1, column=1)
+        wb.close()
+        return pd.read_excel(origem, sheet_name=0, engine="openpyxl")
+
+    def ler_agora():
+        _cache_planilhas.clear()
+        return abrir_planilha(origem).ler_aba().dataframe()
+
+    df_antes, t_ler_antes, m_ler_antes = _medir(ler_antes)
+    df_agora, t_ler_agora, m_ler_agora = _medir(ler_agora)
+    assert df_antes.equals(df_agora), "Leitura em fluxo diferente do pandas"
+
+    formulas = ["=1+1", "=2+2", "=3+3"]
+
+    def escrever_antes():
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["No.", "Nome", "Agente", "Área", "Questionamento SISBAR", "Parecer da Área"])
+        for _, row in df_antes.iterrows():
+            ws.append([row.get("No.", ""), row.get("Nome", ""), row.get("Agente", ""), "", "", ""])
+        for r in range(2, len(df_antes) + 2):
+            for c, formula in enumerate(formulas, start=4):
+                ws.cell(row=r, column=c).value = formula
+        wb.save(os.path.join(pasta, "antes.xlsx"))
+
+    def escrever_agora():
+        linhas = ([no, nome, agente, *formulas] for no, nome, agente in
+                  df_agora[["No.", "Nome", "Agente"]].itertuples(index=False, name=None))
+        salvar_planilha_stream(os.path.join(pasta, "agora.xlsx"), "Mensal",
+                               ["No.", "Nome", "Agente", "Área", "Questionamento SISBAR", "Parecer da Área"], linhas)
+
+    _, t_esc_antes, m_esc_antes = _medir(escrever_antes)
+    _, t_esc_agora, m_esc_agora = _medir(escrever_agora)
+
+    print(f"Mensal com {n_barras} barras ({os.path.getsize(origem) / 1024:.0f} KB)")
+    print(f"  Leitura: antes {t_ler_antes:.2f}s / pico {m_ler_antes:.1f} MB | agora {t_ler_agora:.2f}s / pico {m_ler_agora:.1f} MB")
+    print(f"  Escrita: antes {t_esc_antes:.2f}s / pico {m_esc_antes:.1f} MB | agora {t_esc_agora:.2f}s / pico {m_esc_agora:.1f} MB")
+    return {"ler_antes_s": t_ler_antes, "ler_agora_s": t_ler_agora, "ler_antes_mb": m_ler_antes, "ler_agora_mb": m_ler_agora,
+            "escrever_antes_s": t_esc_antes, "escrever_agora_s": t_esc_agora,
+            "escrever_antes_mb": m_esc_antes, "escrever_agora_mb": m_esc_agora}
+
+
+if __name__ == "__main__":
+    benchmark_io(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -14,10 +14,10 @@ def tab_extract_text_ocr(controller: PDFController):
     Renderiza o conteúdo do Tab para extração de texto com OCR.
     """
     st.header("Extrair Texto com Pytesseract (OCR)")
-    page_ocr = st.number_input("Selecione a Página", min_value=1, max_value=100, value=1, step=1, key="ocr_page")
+    pages_ocr = st.text_input("Páginas para OCR (ex: 1-3,5 ou 'all')", value="1", key="ocr_pages")
+    forcar_ocr = st.checkbox("Aplicar OCR mesmo em páginas com texto", value=False, key="ocr_forcar")
     if st.button("Extrair com OCR", key="b_ocr"):
-        text = PDFController.extract_text_ocr("temp_uploaded_file.pdf", page_ocr)
-        st.text_area("Texto Extraído por OCR", text, height=300)
+        PDFController.stream_text_ocr("temp_uploaded_file.pdf", pages_ocr, forcar_ocr=forcar_ocr)
 
 def tab_extract_tables(controller: PDFController, pages: str):
     """
@@ -40,10 +40,9 @@ def read_must_tables_page(controller: PDFController, pages: str):
             controller.process_pdf(pages, extract_text=True, extract_tables=False)
 
         st.subheader("Texto OCR")
-        page_ocr_container = st.number_input("Página para OCR", min_value=1, max_value=100, value=1, step=1, key="container_ocr_page")
+        pages_ocr_container = st.text_input("Páginas para OCR", value="1", key="container_ocr_pages")
         if st.button("Extrair Texto OCR", key="container_ocr"):
-            text = PDFController.extract_text_ocr("temp_uploaded_file.pdf", page_ocr_container)
-            st.text_area("Texto OCR Extraído", text, height=300)
+            PDFController.stream_text_ocr("temp_uploaded_file.pdf", pages_ocr_container)
 
         st.subheader("Tabelas Extraídas")
         use_powerquery_container = st.checkbox("Usar PowerQuery no Container", value=True, key="container_powerquery")
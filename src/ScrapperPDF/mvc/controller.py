@@ -41,3 +41,11 @@ class PDFController:
     def extract_text_ocr(pdf_path: str, page: int) -> str:
         """Método estático para extrair texto via OCR."""
         return PDFModel.extract_text_ocr(pdf_path, page)
+
+    @staticmethod
+    def stream_text_ocr(pdf_path: str, pages: str, forcar_ocr: bool = False):
+        """Executa o OCR em paralelo e exibe cada página na interface conforme fica pronta."""
+        if not os.path.exists(pdf_path):
+            PDFView.display_error("Arquivo PDF não encontrado.")
+            return
+        PDFView.display_ocr_stream(PDFModel.stream_text_ocr(pdf_path, pages, forcar_ocr=forcar_ocr))
@@ -1,15 +1,124 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import time
+import hashlib
 import pandas as pd
 import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
 import pytesseract
 import camelot
 import tabula
 from models.ClassPowerQuery import MiniPowerQuery
 
+
+def _ocr_pagina(pdf_path: str, page_index: int, dpi: int, lang: str, config: str) -> str:
+    """Worker do pool de processos: rasteriza uma página com PyMuPDF e aplica o Tesseract."""
+    import fitz
+    from PIL import Image
+
+    with fitz.open(pdf_path) as doc:
+        pix = doc.load_page(page_index).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        imagem = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(imagem, lang=lang, config=config)
+
+
+class OCREngine:
+    """
+    OCR paralelo de PDFs escaneados.
+
+    - Páginas que já possuem camada de texto não passam pelo Tesseract.
+    - O texto reconhecido fica em cache no disco, por hash do conteúdo da
+      página + configuração do Tesseract (idioma, DPI e parâmetros).
+    - As demais páginas são rasterizadas e reconhecidas num pool de processos,
+      e os resultados são entregues página a página conforme ficam prontos.
+    """
+    def __init__(self, lang: str = 'por', dpi: int = 300, config: str = '', max_workers: int = None,
+                 min_caracteres_texto: int = 20, cache_dir: str = None):
+        self.lang = lang
+        self.dpi = dpi
+        self.config = config
+        self.max_workers = max_workers
+        self.min_caracteres_texto = min_caracteres_texto
+        self.cache_dir = Path(cache_dir or Path(tempfile.gettempdir()) / "palkia_ocr_cache")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def chave_config(self) -> str:
+        return hashlib.sha1(f"{self.lang}|{self.dpi}|{self.config}".encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def hash_pagina(doc, page) -> str:
+        """Hash do conteúdo da página: fluxo de desenho + bytes das imagens (o scan em si)."""
+        h = hashlib.sha256(page.read_contents())
+        for imagem in page.get_images(full=True):
+            h.update(doc.xref_stream_raw(imagem[0]) or b"")
+        return h.hexdigest()
+
+    def _arquivo_cache(self, hash_pagina: str) -> Path:
+        return self.cache_dir / f"{hash_pagina}_{self.chave_config}.txt"
+
+    def _salvar_cache(self, destino: Path, texto: str):
+        tmp = destino.with_suffix(".tmp")
+        tmp.write_text(texto, encoding="utf-8")
+        tmp.replace(destino)
+
+    def processar(self, pdf_path: str, page_indices: list, forcar_ocr: bool = False):
+        """
+        Gera um dict por página conforme cada uma fica pronta (fora de ordem):
+        {"pagina", "texto", "origem", "tempo_s", "concluidas", "total"}.
+
+        `origem` é "camada_texto", "cache", "ocr" ou "erro".
+        """
+        import fitz
+
+        total = len(page_indices)
+        concluidas = 0
+        inicio = time.perf_counter()
+        pendentes = {}
+
+        def resultado(page_index, texto, origem):
+            nonlocal concluidas
+            concluidas += 1
+            return {"pagina": page_index + 1, "texto": texto, "origem": origem,
+                    "tempo_s": time.perf_counter() - inicio, "concluidas": concluidas, "total": total}
+
+        # Triagem barata no processo principal: camada de texto e cache
+        with fitz.open(pdf_path) as doc:
+            for page_index in page_indices:
+                page = doc.load_page(page_index)
+                if not forcar_ocr:
+                    texto = page.get_text()
+                    if len(texto.strip()) >= self.min_caracteres_texto:
+                        yield resultado(page_index, texto, "camada_texto")
+                        continue
+                destino = self._arquivo_cache(self.hash_pagina(doc, page))
+                if destino.exists():
+                    yield resultado(page_index, destino.read_text(encoding="utf-8"), "cache")
+                    continue
+                pendentes[page_index] = destino
+
+        if not pendentes:
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futuros = {
+                executor.submit(_ocr_pagina, pdf_path, page_index, self.dpi, self.lang, self.config): page_index
+                for page_index in pendentes
+            }
+            for futuro in as_completed(futuros):
+                page_index = futuros[futuro]
+                try:
+                    texto = futuro.result()
+                except Exception as e:
+                    yield resultado(page_index, f"Erro no OCR: {e}", "erro")
+                    continue
+                self._salvar_cache(pendentes[page_index], texto)
+                yield resultado(page_index, texto, "ocr")
+
+
 class PDFModel:
     """
     Classe responsável por gerenciar a lógica de extração de dados de PDFs.
@@ -48,16 +157,38 @@ class PDFModel:
         Returns:
             str: Texto extraído da página.
         """
-        images = convert_from_path(pdf_path, first_page=page, last_page=page)
-        if images:
-            return pytesseract.image_to_string(images[0], lang='por')
+        for resultado in OCREngine().processar(pdf_path, [page - 1]):
+            return resultado["texto"]
         return ""
 
+    @staticmethod
+    def stream_text_ocr(pdf_path: str, pages: str, forcar_ocr: bool = False, **opcoes_ocr):
+        """
+        Extrai texto via OCR de várias páginas em paralelo, entregando cada página assim que fica pronta.
+
+        Args:
+            pdf_path (str): Caminho do arquivo PDF.
+            pages (str): Páginas a serem extraídas (ex: '1-3,5' ou 'all').
+            forcar_ocr (bool): Se True, aplica OCR mesmo em páginas com camada de texto.
+            **opcoes_ocr: Repassadas ao OCREngine (lang, dpi, config, max_workers).
+
+        Yields:
+            dict: Resultado por página (ver `OCREngine.processar`).
+        """
+        import fitz
+        with fitz.open(pdf_path) as doc:
+            total_pages = doc.page_count
+        page_indices = PDFModel._parse_pages_string(pages, total_pages)
+        yield from OCREngine(**opcoes_ocr).processar(pdf_path, page_indices, forcar_ocr=forcar_ocr)
+
     @staticmethod
     def extract_tables(pdf_path: str, pages: str, use_powerquery: bool = True) -> list:
         """
         Extrai tabelas de um PDF usando Camelot e Tabula.
 
+        O Tabula só é usado se o Camelot falhar ou não encontrar nenhuma tabela;
+        nesse caso todas as páginas vão numa única chamada (uma só sessão da JVM).
+
         Args:
             pdf_path (str): Caminho do arquivo PDF.
             pages (str): Páginas a serem extraídas (ex: '1-3,5' ou 'all').
@@ -67,42 +198,40 @@ class PDFModel:
             list: Lista de DataFrames com as tabelas extraídas.
         """
         try:
-            tables = camelot.read_pdf(pdf_path, pages=pages, flavor='lattice', strip_text='\n')
-            if tables:
-                return [PDFModel._process_table_with_powerquery(table.df) for table in tables] if use_powerquery else [table.df for table in tables]
+            tables = [table.df for table in camelot.read_pdf(pdf_path, pages=pages, flavor='lattice', strip_text='\n')]
         except Exception:
-            pass
+            tables = []
+
+        if not tables:
+            tables = PDFModel._extract_tables_tabula(pdf_path, pages)
+
+        return [PDFModel._process_table_with_powerquery(df) for df in tables] if use_powerquery else tables
 
+    @staticmethod
+    def _extract_tables_tabula(pdf_path: str, page_numbers) -> list:
+        """Fallback do Tabula para um lote de páginas (lista 1-based ou string '1-3,5'/'all') numa única chamada."""
         try:
-            tables = tabula.read_pdf(pdf_path, pages=pages, multiple_tables=True, stream=True, lattice=False, pandas_options={'header': None})
-            if tables:
-                return [PDFModel._process_table_with_powerquery(df) for df in tables] if use_powerquery else tables
+            return tabula.read_pdf(pdf_path, pages=page_numbers, multiple_tables=True, stream=True, lattice=False, pandas_options={'header': None}) or []
         except Exception:
-            pass
-
-        return []
+            return []
 
     @staticmethod
     def _process_table_with_powerquery(df: pd.DataFrame) -> pd.DataFrame:
         """
         Processa um DataFrame usando MiniPowerQuery para limpeza e formatação.
 
+        A tabela é entregue em memória; `blank_to_null` reproduz o efeito que a
+        leitura de CSV tinha sobre as células vazias.
+
         Args:
             df (pd.DataFrame): DataFrame a ser processado.
 
         Returns:
             pd.DataFrame: DataFrame processado.
         """
-        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as tmp:
-            temp_path = tmp.name
-            df.to_csv(temp_path, index=False)
-
-        try:
-            mpq = MiniPowerQuery(temp_path)
-            mpq.trim_spaces().drop_nulls(how='all').drop_duplicates().preview()
-            return mpq.df
-        finally:
-            os.unlink(temp_path)
+        mpq = MiniPowerQuery.from_dataframe(df.rename(columns=str))
+        mpq.trim_spaces().blank_to_null().drop_nulls(how='all').drop_duplicates().preview()
+        return mpq.df
 
     @staticmethod
     def _parse_pages_string(pages: str, total_pages: int) -> list:
@@ -128,3 +257,60 @@ class PDFModel:
                 page_indices.add(int(part) - 1)
 
         return sorted([i for i in page_indices if 0 <= i < total_pages])
+
+
+def benchmark_extract_tables(pdf_path: str, pages: str = 'all'):
+    """
+    Compara a extração de tabelas antes e depois da entrega em memória:
+    - limpeza via CSV temporário x DataFrame direto no MiniPowerQuery;
+    - Tabula chamado página a página x uma chamada com todas as páginas.
+    """
+    page_numbers = [i + 1 for i in PDFModel._parse_pages_string(pages, len(PdfReader(pdf_path).pages))]
+    try:
+        tables = [t.df for t in camelot.read_pdf(pdf_path, pages=','.join(map(str, page_numbers)), flavor='lattice', strip_text='\n')]
+    except Exception:
+        tables = []
+    print(f"{len(tables)} tabelas do Camelot em {len(page_numbers)} páginas")
+
+    inicio = time.perf_counter()
+    bytes_disco = 0
+    for df in tables:
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as tmp:
+            temp_path = tmp.name
+        try:
+            df.to_csv(temp_path, index=False)
+            bytes_disco += os.path.getsize(temp_path)
+            mpq = MiniPowerQuery(df=pd.read_csv(temp_path))
+            mpq.trim_spaces().drop_nulls(how='all').drop_duplicates()
+        finally:
+            os.unlink(temp_path)
+    tempo_csv = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for df in tables:
+        mpq = MiniPowerQuery.from_dataframe(df.rename(columns=str))
+        mpq.trim_spaces().blank_to_null().drop_nulls(how='all').drop_duplicates()
+    tempo_memoria = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for page in page_numbers:
+        PDFModel._extract_tables_tabula(pdf_path, [page])
+    tempo_tabula_paginas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    PDFModel._extract_tables_tabula(pdf_path, page_numbers)
+    tempo_tabula_lote = time.perf_counter() - inicio
+
+    print(f"Limpeza via CSV:      {tempo_csv * 1000:.1f} ms ({bytes_disco / 1024:.1f} KB escritos e lidos)")
+    print(f"Limpeza em memória:   {tempo_memoria * 1000:.1f} ms (0 KB em disco)")
+    print(f"Tabula por página:    {tempo_tabula_paginas:.2f} s ({len(page_numbers)} chamadas)")
+    print(f"Tabula em lote:       {tempo_tabula_lote:.2f} s (1 chamada)")
+    return {
+        "csv_s": tempo_csv, "memoria_s": tempo_memoria, "bytes_disco": bytes_disco,
+        "tabula_paginas_s": tempo_tabula_paginas, "tabula_lote_s": tempo_tabula_lote,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    benchmark_extract_tables(sys.argv[1] if len(sys.argv) > 1 else "temp_uploaded_file.pdf", sys.argv[2] if len(sys.argv) > 2 else 'all')
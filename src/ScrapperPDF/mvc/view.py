@@ -43,6 +43,32 @@ class PDFView:
             st.write(f"**Tabela {i + 1}**")
             st.dataframe(df)
 
+    @staticmethod
+    def display_ocr_stream(resultados):
+        """
+        Exibe os resultados do OCR página a página, com barra de progresso.
+
+        Args:
+            resultados: Iterador de dicts por página (ver `OCREngine.processar`).
+        """
+        origens = {"camada_texto": "camada de texto", "cache": "cache", "ocr": "OCR", "erro": "erro"}
+        progresso = st.progress(0.0, text="Preparando páginas...")
+        paginas = {}
+        for r in resultados:
+            progresso.progress(r["concluidas"] / r["total"],
+                               text=f"{r['concluidas']}/{r['total']} páginas ({r['tempo_s']:.1f}s)")
+            paginas[r["pagina"]] = r
+            with st.expander(f"Página {r['pagina']} — {origens[r['origem']]}", expanded=False):
+                if r["origem"] == "erro":
+                    st.error(r["texto"])
+                else:
+                    st.text_area("Texto", r["texto"], height=200, key=f"ocr_pagina_{r['pagina']}")
+
+        if paginas:
+            texto = "\n\n".join(paginas[p]["texto"] for p in sorted(paginas) if paginas[p]["origem"] != "erro")
+            st.download_button("Baixar texto (.txt)", texto, file_name="texto_ocr.txt", key="ocr_download")
+        progresso.empty()
+
     @staticmethod
     def display_error(message: str):
         """
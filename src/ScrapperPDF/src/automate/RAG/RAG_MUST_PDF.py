@@ -1,5 +1,4 @@
 import os
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -45,6 +44,12 @@ class RAGPipeline:
         self.index_path = Path(index_path)
         
         self.docs = []
+        self.index_manager = None
+
+        # Texto (PyMuPDF) e tabelas (camelot) de vários PDFs extraídos em paralelo
+        from ingestion_engine import IngestionEngine
+        self.ingestao = IngestionEngine(tamanho_fila=4, chunk_size=500, chunk_overlap=50)
+
         self.vectorstore = None
         self.retriever = None
         self.document_chain = None
@@ -57,105 +62,78 @@ class RAGPipeline:
         )
         print("RAGPipeline inicializada com o modelo Gemini.")
 
-    def _processar_documentos_hibrido(self):
+    def _listar_pdfs(self) -> list:
+        """Determina a lista de arquivos a serem processados com base na entrada (arquivo ou pasta)."""
+        if self.source_path.is_dir():
+            print(f"Processando diretório: {self.source_path}")
+            return sorted(self.source_path.glob("*.pdf"))
+        elif self.source_path.is_file() and self.source_path.suffix.lower() == '.pdf':
+            print(f"Processando arquivo único: {self.source_path}")
+            return [self.source_path]
+        print(f"[bold red]ERRO: O caminho '{self.source_path}' não é um PDF ou diretório válido.[/bold red]")
+        return []
+
+    def _processar_documentos_hibrido(self, paths_a_processar: list = None):
         """
         Etapa 1: Carrega texto e TABELAS de um PDF ou de um diretório de PDFs.
+        Se `paths_a_processar` for informado, processa apenas esses arquivos.
         """
         print("\n--- Etapa 1: Processamento Híbrido (Texto e Tabelas) ---")
-        
-        from langchain_community.document_loaders import PyMuPDFLoader
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-        from langchain_core.documents import Document
-        import camelot
 
-        chunks = []
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        if paths_a_processar is None:
+            paths_a_processar = self._listar_pdfs()
 
-        # Determina a lista de arquivos a serem processados com base na entrada (arquivo ou pasta)
-        paths_a_processar = []
-        if self.source_path.is_dir():
-            paths_a_processar = list(self.source_path.glob("*.pdf"))
-            print(f"Processando diretório: {self.source_path}")
-        elif self.source_path.is_file() and self.source_path.suffix.lower() == '.pdf':
-            paths_a_processar = [self.source_path]
-            print(f"Processando arquivo único: {self.source_path}")
-        else:
-            print(f"[bold red]ERRO: O caminho '{self.source_path}' não é um PDF ou diretório válido.[/bold red]")
-            return chunks
-
-        for pdf_path in paths_a_processar:
-            try:
-                # 1. Extração de TEXTO
-                print(f"  - Extraindo texto de: {pdf_path.name}")
-                text_loader = PyMuPDFLoader(str(pdf_path))
-                docs_texto = text_loader.load()
-                chunks.extend(text_splitter.split_documents(docs_texto))
-                
-                # 2. Extração de TABELAS
-                print(f"  - Extraindo tabelas de: {pdf_path.name}")
-                tabelas = camelot.read_pdf(str(pdf_path), pages='all', flavor='lattice')
-                
-                for i, tabela in enumerate(tabelas):
-                    tabela_markdown = tabela.df.to_markdown(index=False)
-                    chunk_tabela = Document(
-                        page_content=f"A seguir uma tabela extraída do documento:\n\n{tabela_markdown}",
-                        metadata={
-                            "source": str(pdf_path),
-                            "page": tabela.page,
-                            "type": "table"
-                        }
-                    )
-                    chunks.append(chunk_tabela)
-                print(f"    - Encontradas {len(tabelas)} tabelas.")
-                
-            except Exception as e:
-                print(f"  - Erro ao processar o arquivo {pdf_path.name}: {e}")
+        chunks = []
+        for _, chunks_documento in self.ingestao.processar(paths_a_processar):
+            chunks.extend(chunks_documento)
+        self.ingestao.imprimir_relatorio()
 
         print(f"\nTotal de chunks (texto + tabelas) criados: {len(chunks)}")
         return chunks
 
-    def _criar_e_salvar_novo_indice(self, chunks: list):
-        """
-        Etapa 2: Cria um novo vector store do zero e o salva localmente.
-        """
-        print("\n--- Etapa 2: Criando e salvando novo índice (isso pode demorar) ---")
-        
-        from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        from langchain_community.vectorstores import FAISS
-        
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001", google_api_key=self.api_key
-        )
-        
-        #! --- CORREÇÃO: Reduz o tamanho do lote para evitar erros de limite de uso (rate limit) ---
-        # Um lote menor faz requisições menores à API, respeitando o limite do plano gratuito.
-        batch_size = 15
-        
-        print(f"  - Processando o primeiro lote de {min(batch_size, len(chunks))} chunks...")
-        self.vectorstore = FAISS.from_documents(chunks[:batch_size], embeddings)
-        
-        for i in range(batch_size, len(chunks), batch_size):
-            print(f"\n  - Aguardando 61 segundos para respeitar o limite da API...")
-            time.sleep(61)
-            
-            batch = chunks[i:i + batch_size]
-            print(f"  - Processando próximo lote de {len(batch)} chunks...")
-            self.vectorstore.add_documents(batch)
-
-        self.vectorstore.save_local(str(self.index_path))
-        print(f"\nÍndice salvo localmente em: '{self.index_path}'")
-
-    def _carregar_indice_local(self):
-        """Carrega um índice FAISS pré-existente do disco."""
-        print("\n--- Carregando índice local pré-existente ---")
+    def _criar_index_manager(self):
+        """Cria o gerenciador incremental do índice FAISS."""
         from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        from langchain_community.vectorstores import FAISS
+        from faiss_index_manager import FAISSIndexManager
+        from embedding_scheduler import EmbeddingScheduler
 
         embeddings = GoogleGenerativeAIEmbeddings(
             model="models/embedding-001", google_api_key=self.api_key
         )
-        self.vectorstore = FAISS.load_local(str(self.index_path), embeddings, allow_dangerous_deserialization=True)
-        print("Índice carregado com sucesso.")
+        #! Lotes pequenos (15 chunks); o token bucket respeita a cota do plano gratuito sem pausas fixas.
+        scheduler = EmbeddingScheduler(
+            embeddings.embed_documents, batch_size=15,
+            requisicoes_por_minuto=100, tokens_por_minuto=30000, max_concorrencia=4
+        )
+        return FAISSIndexManager(self.index_path, embeddings, scheduler=scheduler)
+
+    def _sincronizar_indice(self):
+        """
+        Etapa 2: Carrega o índice existente (se houver) e embeda apenas os PDFs
+        novos ou alterados; vetores de PDFs removidos são apagados do índice.
+        """
+        print("\n--- Etapa 2: Sincronizando índice FAISS incremental ---")
+        self.index_manager = self._criar_index_manager()
+        if self.index_manager.carregar():
+            print(f"  - Índice carregado com {len(self.index_manager.documentos_indexados())} documentos.")
+
+        pdfs = self._listar_pdfs()
+        if not pdfs:
+            return
+
+        # Os PDFs são extraídos em paralelo e entregues ao indexador conforme ficam prontos
+        metricas = self.index_manager.sincronizar(pdfs, self.ingestao)
+        self.vectorstore = self.index_manager.vectorstore
+        if metricas["documentos_novos"] or metricas["documentos_falhos"]:
+            self.ingestao.imprimir_relatorio()
+            self.ingestao.salvar_relatorio(self.index_path.with_name(self.index_path.name + "_ingestao.json"))
+
+        print(f"  - Documentos novos/alterados: {metricas['documentos_novos']}, com falha: {metricas['documentos_falhos']}, "
+              f"removidos: {metricas['documentos_removidos']}, "
+              f"chunks embedados: {metricas['chunks_novos']}")
+        print(f"  - Tempos: hash {metricas['hash_s']:.2f}s | extração {metricas['extracao_s']:.2f}s | "
+              f"embedding {metricas['embedding_s']:.2f}s | salvar {metricas['salvar_s']:.2f}s | total {metricas['total_s']:.2f}s")
+        print(f"Índice sincronizado em: '{self.index_path}'")
 
     def _configurar_retriever_e_cadeia(self):
         """Configura o retriever e a cadeia RAG após o vector store estar pronto."""
@@ -163,10 +141,9 @@ class RAGPipeline:
         from langchain_core.prompts import ChatPromptTemplate
         from langchain.chains.combine_documents import create_stuff_documents_chain
 
-        self.retriever = self.vectorstore.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={"score_threshold": 0.5, "k": 5}
-        )
+        # BM25 + FAISS com reciprocal-rank fusion; Cód ONS e nomes de SE vão pelo caminho exato
+        from hybrid_retriever import HybridRetriever
+        self.retriever = HybridRetriever(self.vectorstore, self.index_manager.bm25, k=5)
 
         prompt_rag = ChatPromptTemplate.from_messages([
             ("system",
@@ -184,14 +161,10 @@ class RAGPipeline:
         """
         Executa a configuração da pipeline: carrega ou cria o índice e monta a cadeia.
         """
-        if self.index_path.exists():
-            self._carregar_indice_local()
-        else:
-            chunks = self._processar_documentos_hibrido()
-            if not chunks:
-                print("\n❌ Nenhum documento processado. A pipeline não pode continuar.")
-                return
-            self._criar_e_salvar_novo_indice(chunks)
+        self._sincronizar_indice()
+        if self.vectorstore is None:
+            print("\n❌ Nenhum documento processado. A pipeline não pode continuar.")
+            return
         
         self._configurar_retriever_e_cadeia()
         print("\n✅ Pipeline de RAG pronta para uso!")
@@ -212,6 +185,14 @@ class RAGPipeline:
         
         return {"resposta": resposta, "fontes": fontes}
 
+    def avaliar_retriever(self, json_perguntas: str, n: int = 30) -> dict:
+        """Mede latência e recall do retriever (vetorial, BM25 e híbrido) num conjunto fixo de perguntas."""
+        from hybrid_retriever import carregar_perguntas_avaliacao, avaliar_retriever
+        if not self.retriever:
+            print("Execute o método setup() antes de avaliar o retriever.")
+            return {}
+        return avaliar_retriever(self.retriever, carregar_perguntas_avaliacao(json_perguntas, n))
+
     def _formatar_citacoes(self, docs_rel: list, query: str) -> list:
         """Formata as fontes dos documentos para exibição."""
         import re
@@ -0,0 +1,320 @@
+import json
+import time
+import random
+import asyncio
+import threading
+from pathlib import Path
+from collections import deque
+
+
+class QuotaExcedidaError(Exception):
+    """Erro de limite de uso (HTTP 429 / RESOURCE_EXHAUSTED) da API de embeddings."""
+    pass
+
+
+def eh_erro_de_quota(erro: Exception) -> bool:
+    """Identifica erros de rate limit, seja do stub ou das bibliotecas do Google."""
+    if isinstance(erro, QuotaExcedidaError):
+        return True
+    texto = f"{type(erro).__name__} {erro}".lower()
+    return any(marca in texto for marca in ("429", "quota", "resourceexhausted", "resource_exhausted", "rate limit"))
+
+
+class TokenBucket:
+    """
+    Balde de tokens assíncrono: enche continuamente a `capacidade / periodo_s`
+    por segundo e bloqueia quem pede mais do que há disponível.
+
+    O saldo vale entre chamadas; cada `asyncio.run` tem o seu loop, então o
+    lock assíncrono é recriado quando o loop muda.
+    """
+    def __init__(self, capacidade: float, periodo_s: float = 60.0):
+        self.capacidade = float(capacidade)
+        self.taxa = self.capacidade / periodo_s
+        self.fator = 1.0
+        self.tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _lock_do_loop(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._ultimo) * self.taxa * self.fator)
+        self._ultimo = agora
+
+    async def consumir(self, quantidade: float) -> float:
+        """Consome `quantidade` tokens, esperando o necessário. Retorna o tempo esperado."""
+        # Um pedido maior que o balde nunca passaria; limita à capacidade
+        quantidade = min(quantidade, self.capacidade)
+        esperado = 0.0
+        async with self._lock_do_loop():
+            while True:
+                self._repor()
+                if self.tokens >= quantidade:
+                    self.tokens -= quantidade
+                    return esperado
+                espera = (quantidade - self.tokens) / (self.taxa * self.fator)
+                esperado += espera
+                await asyncio.sleep(espera)
+
+    def reduzir(self, fator_minimo: float = 0.1):
+        """Após um 429: corta a taxa pela metade e esvazia o balde."""
+        self.fator = max(fator_minimo, self.fator * 0.5)
+        self.tokens = 0.0
+        self._ultimo = time.monotonic()
+
+    def recuperar(self):
+        """Após um sucesso: volta gradualmente à taxa configurada."""
+        self.fator = min(1.0, self.fator * 1.1)
+
+
+class RateLimiterAdaptativo:
+    """Combina os limites de requisições e de tokens por minuto da API."""
+    def __init__(self, requisicoes_por_minuto: int, tokens_por_minuto: int, periodo_s: float = 60.0):
+        self.requisicoes = TokenBucket(requisicoes_por_minuto, periodo_s)
+        self.tokens = TokenBucket(tokens_por_minuto, periodo_s)
+
+    async def adquirir(self, n_requisicoes: int, n_tokens: int) -> float:
+        espera = await self.requisicoes.consumir(n_requisicoes)
+        espera += await self.tokens.consumir(n_tokens)
+        return espera
+
+    def penalizar(self):
+        self.requisicoes.reduzir()
+        self.tokens.reduzir()
+
+    def recompensar(self):
+        self.requisicoes.recuperar()
+        self.tokens.recuperar()
+
+
+class CheckpointEmbeddings:
+    """
+    Guarda em disco (JSON Lines) os vetores de cada lote concluído, para que uma
+    indexação interrompida retome de onde parou sem pagar de novo pelos embeddings.
+
+    O arquivo é lido uma única vez; depois disso o índice em memória é mantido
+    por `registrar` e `limpar`, sem reler o JSONL a cada chamada de embedding.
+    """
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._vetores = None  # {id do chunk: vetor}, carregado sob demanda
+
+    def carregar(self) -> dict:
+        if self._vetores is not None:
+            return self._vetores
+        self._vetores = {}
+        if not self.caminho.exists():
+            return self._vetores
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma interrupção no meio da escrita
+                    continue
+                self._vetores.update(zip(registro["ids"], registro["vetores"]))
+        return self._vetores
+
+    def registrar(self, ids: list, vetores: list):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        vetores = [list(map(float, v)) for v in vetores]
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ids": list(ids), "vetores": vetores}) + "\n")
+        self.carregar().update(zip(ids, vetores))
+
+    def limpar(self):
+        if self.caminho.exists():
+            self.caminho.unlink()
+        self._vetores = {}
+
+
+class EmbeddingScheduler:
+    """
+    Agendador assíncrono de lotes de embeddings compartilhado pelas pipelines de RAG.
+
+    Substitui os `sleep` fixos entre lotes por um token bucket (requisições e
+    tokens por minuto), mantém vários lotes em voo, refaz lotes que falharam
+    com backoff exponencial + jitter e registra checkpoints por lote. O limitador
+    é do agendador, não de cada chamada: chamadas seguidas (um `embed` por PDF
+    na sincronização) dividem a mesma cota e herdam a redução após um 429.
+    """
+    def __init__(self, embed_fn, batch_size: int = 15, requisicoes_por_minuto: int = 100,
+                 tokens_por_minuto: int = 30000, max_concorrencia: int = 4, max_tentativas: int = 6,
+                 checkpoint_path=None, requisicao_por_texto: bool = True, periodo_s: float = 60.0):
+        """
+        Args:
+            embed_fn (callable): Função síncrona lista de textos -> lista de vetores
+                (ex.: `GoogleGenerativeAIEmbeddings.embed_documents`).
+            batch_size (int): Textos por chamada à API.
+            requisicoes_por_minuto (int): Cota de requisições por minuto.
+            tokens_por_minuto (int): Cota de tokens de entrada por minuto.
+            max_concorrencia (int): Lotes em voo simultaneamente.
+            max_tentativas (int): Tentativas por lote antes de desistir.
+            checkpoint_path (str | Path): Arquivo de checkpoint; None desativa.
+            requisicao_por_texto (bool): Se True, cada texto do lote conta como uma
+                requisição na cota (comportamento do batchEmbedContents do Gemini).
+            periodo_s (float): Janela das cotas, em segundos.
+        """
+        self.embed_fn = embed_fn
+        self.batch_size = batch_size
+        self.requisicoes_por_minuto = requisicoes_por_minuto
+        self.tokens_por_minuto = tokens_por_minuto
+        self.max_concorrencia = max_concorrencia
+        self.max_tentativas = max_tentativas
+        self.requisicao_por_texto = requisicao_por_texto
+        self.periodo_s = periodo_s
+        self.checkpoint = CheckpointEmbeddings(checkpoint_path) if checkpoint_path else None
+        self.limiter = RateLimiterAdaptativo(requisicoes_por_minuto, tokens_por_minuto, periodo_s)
+        self.metricas = {}
+
+    @staticmethod
+    def estimar_tokens(texto: str) -> int:
+        """Estimativa grosseira (~4 caracteres por token), suficiente para o limitador."""
+        return max(1, len(texto) // 4)
+
+    async def _embedar_lote(self, limiter, semaforo, textos, ids):
+        n_requisicoes = len(textos) if self.requisicao_por_texto else 1
+        n_tokens = sum(self.estimar_tokens(t) for t in textos)
+
+        async with semaforo:
+            for tentativa in range(1, self.max_tentativas + 1):
+                self.metricas["espera_limite_s"] += await limiter.adquirir(n_requisicoes, n_tokens)
+                try:
+                    vetores = await asyncio.to_thread(self.embed_fn, list(textos))
+                except Exception as e:
+                    if tentativa == self.max_tentativas:
+                        raise
+                    if eh_erro_de_quota(e):
+                        limiter.penalizar()
+                        self.metricas["erros_quota"] += 1
+                    self.metricas["retentativas"] += 1
+                    # Backoff exponencial com "full jitter"
+                    espera = random.uniform(0, min(60.0, 2 ** tentativa))
+                    print(f"  - Lote falhou ({type(e).__name__}); nova tentativa {tentativa + 1} em {espera:.1f}s")
+                    await asyncio.sleep(espera)
+                    continue
+
+                limiter.recompensar()
+                if self.checkpoint:
+                    self.checkpoint.registrar(ids, vetores)
+                self.metricas["lotes"] += 1
+                return ids, vetores
+
+    async def embed_async(self, textos: list, ids: list) -> list:
+        """
+        Gera os embeddings de `textos`, retomando do checkpoint quando houver.
+
+        Returns:
+            list: Vetores na mesma ordem de `textos`.
+        """
+        inicio = time.perf_counter()
+        self.metricas = {"lotes": 0, "retentativas": 0, "erros_quota": 0, "espera_limite_s": 0.0, "do_checkpoint": 0}
+
+        # Índice em memória do checkpoint (lido do disco só na primeira chamada)
+        prontos = self.checkpoint.carregar() if self.checkpoint else {}
+        pendentes = [(t, i) for t, i in zip(textos, ids) if i not in prontos]
+        self.metricas["do_checkpoint"] = len(textos) - len(pendentes)
+
+        limiter = self.limiter
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        tarefas = []
+        for k in range(0, len(pendentes), self.batch_size):
+            lote = pendentes[k:k + self.batch_size]
+            tarefas.append(self._embedar_lote(limiter, semaforo, [t for t, _ in lote], [i for _, i in lote]))
+
+        novos = {}
+        for ids_lote, vetores in await asyncio.gather(*tarefas):
+            novos.update(zip(ids_lote, vetores))
+
+        self.metricas["total_s"] = time.perf_counter() - inicio
+        return [novos[i] if i in novos else prontos[i] for i in ids]
+
+    def embed(self, textos: list, ids: list) -> list:
+        """Versão síncrona de `embed_async` (roda o loop em outra thread se já houver um ativo)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.embed_async(textos, ids))
+
+        resultado = {}
+        def _executar():
+            resultado["vetores"] = asyncio.run(self.embed_async(textos, ids))
+        thread = threading.Thread(target=_executar)
+        thread.start()
+        thread.join()
+        return resultado["vetores"]
+
+    def limpar_checkpoint(self):
+        if self.checkpoint:
+            self.checkpoint.limpar()
+
+
+class StubEmbeddingsComQuota:
+    """
+    Modelo de embeddings falso, em processo, que simula a cota da API:
+    levanta `QuotaExcedidaError` quando as requisições ou tokens da janela estouram.
+    """
+    def __init__(self, requisicoes_por_minuto: int, tokens_por_minuto: int, dimensao: int = 768,
+                 latencia_s: float = 0.05, periodo_s: float = 60.0, requisicao_por_texto: bool = True):
+        self.requisicoes_por_minuto = requisicoes_por_minuto
+        self.tokens_por_minuto = tokens_por_minuto
+        self.dimensao = dimensao
+        self.latencia_s = latencia_s
+        self.periodo_s = periodo_s
+        self.requisicao_por_texto = requisicao_por_texto
+        self.chamadas = 0
+        self.rejeicoes = 0
+        self._janela = deque()  # (instante, requisicoes, tokens)
+        self._lock = threading.Lock()
+
+    def embed_documents(self, textos: list) -> list:
+        n_req = len(textos) if self.requisicao_por_texto else 1
+        n_tok = sum(EmbeddingScheduler.estimar_tokens(t) for t in textos)
+        with self._lock:
+            agora = time.monotonic()
+            while self._janela and agora - self._janela[0][0] > self.periodo_s:
+                self._janela.popleft()
+            usados_req = sum(r for _, r, _ in self._janela)
+            usados_tok = sum(t for _, _, t in self._janela)
+            if usados_req + n_req > self.requisicoes_por_minuto or usados_tok + n_tok > self.tokens_por_minuto:
+                self.rejeicoes += 1
+                raise QuotaExcedidaError("429 RESOURCE_EXHAUSTED: cota de embeddings excedida")
+            self._janela.append((agora, n_req, n_tok))
+            self.chamadas += 1
+
+        time.sleep(self.latencia_s)
+        return [self._vetor(t) for t in textos]
+
+    def embed_query(self, texto: str) -> list:
+        return self._vetor(texto)
+
+    def _vetor(self, texto: str) -> list:
+        rng = random.Random(texto)
+        return [rng.uniform(-1, 1) for _ in range(self.dimensao)]
+
+
+if __name__ == "__main__":
+    # Simulação rápida: cota de 60 textos / 20k tokens por "minuto" de 2 segundos
+    periodo = 2.0
+    stub = StubEmbeddingsComQuota(requisicoes_por_minuto=60, tokens_por_minuto=20000, dimensao=16, periodo_s=periodo)
+    textos = [f"Chunk {i}: tabela MUST ponto de conexão {i % 7} " * 5 for i in range(300)]
+    ids = [f"chunk-{i}" for i in range(300)]
+
+    scheduler = EmbeddingScheduler(
+        stub.embed_documents, batch_size=15, requisicoes_por_minuto=60, tokens_por_minuto=20000,
+        max_concorrencia=4, checkpoint_path="checkpoint_demo.jsonl", periodo_s=periodo
+    )
+    vetores = scheduler.embed(textos, ids)
+    scheduler.limpar_checkpoint()
+
+    print(f"Vetores gerados: {len(vetores)}")
+    print(f"Métricas: {scheduler.metricas}")
+    print(f"Chamadas aceitas pelo stub: {stub.chamadas}, rejeitadas (429): {stub.rejeicoes}")
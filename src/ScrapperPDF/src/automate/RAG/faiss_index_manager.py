@@ -0,0 +1,339 @@
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+
+class FAISSIndexManager:
+    """
+    Gerencia um índice FAISS de forma incremental.
+
+    Mantém um manifesto (JSON) ao lado do índice com o hash de cada PDF e os IDs
+    dos chunks que ele gerou. Assim, ao sincronizar uma pasta de PDFs, apenas os
+    documentos novos ou alterados são embedados e os vetores de documentos
+    removidos são apagados pelo mapeamento de IDs, sem reconstruir o índice inteiro.
+    """
+    MANIFEST_NAME = "manifesto_indice.json"
+    VERSAO_MANIFESTO = 1
+
+    def __init__(self, index_path, embeddings, scheduler=None):
+        """
+        Args:
+            index_path (str | Path): Pasta do índice FAISS.
+            embeddings: Modelo de embeddings do LangChain (usado também nas consultas).
+            scheduler (EmbeddingScheduler): Agendador dos lotes de embedding. Se None,
+                usa um agendador padrão com checkpoint ao lado do índice.
+        """
+        self.index_path = Path(index_path)
+        self.embeddings = embeddings
+        if scheduler is None:
+            from embedding_scheduler import EmbeddingScheduler
+            scheduler = EmbeddingScheduler(embeddings.embed_documents)
+        if scheduler.checkpoint is None:
+            from embedding_scheduler import CheckpointEmbeddings
+            scheduler.checkpoint = CheckpointEmbeddings(self.index_path.with_name(self.index_path.name + ".checkpoint.jsonl"))
+        self.scheduler = scheduler
+
+        # Índice léxico (BM25) mantido junto com o FAISS para a busca híbrida
+        from hybrid_retriever import BM25Index
+        self.bm25 = BM25Index(self.index_path)
+
+        self.vectorstore = None
+        self.manifesto = {"versao": self.VERSAO_MANIFESTO, "documentos": {}}
+        self.metricas = {}
+
+        # Protege o vectorstore de consultas concorrentes durante a sincronização
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Hashes
+    # ------------------------------------------------------------------
+    @staticmethod
+    def hash_arquivo(caminho) -> str:
+        """Calcula o SHA-256 do conteúdo binário do arquivo."""
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloco)
+        return h.hexdigest()
+
+    @staticmethod
+    def hash_chunk(chunk) -> str:
+        """ID estável de um chunk: origem, página, tipo e conteúdo."""
+        meta = chunk.metadata or {}
+        chave = f"{Path(meta.get('source', '')).name}|{meta.get('page', '')}|{meta.get('type', 'text')}|{chunk.page_content}"
+        return hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    @property
+    def manifest_path(self) -> Path:
+        return self.index_path / self.MANIFEST_NAME
+
+    def carregar(self) -> bool:
+        """
+        Carrega o índice e o manifesto do disco.
+
+        Returns:
+            bool: True se um índice válido foi carregado.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        if not (self.index_path / "index.faiss").exists():
+            return False
+
+        inicio = time.perf_counter()
+        with self._lock:
+            self.vectorstore = FAISS.load_local(str(self.index_path), self.embeddings, allow_dangerous_deserialization=True)
+            if self.manifest_path.exists():
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.manifesto = json.load(f)
+                if not self.bm25.carregar():
+                    # Índice criado antes do BM25: monta o índice léxico a partir do docstore do FAISS
+                    docstore = self.vectorstore.docstore._dict
+                    self.bm25.adicionar(list(docstore.values()), list(docstore.keys()))
+            else:
+                # Índice antigo, criado antes do manifesto: os documentos serão reindexados na próxima sincronização
+                print("  - Índice sem manifesto encontrado. Ele será reconstruído na sincronização.")
+                self.vectorstore = None
+                return False
+        self.metricas["carregar_s"] = time.perf_counter() - inicio
+        return True
+
+    def salvar(self):
+        """Salva índice e manifesto de forma atômica (pasta temporária + rename)."""
+        with self._lock:
+            if self.vectorstore is None:
+                return
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+            if tmp_path.exists():
+                shutil.rmtree(tmp_path)
+            self.vectorstore.save_local(str(tmp_path))
+            with open(tmp_path / self.MANIFEST_NAME, "w", encoding="utf-8") as f:
+                json.dump(self.manifesto, f, ensure_ascii=False, indent=2)
+            self.bm25.salvar(tmp_path)
+
+            if self.index_path.exists():
+                shutil.rmtree(self.index_path)
+            tmp_path.rename(self.index_path)
+
+        # Tudo persistido: os vetores do checkpoint já estão no índice
+        self.scheduler.limpar_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Operações incrementais
+    # ------------------------------------------------------------------
+    def documentos_indexados(self) -> dict:
+        return self.manifesto["documentos"]
+
+    def calcular_diferencas(self, pdf_paths: list) -> tuple:
+        """
+        Compara os PDFs atuais com o manifesto.
+
+        Returns:
+            tuple: (lista de (caminho, hash) novos ou alterados, lista de chaves removidas)
+        """
+        atuais = {}
+        for pdf_path in pdf_paths:
+            atuais[Path(pdf_path).name] = (Path(pdf_path), self.hash_arquivo(pdf_path))
+
+        indexados = self.documentos_indexados()
+        pendentes = [
+            (caminho, doc_hash) for chave, (caminho, doc_hash) in atuais.items()
+            if indexados.get(chave, {}).get("hash") != doc_hash
+        ]
+        removidos = [chave for chave in indexados if chave not in atuais]
+        return pendentes, removidos
+
+    def adicionar_documento(self, pdf_path, doc_hash: str, chunks: list) -> int:
+        """
+        Adiciona apenas os chunks ainda não indexados de um documento.
+
+        Returns:
+            int: Quantidade de chunks efetivamente embedados.
+        """
+        chave = Path(pdf_path).name
+
+        # Um documento alterado perde os vetores antigos que não existem mais
+        if chave in self.documentos_indexados():
+            self.remover_documento(chave, manter_ids={self.hash_chunk(c) for c in chunks})
+
+        ja_indexados = set(self.documentos_indexados().get(chave, {}).get("chunks", []))
+        novos, ids_novos, vistos = [], [], set(ja_indexados)
+        for chunk in chunks:
+            chunk_id = self.hash_chunk(chunk)
+            if chunk_id in vistos:
+                continue
+            vistos.add(chunk_id)
+            novos.append(chunk)
+            ids_novos.append(chunk_id)
+
+        self._adicionar_em_lotes(novos, ids_novos)
+
+        self.manifesto["documentos"][chave] = {
+            "hash": doc_hash,
+            "chunks": sorted(ja_indexados | set(ids_novos)),
+        }
+        return len(novos)
+
+    def remover_documento(self, chave: str, manter_ids: set = None):
+        """Apaga os vetores de um documento do índice pelo mapeamento de IDs."""
+        info = self.manifesto["documentos"].get(chave)
+        if not info:
+            return
+        manter_ids = manter_ids or set()
+        ids_remover = [i for i in info["chunks"] if i not in manter_ids]
+
+        with self._lock:
+            if ids_remover and self.vectorstore is not None:
+                existentes = set(self.vectorstore.index_to_docstore_id.values())
+                ids_remover = [i for i in ids_remover if i in existentes]
+                if ids_remover:
+                    self.vectorstore.delete(ids_remover)
+            self.bm25.remover(ids_remover)
+
+        if manter_ids:
+            info["chunks"] = [i for i in info["chunks"] if i in manter_ids]
+        else:
+            del self.manifesto["documentos"][chave]
+
+    def _adicionar_em_lotes(self, chunks: list, ids: list):
+        """Gera os embeddings pelo agendador (limite de cota + checkpoint) e os insere no índice."""
+        from langchain_community.vectorstores import FAISS
+
+        if not chunks:
+            return
+        textos = [c.page_content for c in chunks]
+        vetores = self.scheduler.embed(textos, ids)
+        metadados = [c.metadata for c in chunks]
+
+        with self._lock:
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(list(zip(textos, vetores)), self.embeddings, metadatas=metadados, ids=ids)
+            else:
+                self.vectorstore.add_embeddings(list(zip(textos, vetores)), metadatas=metadados, ids=ids)
+            self.bm25.adicionar(chunks, ids)
+
+    def sincronizar(self, pdf_paths: list, processar_documentos) -> dict:
+        """
+        Sincroniza o índice com a lista de PDFs atual.
+
+        Args:
+            pdf_paths (list): PDFs que devem estar no índice.
+            processar_documentos (callable | IngestionEngine): Função que recebe uma lista
+                de caminhos e devolve os chunks, ou um motor de ingestão cujo
+                `processar()` entrega (caminho, chunks) conforme cada PDF fica pronto.
+
+        Returns:
+            dict: Métricas de tempo (segundos) e contagens da sincronização.
+        """
+        metricas = {}
+        inicio_total = time.perf_counter()
+
+        inicio = time.perf_counter()
+        pendentes, removidos = self.calcular_diferencas(pdf_paths)
+        metricas["hash_s"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for chave in removidos:
+            print(f"  - Removendo vetores de documento excluído: {chave}")
+            self.remover_documento(chave)
+        metricas["remocao_s"] = time.perf_counter() - inicio
+
+        metricas["extracao_s"] = 0.0
+        metricas["embedding_s"] = 0.0
+        chunks_novos = 0
+        hashes = {Path(p): h for p, h in pendentes}
+        if hasattr(processar_documentos, "processar"):
+            fluxo = processar_documentos.processar(list(hashes))
+        else:
+            fluxo = ((p, processar_documentos([p])) for p in hashes)
+
+        processados = vazios = 0
+        inicio = time.perf_counter()
+        try:
+            for pdf_path, chunks in fluxo:
+                # Tempo esperando o próximo documento (extração não sobreposta ao embedding)
+                metricas["extracao_s"] += time.perf_counter() - inicio
+
+                inicio = time.perf_counter()
+                if not chunks:
+                    # Extração vazia não entra no manifesto: o PDF é tentado de novo na próxima sincronização.
+                    # Se ele já estava indexado, os vetores da versão anterior não valem mais.
+                    print(f"  - Nenhum chunk extraído de {Path(pdf_path).name}; documento não indexado.")
+                    self.remover_documento(Path(pdf_path).name)
+                    vazios += 1
+                    inicio = time.perf_counter()
+                    continue
+                chunks_novos += self.adicionar_documento(pdf_path, hashes[Path(pdf_path)], chunks)
+                metricas["embedding_s"] += time.perf_counter() - inicio
+                processados += 1
+                inicio = time.perf_counter()
+        finally:
+            # Interrompe a extração em andamento se a indexação falhar no meio
+            if hasattr(fluxo, "close"):
+                fluxo.close()
+
+        metricas["documentos_novos"] = processados
+        metricas["documentos_falhos"] = len(pendentes) - processados
+        metricas["documentos_removidos"] = len(removidos)
+        metricas["chunks_novos"] = chunks_novos
+
+        inicio = time.perf_counter()
+        if processados or removidos or vazios:
+            self.salvar()
+        metricas["salvar_s"] = time.perf_counter() - inicio
+        metricas["total_s"] = time.perf_counter() - inicio_total
+
+        self.metricas.update(metricas)
+        return metricas
+
+
+def benchmark_adicionar_pdf(pasta_pdfs: str, processar_documentos, index_path: str = "benchmark_faiss_index", n_base: int = 50):
+    """
+    Mede o tempo para adicionar 1 PDF a um índice com `n_base` PDFs, comparado
+    à reconstrução completa. Usa embeddings falsos para não depender da API.
+    """
+    from langchain_community.embeddings import FakeEmbeddings
+    from embedding_scheduler import EmbeddingScheduler
+
+    pdfs = sorted(Path(pasta_pdfs).glob("*.pdf"))[:n_base + 1]
+    if len(pdfs) < 2:
+        print(f"São necessários pelo menos 2 PDFs em '{pasta_pdfs}'.")
+        return {}
+
+    embeddings = FakeEmbeddings(size=768)
+
+    def _novo_manager():
+        # Cota folgada: o benchmark mede extração, índice e disco, não a API
+        scheduler = EmbeddingScheduler(embeddings.embed_documents, batch_size=100,
+                                       requisicoes_por_minuto=10**9, tokens_por_minuto=10**12)
+        return FAISSIndexManager(index_path, embeddings, scheduler=scheduler)
+    index_path = Path(index_path)
+    if index_path.exists():
+        shutil.rmtree(index_path)
+
+    base, novo = pdfs[:-1], pdfs[-1]
+    manager = _novo_manager()
+    metricas_base = manager.sincronizar(base, processar_documentos)
+
+    manager = _novo_manager()
+    manager.carregar()
+    metricas_incremental = manager.sincronizar(pdfs, processar_documentos)
+
+    shutil.rmtree(index_path)
+    completo = _novo_manager()
+    metricas_completo = completo.sincronizar(pdfs, processar_documentos)
+    shutil.rmtree(index_path)
+
+    print(f"\n--- Benchmark: adicionar '{novo.name}' a um índice com {len(base)} PDFs ---")
+    print(f"  Índice base ({len(base)} PDFs):      {metricas_base['total_s']:.2f}s")
+    print(f"  Incremental (+1 PDF):         {metricas_incremental['total_s']:.2f}s "
+          f"(hash {metricas_incremental['hash_s']:.2f}s, extração {metricas_incremental['extracao_s']:.2f}s, "
+          f"embedding {metricas_incremental['embedding_s']:.2f}s, salvar {metricas_incremental['salvar_s']:.2f}s)")
+    print(f"  Reconstrução completa ({len(pdfs)}):  {metricas_completo['total_s']:.2f}s")
+
+    return {"base": metricas_base, "incremental": metricas_incremental, "completo": metricas_completo}
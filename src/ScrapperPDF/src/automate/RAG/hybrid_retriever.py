@@ -0,0 +1,297 @@
+import re
+import json
+import math
+import time
+import unicodedata
+from pathlib import Path
+from collections import Counter
+
+
+# Códigos ONS ("SPUFA-138", "SPASS188"), siglas de LT/SE e números de tabela
+PADRAO_IDENTIFICADOR = re.compile(r"^(?=.*\d)[A-Za-z0-9][A-Za-z0-9\-_/.]{2,}$")
+PADRAO_TOKEN = re.compile(r"[a-z0-9]+(?:[\-_/.][a-z0-9]+)*")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos, para casar 'Cód' com 'cod' e 'Usuária' com 'usuaria'."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto: str) -> list:
+    """
+    Quebra o texto em tokens. Identificadores compostos ('spufa-138') viram um
+    token inteiro e também as suas partes ('spufa', '138').
+    """
+    tokens = []
+    for token in PADRAO_TOKEN.findall(normalizar(texto)):
+        tokens.append(token)
+        partes = re.split(r"[\-_/.]", token)
+        if len(partes) > 1:
+            tokens.extend(p for p in partes if p)
+    return tokens
+
+
+def id_chunk(chunk) -> str:
+    """Mesmo ID de conteúdo usado pelo FAISSIndexManager, para a fusão casar os resultados."""
+    # Importado aqui: faiss_index_manager também importa este módulo
+    from faiss_index_manager import FAISSIndexManager
+    return FAISSIndexManager.hash_chunk(chunk)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 persistido em disco (JSON).
+
+    Guarda as listas de postings por termo e o texto/metadados de cada chunk,
+    com suporte a inserção e remoção incrementais pelo ID do chunk.
+    """
+    ARQUIVO = "bm25_index.json"
+
+    def __init__(self, index_path, k1: float = 1.5, b: float = 0.75):
+        self.index_path = Path(index_path)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # termo -> {chunk_id: frequência}
+        self.tamanhos = {}   # chunk_id -> número de tokens
+        self.documentos = {}  # chunk_id -> {"texto", "metadata"}
+        self._texto_normalizado = {}
+
+    @property
+    def arquivo(self) -> Path:
+        return self.index_path / self.ARQUIVO
+
+    def carregar(self) -> bool:
+        if not self.arquivo.exists():
+            return False
+        with open(self.arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        self.postings = dados["postings"]
+        self.tamanhos = dados["tamanhos"]
+        self.documentos = dados["documentos"]
+        self._texto_normalizado = {}
+        return True
+
+    def salvar(self, pasta=None):
+        """Salva em `pasta` (padrão: a pasta do índice)."""
+        pasta = Path(pasta) if pasta else self.index_path
+        pasta.mkdir(parents=True, exist_ok=True)
+        arquivo = pasta / self.ARQUIVO
+        tmp = arquivo.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"postings": self.postings, "tamanhos": self.tamanhos, "documentos": self.documentos}, f, ensure_ascii=False)
+        tmp.replace(arquivo)
+
+    def adicionar(self, chunks: list, ids: list = None):
+        ids = ids or [id_chunk(c) for c in chunks]
+        for chunk, chunk_id in zip(chunks, ids):
+            if chunk_id in self.documentos:
+                continue
+            frequencias = Counter(tokenizar(chunk.page_content))
+            for termo, tf in frequencias.items():
+                self.postings.setdefault(termo, {})[chunk_id] = tf
+            self.tamanhos[chunk_id] = sum(frequencias.values())
+            self.documentos[chunk_id] = {"texto": chunk.page_content, "metadata": dict(chunk.metadata or {})}
+
+    def remover(self, ids: list):
+        for chunk_id in ids:
+            doc = self.documentos.pop(chunk_id, None)
+            if doc is None:
+                continue
+            self.tamanhos.pop(chunk_id, None)
+            self._texto_normalizado.pop(chunk_id, None)
+            for termo in set(tokenizar(doc["texto"])):
+                lista = self.postings.get(termo)
+                if lista is not None:
+                    lista.pop(chunk_id, None)
+                    if not lista:
+                        del self.postings[termo]
+
+    def buscar(self, query: str, k: int = 10) -> list:
+        """Retorna [(chunk_id, score)] ordenado pelo score BM25."""
+        n = len(self.tamanhos)
+        if n == 0:
+            return []
+        media = sum(self.tamanhos.values()) / n
+        scores = Counter()
+        for termo in set(tokenizar(query)):
+            lista = self.postings.get(termo)
+            if not lista:
+                continue
+            idf = math.log(1 + (n - len(lista) + 0.5) / (len(lista) + 0.5))
+            for chunk_id, tf in lista.items():
+                norma = 1 - self.b + self.b * self.tamanhos[chunk_id] / media
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norma)
+        return scores.most_common(k)
+
+    def busca_exata(self, query: str, k: int = 10) -> list:
+        """
+        Busca a frase da query literalmente (sem acentos/caixa). Usa a interseção
+        das postings para só verificar o texto dos chunks candidatos.
+        """
+        termos = tokenizar(query)
+        if not termos:
+            return []
+        candidatos = None
+        for termo in set(termos):
+            lista = self.postings.get(termo)
+            if not lista:
+                return []
+            candidatos = set(lista) if candidatos is None else candidatos & set(lista)
+            if not candidatos:
+                return []
+
+        frase = normalizar(query).strip()
+        achados = []
+        for chunk_id in candidatos:
+            texto = self._texto_normalizado.get(chunk_id)
+            if texto is None:
+                texto = self._texto_normalizado[chunk_id] = normalizar(self.documentos[chunk_id]["texto"])
+            if frase in texto:
+                achados.append(chunk_id)
+        # Chunks de tabela primeiro: é onde estão os valores do Cód ONS
+        achados.sort(key=lambda i: self.documentos[i]["metadata"].get("type") != "table")
+        return achados[:k]
+
+    def documento(self, chunk_id: str):
+        from langchain_core.documents import Document
+        doc = self.documentos[chunk_id]
+        return Document(page_content=doc["texto"], metadata=doc["metadata"])
+
+
+def reciprocal_rank_fusion(listas: list, k: int = 60) -> list:
+    """Funde listas de IDs ranqueadas: score = soma de 1 / (k + posição)."""
+    scores = Counter()
+    for lista in listas:
+        for posicao, chunk_id in enumerate(lista, start=1):
+            scores[chunk_id] += 1.0 / (k + posicao)
+    return [chunk_id for chunk_id, _ in scores.most_common()]
+
+
+class HybridRetriever:
+    """
+    Retriever híbrido BM25 + FAISS para as tabelas MUST.
+
+    - Consultas com cara de identificador (Cód ONS, nome de subestação curto)
+      vão pelo caminho rápido de correspondência exata, sem chamar a API de embedding.
+    - As demais combinam BM25 e similaridade vetorial com reciprocal-rank fusion.
+      Os candidatos vetoriais passam pelo mesmo `score_threshold` (0.5) do
+      retriever por similaridade usado antes.
+
+    Expõe `invoke(query)` como os retrievers do LangChain.
+    """
+    def __init__(self, vectorstore, bm25: BM25Index, k: int = 5, k_candidatos: int = 20, rrf_k: int = 60,
+                 max_palavras_exata: int = 4, score_threshold: float = 0.5):
+        self.vectorstore = vectorstore
+        self.bm25 = bm25
+        self.k = k
+        self.k_candidatos = k_candidatos
+        self.rrf_k = rrf_k
+        self.max_palavras_exata = max_palavras_exata
+        self.score_threshold = score_threshold
+        self.ultima_estrategia = None
+
+    def _parece_identificador(self, query: str) -> bool:
+        termos = query.strip().strip('"\'').split()
+        if not termos or len(termos) > self.max_palavras_exata:
+            return False
+        if query.strip().startswith('"') and query.strip().endswith('"'):
+            return True
+        return any(PADRAO_IDENTIFICADOR.match(t) for t in termos) or all(t.isupper() for t in termos)
+
+    def _busca_vetorial(self, query: str) -> tuple:
+        """
+        Candidatos do FAISS com relevância >= `score_threshold`.
+
+        Returns:
+            tuple: (IDs ranqueados, {ID: Document} dos chunks que só existem no FAISS)
+        """
+        if self.vectorstore is None:
+            return [], {}
+        resultados = self.vectorstore.similarity_search_with_relevance_scores(
+            query, k=self.k_candidatos, score_threshold=self.score_threshold
+        )
+        ids, so_vetoriais = [], {}
+        for doc, _ in resultados:
+            chunk_id = id_chunk(doc)
+            if chunk_id not in self.bm25.documentos:
+                # Chunk presente só no FAISS: o documento vem da própria busca
+                so_vetoriais[chunk_id] = doc
+            ids.append(chunk_id)
+        return ids, so_vetoriais
+
+    def _buscar(self, query: str, modo: str) -> tuple:
+        if modo in ("hibrido", "exato") and self._parece_identificador(query):
+            exatos = self.bm25.busca_exata(query.strip().strip('"\''), k=self.k)
+            if exatos or modo == "exato":
+                self.ultima_estrategia = "exato"
+                return exatos, {}
+
+        if modo == "bm25":
+            self.ultima_estrategia = "bm25"
+            return [i for i, _ in self.bm25.buscar(query, self.k)], {}
+        if modo == "vetorial":
+            self.ultima_estrategia = "vetorial"
+            ids, so_vetoriais = self._busca_vetorial(query)
+            return ids[:self.k], so_vetoriais
+
+        self.ultima_estrategia = "rrf"
+        lexicos = [i for i, _ in self.bm25.buscar(query, self.k_candidatos)]
+        vetoriais, so_vetoriais = self._busca_vetorial(query)
+        return reciprocal_rank_fusion([lexicos, vetoriais], k=self.rrf_k)[:self.k], so_vetoriais
+
+    def buscar_ids(self, query: str, modo: str = "hibrido") -> list:
+        return self._buscar(query, modo)[0]
+
+    def invoke(self, query: str, modo: str = "hibrido") -> list:
+        ids, so_vetoriais = self._buscar(query, modo)
+        return [self.bm25.documento(i) if i in self.bm25.documentos else so_vetoriais[i] for i in ids]
+
+
+def carregar_perguntas_avaliacao(json_path, n: int = 30) -> list:
+    """
+    Conjunto fixo de perguntas a partir da base MUST consolidada
+    (`database/must_tables_PDF_notes_merged.json`): para cada um dos primeiros
+    `n` Cód ONS, uma pergunta em linguagem natural e uma busca só pelo código.
+    O chunk é considerado relevante se contiver o código.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        registros = json.load(f)
+
+    perguntas, vistos = [], set()
+    for registro in registros:
+        codigo = str(registro.get("Cód ONS") or "").strip()
+        if not codigo or codigo in vistos:
+            continue
+        vistos.add(codigo)
+        empresa = registro.get("EMPRESA", "")
+        perguntas.append({"pergunta": f"Qual o valor de MUST na ponta de 2025 para o ponto {codigo} da {empresa}?", "esperado": codigo})
+        perguntas.append({"pergunta": codigo, "esperado": codigo})
+        if len(vistos) >= n:
+            break
+    return perguntas
+
+
+def avaliar_retriever(retriever: HybridRetriever, perguntas: list, modos=("vetorial", "bm25", "hibrido")) -> dict:
+    """Mede latência (média/p95) e recall@k de cada modo de busca no conjunto fixo de perguntas."""
+    resultados = {}
+    for modo in modos:
+        latencias, acertos = [], 0
+        for item in perguntas:
+            inicio = time.perf_counter()
+            docs = retriever.invoke(item["pergunta"], modo=modo)
+            latencias.append(time.perf_counter() - inicio)
+            esperado = normalizar(item["esperado"])
+            if any(esperado in normalizar(d.page_content) for d in docs):
+                acertos += 1
+        latencias.sort()
+        resultados[modo] = {
+            "recall": acertos / len(perguntas) if perguntas else 0.0,
+            "latencia_media_ms": 1000 * sum(latencias) / len(latencias) if latencias else 0.0,
+            "latencia_p95_ms": 1000 * latencias[int(0.95 * (len(latencias) - 1))] if latencias else 0.0,
+        }
+
+    print(f"\n--- Avaliação do retriever ({len(perguntas)} perguntas, k={retriever.k}) ---")
+    for modo, r in resultados.items():
+        print(f"  {modo:<9} recall@{retriever.k}: {r['recall']:.2%} | média {r['latencia_media_ms']:.1f} ms | p95 {r['latencia_p95_ms']:.1f} ms")
+    return resultados
@@ -0,0 +1,159 @@
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+
+def extrair_texto(pdf_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> list:
+    """Worker: extrai o texto com PyMuPDF e divide em chunks. Retorna [(conteúdo, metadados)]."""
+    from langchain_community.document_loaders import PyMuPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = text_splitter.split_documents(PyMuPDFLoader(pdf_path).load())
+    return [(c.page_content, c.metadata) for c in chunks]
+
+
+def extrair_tabelas(pdf_path: str) -> list:
+    """Worker: extrai as tabelas com camelot (lattice) como chunks em Markdown."""
+    import camelot
+
+    tabelas = camelot.read_pdf(pdf_path, pages='all', flavor='lattice')
+    return [
+        (
+            f"A seguir uma tabela extraída do documento:\n\n{tabela.df.to_markdown(index=False)}",
+            {"source": pdf_path, "page": tabela.page, "type": "table"},
+        )
+        for tabela in tabelas
+    ]
+
+
+class IngestionEngine:
+    """
+    Ingestão paralela de PDFs para a pipeline de RAG.
+
+    Cada PDF gera duas tarefas independentes (texto e tabelas), executadas num
+    pool de processos, de forma que a extração de texto de um documento se
+    sobrepõe ao camelot de outro. Quando as duas partes de um documento
+    terminam, os chunks são enviados ao indexador por uma fila limitada: se o
+    embedding estiver mais lento, os workers param de acumular resultados.
+    """
+    FIM = object()
+
+    def __init__(self, max_workers: int = None, tamanho_fila: int = 4, chunk_size: int = 500,
+                 chunk_overlap: int = 50, usar_processos: bool = True):
+        self.max_workers = max_workers
+        self.tamanho_fila = tamanho_fila
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.usar_processos = usar_processos
+        self.relatorio = {}
+
+    @staticmethod
+    def _entregar(fila: queue.Queue, item, parar: threading.Event) -> bool:
+        """Coloca `item` na fila, desistindo se o consumidor sinalizar parada. Retorna True se entregou."""
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produzir(self, pdf_paths: list, fila: queue.Queue, parar: threading.Event):
+        """Thread produtora: dispara as extrações e entrega cada documento completo na fila."""
+        executor_cls = ProcessPoolExecutor if self.usar_processos else ThreadPoolExecutor
+        pendentes = {str(p): {"texto": None, "tabelas": None} for p in pdf_paths}
+        inicio_total = time.perf_counter()
+
+        try:
+            with executor_cls(max_workers=self.max_workers) as executor:
+                futuros = {}
+                for pdf_path in pendentes:
+                    self.relatorio["documentos"][pdf_path] = {"inicio_s": time.perf_counter() - inicio_total}
+                    futuros[executor.submit(extrair_texto, pdf_path, self.chunk_size, self.chunk_overlap)] = (pdf_path, "texto")
+                    futuros[executor.submit(extrair_tabelas, pdf_path)] = (pdf_path, "tabelas")
+
+                for futuro in as_completed(futuros):
+                    if parar.is_set():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+                    pdf_path, parte = futuros[futuro]
+                    info = self.relatorio["documentos"][pdf_path]
+                    info[f"{parte}_fim_s"] = time.perf_counter() - inicio_total
+                    try:
+                        pendentes[pdf_path][parte] = futuro.result()
+                        info[f"{parte}_chunks"] = len(pendentes[pdf_path][parte])
+                    except Exception as e:
+                        info.setdefault("erros", []).append(f"{parte}: {type(e).__name__}: {e}")
+                        pendentes[pdf_path][parte] = e
+
+                    partes = pendentes[pdf_path]
+                    if partes["texto"] is None or partes["tabelas"] is None:
+                        continue
+
+                    info["total_s"] = time.perf_counter() - inicio_total - info["inicio_s"]
+                    del pendentes[pdf_path]
+                    if "erros" in info:
+                        # Documento com falha não é entregue: será reprocessado na próxima sincronização
+                        print(f"  - Erro ao processar o arquivo {Path(pdf_path).name}: {'; '.join(info['erros'])}")
+                        continue
+                    print(f"  - {Path(pdf_path).name}: {info['texto_chunks']} chunks de texto, {info['tabelas_chunks']} tabelas")
+                    # Espera se o indexador estiver atrasado (backpressure), mas não depois de ele parar
+                    if not self._entregar(fila, (Path(pdf_path), partes["texto"] + partes["tabelas"]), parar):
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+        finally:
+            self.relatorio["total_s"] = time.perf_counter() - inicio_total
+            self._entregar(fila, self.FIM, parar)
+
+    def processar(self, pdf_paths: list):
+        """
+        Gera (caminho do PDF, lista de Documents) conforme cada documento fica pronto.
+
+        O relatório da ingestão fica em `self.relatorio` ao final da iteração.
+        """
+        from langchain_core.documents import Document
+
+        self.relatorio = {"documentos": {}, "total_s": 0.0}
+        fila = queue.Queue(maxsize=self.tamanho_fila)
+        parar = threading.Event()
+        produtor = threading.Thread(target=self._produzir, args=(list(pdf_paths), fila, parar), name="ingestao-pdf", daemon=True)
+        produtor.start()
+
+        try:
+            while True:
+                item = fila.get()
+                if item is self.FIM:
+                    break
+                pdf_path, chunks = item
+                yield pdf_path, [Document(page_content=conteudo, metadata=meta) for conteudo, meta in chunks]
+        finally:
+            # Consumidor terminou, falhou ou abandonou o gerador: libera a produtora e o pool
+            parar.set()
+            while True:
+                try:
+                    fila.get_nowait()
+                except queue.Empty:
+                    break
+            produtor.join()
+
+    def falhas(self) -> dict:
+        return {p: info["erros"] for p, info in self.relatorio.get("documentos", {}).items() if "erros" in info}
+
+    def salvar_relatorio(self, caminho):
+        """Grava o relatório da ingestão (tempos e falhas por documento) em JSON."""
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.relatorio, f, ensure_ascii=False, indent=2)
+
+    def imprimir_relatorio(self):
+        docs = self.relatorio.get("documentos", {})
+        print(f"\n--- Relatório de ingestão: {len(docs)} documentos em {self.relatorio.get('total_s', 0):.1f}s ---")
+        for pdf_path, info in docs.items():
+            status = "ERRO" if "erros" in info else "ok"
+            print(f"  [{status}] {Path(pdf_path).name}: {info.get('total_s', 0):.1f}s "
+                  f"(texto: {info.get('texto_chunks', '-')} chunks, tabelas: {info.get('tabelas_chunks', '-')})")
+            for erro in info.get("erros", []):
+                print(f"      {erro}")
@@ -12,16 +12,20 @@ from rich.prompt import Prompt
 from rich_menu import Menu
 from rich.panel import Panel
 
-# Substitua pelos seus dados de exemplo
-DATABASE_DATA = {
-    "EMPLOYEES": [
-        {"NAME": "João", "EMPLOYEEID": 1, "AGE": 30, "EXPERIENCE": 5},
-        {"NAME": "Maria", "EMPLOYEEID": 2, "AGE": 25, "EXPERIENCE": 2},
-        {"NAME": "Carlos", "EMPLOYEEID": 3, "AGE": 40, "EXPERIENCE": 10},
-        {"NAME": "Ana", "EMPLOYEEID": 4, "AGE": 35, "EXPERIENCE": 7},
-        {"NAME": "Pedro", "EMPLOYEEID": 5, "AGE": 28, "EXPERIENCE": 3},
-    ]
-}
+from MUSTSqlEngine import MUSTSqlEngine, ConsultaSQLError
+
+PROMPT_SQL_MUST = """
+Atue como um especialista em converter perguntas em consultas SQL (SQLite) sobre a base MUST da ONS.
+As tabelas disponíveis são:
+{esquema}
+A tabela valores_must tem uma linha por ponto de conexão (cod_ons), ano (2025 a 2028) e
+periodo ('ponta' ou 'fora_ponta'), com o valor em MW na coluna valor_mw. Por exemplo:
+- Exemplo 1: "Quantos pontos de conexão a ELETROPAULO possui?" resultaria no comando SQL:
+  SELECT COUNT(DISTINCT cod_ons) FROM valores_must WHERE empresa = 'ELETROPAULO';
+- Exemplo 2: "Qual o MUST de ponta em 2026 do ponto SPUFA-138?" resultaria em:
+  SELECT de, ate, valor_mw, anotacao FROM valores_must WHERE cod_ons = 'SPUFA-138' AND ano = 2026 AND periodo = 'ponta';
+Gere apenas consultas SELECT. Além disso, garanta que o código SQL de saída não contenha ``` no início ou no fim, nem a palavra "sql" nele.
+"""
 
 class C3PO:
     def __init__(self):
@@ -32,6 +36,10 @@ class C3PO:
         # Inicializa o modelo Gemini
         self.gemini_model = genai.GenerativeModel('gemini-pro')
         self.console = Console()
+        # Motor SQL somente leitura carregado dos artefatos da base MUST
+        self.sql_engine = MUSTSqlEngine(timeout_s=5.0, limite_linhas=1000)
+        # Cache pergunta -> SQL gerado, para não chamar o Gemini de novo em perguntas repetidas
+        self._cache_perguntas = {}
 
     def generate_gemini_response(self, prompt, question):
         """
@@ -51,76 +59,47 @@ class C3PO:
             self.console.print(Panel(f"Erro ao gerar resposta do Gemini: {e}", title="Erro", border_style="red"))
             return None
 
-    def execute_sql_query(self, sql):
+    def execute_sql_query(self, sql, params=None):
         """
-        Executa uma consulta SQL simulada no banco de dados.
+        Executa uma consulta SQL somente leitura na base MUST (SQLite).
 
         Args:
-            sql (str): A consulta SQL a ser executada.
+            sql (str): A consulta SQL a ser executada (um único SELECT).
+            params (tuple | dict, optional): Parâmetros vinculados aos placeholders da consulta.
 
         Returns:
             tuple: Uma tupla contendo as linhas retornadas pela consulta e os nomes das colunas.
                    Retorna (None, None) em caso de erro.
         """
         try:
-            # Simula a execução da consulta SQL
-            if "SELECT" in sql.upper():
-                if "EMPLOYEES" in sql.upper():
-                    data = DATABASE_DATA["EMPLOYEES"]
-                    columns = list(data[0].keys()) if data else []
-                    filtered_data = data
-                    if "WHERE" in sql.upper():
-                        condition = sql.split("WHERE")[1].strip()
-                        filtered_data = []
-                        for row in data:
-                            try:
-                                if eval(condition.replace(columns[0], f"row['{columns[0]}']").replace(columns[1], f"row['{columns[1]}']").replace(columns[2], f"row['{columns[2]}']").replace(columns[3], f"row['{columns[3]}']")):
-                                    filtered_data.append(row)
-                            except:
-                                self.console.print(Panel(f"Erro ao avaliar condição: {condition}. Retornando todos os dados.", title="Erro", border_style="red"))
-                                filtered_data = data
-                    if "COUNT(*)" in sql.upper():
-                         return [{"COUNT(*)": len(filtered_data)}], ["COUNT(*)"]
-                    elif "*" in sql:
-                        return filtered_data, columns
-                    else:
-                        selected_columns = [col.strip() for col in sql.split("SELECT")[1].split("FROM")[0].split(",")]
-                        result = []
-                        for row in filtered_data:
-                            new_row = {}
-                            for col in selected_columns:
-                                if col in columns:
-                                    new_row[col] = row[col]
-                            result.append(new_row)
-                        return result, selected_columns
-
-                else:
-                    self.console.print(Panel("Tabela não encontrada. A tabela 'EMPLOYEES' é a única disponível.", title="Erro", border_style="red"))
-                    return None, None
-            elif "INSERT" in sql.upper():
-                table_name = sql.split("INTO")[1].split("(")[0].strip()
-                if table_name == "EMPLOYEES":
-                    columns_str = sql.split("(")[1].split(")")[0].split(",")
-                    values_str = sql.split("VALUES")[1].split(")")[0].split(",")
-                    columns = [col.strip() for col in columns_str]
-                    values = [eval(v.strip()) for v in values_str]  # Use eval carefully!
-                    if len(columns) != len(values):
-                        self.console.print(Panel("Número de colunas e valores não correspondem.", title="Erro", border_style="red"))
-                        return None, None
-                    new_employee = dict(zip(columns, values))
-                    DATABASE_DATA["EMPLOYEES"].append(new_employee)
-                    self.console.print(Panel(f"Novo empregado inserido: {new_employee}", title="Sucesso", border_style="green"))
-                    return None, None
-                else:
-                    self.console.print(Panel("Tabela não encontrada. A tabela 'EMPLOYEES' é a única disponível.", title="Erro", border_style="red"))
-                    return None, None
-            else:
-                self.console.print(Panel("Consulta não suportada. Use SELECT ou INSERT.", title="Erro", border_style="red"))
-                return None, None
-        except Exception as e:
+            resultado = self.sql_engine.executar(sql, params or ())
+        except ConsultaSQLError as e:
             self.console.print(Panel(f"Erro ao executar consulta SQL: {e}", title="Erro", border_style="red"))
             return None, None
 
+        if resultado["truncado"]:
+            self.console.print(Panel(f"Resultado limitado a {self.sql_engine.limite_linhas} linhas.", title="Aviso", border_style="yellow"))
+        return resultado["linhas"], resultado["colunas"]
+
+    def generate_sql_for_question(self, question):
+        """
+        Converte a pergunta em SQL com o Gemini, reaproveitando o SQL de perguntas repetidas.
+
+        Args:
+            question (str): A pergunta do usuário.
+
+        Returns:
+            str: A consulta SQL gerada, ou None em caso de erro.
+        """
+        chave = " ".join(question.lower().split())
+        if chave not in self._cache_perguntas:
+            prompt = PROMPT_SQL_MUST.format(esquema=self.sql_engine.descrever_esquema())
+            sql_query = self.generate_gemini_response(prompt, question)
+            if not sql_query:
+                return None
+            self._cache_perguntas[chave] = sql_query.strip()
+        return self._cache_perguntas[chave]
+
     def read_excel_file(self, file_path):
         """
         Lê um arquivo Excel usando o Pandas.
@@ -235,7 +214,7 @@ class C3PO:
             ("1", "Executar Consulta SQL"),
             ("2", "Interagir com Arquivos"),
             ("3", "Conversar com o Chatbot"),
-            ("4", "Inserir dados de exemplo"),
+            ("4", "Recarregar base MUST"),
             ("0", "Sair"),
         ])
         while True:
@@ -259,21 +238,8 @@ class C3PO:
         Executa a funcionalidade de consulta SQL no terminal.
         """
         console = Console()
-        prompt = [
-            """
-            Atue como um especialista em converter perguntas em consulta SQL
-            O banco de dados SQL tem o nome EMPLOYEES e tem as seguintes colunas - NAME, EMPLOYEEID,
-            AGE e EXPERIENCE. Por exemplo:
-            - Exemplo 1: "Quantos registros estão presentes?" resultaria no comando SQL:
-              SELECT COUNT(*) FROM EMPLOYEES;
-            - Exemplo 2: "Me diga todos os empregados com mais de 2 anos de experiência?" resultaria em:
-              SELECT * FROM EMPLOYEES WHERE EXPERIENCE >= 2;
-            Além disso, garanta que o código SQL de saída não contenha ``` no início ou no fim, nem a palavra "sql" nele.
-            """
-        ]
-
         question = Prompt.ask(console, "Faça uma pergunta SQL")
-        sql_query = self.generate_gemini_response(prompt[0], question)
+        sql_query = self.generate_sql_for_question(question)
         if sql_query:
             console.print(Panel(f"Consulta SQL Gerada:\n{sql_query}", title="Consulta SQL", border_style="blue"))
             response, columns = self.execute_sql_query(sql_query)
@@ -335,20 +301,20 @@ class C3PO:
 
     def terminal_insert_data(self):
         """
-        Executa a inserção de dados de exemplo no terminal.
+        Recarrega a base MUST a partir dos artefatos (o motor SQL é somente leitura).
         """
         console = Console()
-        console.print(Panel("Inserindo dados de exemplo na tabela EMPLOYEES.", border_style="green"))
-        sql = "INSERT INTO EMPLOYEES (NAME, EMPLOYEEID, AGE, EXPERIENCE) VALUES ('Novo Empregado', 6, 30, 5)"
-        self.execute_sql_query(sql)
-        console.print(Panel("Dados de exemplo inseridos com sucesso.", border_style="green"))
+        console.print(Panel("Recarregando a base MUST a partir dos artefatos.", border_style="green"))
+        self.sql_engine.carregar(forcar=True)
+        self._cache_perguntas.clear()
+        console.print(Panel("Base MUST recarregada com sucesso.", border_style="green"))
 
     def streamlit_ui(self):
         """
         Cria a interface do Streamlit.
         """
         st.title("C3PO")
-        menu = ["Consulta SQL", "Interagir com Arquivos", "Conversar com o Chatbot", "Inserir Dados de Exemplo"]
+        menu = ["Consulta SQL", "Interagir com Arquivos", "Conversar com o Chatbot", "Recarregar Base MUST"]
         choice = st.sidebar.selectbox("Menu", menu)
 
         if choice == "Consulta SQL":
@@ -357,7 +323,7 @@ class C3PO:
             self.streamlit_file_interaction()
         elif choice == "Conversar com o Chatbot":
             self.streamlit_chatbot()
-        elif choice == "Inserir Dados de Exemplo":
+        elif choice == "Recarregar Base MUST":
             self.streamlit_insert_data()
 
     def streamlit_sql_query(self):
@@ -365,28 +331,15 @@ class C3PO:
         Executa a funcionalidade de consulta SQL no Streamlit.
         """
         st.header("Executar Consulta SQL")
-        prompt = [
-            """
-            Atue como um especialista em converter perguntas em consulta SQL
-            O banco de dados SQL tem o nome EMPLOYEES e tem as seguintes colunas - NAME, EMPLOYEEID,
-            AGE e EXPERIENCE. Por exemplo:
-            - Exemplo 1: "Quantos registros estão presentes?" resultaria no comando SQL:
-              SELECT COUNT(*) FROM EMPLOYEES;
-            - Exemplo 2: "Me diga todos os empregados com mais de 2 anos de experiência?" resultaria em:
-              SELECT * FROM EMPLOYEES WHERE EXPERIENCE >= 2;
-            Além disso, garanta que o código SQL de saída não contenha ``` no início ou no fim, nem a palavra "sql" nele.
-            """
-        ]
 
         question = st.text_input("Faça uma pergunta SQL:", key="sql_input")
         submit_sql = st.button("Executar Consulta SQL")
 
         if submit_sql and question:
-            sql_query = self.generate_gemini_response(prompt[0], question)
+            sql_query = self.generate_sql_for_question(question)
             if sql_query:
                 st.subheader("Consulta SQL Gerada:")
                 st.code(sql_query)
-                # Removi a necessidade de server, database, uid e pwd
                 response, columns = self.execute_sql_query(sql_query)
                 st.subheader("Resposta da Consulta SQL:")
                 self.display_data(response, columns)
@@ -448,20 +401,24 @@ class C3PO:
 
     def streamlit_insert_data(self):
         """
-        Executa a inserção de dados de exemplo no Streamlit.
+        Recarrega a base MUST a partir dos artefatos no Streamlit.
         """
-        st.header("Inserir Dados de Exemplo")
-        if st.button("Inserir Dados de Exemplo"):
-            sql = "INSERT INTO EMPLOYEES (NAME, EMPLOYEEID, AGE, EXPERIENCE) VALUES ('Novo Empregado', 6, 30, 5)"
-            self.execute_sql_query(sql)
-            st.success("Dados de exemplo inseridos com sucesso.")
+        st.header("Recarregar Base MUST")
+        if st.button("Recarregar Base MUST"):
+            self.sql_engine.carregar(forcar=True)
+            self._cache_perguntas.clear()
+            st.success("Base MUST recarregada com sucesso.")
+
+@st.cache_resource
+def get_c3po():
+    """Mantém uma única instância (motor SQL e caches) entre os reruns do Streamlit."""
+    return C3PO()
 
 def main():
-    c3po = C3PO()
     if len(sys.argv) > 1 and sys.argv[1] == "terminal":
-        c3po.terminal_menu()
+        C3PO().terminal_menu()
     else:
-        c3po.streamlit_ui()
+        get_c3po().streamlit_ui()
 
 if __name__ == "__main__":
     import sys
@@ -2,11 +2,13 @@ import streamlit as st
 import google.generativeai as genai
 from dotenv import load_dotenv
 import os
-from typing import List, Dict
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
+import hashlib
 import tempfile
-from io import BytesIO
+import threading
+from pathlib import Path
+from typing import List, Dict
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # --- 1. CONFIGURAÇÕES INICIAIS E DE ESTILO ---
 
@@ -98,6 +100,7 @@ class UseStateController:
             "active_pdf_preview": None,
             "active_pdf_bytes": None,
             "active_pdf_name": None,
+            "active_pdf_hash": None,
         }
         self.initialize_state()
 
@@ -113,13 +116,130 @@ class UseStateController:
             st.session_state[key].append(item)
 
     def clear_all_data(self):
-        for key in ["chat_messages", "system_instructions", "pdf_context", "active_pdf_preview", "active_pdf_bytes", "active_pdf_name"]:
+        for key in ["chat_messages", "system_instructions", "pdf_context", "active_pdf_preview", "active_pdf_bytes", "active_pdf_name", "active_pdf_hash"]:
             st.session_state[key] = self.defaults.get(key, [])
         st.success("Todos os dados (chat, instruções, PDFs) foram limpos!")
 
+class PDFPreviewService:
+    """
+    Renderiza páginas sob demanda com PyMuPDF e guarda em disco, por hash do
+    conteúdo e página, as miniaturas (PNG por DPI) e o texto extraído.
+    A renderização roda num pool de threads, fora da thread da interface.
+
+    Em memória ficam só as renderizações em andamento (para não duplicar pedidos
+    simultâneos) e um LRU pequeno com o número de páginas; o que já terminou é
+    servido do disco.
+    """
+    def __init__(self, cache_dir: str = None, max_workers: int = 2, max_pdfs: int = 32):
+        self.cache_dir = Path(cache_dir or Path(tempfile.gettempdir()) / "palkia_pdf_cache")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview-pdf")
+        self.max_pdfs = max_pdfs
+        self._futuros = {}
+        self._num_paginas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_pdf(pdf_bytes: bytes) -> str:
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    def _pasta(self, pdf_hash: str) -> Path:
+        pasta = self.cache_dir / pdf_hash
+        pasta.mkdir(exist_ok=True)
+        return pasta
+
+    def num_paginas(self, pdf_bytes: bytes, pdf_hash: str) -> int:
+        with self._lock:
+            if pdf_hash in self._num_paginas:
+                self._num_paginas.move_to_end(pdf_hash)
+                return self._num_paginas[pdf_hash]
+        import fitz
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            total = doc.page_count
+        with self._lock:
+            self._num_paginas[pdf_hash] = total
+            if len(self._num_paginas) > self.max_pdfs:
+                self._num_paginas.popitem(last=False)
+        return total
+
+    @staticmethod
+    def _caminho_miniatura(pasta: Path, pagina: int, dpi: int) -> Path:
+        return pasta / f"p{pagina}_{dpi}dpi.png"
+
+    def _renderizar(self, pdf_bytes: bytes, pdf_hash: str, pagina: int, dpi: int) -> bytes:
+        import fitz
+        destino = self._caminho_miniatura(self._pasta(pdf_hash), pagina, dpi)
+        if destino.exists():
+            return destino.read_bytes()
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            png = doc.load_page(pagina).get_pixmap(dpi=dpi).tobytes("png")
+        tmp = destino.with_suffix(".tmp")
+        tmp.write_bytes(png)
+        tmp.replace(destino)
+        return png
+
+    def solicitar_miniatura(self, pdf_bytes: bytes, pdf_hash: str, pagina: int, dpi: int = 72):
+        """Agenda (ou reaproveita) a renderização de uma página. Retorna um Future com o PNG."""
+        destino = self._caminho_miniatura(self._pasta(pdf_hash), pagina, dpi)
+        if destino.exists():
+            # Página já renderizada: vem do disco, sem passar pelo pool
+            futuro = Future()
+            futuro.set_result(destino.read_bytes())
+            return futuro
+
+        chave = (pdf_hash, pagina, dpi)
+        with self._lock:
+            futuro = self._futuros.get(chave)
+            novo = futuro is None
+            if novo:
+                futuro = self.executor.submit(self._renderizar, pdf_bytes, pdf_hash, pagina, dpi)
+                self._futuros[chave] = futuro
+        if novo:
+            # Fora do lock: o callback roda na hora se o Future já tiver terminado
+            futuro.add_done_callback(lambda f, chave=chave: self._descartar(chave, f))
+        return futuro
+
+    def _descartar(self, chave, futuro):
+        """Tira do dicionário um Future concluído (o PNG fica só no disco; uma falha é refeita no próximo pedido)."""
+        with self._lock:
+            if self._futuros.get(chave) is futuro:
+                del self._futuros[chave]
+
+    def texto_pagina(self, pdf_bytes: bytes, pdf_hash: str, pagina: int, doc=None) -> str:
+        """Texto de uma página, extraído uma única vez e reaproveitado do cache em disco."""
+        destino = self._pasta(pdf_hash) / f"p{pagina}.txt"
+        if destino.exists():
+            return destino.read_text(encoding="utf-8")
+        if doc is None:
+            import fitz
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc_local:
+                texto = doc_local.load_page(pagina).get_text()
+        else:
+            texto = doc.load_page(pagina).get_text()
+        destino.write_text(texto, encoding="utf-8")
+        return texto
+
+    def textos_paginas(self, pdf_bytes: bytes, pdf_hash: str, paginas: List[int]) -> Dict[int, str]:
+        """Texto de várias páginas; o PDF só é aberto se alguma página ainda não estiver no cache."""
+        pasta = self._pasta(pdf_hash)
+        faltando = [p for p in paginas if not (pasta / f"p{p}.txt").exists()]
+        if not faltando:
+            return {p: self.texto_pagina(pdf_bytes, pdf_hash, p) for p in paginas}
+        import fitz
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return {p: self.texto_pagina(pdf_bytes, pdf_hash, p, doc=doc) for p in paginas}
+
+
+@st.cache_resource
+def get_preview_service() -> PDFPreviewService:
+    """Uma instância por processo do Streamlit (pool de threads e cache compartilhados)."""
+    return PDFPreviewService()
+
+
 class PDFController:
-    def __init__(self, state_controller: UseStateController):
+    def __init__(self, state_controller: UseStateController, preview_service: PDFPreviewService = None):
         self.state = state_controller
+        self.preview = preview_service or get_preview_service()
 
     @staticmethod
     def parse_page_string(page_str: str, max_pages: int) -> list[int]:
@@ -137,27 +257,33 @@ class PDFController:
                 except ValueError: pass
         return sorted([p for p in pages if 0 <= p < max_pages])
 
+    def num_pages(self) -> int:
+        """Número de páginas do PDF ativo (lido uma vez por conteúdo)."""
+        return self.preview.num_paginas(self.state.get("active_pdf_bytes"), self.state.get("active_pdf_hash"))
+
     def extract_text_from_pages(self, pdf_file_bytes: bytes, pages_to_process: List[int]) -> str:
         try:
-            reader = PdfReader(BytesIO(pdf_file_bytes))
-            text_content = [f"--- CONTEÚDO DA PÁGINA {i + 1} ---\n{reader.pages[i].extract_text() or ''}\n" for i in pages_to_process]
+            pdf_hash = self.state.get("active_pdf_hash") or self.preview.hash_pdf(pdf_file_bytes)
+            textos = self.preview.textos_paginas(pdf_file_bytes, pdf_hash, pages_to_process)
+            text_content = [f"--- CONTEÚDO DA PÁGINA {i + 1} ---\n{textos[i] or ''}\n" for i in pages_to_process]
             return "\n".join(text_content)
         except Exception as e:
             st.error(f"Erro ao extrair texto: {e}")
             return ""
 
-    def generate_and_store_preview(self):
-        pdf_bytes = self.state.get("active_pdf_bytes")
-        if pdf_bytes:
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                    tmp.write(pdf_bytes)
-                images = convert_from_path(tmp.name, first_page=1, last_page=5)
-                os.unlink(tmp.name)
-                self.state.set("active_pdf_preview", images)
-            except Exception:
-                self.state.set("active_pdf_preview", None)
-                st.warning("Não foi possível gerar a pré-visualização. Verifique se o Poppler está instalado corretamente no seu sistema.")
+    def request_preview(self, pages: List[int], dpi: int = 72) -> list:
+        """
+        Agenda a renderização das páginas pedidas em segundo plano.
+
+        Returns:
+            list: [(página, Future)] na ordem pedida.
+        """
+        pdf_bytes, pdf_hash = self.state.get("active_pdf_bytes"), self.state.get("active_pdf_hash")
+        if not pdf_bytes:
+            return []
+        futuros = [(p, self.preview.solicitar_miniatura(pdf_bytes, pdf_hash, p, dpi)) for p in pages]
+        self.state.set("active_pdf_preview", {"pages": list(pages), "dpi": dpi})
+        return futuros
     
     def add_pdf_context_to_session(self, file_name: str, extracted_text: str):
         if extracted_text.strip():
@@ -248,17 +374,27 @@ def MenuLateral(state: UseStateController, pdf_controller: PDFController):
             uploaded_file = st.file_uploader("Carregue um arquivo PDF:", type="pdf", key="pdf_uploader")
             
             if uploaded_file and uploaded_file.getvalue() != state.get("active_pdf_bytes"):
-                with st.spinner("Gerando pré-visualização..."):
-                    state.set("active_pdf_bytes", uploaded_file.getvalue())
-                    state.set("active_pdf_name", uploaded_file.name)
-                    pdf_controller.generate_and_store_preview()
+                # Nada é renderizado no upload: as páginas são geradas quando pedidas
+                state.set("active_pdf_bytes", uploaded_file.getvalue())
+                state.set("active_pdf_name", uploaded_file.name)
+                state.set("active_pdf_hash", pdf_controller.preview.hash_pdf(uploaded_file.getvalue()))
+                state.set("active_pdf_preview", None)
 
             if state.get("active_pdf_bytes"):
                 st.markdown(f"**Arquivo ativo: `{state.get('active_pdf_name')}`**")
-                if state.get("active_pdf_preview"):
-                    st.image(state.get("active_pdf_preview"), use_column_width=True, caption="Pré-visualização das primeiras páginas")
-                
-                num_pages = len(PdfReader(BytesIO(state.get("active_pdf_bytes"))).pages)
+                num_pages = pdf_controller.num_pages()
+
+                if st.checkbox("🖼️ Mostrar pré-visualização", key="show_preview"):
+                    preview_pages = st.text_input(f"Páginas para visualizar (1-{num_pages}):", value="1", key="preview_selector")
+                    dpi = st.select_slider("Resolução (DPI):", options=[50, 72, 100, 150], value=72, key="preview_dpi")
+                    futuros = pdf_controller.request_preview(pdf_controller.parse_page_string(preview_pages, num_pages)[:10], dpi)
+                    prontas = [(p, f.result()) for p, f in futuros if f.done() and f.exception() is None]
+                    if prontas:
+                        st.image([png for _, png in prontas], caption=[f"Página {p + 1}" for p, _ in prontas], use_column_width=True)
+                    if len(prontas) < len(futuros):
+                        st.info(f"Renderizando {len(futuros) - len(prontas)} página(s) em segundo plano...")
+                        st.button("🔄 Atualizar pré-visualização", key="refresh_preview")
+
                 page_selection = st.text_input(f"Páginas para processar (1-{num_pages}, ex: 1-3,5,all):", key="page_selector")
                 
                 if st.button(f"Processar Páginas"):
@@ -4,11 +4,16 @@ from PyPDF2 import PdfReader
 from typing import Dict
 
 class MiniPowerQuery:
-    def __init__(self, file_path: str = None):
-        self.df = pd.DataFrame()
+    def __init__(self, file_path: str = None, df: pd.DataFrame = None):
+        self.df = df if df is not None else pd.DataFrame()
         self.file_path = file_path
         self.pdf_info = {}
 
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        """Inicia a consulta direto de um DataFrame em memória (sem arquivo intermediário)."""
+        return cls(df=df.copy())
+
     # -------------------- ANÁLISE INICIAL DO PDF --------------------
     def analyze_pdf(self, file_path: str):
         """Analisa o PDF para mostrar informações sobre tabelas e páginas."""
@@ -220,8 +225,13 @@ class MiniPowerQuery:
         return self
 
     # -------------------- OPERAÇÕES AUXILIARES --------------------
-    def drop_nulls(self, cols=None):
-        self.df = self.df.dropna(subset=cols)
+    def drop_nulls(self, cols=None, how: str = 'any'):
+        self.df = self.df.dropna(subset=cols, how=how)
+        return self
+
+    def blank_to_null(self):
+        """Células vazias viram nulas (como acontece ao ler um CSV), para o drop_nulls enxergá-las."""
+        self.df = self.df.replace(r'^\s*$', float('nan'), regex=True)
         return self
 
     def drop_duplicates(self, cols=None):
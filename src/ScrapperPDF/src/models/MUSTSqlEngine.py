@@ -0,0 +1,232 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+
+# Artefato consolidado das tabelas MUST (gerado pelo pipeline de extração dos PDFs)
+CAMINHO_JSON_MUST = Path(__file__).resolve().parents[2] / "database" / "must_tables_PDF_notes_merged.json"
+
+ANOS_MUST = (2025, 2026, 2027, 2028)
+PERIODOS_MUST = {"Ponta": "ponta", "Fora Ponta": "fora_ponta"}
+
+
+class ConsultaSQLError(Exception):
+    """Consulta rejeitada (escrita, timeout) ou inválida."""
+    pass
+
+
+def nome_coluna_sql(nome: str) -> str:
+    """'Cód ONS' -> 'cod_ons', 'Tensão (kV)' -> 'tensao_kv', 'Ponta 2025 Valor' -> 'ponta_2025_valor'."""
+    nome = unicodedata.normalize("NFKD", str(nome))
+    nome = "".join(c for c in nome if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", "_", nome).strip("_")
+
+
+def converter_valor_must(valor):
+    """Converte '44,700' (vírgula decimal) em 44.7; '-' e vazios viram None."""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip().replace(".", "").replace(",", ".")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+class MUSTSqlEngine:
+    """
+    Motor SQL embutido (SQLite) para a ferramenta de dados do chatbot.
+
+    Carrega os artefatos da base MUST num arquivo SQLite (reconstruído só quando
+    o JSON de origem muda) e executa consultas em modo somente leitura, com
+    parâmetros vinculados, timeout, limite de linhas e cache de resultados.
+
+    Tabelas:
+        must_tabelas: uma linha por registro extraído (formato largo, como no JSON).
+        valores_must: formato longo (cod_ons, empresa, ano, periodo, valor_mw, anotacao).
+    """
+    # SQLITE_RECURSIVE (33) libera CTEs recursivas; o timeout continua valendo para elas
+    _ACOES_PERMITIDAS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, getattr(sqlite3, "SQLITE_RECURSIVE", 33)}
+
+    def __init__(self, json_path=CAMINHO_JSON_MUST, db_path=None, timeout_s: float = 5.0,
+                 limite_linhas: int = 1000, tamanho_cache: int = 128):
+        self.json_path = Path(json_path)
+        self.db_path = Path(db_path) if db_path else self.json_path.with_suffix(".sqlite")
+        self.timeout_s = timeout_s
+        self.limite_linhas = limite_linhas
+        self.tamanho_cache = tamanho_cache
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.carregar()
+
+    # ------------------------------------------------------------------
+    # Carga dos artefatos
+    # ------------------------------------------------------------------
+    def _precisa_reconstruir(self) -> bool:
+        if not self.db_path.exists():
+            return True
+        return self.json_path.exists() and self.json_path.stat().st_mtime > self.db_path.stat().st_mtime
+
+    def _construir_banco(self):
+        """Monta o arquivo SQLite a partir do JSON MUST (escrita só acontece aqui)."""
+        with open(self.json_path, "r", encoding="utf-8") as f:
+            registros = json.load(f)
+
+        colunas_origem = list(dict.fromkeys(k for r in registros for k in r))
+        colunas = [nome_coluna_sql(c) for c in colunas_origem]
+
+        tmp_path = self.db_path.with_suffix(".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute(f"CREATE TABLE must_tabelas (id INTEGER PRIMARY KEY, {', '.join(f'{c} TEXT' for c in colunas)})")
+            conn.executemany(
+                f"INSERT INTO must_tabelas ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                ([None if r.get(c) is None else str(r.get(c)) for c in colunas_origem] for r in registros),
+            )
+
+            conn.execute("""
+                CREATE TABLE valores_must (
+                    id_registro INTEGER, cod_ons TEXT, empresa TEXT, tensao_kv REAL,
+                    de TEXT, ate TEXT, ano INTEGER, periodo TEXT, valor_mw REAL, anotacao TEXT
+                )
+            """)
+            linhas = []
+            for id_registro, r in enumerate(registros, start=1):
+                for ano in ANOS_MUST:
+                    for rotulo, periodo in PERIODOS_MUST.items():
+                        if f"{rotulo} {ano} Valor" not in r:
+                            continue
+                        linhas.append((
+                            id_registro, r.get("Cód ONS"), r.get("EMPRESA"), converter_valor_must(r.get("Tensão (kV)")),
+                            r.get("De"), r.get("Até"), ano, periodo,
+                            converter_valor_must(r.get(f"{rotulo} {ano} Valor")), r.get(f"{rotulo} {ano} Anotacao"),
+                        ))
+            conn.executemany("INSERT INTO valores_must VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+
+            conn.execute("CREATE INDEX idx_must_cod_ons ON must_tabelas (cod_ons)")
+            conn.execute("CREATE INDEX idx_valores_cod_ons ON valores_must (cod_ons, ano, periodo)")
+            conn.execute("CREATE INDEX idx_valores_empresa ON valores_must (empresa, ano, periodo)")
+            conn.commit()
+        finally:
+            conn.close()
+        tmp_path.replace(self.db_path)
+        print(f"Base MUST carregada no SQLite: {len(registros)} registros, {len(linhas)} valores -> {self.db_path.name}")
+
+    def carregar(self, forcar: bool = False):
+        """(Re)abre o banco em modo somente leitura, reconstruindo-o se o artefato mudou."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if forcar or self._precisa_reconstruir():
+                self._construir_banco()
+
+            self._conn = sqlite3.connect(f"file:{self.db_path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+            self._conn.execute("PRAGMA query_only = ON")
+            self._conn.set_authorizer(self._autorizar)
+            self._cache.clear()
+
+    def _autorizar(self, acao, *args):
+        # Só leitura: qualquer escrita, DDL, ATTACH ou PRAGMA é negada pelo SQLite antes de executar
+        return sqlite3.SQLITE_OK if acao in self._ACOES_PERMITIDAS else sqlite3.SQLITE_DENY
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def descrever_esquema(self) -> str:
+        """Resumo das tabelas e colunas, usado no prompt que gera o SQL."""
+        linhas = []
+        for tabela in ("must_tabelas", "valores_must"):
+            colunas = self.executar(f"SELECT * FROM {tabela} LIMIT 0")["colunas"]
+            linhas.append(f"{tabela} ({', '.join(colunas)})")
+        return "\n".join(linhas)
+
+    def executar(self, sql: str, params=(), limite_linhas: int = None, usar_cache: bool = True) -> dict:
+        """
+        Executa uma consulta somente leitura.
+
+        Args:
+            sql (str): Um único comando SELECT (placeholders `?` ou `:nome`).
+            params (tuple | dict): Parâmetros vinculados ao comando.
+            limite_linhas (int): Máximo de linhas retornadas (padrão do motor se None).
+            usar_cache (bool): Reaproveita o resultado de uma consulta idêntica.
+
+        Returns:
+            dict: {"linhas": [dict], "colunas": [str], "truncado": bool, "tempo_s": float, "cache": bool}
+        """
+        sql = sql.strip().rstrip(";").strip()
+        limite = limite_linhas or self.limite_linhas
+        params = params or ()
+        chave = (re.sub(r"\s+", " ", sql), json.dumps(params, sort_keys=True, default=str), limite)
+
+        if usar_cache:
+            with self._lock:
+                if chave in self._cache:
+                    self._cache.move_to_end(chave)
+                    return {**self._cache[chave], "cache": True}
+
+        inicio = time.perf_counter()
+        prazo = inicio + self.timeout_s
+        with self._lock:
+            # Interrompe a consulta quando passa do prazo (checado a cada ~10k instruções da VM)
+            self._conn.set_progress_handler(lambda: 1 if time.perf_counter() > prazo else 0, 10000)
+            try:
+                cursor = self._conn.execute(sql, params)
+                colunas = [d[0] for d in cursor.description] if cursor.description else []
+                brutas = cursor.fetchmany(limite + 1)
+            except sqlite3.OperationalError as e:
+                if "interrupted" in str(e):
+                    raise ConsultaSQLError(f"Consulta excedeu o tempo limite de {self.timeout_s}s") from e
+                raise ConsultaSQLError(str(e)) from e
+            except (sqlite3.DatabaseError, sqlite3.Warning) as e:
+                # Inclui "not authorized" (escrita negada) e múltiplos comandos
+                raise ConsultaSQLError(str(e)) from e
+            finally:
+                self._conn.set_progress_handler(None, 0)
+
+        resultado = {
+            "linhas": [dict(zip(colunas, linha)) for linha in brutas[:limite]],
+            "colunas": colunas,
+            "truncado": len(brutas) > limite,
+            "tempo_s": time.perf_counter() - inicio,
+            "cache": False,
+        }
+        if usar_cache:
+            with self._lock:
+                self._cache[chave] = resultado
+                if len(self._cache) > self.tamanho_cache:
+                    self._cache.popitem(last=False)
+        return resultado
+
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+if __name__ == "__main__":
+    engine = MUSTSqlEngine()
+    print(engine.descrever_esquema())
+
+    consulta = "SELECT empresa, COUNT(DISTINCT cod_ons) AS pontos, ROUND(SUM(valor_mw), 1) AS must_total_mw FROM valores_must WHERE ano = ? AND periodo = ? GROUP BY empresa ORDER BY must_total_mw DESC"
+    for _ in range(2):
+        resultado = engine.executar(consulta, (2025, "ponta"))
+        print(f"{len(resultado['linhas'])} linhas em {resultado['tempo_s'] * 1000:.2f} ms (cache: {resultado['cache']})")
+    for linha in resultado["linhas"]:
+        print(linha)
+
+    try:
+        engine.executar("DELETE FROM valores_must")
+    except ConsultaSQLError as e:
+        print(f"Escrita bloqueada: {e}")
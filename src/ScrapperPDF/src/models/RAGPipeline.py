@@ -1,5 +1,4 @@
 import os
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -90,22 +89,38 @@ class RAGPipeline:
         # Ferramenta para criar um banco de dados em memória para buscar vetores similares.
         from langchain_community.vectorstores import FAISS
         
-        #! --- CORREÇÃO: PROCESSAMENTO EM LOTES PARA EVITAR RATE LIMIT ---
-        batch_size = 100  # Número de chunks a processar por vez
-        
-        print(f"  - Processando o primeiro lote de {min(batch_size, len(chunks))} chunks...")
-        self.vectorstore = FAISS.from_documents(chunks[:batch_size], embeddings)
-        
-        # Processa o restante dos chunks em lotes, com uma pausa entre eles
-        for i in range(batch_size, len(chunks), batch_size):
+        #! --- Lotes agendados por token bucket (requisições e tokens por minuto) ---
+        # Substitui a pausa fixa de 62s: os lotes saem assim que há cota disponível,
+        # vários lotes ficam em voo e um 429 reduz a taxa e refaz o lote com jitter.
+        # Agendador compartilhado com as pipelines em automate/RAG (pacote a partir de src/)
+        from automate.RAG.embedding_scheduler import EmbeddingScheduler
 
-            print(f"\n  - Aguardando 62 segundos para respeitar o limite da API...")
-            time.sleep(62)  # Pausa para o limite de RPM resetar
-            
-            batch = chunks[i:i + batch_size]
-            print(f"  - Processando próximo lote de {len(batch)} chunks (iniciando no índice {i})...")
-            
-            self.vectorstore.add_documents(batch)
+        scheduler = EmbeddingScheduler(
+            embeddings.embed_documents,
+            batch_size=100,  # Número de chunks a processar por vez
+            requisicoes_por_minuto=100,
+            tokens_por_minuto=30000,
+            max_concorrencia=4,
+            checkpoint_path=self.pdf_directory / "embeddings_checkpoint.jsonl",
+        )
+
+        textos = [c.page_content for c in chunks]
+        # IDs pelo conteúdo: um checkpoint só é reaproveitado se o chunk for idêntico
+        import hashlib
+        ids = [
+            hashlib.sha1(f"{Path(c.metadata.get('source', '')).name}|{c.metadata.get('page', 0)}|{c.page_content}".encode("utf-8")).hexdigest()
+            for c in chunks
+        ]
+        print(f"  - Gerando embeddings de {len(chunks)} chunks em lotes de {scheduler.batch_size}...")
+        vetores = scheduler.embed(textos, ids)
+        print(f"  - Embeddings gerados em {scheduler.metricas['total_s']:.1f}s "
+              f"({scheduler.metricas['do_checkpoint']} reaproveitados do checkpoint, "
+              f"{scheduler.metricas['retentativas']} novas tentativas).")
+
+        self.vectorstore = FAISS.from_embeddings(
+            list(zip(textos, vetores)), embeddings, metadatas=[c.metadata for c in chunks]
+        )
+        scheduler.limpar_checkpoint()
 
         # O retriever é o componente que busca os chunks relevantes para uma pergunta.
         self.retriever = self.vectorstore.as_retriever(
@@ -207,6 +222,8 @@ class RAGPipeline:
 
 # --- Bloco Principal de Execução ---
 if __name__ == "__main__":
+    # Execute a partir de src/ para que o pacote automate.RAG seja encontrado:
+    #   python -m models.RAGPipeline
     #GOOGLE_API_KEY = os.getenv('GEMINI_API_KEY')
     
     # Use uma das suas chaves de API
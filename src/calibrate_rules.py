@@ -0,0 +1,281 @@
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+from collections import Counter
+
+import fitz
+
+from configs.rules.notas import MANUAL_RULES, load_rules, save_rules, list_versions
+from start import PDFTableExtractor, REGIOES, list_files
+
+logging.basicConfig(level=logging.INFO)
+
+# Parâmetros da clusterização (em pontos do PDF)
+GAP_LINHA = 3       # tolerância vertical para palavras da mesma linha
+GAP_BLOCOS = 18     # espaço em branco vertical que separa dois blocos de texto
+GAP_COLUNAS = 6     # espaço horizontal mínimo entre duas células
+MARGEM = 4
+
+
+def pdf_folder(corretora):
+    return os.path.abspath(f"src/files/pdf/{corretora}/")
+
+
+def open_pdf(pdf_path, password=None):
+    doc = fitz.open(pdf_path)
+    if doc.needs_pass:
+        doc.authenticate(password or "")
+    return doc
+
+
+def page_lines(page):
+    """Agrupa as palavras da página em linhas (coordenadas do PyMuPDF, origem no topo)."""
+    words = sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+    lines = []
+    for x0, top, x1, bottom, text, *_ in words:
+        center = (top + bottom) / 2
+        if lines and abs(center - lines[-1]["center"]) <= GAP_LINHA:
+            line = lines[-1]
+        else:
+            line = {"center": center, "top": top, "bottom": bottom, "words": []}
+            lines.append(line)
+        line["top"], line["bottom"] = min(line["top"], top), max(line["bottom"], bottom)
+        line["words"].append((x0, x1, text))
+    for line in lines:
+        line["words"].sort()
+        line["cells"] = line_cells(line["words"])
+    return lines
+
+
+def line_cells(words):
+    """Junta as palavras vizinhas de uma linha em células: [(x0, x1, texto)]."""
+    cells = []
+    for x0, x1, text in words:
+        if cells and x0 - cells[-1][1] < GAP_COLUNAS:
+            cx0, _, ctext = cells[-1]
+            cells[-1] = (cx0, x1, f"{ctext} {text}")
+        else:
+            cells.append((x0, x1, text))
+    return cells
+
+
+def text_blocks(lines, gap=GAP_BLOCOS):
+    """Separa as linhas em blocos sempre que o espaço em branco vertical passa de `gap`."""
+    blocks = []
+    for line in lines:
+        if blocks and line["top"] - blocks[-1][-1]["bottom"] <= gap:
+            blocks[-1].append(line)
+        else:
+            blocks.append([line])
+    return blocks
+
+
+def find_regions(blocks):
+    """
+    Identifica as regiões da nota entre os blocos de texto:
+    - main: o bloco com mais linhas (a tabela de operações);
+    - header: o bloco de rótulos/valores imediatamente acima dele;
+    - small: tudo o que vem abaixo dele (resumo de taxas).
+
+    Retorna {regiao: {"lines": [...], "next_top": topo do bloco seguinte ou None}}.
+    """
+    if not blocks:
+        return {}
+    main = max(range(len(blocks)), key=lambda i: len(blocks[i]))
+    above = [i for i in range(main) if len(blocks[i]) >= 2]
+    spans = {"main": (main, main)}
+    if above:
+        spans["header"] = (above[-1], above[-1])
+    if main + 1 < len(blocks):
+        spans["small"] = (main + 1, len(blocks) - 1)
+
+    return {
+        region: {
+            "lines": [line for block in blocks[first:last + 1] for line in block],
+            "next_top": blocks[last + 1][0]["top"] if last + 1 < len(blocks) else None,
+        }
+        for region, (first, last) in spans.items()
+    }
+
+
+def pdf_regions(pdf_path, password=None):
+    """Regiões encontradas em cada página do PDF: [(altura da página, regiões)]."""
+    with open_pdf(pdf_path, password) as doc:
+        return [(page.rect.height, find_regions(text_blocks(page_lines(page)))) for page in doc]
+
+
+def column_separators(lines):
+    """Separadores de colunas no meio dos vãos que nenhuma célula cobre, em todas as linhas das amostras."""
+    intervals = sorted((x0, x1) for line in lines for x0, x1, _ in line["cells"])
+    merged = []
+    for x0, x1 in intervals:
+        if merged and x0 <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], x1)
+        else:
+            merged.append([x0, x1])
+    return [round((a[1] + b[0]) / 2, 1) for a, b in zip(merged, merged[1:])]
+
+
+def calibrate(corretora, samples=5):
+    """
+    Deriva table_areas e columns de cada região a partir das primeiras
+    `samples` notas da corretora. As demais chaves da regra (fix, flavor,
+    strip_text...) vêm da versão em uso.
+
+    Convenção das regras: a primeira coluna começa na borda esquerda da área
+    e fica vazia, que é a coluna descartada pelo `fix_header`.
+    """
+    base = load_rules(corretora)
+    files = sorted(list_files(pdf_folder(corretora)))[:samples]
+    found = {region: [] for region in REGIOES}
+    for file_name in files:
+        for height, regions in pdf_regions(os.path.join(pdf_folder(corretora), f"{file_name}.pdf"), base["password"]):
+            for region, info in regions.items():
+                found[region].append((height, info))
+
+    rule = dict(base)
+    for region, prefix in REGIOES.items():
+        if not found[region]:
+            logging.warning(f"[{corretora}] região '{region}' não encontrada nas amostras; mantendo a versão anterior")
+            continue
+        height = found[region][0][0]
+        lines = [line for _, info in found[region] for line in info["lines"]]
+        x1 = min(x0 for line in lines for x0, _, _ in line["cells"]) - MARGEM
+        x2 = max(x1_ for line in lines for _, x1_, _ in line["cells"]) + MARGEM
+        top = min(line["top"] for line in lines) - MARGEM
+        # A área vai até perto do bloco seguinte: notas com mais linhas continuam dentro dela
+        next_tops = [info["next_top"] for _, info in found[region] if info["next_top"] is not None]
+        bottom = min(next_tops) - 2 * MARGEM if next_tops else max(line["bottom"] for line in lines) + MARGEM
+
+        area = [x1, height - top, x2, height - bottom]
+        columns = [round(x1, 1)] + column_separators(lines)
+        rule[f"{prefix}table_areas"] = [",".join(f"{v:g}" for v in (round(c, 1) for c in area))]
+        rule[f"{prefix}columns"] = [",".join(f"{v:g}" for v in columns)]
+        logging.info(f"[{corretora}] {region:<6} area={rule[f'{prefix}table_areas'][0]} columns={rule[f'{prefix}columns'][0]}")
+    return rule, files
+
+
+def _normalize(text, strip_text):
+    return "".join(c for c in str(text) if c not in strip_text and not c.isspace())
+
+
+def validate(corretora, rule, files=None):
+    """
+    Extrai todas as notas da corretora com a regra e compara, por região, as
+    células obtidas pelo camelot com as células do layout de texto do PDF.
+
+    Returns:
+        dict: taxa de acerto por região, notas com divergência e tempo médio.
+    """
+    files = files or sorted(list_files(pdf_folder(corretora)))
+    strip_text = rule["strip_text"]
+    stats = {region: {"ok": 0, "total": 0, "cells": 0, "cells_ok": 0} for region in REGIOES}
+    failures = []
+    start_time = time.perf_counter()
+
+    for file_name in files:
+        expected = {region: Counter() for region in REGIOES}
+        for _, regions in pdf_regions(os.path.join(pdf_folder(corretora), f"{file_name}.pdf"), rule["password"]):
+            for region, info in regions.items():
+                for line in info["lines"]:
+                    expected[region].update(_normalize(text, strip_text) for _, _, text in line["cells"])
+
+        try:
+            tables = PDFTableExtractor(file_name, rule).get_tables_data()
+        except Exception as e:
+            failures.append({"arquivo": file_name, "erro": f"{type(e).__name__}: {e}"})
+            for region in REGIOES:
+                stats[region]["total"] += 1
+            continue
+
+        for region, prefix in REGIOES.items():
+            df = tables[region]
+            values = list(df.columns) if rule[f"{prefix}fix"] else []
+            values += df.to_numpy().ravel().tolist()
+            extracted = Counter(v for v in (_normalize(x, strip_text) for x in values) if v)
+
+            matched = sum((expected[region] & extracted).values())
+            total = sum(expected[region].values())
+            region_stats = stats[region]
+            region_stats["total"] += 1
+            region_stats["cells"] += total
+            region_stats["cells_ok"] += matched
+            if matched == total and sum(extracted.values()) == total:
+                region_stats["ok"] += 1
+            else:
+                failures.append({
+                    "arquivo": file_name, "regiao": region,
+                    "faltando": sorted((expected[region] - extracted).elements())[:10],
+                    "sobrando": sorted((extracted - expected[region]).elements())[:10],
+                })
+
+    report = {
+        "arquivos": len(files),
+        "tempo_medio_s": (time.perf_counter() - start_time) / max(len(files), 1),
+        "regioes": {
+            region: {
+                "notas_ok": s["ok"], "notas": s["total"],
+                "taxa_notas": s["ok"] / s["total"] if s["total"] else 0.0,
+                "taxa_celulas": s["cells_ok"] / s["cells"] if s["cells"] else 0.0,
+            }
+            for region, s in stats.items()
+        },
+        "falhas": failures,
+    }
+    report["aprovada"] = all(r["taxa_notas"] == 1.0 for r in report["regioes"].values())
+    return report
+
+
+def print_report(corretora, label, report):
+    logging.info(f"[{corretora}] {label}: {report['arquivos']} notas ({report['tempo_medio_s']:.2f}s/nota)")
+    for region, r in report["regioes"].items():
+        logging.info(f"[{corretora}]   {region:<6} notas {r['notas_ok']}/{r['notas']} | células {r['taxa_celulas']:.1%}")
+    for failure in report["falhas"][:5]:
+        logging.info(f"[{corretora}]   divergência: {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibração automática das regras de leitura das notas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    cal = sub.add_parser("calibrar", help="deriva uma nova versão da regra a partir de amostras")
+    cal.add_argument("corretoras", nargs="+", choices=sorted(MANUAL_RULES))
+    cal.add_argument("--amostras", type=int, default=5)
+    cal.add_argument("--forcar", action="store_true", help="salva a versão mesmo sem passar na validação")
+
+    val = sub.add_parser("validar", help="valida uma versão da regra sobre todas as notas")
+    val.add_argument("corretoras", nargs="+", choices=sorted(MANUAL_RULES))
+    val.add_argument("--versao", type=int, default=None, help="0 = regra manual; padrão: a última versão")
+
+    args = parser.parse_args()
+    for corretora in args.corretoras:
+        if args.comando == "validar":
+            report = validate(corretora, load_rules(corretora, args.versao))
+            print_report(corretora, f"versão {args.versao if args.versao is not None else list_versions(corretora)[-1]}", report)
+            continue
+
+        rule, samples = calibrate(corretora, args.amostras)
+        # Validação só nas notas que não entraram na calibração
+        held_out = [f for f in sorted(list_files(pdf_folder(corretora))) if f not in samples]
+        if not held_out:
+            logging.warning(f"[{corretora}] todas as notas foram usadas como amostra; sem notas para validar")
+            continue
+        report = validate(corretora, rule, held_out)
+        print_report(corretora, "candidata (notas fora das amostras)", report)
+        if report["aprovada"] or args.forcar:
+            meta = {
+                "criada_em": datetime.now().isoformat(timespec="seconds"),
+                "amostras": samples,
+                "parametros": {"gap_linha": GAP_LINHA, "gap_blocos": GAP_BLOCOS, "gap_colunas": GAP_COLUNAS, "margem": MARGEM},
+                "validacao": {"conjunto": "fora_das_amostras", **{k: v for k, v in report.items() if k != "falhas"}},
+            }
+            version = save_rules(corretora, rule, meta)
+            logging.info(f"[{corretora}] regra salva como versão {version}")
+        else:
+            logging.warning(f"[{corretora}] candidata reprovada na validação; nenhuma versão salva (use --forcar)")
+
+
+if __name__ == "__main__":
+    main()
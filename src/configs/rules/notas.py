@@ -1,3 +1,10 @@
+import os
+import json
+
+# Versões calibradas (calibrate_rules.py): versions/<corretora>_v<N>.json
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "versions")
+
+# Versão 0: coordenadas ajustadas manualmente com o pdf_viz.py
 redrex = {
     "name": "RedRex",
     "table_areas": ['70, 560,498,279'],
@@ -36,7 +43,44 @@ jornada = {
 
 
 
-rules_dict = {
+MANUAL_RULES = {
     "jornada": jornada,
     "redrex": redrex,
 }
+
+
+def list_versions(corretora):
+    """Versões disponíveis da regra da corretora (0 = regra manual)."""
+    versions = [0]
+    if os.path.isdir(VERSIONS_DIR):
+        prefix = f"{corretora}_v"
+        for name in os.listdir(VERSIONS_DIR):
+            if name.startswith(prefix) and name.endswith(".json") and name[len(prefix):-5].isdigit():
+                versions.append(int(name[len(prefix):-5]))
+    return sorted(versions)
+
+
+def load_rules(corretora, version=None):
+    """Regra da corretora na versão pedida (None = a mais recente)."""
+    version = list_versions(corretora)[-1] if version is None else version
+    if version == 0:
+        return dict(MANUAL_RULES[corretora])
+    with open(os.path.join(VERSIONS_DIR, f"{corretora}_v{version}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["regra"]
+
+
+def save_rules(corretora, rule, meta):
+    """Grava a regra como uma nova versão, com os metadados da calibração. Retorna o número da versão."""
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    version = list_versions(corretora)[-1] + 1
+    with open(os.path.join(VERSIONS_DIR, f"{corretora}_v{version}.json"), "w", encoding="utf-8") as f:
+        json.dump({"versao": version, "corretora": corretora, **meta, "regra": rule}, f, ensure_ascii=False, indent=2)
+    return version
+
+
+# Versão usada na extração (start.py). A v1 calibrada também lê "Conta Liquidação"
+# no cabeçalho, o que muda o schema das tabelas; fica na regra manual até os
+# consumidores aceitarem a coluna nova. Outras versões: load_rules(corretora, N).
+VERSOES_EM_USO = {"jornada": 0, "redrex": 0}
+
+rules_dict = {corretora: load_rules(corretora, VERSOES_EM_USO.get(corretora)) for corretora in MANUAL_RULES}
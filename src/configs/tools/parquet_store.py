@@ -0,0 +1,298 @@
+import os
+import glob
+import logging
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from unidecode import unidecode
+
+# Esquema fixo de cada dataset (as colunas de partição ficam no caminho, não no arquivo)
+SCHEMAS = {
+    "operacoes": pa.schema([
+        ("arquivo", pa.string()),
+        ("nota", pa.string()),
+        ("conta", pa.string()),
+        ("data_pregao", pa.date32()),
+        ("cv", pa.string()),
+        ("mercado", pa.string()),
+        ("tipo", pa.string()),
+        ("vencimento", pa.date32()),
+        ("quantidade", pa.int64()),
+        ("taxa_operacional", pa.float64()),
+        ("mercadoria", pa.string()),
+        ("cotacao", pa.float64()),
+        ("data_insercao", pa.date32()),
+        ("extraido_em", pa.timestamp("us")),
+    ]),
+    "taxas": pa.schema([
+        ("arquivo", pa.string()),
+        ("nota", pa.string()),
+        ("conta", pa.string()),
+        ("data_pregao", pa.date32()),
+        ("descricao", pa.string()),
+        ("valor", pa.float64()),
+        ("data_insercao", pa.date32()),
+        ("extraido_em", pa.timestamp("us")),
+    ]),
+}
+PARTITIONS = ("corretora", "data")
+
+# Nomes de coluna das notas (já sanitizados) -> coluna do esquema.
+# Inclui as variantes geradas pelo strip_text das regras ('Vencto.' vira 'vecto').
+COLUMN_ALIASES = {
+    "cv": "cv",
+    "merc": "mercado",
+    "tipo": "tipo",
+    "vencto": "vencimento",
+    "vecto": "vencimento",
+    "qted": "quantidade",
+    "txop": "taxa_operacional",
+    "mercadoria": "mercadoria",
+    "cotacao": "cotacao",
+    "n_nota": "nota",
+    "conta_liquidacao": "conta",
+    "cota_liquidacao": "conta",
+    "data_de_pregao": "data_pregao",
+    "data_de_insercao": "data_insercao",
+    "arquivo": "arquivo",
+}
+DATE_COLUMNS = ("data_pregao", "vencimento", "data_insercao")
+FLOAT_COLUMNS = ("taxa_operacional", "cotacao", "valor")
+META_COLUMNS = ("arquivo", "nota", "conta", "data_pregao", "data_insercao")
+
+
+def sanitize(column):
+    column = unidecode(str(column)).replace(" ", "_")
+    return "".join(c for c in column if c.isalnum() or c == "_").lower()
+
+
+def to_date(series):
+    """Datas no formato da nota ('02/01/2024', ou '02012024' quando o strip_text remove a barra) ou ISO."""
+    text = series.astype("string").str.strip()
+    result = pd.to_datetime(text, format="%d/%m/%Y", errors="coerce")
+    for fmt in ("%d%m%Y", "%Y-%m-%d"):
+        result = result.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+    return result.dt.date
+
+
+def to_float(series):
+    return pd.to_numeric(series.astype("string").str.strip().str.replace(",", ".", regex=False), errors="coerce")
+
+
+class ParquetStore:
+    """
+    Dataset Parquet particionado por corretora e data do pregão.
+
+    Cada nota extraída vira um arquivo `<dataset>/corretora=<c>/data=<AAAA-MM-DD>/<arquivo>.parquet`
+    com esquema fixo; `compact` junta os arquivos de cada partição e `query`
+    lê só as partições pedidas. Se a mesma nota for gravada mais de uma vez,
+    vale a extração mais recente (`extraido_em`).
+    """
+
+    def __init__(self, root="src/files/parquet"):
+        self.root = os.path.abspath(root)
+
+    # -------------------- NORMALIZAÇÃO --------------------
+    @staticmethod
+    def _rename(df):
+        df = df.copy()
+        df.columns = [COLUMN_ALIASES.get(sanitize(c), sanitize(c)) for c in df.columns]
+        return df.loc[:, ~df.columns.duplicated()]
+
+    @staticmethod
+    def normalize_operacoes(df):
+        return ParquetStore._rename(df)
+
+    @staticmethod
+    def normalize_taxas(df):
+        """
+        O resumo de taxas vem largo (uma coluna por taxa, jornada) ou já em
+        pares rótulo/valor em colunas numeradas (redrex); os dois viram
+        linhas (descricao, valor).
+        """
+        df = ParquetStore._rename(df)
+        meta = [c for c in META_COLUMNS if c in df.columns]
+        fees = [c for c in df.columns if c not in meta]
+        fees = [c for c in fees if df[c].astype("string").str.strip().fillna("").ne("").any()]
+        if fees and all(c.isdigit() for c in fees):
+            label, value = fees[0], fees[-1]
+            return df[meta].assign(descricao=df[label], valor=df[value])
+        return df.melt(id_vars=meta, value_vars=fees, var_name="descricao", value_name="valor")
+
+    @staticmethod
+    def _conform(df, dataset):
+        """Ajusta o DataFrame ao esquema do dataset: colunas que faltam ficam nulas, tipos são convertidos."""
+        schema = SCHEMAS[dataset]
+        df = df.reindex(columns=schema.names)
+        for column in DATE_COLUMNS:
+            if column in df:
+                df[column] = to_date(df[column])
+        for column in FLOAT_COLUMNS:
+            if column in df:
+                df[column] = to_float(df[column])
+        if "quantidade" in df:
+            df["quantidade"] = pd.to_numeric(df["quantidade"], errors="coerce").astype("Int64")
+        for field in schema:
+            if pa.types.is_string(field.type):
+                df[field.name] = df[field.name].astype("string")
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    # -------------------- ESCRITA --------------------
+    def _partition_dir(self, dataset, corretora, data):
+        return os.path.join(self.root, dataset, f"corretora={corretora}", f"data={data}")
+
+    def _write(self, table, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    def append(self, corretora, main, small, arquivo, extraido_em=None):
+        """Grava as tabelas de uma nota (substituindo uma gravação anterior da mesma nota)."""
+        extraido_em = extraido_em or pd.Timestamp.now()
+        frames = {"operacoes": self.normalize_operacoes(main), "taxas": self.normalize_taxas(small)}
+        written = {}
+        for dataset, df in frames.items():
+            df = df.assign(arquivo=arquivo, extraido_em=extraido_em)
+            table = self._conform(df, dataset)
+            dates = table.column("data_pregao").to_pylist() or [None]
+            fallback = table.column("data_insercao").to_pylist() or [None]
+            data = next((d for d in dates + fallback if d is not None), None)
+            path = os.path.join(self._partition_dir(dataset, corretora, data or "sem_data"), f"{arquivo}.parquet")
+            self._write(table, path)
+            written[dataset] = table.num_rows
+        return written
+
+    # -------------------- LEITURA --------------------
+    def partitions(self, dataset, corretoras=None, inicio=None, fim=None):
+        """Pastas de partição que atendem ao filtro (pela estrutura de pastas, sem abrir arquivos)."""
+        selected = []
+        for path in sorted(glob.glob(os.path.join(self.root, dataset, "corretora=*", "data=*"))):
+            corretora = os.path.basename(os.path.dirname(path)).split("=", 1)[1]
+            data = os.path.basename(path).split("=", 1)[1]
+            if corretoras and corretora not in corretoras:
+                continue
+            if (inicio and data < str(inicio)) or (fim and data > str(fim)):
+                continue
+            selected.append((corretora, data, path))
+        return selected
+
+    @staticmethod
+    def _latest(df):
+        """Mantém, para cada nota, só as linhas da extração mais recente."""
+        if df.empty:
+            return df
+        return df[df["extraido_em"] == df.groupby("arquivo")["extraido_em"].transform("max")]
+
+    def _read_partition(self, path, columns=None):
+        files = sorted(glob.glob(os.path.join(path, "*.parquet")))
+        if columns is not None:
+            columns = list(dict.fromkeys(list(columns) + ["arquivo", "extraido_em"]))
+        tables = [pq.read_table(f, columns=columns) for f in files]
+        return pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame()
+
+    def query(self, dataset, corretoras=None, inicio=None, fim=None, columns=None):
+        """
+        Lê o dataset filtrando por corretora e intervalo de datas (AAAA-MM-DD).
+
+        Args:
+            dataset (str): "operacoes" ou "taxas".
+            corretoras (list): Corretoras desejadas (padrão: todas).
+            inicio, fim (str | date): Intervalo de datas do pregão, inclusivo.
+            columns (list): Colunas a ler (além das de partição).
+        """
+        frames = []
+        for corretora, data, path in self.partitions(dataset, corretoras, inicio, fim):
+            df = self._read_partition(path, columns)
+            if not df.empty:
+                frames.append(df.assign(corretora=corretora, data=data))
+        if not frames:
+            return pd.DataFrame(columns=list(PARTITIONS) + (list(columns) if columns else SCHEMAS[dataset].names))
+        df = self._latest(pd.concat(frames, ignore_index=True))
+        return df[list(PARTITIONS) + [c for c in df.columns if c not in PARTITIONS]].reset_index(drop=True)
+
+    # -------------------- MANUTENÇÃO --------------------
+    def compact(self, datasets=None):
+        """Junta os arquivos de cada partição num único `compactado.parquet`, descartando extrações antigas."""
+        stats = {}
+        for dataset in datasets or SCHEMAS:
+            merged = removed = 0
+            for _, _, path in self.partitions(dataset):
+                files = sorted(glob.glob(os.path.join(path, "*.parquet")))
+                if len(files) <= 1:
+                    continue
+                df = self._latest(self._read_partition(path))
+                target = os.path.join(path, "compactado.parquet")
+                self._write(pa.Table.from_pandas(df, schema=SCHEMAS[dataset], preserve_index=False), target)
+                for f in files:
+                    if f != target:
+                        os.remove(f)
+                merged += 1
+                removed += len(files) - 1
+            stats[dataset] = {"particoes": merged, "arquivos_removidos": removed}
+            logging.info(f"Compactação de {dataset}: {merged} partições, {removed} arquivos a menos")
+        return stats
+
+    def import_csv(self, csv_dir, find_corretora):
+        """
+        Importa os CSVs antigos (`<nota>.csv` e `<nota>_small.csv`) para o dataset.
+
+        Args:
+            csv_dir (str): Pasta dos CSVs.
+            find_corretora (callable): nome da nota -> corretora (ou None para ignorar).
+        """
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(csv_dir, "*.csv"))):
+            arquivo = os.path.splitext(os.path.basename(path))[0]
+            if arquivo.endswith("_small"):
+                continue
+            corretora = find_corretora(arquivo)
+            small_path = os.path.join(csv_dir, f"{arquivo}_small.csv")
+            if corretora is None or not os.path.exists(small_path):
+                logging.warning(f"Ignorando {arquivo}: corretora ou resumo de taxas não encontrado")
+                continue
+            main = pd.read_csv(path, sep=";", dtype=str)
+            small = pd.read_csv(small_path, sep=";", dtype=str)
+            self.append(corretora, main, small, arquivo, extraido_em=pd.Timestamp(os.path.getmtime(path), unit="s"))
+            imported += 1
+        logging.info(f"{imported} notas importadas de {csv_dir}")
+        return imported
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Dataset Parquet das notas de corretagem")
+    parser.add_argument("--raiz", default="src/files/parquet")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("compactar", help="junta os arquivos de cada partição")
+
+    con = sub.add_parser("consultar", help="lê só as partições pedidas")
+    con.add_argument("dataset", choices=sorted(SCHEMAS))
+    con.add_argument("--corretora", action="append")
+    con.add_argument("--inicio")
+    con.add_argument("--fim")
+    con.add_argument("--colunas", nargs="+")
+
+    imp = sub.add_parser("importar-csv", help="importa os CSVs gerados pelas versões anteriores")
+    imp.add_argument("--pasta", default="src/files/csv")
+
+    args = parser.parse_args()
+    store = ParquetStore(args.raiz)
+    if args.comando == "compactar":
+        store.compact()
+    elif args.comando == "consultar":
+        df = store.query(args.dataset, args.corretora, args.inicio, args.fim, args.colunas)
+        print(df.to_string(max_rows=40))
+        print(f"\n{len(df)} linhas")
+    else:
+        pdf_root = os.path.abspath("src/files/pdf")
+        corretoras = [d for d in os.listdir(pdf_root) if os.path.isdir(os.path.join(pdf_root, d))]
+        store.import_csv(args.pasta, lambda arquivo: next(
+            (c for c in corretoras if os.path.exists(os.path.join(pdf_root, c, f"{arquivo}.pdf"))), None))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
+import io
 import os
+import logging
 
 import psycopg2
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+
+# Engines por URL: o pool de conexões é compartilhado por todo o processo
+_ENGINES = {}
+
+
+def pooled_engine(url, **kwargs):
+    """Engine com pool de conexões, criado uma única vez por URL."""
+    if url not in _ENGINES:
+        _ENGINES[url] = create_engine(url, pool_pre_ping=True, **kwargs)
+    return _ENGINES[url]
 
 
 class RDSPostgreSQLManager:
@@ -25,17 +37,11 @@ class RDSPostgreSQLManager:
         self.db_port = db_port
 
     def connect(self):
+        # Conexão emprestada do pool do engine; close() a devolve ao pool
         try:
-            connection = psycopg2.connect(
-                dbname=self.db_name,
-                user=self.db_user,
-                password=self.db_password,
-                host=self.db_host,
-                port=self.db_port,
-            )
-            print("Conexão bem-sucedida ao banco de dados PostgreSQL.")
+            connection = self.alchemy().raw_connection()
             return connection
-        except psycopg2.Error as e:
+        except Exception as e:
             print(f"Erro ao conectar ao banco de dados PostgreSQL: {e}")
             return None
 
@@ -87,7 +93,102 @@ class RDSPostgreSQLManager:
             return True
 
     def alchemy(self):
-        self.engine = create_engine(
-            f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+        self.engine = pooled_engine(
+            f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}",
+            pool_size=5,
+            max_overflow=5,
         )
         return self.engine
+
+    def engine_or_sqlite(self, sqlite_path):
+        """Engine do PostgreSQL se as credenciais estiverem configuradas e o banco responder; senão, SQLite local."""
+        if self.db_host and self.db_name:
+            try:
+                engine = self.alchemy()
+                with engine.connect():
+                    pass
+                return engine
+            except Exception as e:
+                logging.warning(f"PostgreSQL indisponível ({e}); usando SQLite em {sqlite_path}")
+        return pooled_engine(f"sqlite:///{os.path.abspath(sqlite_path)}")
+
+
+class BulkLoader:
+    """
+    Carga em lote dos DataFrames extraídos, numa única transação.
+
+    No PostgreSQL os dados vão por `COPY FROM STDIN` para uma tabela de staging
+    e são mesclados na tabela final; no SQLite (fallback local) vão por
+    `to_sql`. Em ambos, as linhas já existentes com a mesma chave natural
+    (por padrão o arquivo de origem da nota) são substituídas, de forma que
+    reprocessar uma nota não duplica registros.
+    """
+
+    def __init__(self, engine, key="arquivo"):
+        self.engine = engine
+        self.key = key
+
+    def load(self, frames):
+        """
+        Args:
+            frames (dict): nome da tabela -> DataFrame (ou lista de DataFrames).
+
+        Returns:
+            dict: nome da tabela -> número de linhas carregadas.
+        """
+        import pandas as pd
+
+        loaded = {}
+        with self.engine.begin() as conn:
+            for table, dfs in frames.items():
+                df = pd.concat(dfs, ignore_index=True) if isinstance(dfs, list) else dfs
+                if df.empty:
+                    continue
+                # Tabelas do camelot sem cabeçalho (ex.: small com small_fix=False) vêm com rótulos inteiros
+                df = df.rename(columns=str)
+                self._prepare_table(conn, table, df)
+                if conn.dialect.name == "postgresql":
+                    self._merge_postgres(conn, table, df)
+                else:
+                    self._merge_generic(conn, table, df)
+                loaded[table] = len(df)
+                logging.info(f"Success to save into {table} ({len(df)} linhas)")
+        return loaded
+
+    def _prepare_table(self, conn, table, df):
+        """Cria a tabela a partir do DataFrame ou acrescenta as colunas que faltarem."""
+        inspector = inspect(conn)
+        if not inspector.has_table(table):
+            df.head(0).to_sql(table, conn, index=False)
+            return
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        quote = conn.dialect.identifier_preparer.quote
+        for column in df.columns:
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} TEXT"))
+
+    def _merge_postgres(self, conn, table, df):
+        quote = conn.dialect.identifier_preparer.quote
+        staging = quote(f"stg_{table}")
+        columns = ", ".join(quote(c) for c in df.columns)
+
+        conn.execute(text(f"CREATE TEMP TABLE {staging} (LIKE {quote(table)} INCLUDING DEFAULTS) ON COMMIT DROP"))
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+        conn.execute(text(
+            f"DELETE FROM {quote(table)} WHERE {quote(self.key)} IN (SELECT DISTINCT {quote(self.key)} FROM {staging})"
+        ))
+        conn.execute(text(f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {staging}"))
+
+    def _merge_generic(self, conn, table, df):
+        quote = conn.dialect.identifier_preparer.quote
+        for value in df[self.key].dropna().unique():
+            conn.execute(text(f"DELETE FROM {quote(table)} WHERE {quote(self.key)} = :value"), {"value": value})
+        df.to_sql(table, conn, if_exists="append", index=False, chunksize=1000)
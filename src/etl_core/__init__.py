@@ -0,0 +1,20 @@
+"""
+Núcleo de ETL do relatório de Perdas Duplas, compartilhado pelos apps
+Perdas-Duplas-ETL-Desktop-V4, sistema-ferramentas-RPA-desktop-V4 e NexusPy.
+
+Os apps importam daqui (via app/controllers/etl_repository.py); correções e
+otimizações são feitas só neste pacote. Benchmark de regressão:
+    python -m etl_core.benchmark
+"""
+from etl_core.perdas_duplas import (
+    DATASET_EXEMPLO,
+    ETLController,
+    ETLRepository,
+    extract_text_from_pdf,
+    process_contingencias_duplas,
+    run_etl_perdas_duplas,
+    standardize_text_columns,
+)
+
+COLUMN_NAMES = list(ETLController._COLUMN_NAMES)
+DEFAULT_PROCESS_OPTIONS = dict(ETLController._DEFAULT_PROCESS_OPTIONS)
@@ -0,0 +1,270 @@
+"""
+Benchmark de regressão do núcleo de ETL sobre os relatórios distribuídos no repositório.
+
+Para cada caso (relatório TXT de exemplo, PDFs de Perdas Duplas e um relatório
+sintético grande) mede a vazão da extração e do processamento e compara com a
+base salva em benchmark_base.json:
+    - a assinatura do resultado (linhas + hash do CSV) tem que ser idêntica;
+    - a vazão é comparada relativa à velocidade da máquina (uma carga de
+      referência medida junto com a base e a cada execução) e, por padrão,
+      só gera aviso; com --estrito uma queda acima da tolerância reprova.
+Também confere que os três apps carregam este mesmo núcleo.
+
+Uso:
+    python -m etl_core.benchmark               # compara com a base
+    python -m etl_core.benchmark --estrito     # queda de vazão também reprova
+    python -m etl_core.benchmark --atualizar   # regrava a base (após mudança intencional)
+    python -m etl_core.benchmark --log         # custo do log DEBUG no relatório sintético
+"""
+import io
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import importlib.util
+from pathlib import Path
+
+from etl_core.perdas_duplas import DATASET_EXEMPLO, ETLController, ETLRepository, logger
+
+SRC = Path(__file__).resolve().parents[1]
+ARQUIVO_BASE = Path(__file__).with_name("benchmark_base.json")
+
+RELATORIOS_PDF = [
+    SRC / "BulbassaurQT6-ETL" / "Perdas-Duplas-ETL-Desktop-V4" / "app" / "assets" / "Relatorios" / "Lista de Contingências Duplas Analisadas_Rev5.pdf",
+    SRC / "BulbassaurQT6-ETL" / "Perdas-Duplas-ETL-Desktop-V4" / "app" / "assets" / "Relatorios" / "Relatório- Contingências Duplas.pdf",
+]
+
+APPS = {
+    "Perdas-Duplas-ETL-Desktop-V4": SRC / "BulbassaurQT6-ETL" / "Perdas-Duplas-ETL-Desktop-V4",
+    "ferramentas-RPA": SRC / "BulbassaurQT6-ETL" / "sistema-ferramentas-RPA-desktop-V4" / "ferramentas-RPA",
+    "NexusPy": SRC / "NexusPy",
+}
+
+# Conjuntos de opções avaliados em cada caso
+PERFIS = {
+    "padrao": {},
+    "regex": {"enable_regex_processing": True},
+}
+
+
+def gerar_relatorio_sintetico(n_contingencias=10000, por_pagina=25):
+    """Gera um texto no formato do relatório de Perdas Duplas com `n_contingencias` itens."""
+    linhas = []
+    for i in range(n_contingencias):
+        if i % por_pagina == 0:
+            pagina = i // por_pagina + 1
+            linhas += [f"--- Página {pagina} ---", "ONS", f"RT-ONS DPL 0013/2025", f"{pagina} / {n_contingencias // por_pagina + 1}"]
+            linhas.append(f"2.{pagina} Volume {pagina % 7 + 1} - Interligação Sul e Sudeste/Centro-Oeste")
+            linhas.append(f"2.{pagina}.1 {'Curto' if pagina % 2 else 'Médio'} Prazo")
+        linhas.append("•")
+        if i % 3 == 0:
+            linhas.append(f"LT 765 kV Foz do Iguaçu – Ivaiporã C{i % 3 + 1} e C{i % 3 + 2}")
+        else:
+            linhas.append(f"Contingência Dupla da LT 500 kV Assis {i} – Ponta Grossa C1 e LT 525 kV Blumenau – Gaspar 2")
+    return "\n".join(linhas)
+
+
+def benchmark_contingencias_duplas(n_contingencias=10000):
+    """Mede a vazão de process_contingencias_duplas num relatório sintético, com log em WARNING e em DEBUG."""
+    texto = gerar_relatorio_sintetico(n_contingencias)
+    n_linhas = texto.count("\n") + 1
+    resultados = {}
+    for nivel in ("WARNING", "DEBUG"):
+        etl_controller = ETLController()
+        etl_controller.process_options.update(enable_regex_processing=True, log_level=nivel)
+        handler = logging.StreamHandler(io.StringIO())  # DEBUG vai para memória, sem custo de terminal
+        logger.addHandler(handler)
+        try:
+            inicio = time.perf_counter()
+            df = etl_controller.process_contingencias_duplas(texto)
+            duracao = time.perf_counter() - inicio
+        finally:
+            logger.removeHandler(handler)
+        resultados[nivel] = {"linhas_s": n_linhas / duracao, "contingencias": len(df), "tempo_s": duracao}
+        print(f"log {nivel:<7}: {duracao:.3f}s | {n_linhas / duracao:,.0f} linhas/s | {len(df)} contingências")
+    return resultados
+
+
+def _casos(n_sintetico):
+    """Gera (nome do caso, função que devolve o texto, páginas) para cada relatório disponível."""
+    repositorio = ETLRepository()
+    yield "dataset_perdas_duplas.txt", lambda: repositorio.extract_text_from_txt(DATASET_EXEMPLO), None
+    for pdf in RELATORIOS_PDF:
+        if pdf.exists():
+            yield pdf.name, lambda pdf=pdf: repositorio.extract_text_from_pdf(str(pdf)), repositorio.count_pages(str(pdf))
+        else:
+            print(f"Aviso: relatório não encontrado, caso ignorado: {pdf}")
+    yield f"sintetico_{n_sintetico}", lambda: gerar_relatorio_sintetico(n_sintetico), None
+
+
+def _melhor_tempo(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes; devolve (menor tempo, último resultado)."""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def referencia_maquina(repeticoes=5):
+    """
+    Velocidade da máquina numa carga fixa de Python puro (regex + split de
+    strings, como o ETL), em linhas/s. Serve para comparar vazões medidas
+    em máquinas diferentes.
+    """
+    texto = gerar_relatorio_sintetico(2000)
+    padrao = re.compile(r"(LT|SE)\s+\d+\s*kV\s+(.+?)\s+[–-]\s+(.+?)(?:\s+C\d)?$")
+
+    def carga():
+        total = 0
+        for linha in texto.splitlines():
+            linha = linha.strip()
+            total += bool(padrao.search(linha)) + len(linha.split(" – "))
+        return total
+
+    tempo, _ = _melhor_tempo(carga, repeticoes)
+    return (texto.count("\n") + 1) / tempo
+
+
+def assinatura(df):
+    """Impressão digital do resultado: muda se qualquer célula mudar."""
+    return hashlib.sha1(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def medir(n_sintetico=10000, repeticoes=3):
+    """Roda todos os casos e perfis; devolve {caso: {...métricas...}}."""
+    resultados = {}
+    for nome, obter_texto, paginas in _casos(n_sintetico):
+        tempo_extracao, texto = _melhor_tempo(obter_texto, repeticoes)
+        n_linhas = texto.count("\n") + 1
+        caso = {"linhas_texto": n_linhas, "extracao_s": tempo_extracao, "perfis": {}}
+        if paginas:
+            caso["paginas_s"] = paginas / tempo_extracao
+
+        for perfil, opcoes in PERFIS.items():
+            def processar():
+                etl_controller = ETLController()
+                etl_controller.process_options.update(opcoes)
+                return etl_controller.process_contingencias_duplas(texto)
+
+            tempo, df = _melhor_tempo(processar, repeticoes)
+            caso["perfis"][perfil] = {
+                "contingencias": len(df),
+                "assinatura": assinatura(df),
+                "processamento_s": tempo,
+                "linhas_s": n_linhas / tempo,
+            }
+        resultados[nome] = caso
+    return resultados
+
+
+def verificar_apps():
+    """Confere que o etl_repository de cada app reexporta o ETLController deste núcleo."""
+    status = {}
+    for app, pasta in APPS.items():
+        caminho = pasta / "app" / "controllers" / "etl_repository.py"
+        try:
+            spec = importlib.util.spec_from_file_location(f"_etl_repository_{app.replace('-', '_')}", caminho)
+            modulo = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(modulo)
+            status[app] = modulo.ETLController is ETLController
+        except Exception as e:
+            print(f"Erro ao carregar {caminho}: {e}")
+            status[app] = False
+    return status
+
+
+def comparar(atual, base, tolerancia, escala=1.0):
+    """
+    Compara `atual` com a `base`.
+
+    Args:
+        escala (float): velocidade desta máquina / velocidade da máquina da base;
+            as vazões da base são multiplicadas por ela antes da comparação.
+
+    Returns:
+        tuple: (regressões de resultado, quedas de vazão acima da tolerância)
+    """
+    regressoes, lentidoes = [], []
+    for nome, caso in atual.items():
+        if nome not in base:
+            continue
+        for perfil, metricas in caso["perfis"].items():
+            ref = base[nome]["perfis"].get(perfil)
+            if ref is None:
+                continue
+            if metricas["assinatura"] != ref["assinatura"]:
+                regressoes.append(f"{nome} [{perfil}]: resultado mudou ({ref['contingencias']} -> {metricas['contingencias']} contingências)")
+            esperado = ref["linhas_s"] * escala
+            if metricas["linhas_s"] < esperado * (1 - tolerancia):
+                lentidoes.append(f"{nome} [{perfil}]: vazão {1 - metricas['linhas_s'] / esperado:.0%} abaixo da base ajustada "
+                                 f"({esperado:,.0f} -> {metricas['linhas_s']:,.0f} linhas/s)")
+        if "paginas_s" in caso and "paginas_s" in base[nome]:
+            esperado = base[nome]["paginas_s"] * escala
+            if caso["paginas_s"] < esperado * (1 - tolerancia):
+                lentidoes.append(f"{nome}: extração {1 - caso['paginas_s'] / esperado:.0%} abaixo da base ajustada "
+                                 f"({esperado:,.1f} -> {caso['paginas_s']:,.1f} páginas/s)")
+    return regressoes, lentidoes
+
+
+def imprimir(resultados):
+    for nome, caso in resultados.items():
+        extracao = f"{caso['paginas_s']:,.1f} páginas/s" if "paginas_s" in caso else f"{caso['extracao_s'] * 1000:.1f} ms"
+        print(f"\n{nome} ({caso['linhas_texto']} linhas | extração: {extracao})")
+        for perfil, m in caso["perfis"].items():
+            print(f"  {perfil:<7}: {m['processamento_s'] * 1000:8.1f} ms | {m['linhas_s']:>10,.0f} linhas/s | {m['contingencias']} contingências")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de regressão do núcleo de ETL de Perdas Duplas")
+    parser.add_argument("--atualizar", action="store_true", help="regrava benchmark_base.json com as medições atuais")
+    parser.add_argument("--tolerancia", type=float, default=0.3, help="queda de vazão aceita (fração, padrão 0.3)")
+    parser.add_argument("--estrito", action="store_true", help="queda de vazão acima da tolerância também reprova")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sintetico", type=int, default=10000, help="contingências do relatório sintético")
+    parser.add_argument("--log", action="store_true", help="mede só o custo do log DEBUG no relatório sintético")
+    args = parser.parse_args()
+
+    if args.log:
+        benchmark_contingencias_duplas(args.sintetico)
+        return 0
+
+    apps = verificar_apps()
+    for app, ok in apps.items():
+        print(f"{app:<30} {'usa o núcleo compartilhado' if ok else 'NÃO usa o núcleo compartilhado'}")
+
+    referencia = referencia_maquina()
+    resultados = medir(args.sintetico, args.repeticoes)
+    imprimir(resultados)
+    print(f"\nReferência da máquina: {referencia:,.0f} linhas/s")
+
+    if args.atualizar:
+        with open(ARQUIVO_BASE, "w", encoding="utf-8") as f:
+            json.dump({"referencia_linhas_s": referencia, "casos": resultados}, f, ensure_ascii=False, indent=2)
+        print(f"\nBase atualizada: {ARQUIVO_BASE.name}")
+        return 0 if all(apps.values()) else 1
+
+    if not ARQUIVO_BASE.exists():
+        print("\nSem base para comparar; rode com --atualizar.")
+        return 0 if all(apps.values()) else 1
+
+    with open(ARQUIVO_BASE, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    # Vazões absolutas variam com a máquina: a base é escalada pela carga de referência
+    escala = referencia / base["referencia_linhas_s"]
+    print(f"Máquina {escala:.2f}x a da base")
+    regressoes, lentidoes = comparar(resultados, base["casos"], args.tolerancia, escala)
+    if args.estrito:
+        regressoes += lentidoes
+    elif lentidoes:
+        print("\nAviso (vazão, informativo; use --estrito para reprovar):\n  " + "\n  ".join(lentidoes))
+    print("\nSem regressões." if not regressoes else "\nRegressões:\n  " + "\n  ".join(regressoes))
+    return 0 if not regressoes and all(apps.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
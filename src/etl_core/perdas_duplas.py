@@ -0,0 +1,562 @@
+import pandas as pd
+import os
+import re
+import sys
+import logging
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+
+logger = logging.getLogger(__name__)
+
+# Padrões compilados uma única vez (antes eram recompilados/buscados a cada linha)
+_PAGINA_RE = re.compile(r'--- Página (\d+) ---')
+_VOLUME_RE = re.compile(r'(?:\d+\.\d+\s+)?Volume\s*(\d+)\s*[-–]\s*(.+)')
+_PRAZO_RE = re.compile(r'(Curto\s+Prazo|Médio\s+Prazo)', re.IGNORECASE)
+_CONTINGENCIA_RE = re.compile(r'(?i:Contingência dupla da)|LT \d+\s*kV')
+_DUPLA_RE = re.compile(r'contingência dupla', re.IGNORECASE)
+_PREFIXO_DUPLA_RE = re.compile(r'Contingência Dupla (da|das)?\s*', re.IGNORECASE)
+
+# Tokens do tokenizador de linhas
+TOKEN_PAGINA, TOKEN_VOLUME, TOKEN_PRAZO, TOKEN_CONTINGENCIA = "pagina", "volume", "prazo", "contingencia"
+
+
+def _extrair_paginas(pdf_path, paginas):
+    """Worker do pool de processos: abre o PDF e extrai o texto de um lote de páginas (base 0)."""
+    with fitz.open(pdf_path) as doc:
+        return [(p + 1, doc.load_page(p).get_text()) for p in paginas]
+
+
+def _log_debug(evento, **campos):
+    """Log estruturado (evento + campos); só formata a mensagem se o nível DEBUG estiver ativo."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s", evento, " ".join(f"{k}={v!r}" for k, v in campos.items()), extra={"evento": evento, "campos": campos})
+
+# ===============================================================
+# CLASSE: ETLRepository (MODEL - Camada de Acesso a Dados)
+# ===============================================================
+
+class ETLRepository:
+    """Gerencia a lógica de Extração de dados de baixo nível para documentos PDF."""
+
+    def __init__(self):
+        """Inicializa o ETLRepository."""
+        pass
+
+
+    def extract_text_from_txt(self, filename):
+        """
+        Lê todo o texto de um arquivo .txt do caminho especificado e retorna como string.
+
+        Args:
+            filename (str): O caminho do arquivo .txt a ser lido.
+
+        Returns:
+            str: O texto extraído do arquivo.
+        """
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                text = file.read()
+            return text
+        except Exception as e:
+            print(f"Erro ao ler o arquivo TXT '{filename}': {e}")
+            return ""
+
+    @staticmethod
+    def parse_page_range(page_range, total_pages):
+        """
+        Normaliza a seleção de páginas para índices base 0 dentro do documento.
+
+        Args:
+            page_range (list | str | None): Lista de índices base 0, string com
+                intervalos base 1 (ex: '1-3,5') ou None para todas as páginas.
+            total_pages (int): Número de páginas do documento.
+
+        Returns:
+            list: Índices de páginas (base 0).
+        """
+        if page_range is None:
+            return list(range(total_pages))
+        if isinstance(page_range, str):
+            paginas = []
+            for parte in page_range.split(','):
+                parte = parte.strip()
+                if not parte:
+                    continue
+                if '-' in parte:
+                    inicio, fim = map(int, parte.split('-'))
+                    paginas.extend(range(inicio - 1, fim))
+                else:
+                    paginas.append(int(parte) - 1)
+            page_range = sorted(set(paginas))
+        return [p for p in page_range if 0 <= p < total_pages]
+
+    def count_pages(self, pdf_path, page_range=None):
+        """Número de páginas que serão lidas para a seleção informada."""
+        with fitz.open(pdf_path) as doc:
+            return len(self.parse_page_range(page_range, len(doc)))
+
+    def iter_pages(self, pdf_path, page_range=None, parallel=False, max_workers=None, pages_per_task=8):
+        """
+        Gera (número da página base 1, texto) na ordem do documento, uma página por vez.
+
+        Args:
+            pdf_path (str): O caminho para o arquivo PDF.
+            page_range (list | str, optional): Páginas a processar (ver `parse_page_range`).
+            parallel (bool): Se True, extrai lotes de páginas num pool de processos.
+                Só há poucos lotes em andamento por vez, então a memória não cresce com o documento.
+            max_workers (int, optional): Processos do pool (padrão: número de CPUs).
+            pages_per_task (int): Páginas por lote enviado a cada processo.
+        """
+        with fitz.open(pdf_path) as doc:
+            paginas = self.parse_page_range(page_range, len(doc))
+            if not parallel or len(paginas) <= pages_per_task:
+                for page_num in paginas:
+                    yield page_num + 1, doc.load_page(page_num).get_text()
+                return
+
+        lotes = [paginas[i:i + pages_per_task] for i in range(0, len(paginas), pages_per_task)]
+        max_workers = max_workers or os.cpu_count() or 1
+        janela = 2 * max_workers
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pendentes = deque()
+            for lote in lotes:
+                pendentes.append(executor.submit(_extrair_paginas, pdf_path, lote))
+                if len(pendentes) >= janela:
+                    yield from pendentes.popleft().result()
+            while pendentes:
+                yield from pendentes.popleft().result()
+
+    def extract_text_from_pdf(self, pdf_path, page_range=None):
+        """
+        Extrai texto de um arquivo PDF, opcionalmente limitando a um intervalo de páginas.
+
+        Args:
+            pdf_path (str): O caminho para o arquivo PDF.
+            page_range (list, optional): Uma lista de índices de páginas (base 0) a serem processadas. Se None, todas as páginas são processadas. Defaults to None.
+
+        Returns:
+            str: O texto concatenado das páginas extraídas, com marcadores de página.
+        """
+        return "".join(
+            f"\n--- Página {page_num} ---\n{texto}" # Adiciona marcador de página
+            for page_num, texto in self.iter_pages(pdf_path, page_range)
+        )
+
+    def _clean_contingency_name(self, contingency_name, add_lt_option, prev_part_ends_with_lt=False):
+        """
+        Limpa e padroniza o nome de uma contingência, removendo termos desnecessários e adicionando 'LT' se aplicável.
+
+        Args:
+            contingency_name (str): O nome original da contingência.
+            add_lt_option (bool): Se True, tenta adicionar 'LT' se 'kV' estiver presente e 'LT' não for duplicado.
+            prev_part_ends_with_lt (bool, optional): Indica se a parte anterior da contingência (em caso de múltiplas) termina com 'LT'. Usado para evitar duplicação. Defaults to False.
+
+        Returns:
+            str: O nome da contingência limpo e padronizado.
+        """
+        # Remove o texto "Contingência Dupla" e variações (ex: "Contingência Dupla da", "Contingência Dupla das")
+        cleaned_name = _PREFIXO_DUPLA_RE.sub('', contingency_name).strip()
+        
+        # Adiciona "LT" se necessário, evitando duplicações e garantindo formato
+        if add_lt_option:
+            if not cleaned_name.startswith('LT ') and ' kV ' in cleaned_name:
+                # Se não começa com 'LT ' e contém ' kV ', adiciona 'LT '
+                cleaned_name = 'LT ' + cleaned_name
+            elif cleaned_name.startswith('LT LT '):
+                # Corrige caso haja "LT LT " duplicado no início
+                cleaned_name = cleaned_name.replace('LT LT ', 'LT ')
+            elif prev_part_ends_with_lt and cleaned_name.startswith('LT '):
+                # Remove 'LT ' duplicado se a parte anterior já terminou com 'LT'
+                cleaned_name = cleaned_name[3:].strip() # Remove apenas o primeiro 'LT ' 
+        return cleaned_name
+
+    def _parse_contingency_line(self, contingency_raw_line, process_options, prazo_atual, enable_regex_processing):
+        """
+        Processa uma linha de texto bruta identificada como contingência, extraindo os detalhes.
+        Encapsula a lógica de identificação e separação de contingências duplas.
+
+        Args:
+            contingency_raw_line (str): A linha de texto da contingência (ex: '• Contingência Dupla LT X e LT Y').
+            process_options (dict): Opções de processamento, como 'separar_duplas' e 'adicionar_lt'.
+            prazo_atual (str): O prazo atual (Curto Prazo ou Médio Prazo).
+            enable_regex_processing (bool, optional): Se True, ativa o processamento de regex para contingências duplas.
+
+        Returns:
+            list: Uma lista de dicionários, onde cada dicionário representa uma contingência extraída.
+        """
+        contingencias_data = []
+        contingencia_base = contingency_raw_line.replace('•', '').replace('-', '').strip() # Garante que a linha bruta seja limpa de marcadores e espaços
+        futura = "SIM" if prazo_atual == "Curto Prazo" else "NÃO"
+
+        add_lt_enabled = process_options['adicionar_lt']
+        separate_duplas_enabled = process_options['separar_duplas']
+
+        _log_debug("contingencia", raw=contingency_raw_line, base=contingencia_base, adicionar_lt=add_lt_enabled,
+                   separar_duplas=separate_duplas_enabled, regex=enable_regex_processing)
+
+        try:
+            if enable_regex_processing:
+                is_contingencia_dupla = separate_duplas_enabled and _DUPLA_RE.search(contingencia_base)
+
+                if is_contingencia_dupla:
+                    contingencia_processada = _PREFIXO_DUPLA_RE.sub('', contingencia_base).strip()
+
+                    if ' e ' in contingencia_processada:
+                        partes = contingencia_processada.split(' e ')
+                        _log_debug("contingencia_dupla_separada", processada=contingencia_processada, partes=partes)
+                        for i, parte in enumerate(partes):
+                            parte = parte.strip()
+                            prev_part_ends_with_lt = (i > 0 and partes[i-1].strip().endswith('LT'))
+                            
+                            final_part_name = parte # Valor padrão antes de aplicar a lógica de LT
+                            if add_lt_enabled:
+                                final_part_name = self._clean_contingency_name(parte, True, prev_part_ends_with_lt)
+
+                            if final_part_name:
+                                contingencias_data.append({
+                                    'Perda Dupla': final_part_name,
+                                    'Futura': futura,
+                                    'Perdas Duplas na mesma contigencia': 'SIM'
+                                })
+                    else:
+                        # É uma "Contingência Dupla" mas não tem separador " e ", trata como uma única
+                        final_contingency_name = contingencia_processada
+                        if add_lt_enabled:
+                            final_contingency_name = self._clean_contingency_name(contingencia_processada, True)
+
+                        if final_contingency_name:
+                            contingencias_data.append({
+                                'Perda Dupla': final_contingency_name,
+                                'Futura': futura,
+                                'Perdas Duplas na mesma contigencia': 'NÃO'
+                            })
+                else:
+                    # Não é uma "Contingência Dupla" ou a opção de separar está desativada
+                    # Trata a linha como uma única contingência, aplicando _clean_contingency_name com add_lt_enabled
+                    final_contingency_name = contingencia_base # Valor padrão antes de aplicar a lógica de LT
+                    if add_lt_enabled:
+                        final_contingency_name = self._clean_contingency_name(contingencia_base, True)
+
+                    if final_contingency_name:
+                        contingencias_data.append({
+                            'Perda Dupla': final_contingency_name,
+                            'Futura': futura,
+                            'Perdas Duplas na mesma contigencia': 'NÃO'
+                        })
+            else:
+                # enable_regex_processing está desativado
+                contingencia_bruta_limpa = contingency_raw_line.replace('•', '').replace('-', '').replace('Contingência dupla da', '').strip()
+                
+                final_contingency_name = contingencia_bruta_limpa # Valor padrão antes de aplicar a lógica de LT
+                if add_lt_enabled:
+                    final_contingency_name = self._clean_contingency_name(contingencia_bruta_limpa, True, False)
+                
+                if final_contingency_name:
+                    contingencias_data.append({
+                        'Perda Dupla': final_contingency_name,
+                        'Futura': futura,
+                        'Perdas Duplas na mesma contigencia': 'NÃO'
+                    })
+        except Exception as e:
+            logger.error("Erro em _parse_contingency_line: %s para a linha: %r", e, contingency_raw_line)
+            # Se houver erro, ainda podemos adicionar uma entrada para não travar o processo principal
+            contingencias_data.append({
+                'Perda Dupla': f"ERRO: {str(e)}", 
+                'Futura': futura, 
+                'Perdas Duplas na mesma contigencia': 'NÃO'
+            })
+        
+        return contingencias_data
+
+# ===============================================================
+# CLASSE: ETLController (CONTROLLER - Camada de Lógica de Negócio)
+# ===============================================================
+
+class ETLController:
+    """Orquestra as operações de ETL, utilizando o ETLRepository para acesso a dados."""
+
+    _DEFAULT_PROCESS_OPTIONS = {
+        'enable_volume_area_extraction': True,
+        'enable_prazo_extraction': True,    
+        'enable_contingency_identification': True,
+
+        'enable_regex_processing': False,
+        'separar_duplas': True,
+        'adicionar_lt': True,
+
+        'standardize_columns': True, 
+
+        'log_level': 'WARNING', # DEBUG registra cada linha/contingência processada
+
+    }
+
+    _COLUMN_NAMES = [
+        'Volume',
+        'Área Geoelétrica',
+        'Perda Dupla',
+        'Prazo',
+        'Futura',
+        'Perdas Duplas na mesma contigencia',
+        'Página' # Nova coluna para o número da página
+    ]
+
+    def __init__(self):
+        """Inicializa o ETLController e seu repositório de dados."""
+        self._etl_repository = ETLRepository()
+        self.process_options = self._DEFAULT_PROCESS_OPTIONS.copy()
+
+    def _tokenize_line(self, linha):
+        """
+        Classifica uma linha (já sem espaços nas pontas) num único passo.
+
+        A ordem de prioridade é a mesma das regras originais (página, Volume/Área,
+        Prazo, contingência); testes baratos de substring evitam rodar as regex
+        na maioria das linhas.
+
+        Returns:
+            tuple: (token, match) ou (None, None) para linhas sem interesse.
+        """
+        opcoes = self.process_options
+        if linha.startswith('--- Página'):
+            match = _PAGINA_RE.search(linha)
+            if match:
+                return TOKEN_PAGINA, match
+        if opcoes['enable_volume_area_extraction'] and 'Volume' in linha:
+            match = _VOLUME_RE.search(linha)
+            if match:
+                return TOKEN_VOLUME, match
+        if opcoes['enable_prazo_extraction'] and 'prazo' in linha.lower():
+            match = _PRAZO_RE.search(linha)
+            if match:
+                return TOKEN_PRAZO, match
+        if opcoes['enable_contingency_identification']:
+            if linha[0] in '•-' or _CONTINGENCIA_RE.search(linha):
+                return TOKEN_CONTINGENCIA, None
+        return None, None
+
+    def extract_pdf_text(self, pdf_path, page_range=None):
+        """
+        Extrai texto de um arquivo PDF usando o ETLRepository.
+
+        Args:
+            pdf_path (str): O caminho para o arquivo PDF.
+            page_range (list, optional): Uma lista de índices de páginas (base 0) a serem processadas. Se None, todas as páginas são processadas. Defaults to None.
+
+        Returns:
+            str: O texto concatenado das páginas extraídas.
+        """
+        return self._etl_repository.extract_text_from_pdf(pdf_path, page_range)
+
+    def iter_pdf_pages(self, pdf_path, page_range=None, parallel=False):
+        """Gera (número da página, texto) do PDF, página a página (ver ETLRepository.iter_pages)."""
+        return self._etl_repository.iter_pages(pdf_path, page_range, parallel=parallel)
+
+    def count_pdf_pages(self, pdf_path, page_range=None):
+        return self._etl_repository.count_pages(pdf_path, page_range)
+
+    def process_outro_script(self, texto):
+        """
+        Função placeholder para outros scripts de processamento.
+        Retorna um DataFrame de exemplo.
+
+        Args:
+            texto (str): O texto a ser processado.
+
+        Returns:
+            pd.DataFrame: DataFrame de exemplo.
+        """
+        return pd.DataFrame({"Exemplo": ["Script 2 em desenvolvimento"]})
+
+    def process_contingencias_duplas(self, texto):
+        """
+        Processa o texto extraído do PDF para identificar e tabular contingências duplas.
+
+        Args:
+            texto (str | iterable): O texto completo extraído do PDF, ou um fluxo de
+                (número da página, texto) como o gerado por `iter_pdf_pages`.
+
+        Returns:
+            pd.DataFrame: Um DataFrame contendo as contingências identificadas e seus atributos.
+        """
+        try:
+            dados = []
+            for _, linhas in self._iter_contingencias(texto):
+                dados.extend(linhas)
+            return self._build_dataframe(dados)
+
+        except Exception as e:
+            logger.error("Erro no processamento de contingências duplas: %s", e)
+            return pd.DataFrame({"Erro": [f"Falha no processamento: {e}"]})
+
+    def iter_contingencias_duplas(self, paginas):
+        """
+        Versão incremental de `process_contingencias_duplas`: consome o fluxo de
+        páginas e gera (número da página, DataFrame parcial) assim que cada página
+        é processada. O estado (Volume/Área, Prazo) continua de uma página para a outra.
+        """
+        for pagina, linhas in self._iter_contingencias(paginas):
+            yield pagina, self._build_dataframe(linhas)
+
+    def _iter_contingencias(self, paginas):
+        """Passo único sobre as linhas; gera (página, [tuplas na ordem de _COLUMN_NAMES]) por página."""
+        logger.setLevel(self.process_options.get('log_level', 'WARNING'))
+        if isinstance(paginas, str):
+            # Texto completo: as páginas vêm dos marcadores '--- Página N ---'
+            paginas = [(None, paginas)]
+
+        volume_atual = None
+        area_geoelerica_atual = None
+        prazo_atual = None
+        pagina_atual = None # Nova variável para rastrear a página atual
+        parse_line = self._etl_repository._parse_contingency_line
+        enable_regex = self.process_options['enable_regex_processing']
+
+        for numero_pagina, texto in paginas:
+            if numero_pagina is not None:
+                pagina_atual = numero_pagina
+                _log_debug("pagina", pagina=pagina_atual)
+            dados = []
+
+            #! Passo único: cada linha vira um token que atualiza o estado (página, volume/área, prazo) ou gera contingências
+            for linha in texto.split('\n'):
+                linha = linha.strip()
+                if not linha:
+                    continue
+
+                token, match = self._tokenize_line(linha)
+                if token is None:
+                    continue
+
+                if token == TOKEN_PAGINA:
+                    pagina_atual = int(match.group(1))
+                    _log_debug("pagina", pagina=pagina_atual)
+                elif token == TOKEN_VOLUME:
+                    volume_atual = f"Volume {match.group(1)}"
+                    area_geoelerica_atual = match.group(2).strip()
+                elif token == TOKEN_PRAZO:
+                    prazo_atual = match.group(1).title()
+                else:
+                    # Delega o processamento detalhado da linha de contingência ao ETLRepository
+                    for c_data in parse_line(linha, self.process_options, prazo_atual, enable_regex):
+                        dados.append((
+                            volume_atual, area_geoelerica_atual, c_data['Perda Dupla'], prazo_atual,
+                            c_data['Futura'], c_data['Perdas Duplas na mesma contigencia'], pagina_atual,
+                        ))
+            yield numero_pagina, dados
+
+    def _build_dataframe(self, dados):
+        """Monta o DataFrame final a partir das tuplas (na ordem de _COLUMN_NAMES)."""
+        df = pd.DataFrame(dados, columns=self._COLUMN_NAMES)
+        if df.empty:
+            return df
+
+        # Verifica a opção standardize_columns antes de aplicar
+        if self.process_options['standardize_columns']:
+            # Padroniza a capitalização das colunas de texto usando o método privado
+            df = self._standardize_dataframe_text_columns(df, self._COLUMN_NAMES[:4])
+
+        # retirar as linhas em branco que ele leu (string vazia ou apenas espaços)
+        df = df[df['Perda Dupla'].astype(str).str.strip().astype(bool)]
+        logger.info("%d contingências extraídas", len(df))
+        return df
+
+    def _standardize_dataframe_text_columns(self, df, columns_to_standardize):
+        """Mantido para os chamadores antigos; ver `standardize_text_columns`."""
+        return standardize_text_columns(df, columns_to_standardize)
+
+
+# ===============================================================
+# API estável do núcleo de ETL (usada pelos apps)
+# ===============================================================
+
+def standardize_text_columns(df, columns_to_standardize):
+    """
+    Padroniza a capitalização das strings em colunas específicas de um DataFrame para o formato de título.
+
+    Args:
+        df (pd.DataFrame): O DataFrame a ser processado.
+        columns_to_standardize (list): Uma lista de nomes de colunas cujos valores de string devem ser padronizados.
+
+    Returns:
+        pd.DataFrame: O DataFrame com as colunas de texto padronizadas.
+    """
+    for col in columns_to_standardize:
+        # Verifica se a coluna existe e se é de texto ('object' no pandas 2, 'str' no pandas 3)
+        if col in df.columns and (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            # Aplica a função .title() a cada string na coluna
+            df[col] = df[col].apply(lambda x: x.title() if isinstance(x, str) else x)
+    return df
+
+
+def extract_text_from_pdf(pdf_path, page_range=None):
+    """Texto do PDF com marcadores '--- Página N ---' (ver `ETLRepository.extract_text_from_pdf`)."""
+    return ETLRepository().extract_text_from_pdf(pdf_path, page_range)
+
+
+def process_contingencias_duplas(texto, **process_options):
+    """
+    Tabula as contingências duplas de um texto (ou fluxo de páginas) com as
+    opções padrão do ETLController, sobrescritas por `process_options`.
+
+    Exemplo:
+        df = process_contingencias_duplas(extract_text_from_pdf(pdf), enable_regex_processing=True)
+    """
+    desconhecidas = set(process_options) - set(ETLController._DEFAULT_PROCESS_OPTIONS)
+    if desconhecidas:
+        raise ValueError(f"Opções de processamento desconhecidas: {sorted(desconhecidas)}")
+    etl_controller = ETLController()
+    etl_controller.process_options.update(process_options)
+    return etl_controller.process_contingencias_duplas(texto)
+
+
+# Função de teste para demonstrar o ETL de perdas duplas a partir de texto/arquivo TXT
+def run_etl_perdas_duplas(test_file_path=None):
+    
+    print("\n--- Executa um teste da lógica de ETL para perdas duplas a partir de um arquivo TXT ou texto de exemplo. ---")
+    etl_controller = ETLController()
+
+    extracted_text = "" # Inicializa com string vazia
+
+    # Você pode modificar as opções de processamento aqui para testar cenários diferentes
+    print("\n--- Opções de processamento ---")
+    etl_controller.process_options['enable_volume_area_extraction'] = True
+    etl_controller.process_options['enable_prazo_extraction'] = True
+    etl_controller.process_options['enable_contingency_identification'] = True
+    etl_controller.process_options['enable_regex_processing'] = True  # Alterado
+    etl_controller.process_options['separar_duplas'] = False       # Alterado 
+    etl_controller.process_options['adicionar_lt'] = False         # Alterado 
+    etl_controller.process_options['standardize_columns'] = True
+    print(etl_controller.process_options)
+    print("\n")
+
+
+    if test_file_path:
+        print(f"Lendo texto do arquivo: {test_file_path}")
+        file_content = etl_controller._etl_repository.extract_text_from_txt(test_file_path)
+        if file_content:
+            extracted_text = file_content
+        else:
+            print(f"Erro: Não foi possível ler o arquivo TXT {test_file_path}. Não há texto para processar.")
+            return # Sai da função se não conseguir ler o arquivo
+
+    # Executa o ETL
+    if not extracted_text:
+        print("Erro: Nenhuma texto para processar. O arquivo TXT pode estar vazio ou não foi lido.")
+        return
+
+    df_resultados = etl_controller.process_contingencias_duplas(extracted_text)
+    
+    # Exibe os resultados
+    print("\n--- Resultados do ETL ---")
+    print(df_resultados.head(10)) 
+    print("\n--- Teste concluído ---")
+
+
+# Relatório de exemplo distribuído com o núcleo (usado no teste e no benchmark de regressão)
+DATASET_EXEMPLO = Path(__file__).with_name("dataset_perdas_duplas.txt")
+
+
+if __name__ == '__main__':
+    run_etl_perdas_duplas(sys.argv[1] if len(sys.argv) > 1 else DATASET_EXEMPLO)
@@ -1,26 +1,34 @@
 import os
+import time
 import camelot
 import pandas as pd
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from unidecode import unidecode
 from configs.rules.notas import rules_dict
-from configs.tools.postgre import RDSPostgreSQLManager
+from configs.tools.postgre import RDSPostgreSQLManager, BulkLoader
+from configs.tools.parquet_store import ParquetStore
 
 logging.basicConfig(level=logging.INFO)
 
+# Regiões de cada regra de nota: nome -> prefixo das chaves em rules_dict
+REGIOES = {"header": "header_", "main": "", "small": "small_"}
+
+SQLITE_FALLBACK = "src/files/faturas.sqlite"
+
 class PDFTableExtractor:
     def __init__(self, file_name, configs):
-        self.path = os.path.abspath(f"src/files/pdf/{configs["name"].lower()}/{file_name}.pdf")
+        self.path = os.path.abspath(f"src/files/pdf/{configs['name'].lower()}/{file_name}.pdf")
         self.csv_path = os.path.abspath(f"src/files/csv/")
         self.file_name = file_name
         self.configs = configs
+        self.tempos = {}
 
-    def start(self):
+    def start(self, enviar_db=True):
         
         logging.info(f"Start pdf - {self.file_name}")
-        header = self.get_table_data(self.configs["header_table_areas"], self.configs["header_columns"],self.configs["header_fix"])
-        main = self.get_table_data(self.configs["table_areas"], self.configs["columns"],self.configs["fix"])
-        small = self.get_table_data(self.configs["small_table_areas"], self.configs["small_columns"],self.configs["small_fix"])
+        tabelas = self.get_tables_data()
+        header, main, small = tabelas["header"], tabelas["main"], tabelas["small"]
 
         main = self.add_infos(header,main)
         small = self.add_infos(header, small)
@@ -29,15 +37,60 @@ class PDFTableExtractor:
         if self.configs["small_sanitize"]:
             small = self.sanitize_column_names(small)
 
-        logging.info(f"Saving csv - {self.file_name}")
-        self.save_csv(main, self.file_name)
-        self.save_csv(small, f"{self.file_name}_small")
+        # Chave natural da carga: reprocessar a nota substitui as linhas dela no banco
+        main["arquivo"] = self.file_name
+        small["arquivo"] = self.file_name
+
+        logging.info(f"Saving parquet - {self.file_name}")
+        self.save_parquet(main, small)
+
+        if enviar_db:
+            logging.info(f"Sending to DB - {self.file_name}")
+            self.send_to_db({
+                f"Fatura_{self.configs['name']}".lower(): main,
+                f"Fatura_{self.configs['name']}_small".lower(): small,
+            })
+
+        return {"main": main, "small": small, "tempos": self.tempos}
+
+    def get_tables_data(self):
+        """
+        Lê o PDF uma única vez com todas as regiões da regra (header, main, small)
+        e separa as tabelas de cada região pelo bbox devolvido pelo camelot.
+        """
+        entradas = []
+        for regiao, prefixo in REGIOES.items():
+            for area, colunas in zip(self.configs[f"{prefixo}table_areas"], self.configs[f"{prefixo}columns"]):
+                entradas.append((regiao, area, colunas))
+        # O camelot associa `columns` às áreas ordenadas de cima para baixo na página
+        entradas.sort(key=lambda e: float(e[1].split(",")[1]), reverse=True)
+
+        inicio = time.perf_counter()
+        tables = camelot.read_pdf(
+            self.path,
+            flavor=self.configs["flavor"],
+            table_areas=[area for _, area, _ in entradas],
+            columns=[colunas for _, _, colunas in entradas],
+            strip_text=self.configs["strip_text"],
+            pages=self.configs["pages"],
+            password=self.configs["password"],
+        )
+        self.tempos["leitura_s"] = time.perf_counter() - inicio
 
-        logging.info(f"Sending to DB - {self.file_name}")
-        self.send_to_db(main, f"Fatura_{self.configs['name']}".lower())
-        self.send_to_db(small, f"Fatura_{self.configs['name']}_small".lower())
+        por_bbox = {tuple(sorted(float(v) for v in area.split(","))): regiao for regiao, area, _ in entradas}
+        por_regiao = {regiao: [] for regiao in REGIOES}
+        for i, table in enumerate(tables):
+            bbox = getattr(table, "_bbox", None)
+            regiao = por_bbox.get(tuple(sorted(bbox))) if bbox else None
+            por_regiao[regiao or entradas[i % len(entradas)][0]].append(table)
 
-        return {"main": main, "small": small}
+        resultado = {}
+        for regiao, prefixo in REGIOES.items():
+            inicio = time.perf_counter()
+            resultado[regiao] = self.assemble_table(por_regiao[regiao], self.configs[f"{prefixo}fix"])
+            self.tempos[regiao] = {"tabelas": len(por_regiao[regiao]), "linhas": len(resultado[regiao]),
+                                   "montagem_s": time.perf_counter() - inicio}
+        return resultado
 
 
     def get_table_data(self, table_areas, table_columns, fix = True):
@@ -50,7 +103,9 @@ class PDFTableExtractor:
             pages=self.configs["pages"],
             password=self.configs["password"],
         )
+        return self.assemble_table(tables, fix)
 
+    def assemble_table(self, tables, fix = True):
         table_content = [self.fix_header(page.df) if fix else page.df for page in tables]
 
         result = pd.concat(table_content, ignore_index=True) if len(table_content) > 1 else table_content[0]
@@ -58,10 +113,14 @@ class PDFTableExtractor:
 
     def save_csv(self, df, file_name):
         if not os.path.exists(self.csv_path):
-            os.makedirs(self.local_path, exist_ok=True)
+            os.makedirs(self.csv_path, exist_ok=True)
         path = os.path.join(self.csv_path, f"{file_name}.csv")
         df.to_csv(path, sep=";", index=False)
 
+    def save_parquet(self, main, small):
+        """Acrescenta a nota ao dataset Parquet particionado (corretora, data do pregão)."""
+        ParquetStore().append(self.configs["name"].lower(), main, small, self.file_name)
+
     def add_infos(self, header, content):
         infos = header.iloc[0]
         df = pd.DataFrame([infos.values] * len(content), columns=header.columns)
@@ -84,11 +143,11 @@ class PDFTableExtractor:
         return df
 
     @staticmethod
-    def send_to_db(df, table_name):
+    def send_to_db(frames):
+        """Carga em lote (COPY no PostgreSQL, SQLite local como fallback) de {tabela: DataFrame}."""
         try:
-            connection = RDSPostgreSQLManager().alchemy()
-            df.to_sql(table_name, connection, if_exists="append", index=False)
-            logging.info(f"Success to save into {table_name}")
+            engine = RDSPostgreSQLManager().engine_or_sqlite(SQLITE_FALLBACK)
+            return BulkLoader(engine).load(frames)
         except Exception as e:
             logging.error(e)
 
@@ -103,15 +162,52 @@ def list_files(folder):
         logging.info(f"Ocorreu um erro: {e}")
         return []
 
-if __name__ == "__main__":
+def processar_fatura(corretora, file_name):
+    """Worker do pool: extrai uma nota e devolve os DataFrames e os tempos por regra."""
+    return PDFTableExtractor(file_name, configs=rules_dict[corretora]).start(enviar_db=False)
+
+def extrair_faturas(corretoras=("jornada", "redrex"), max_workers=None, enviar_db=True):
+    """
+    Distribui os PDFs de todas as corretoras num pool de processos e resume os
+    tempos por regra. Ao final, tudo o que foi extraído vai ao banco numa única carga.
+    """
+    tarefas = [(c, f) for c in corretoras for f in list_files(os.path.abspath(f"src/files/pdf/{c}/"))]
+    resultados = {}
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(processar_fatura, c, f): (c, f) for c, f in tarefas}
+        for futuro in as_completed(futuros):
+            corretora, file_name = futuros[futuro]
+            try:
+                resultados[(corretora, file_name)] = futuro.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar {corretora}/{file_name}: {e}")
+    total = time.perf_counter() - inicio
+
+    logging.info(f"{len(resultados)}/{len(tarefas)} notas processadas em {total:.1f}s")
+    for corretora in corretoras:
+        tempos = [r["tempos"] for (c, _), r in resultados.items() if c == corretora]
+        if not tempos:
+            continue
+        leitura = sum(t["leitura_s"] for t in tempos)
+        logging.info(f"[{corretora}] {len(tempos)} notas | leitura do PDF (todas as regiões): {leitura:.2f}s ({leitura / len(tempos):.2f}s/nota)")
+        for regiao in REGIOES:
+            linhas = sum(t[regiao]["linhas"] for t in tempos)
+            montagem = sum(t[regiao]["montagem_s"] for t in tempos)
+            logging.info(f"[{corretora}]   {regiao:<6} {linhas} linhas | montagem {montagem * 1000:.1f} ms")
+
+    if enviar_db and resultados:
+        frames = {}
+        for (corretora, _), r in sorted(resultados.items()):
+            nome = rules_dict[corretora]["name"]
+            frames.setdefault(f"Fatura_{nome}".lower(), []).append(r["main"])
+            frames.setdefault(f"Fatura_{nome}_small".lower(), []).append(r["small"])
+        inicio = time.perf_counter()
+        PDFTableExtractor.send_to_db(frames)
+        logging.info(f"Carga no banco em {time.perf_counter() - inicio:.2f}s")
+    return resultados
 
+if __name__ == "__main__":
 
-    corretora = 'jornada'
-    path = os.path.abspath(f"src/files/pdf/{corretora}/")
-    path_windows = r"C:\Users\pedrovictor.veras\OneDrive - Operador Nacional do Sistema Eletrico\Documentos\ESTAGIO_ONS_PVRV_2025\GitHub\Palkia-PDF-extractor\src\files\pdf\jornada"
-    files = list_files(path)
-    
-    for file in files:
-        #print(file)
-        extractor = PDFTableExtractor(file, configs=rules_dict[corretora]).start()
+    extrair_faturas(("jornada", "redrex"))
     logging.info("Todos os arquivos foram processados")
\ No newline at end of file
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "ScrapperPDF", "src"))
+
+from automate.RAG.embedding_scheduler import EmbeddingScheduler, StubEmbeddingsComQuota
+
+PERIODO_S = 1.0
+
+
+def _textos(prefixo, n):
+    return [f"{prefixo} {i}" for i in range(n)], [f"{prefixo}-{i}" for i in range(n)]
+
+
+def test_chamadas_seguidas_dividem_o_balde():
+    stub = StubEmbeddingsComQuota(requisicoes_por_minuto=10, tokens_por_minuto=10**6, dimensao=4,
+                                  latencia_s=0.0, periodo_s=PERIODO_S)
+    scheduler = EmbeddingScheduler(stub.embed_documents, batch_size=5, requisicoes_por_minuto=10,
+                                   tokens_por_minuto=10**6, periodo_s=PERIODO_S)
+
+    # A primeira chamada (um PDF) gasta a cota inteira da janela...
+    scheduler.embed(*_textos("pdf1", 10))
+    assert scheduler.metricas["espera_limite_s"] < 0.1
+    assert scheduler.limiter.requisicoes.tokens < 1
+
+    # ...e a seguinte espera a reposição em vez de começar com o balde cheio
+    scheduler.embed(*_textos("pdf2", 10))
+    assert scheduler.metricas["espera_limite_s"] > 0.5 * PERIODO_S
+
+
+def test_reducao_apos_429_vale_para_a_chamada_seguinte():
+    scheduler = EmbeddingScheduler(lambda textos: [[0.0] for _ in textos], batch_size=5,
+                                   requisicoes_por_minuto=1000, tokens_por_minuto=10**6, periodo_s=PERIODO_S)
+    scheduler.embed(*_textos("pdf1", 5))
+    scheduler.limiter.penalizar()
+    fator = scheduler.limiter.requisicoes.fator
+
+    scheduler.embed(*_textos("pdf2", 5))
+    assert scheduler.limiter.requisicoes.fator < 1.0
+    assert scheduler.limiter.requisicoes.fator >= fator
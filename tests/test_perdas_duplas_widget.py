@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication, QMessageBox
+
+PASTA_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "BulbassaurQT6-ETL",
+                         "Perdas-Duplas-ETL-Desktop-V4")
+sys.path.insert(0, PASTA_APP)
+
+from gui.iframes.perdas_duplas_widget import PerdasDuplasWidget, ProcessingThread
+
+PDF_REV5 = os.path.join(PASTA_APP, "app", "assets", "Relatorios", "Lista de Contingências Duplas Analisadas_Rev5.pdf")
+PAGINAS = [0, 1, 2, 3, 4]
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def widget(app, monkeypatch):
+    monkeypatch.setattr(QMessageBox, "information", lambda *args, **kwargs: None)
+    widget = PerdasDuplasWidget()
+    widget.current_pdf_path = PDF_REV5
+    return widget
+
+
+def test_thread_entrega_as_paginas_lidas(widget, app):
+    recebido = {}
+    thread = ProcessingThread(PDF_REV5, "contingencias_duplas", page_range=PAGINAS,
+                              etl_controller=widget.etl_controller)
+    thread.pages_result_signal.connect(lambda por_pagina: recebido.update(paginas=por_pagina))
+    thread.result_signal.connect(lambda df: recebido.update(resultado=df))
+    thread.start()
+    thread.wait()
+    app.processEvents()
+
+    assert sorted(recebido["paginas"]) == [p + 1 for p in PAGINAS]
+    assert all(isinstance(df, pd.DataFrame) for df in recebido["paginas"].values())
+    total = sum(len(df) for df in recebido["paginas"].values())
+    assert total == len(recebido["resultado"]) > 0
+
+
+def test_resultado_exibido_e_guardado_por_pagina(widget, app):
+    widget.selected_pages = PAGINAS
+    controller = widget.ui_controller
+    controller.run_script("contingencias_duplas")
+    controller.thread.wait()
+    app.processEvents()
+
+    assert sorted(controller.resultados.paginas) == [p + 1 for p in PAGINAS]
+    assert len(widget.current_df) > 0
+    assert widget.results_table.rowCount() == len(widget.current_df)
+    # Intervalo contínuo desde a página 1: reduzir a seleção não reprocessa
+    assert controller.resultados.cobre([0, 1])
@@ -0,0 +1,99 @@
+import datetime as dt
+import glob
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+
+PASTA_SISBAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "NexusPy", "modules",
+                            "Mensal SISBAR Barras ausentes")
+sys.path.insert(0, PASTA_SISBAR)
+
+from planilhas_sisbar import PlanilhaXlsx
+
+AMOSTRAS = sorted(glob.glob(os.path.join(PASTA_SISBAR, "assets", "*.xlsx")))
+
+
+def _abas(caminhos):
+    wb_por_arquivo = {c: load_workbook(c, read_only=True).sheetnames for c in caminhos}
+    return [(c, aba) for c, abas in wb_por_arquivo.items() for aba in abas]
+
+
+def _sem_none_no_fim(valores):
+    valores = list(valores)
+    while valores and valores[-1] is None:
+        valores.pop()
+    return valores
+
+
+def _mesmo_valor(lido, esperado):
+    # O leitor devolve NaN nas células com erro (#N/A, #REF!...), como o pandas
+    if isinstance(esperado, str) and esperado in ERROR_CODES:
+        return isinstance(lido, float) and math.isnan(lido)
+    return lido == esperado and type(lido) is type(esperado)
+
+
+@pytest.fixture
+def planilha_bordas(tmp_path):
+    """Casos que o pd.read_excel trata de forma particular: cabeçalhos vazios/repetidos, textos NA, tipos mistos."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Bordas"
+    ws.append(["No.", "Nome", None, "Nome", "Data", "Flag", "Misto", "NA", "Num txt", "Nome.1", "Hora"])
+    ws.append([1, "A", None, "x", dt.datetime(2026, 1, 2), True, 1, "NA", "0123", 5, dt.time(10, 30)])
+    ws.append([2, "N/A", "z", None, dt.datetime(2026, 1, 3), False, "b", "null", "12", None, dt.time(11, 0)])
+    ws.append([None] * 11)
+    ws.append([3.5, "", "=1/0", "y", "texto", True, dt.datetime(2026, 2, 1), "", "1e3", 7, None])
+    ws = wb.create_sheet("Tipos")
+    ws.append(["bool", "data", "int", "txt", 2026, 2026, None, "boolna", "mix"])
+    ws.append([True, dt.datetime(2026, 1, 1), 1, " 12 ", 1, "a", None, True, 1])
+    ws.append([False, dt.datetime(2026, 1, 2), 2, "1,5", 2, "b", None, None, "2"])
+    ws.append([True, dt.datetime(2026, 1, 3, 10), 3, "-7", 3, "c", 9, "NA", "x"])
+    ws = wb.create_sheet("Inteiros")
+    ws.append(["a", "b", None])
+    ws.append([1, 2, None])
+    ws.append([3, None, None])
+    ws.append([None, None, "fim"])
+    wb.create_sheet("Vazia")
+    wb.create_sheet("SoCabecalho").append(["x", "y"])
+    caminho = tmp_path / "bordas.xlsx"
+    wb.save(caminho)
+    return str(caminho)
+
+
+@pytest.mark.parametrize("caminho,aba", _abas(AMOSTRAS), ids=lambda v: os.path.basename(v))
+def test_valores_e_formulas_como_openpyxl(caminho, aba):
+    lida = PlanilhaXlsx(caminho).ler_aba(aba)
+    valores = load_workbook(caminho, read_only=True, data_only=True)[aba]
+    formulas = load_workbook(caminho, read_only=True, data_only=False)[aba]
+
+    linhas_valores = [_sem_none_no_fim(linha) for linha in valores.iter_rows(values_only=True)]
+    while linhas_valores and not linhas_valores[-1]:
+        linhas_valores.pop()
+    assert len(lida.valores) == len(linhas_valores)
+    for numero, esperada in enumerate(linhas_valores, start=1):
+        obtida = lida.linha(numero)
+        assert len(obtida) == len(esperada), f"linha {numero}"
+        assert all(_mesmo_valor(o, e) for o, e in zip(obtida, esperada)), f"linha {numero}: {obtida} != {esperada}"
+
+    esperadas = {(c.row, c.column): c.value for linha in formulas.iter_rows() for c in linha
+                 if getattr(c, "data_type", None) == "f"}
+    assert lida.formulas == esperadas
+
+
+@pytest.mark.parametrize("caminho,aba", _abas(AMOSTRAS), ids=lambda v: os.path.basename(v))
+def test_dataframe_como_read_excel(caminho, aba):
+    obtido = PlanilhaXlsx(caminho).ler_aba(aba).dataframe()
+    esperado = pd.read_excel(caminho, sheet_name=aba, engine="openpyxl")
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+
+@pytest.mark.parametrize("aba", ["Bordas", "Tipos", "Inteiros", "Vazia", "SoCabecalho"])
+def test_dataframe_como_read_excel_casos_de_borda(planilha_bordas, aba):
+    obtido = PlanilhaXlsx(planilha_bordas).ler_aba(aba).dataframe()
+    esperado = pd.read_excel(planilha_bordas, sheet_name=aba, engine="openpyxl")
+    pd.testing.assert_frame_equal(obtido, esperado)
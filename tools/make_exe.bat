@@ -5,7 +5,9 @@ setlocal
 set NAME=run
 
 cd %~dp0\..
-pyinstaller.exe %NAME%.py --onefile --noconsole --clean --add-data app\data;app\data
+REM O ETL compartilhado (src\etl_core) entra no executavel junto com o exemplo TXT
+pyinstaller.exe %NAME%.py --onefile --noconsole --clean --add-data app\data;app\data ^
+    --paths src --hidden-import etl_core --add-data src\etl_core\dataset_perdas_duplas.txt;etl_core
 move dist\%NAME%.exe %~dp0\
 rmdir /S /Q build dist
 del %NAME%.spec